@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the Payroll Management System
+
+Run with:
+    python -m benchmarks.run --sizes 100,1000 --output results.json
+"""
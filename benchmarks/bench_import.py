@@ -0,0 +1,57 @@
+"""
+Bulk employee import benchmarks
+
+Each benchmark writes ``size`` new employees to a file in the dataset's work
+directory once, then times importing it (the imported rows are removed
+before every run, and the employees collection is restored afterwards).
+"""
+import csv
+
+from openpyxl import Workbook
+
+from payroll_system.services.import_service import EmployeeImportService
+from benchmarks.harness import Dataset, benchmark
+
+COLUMNS = ('employee_id', 'employee_name', 'email', 'mobile_number', 'gender',
+           'basic_salary', 'bank_account_number', 'joining_date')
+
+
+def _rows(dataset: Dataset):
+    for i in range(dataset.size):
+        yield (f"IMP{i:07d}", f"Imported Employee {i}", f"imported.{i}@example.com",
+               f"9{i:09d}", "Female" if i % 2 else "Male", 15000 + (i % 50) * 1000,
+               f"{i:012d}", "2025-04-01")
+
+
+def _import(dataset: Dataset, path):
+    service = EmployeeImportService()
+    employees = dataset.database.employees
+
+    def body():
+        employees.delete_many({'employee_id': {'$regex': '^IMP'}})
+        report = service.import_file(path)
+        assert report.imported == dataset.size, report.summary()
+    return body
+
+
+@benchmark("import.employees_csv", group="import", repeat=3, ops=lambda d: d.size, restores=('employees',))
+def employees_csv(dataset: Dataset):
+    path = dataset.workdir / "employees.csv"
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(_rows(dataset))
+    return _import(dataset, path)
+
+
+@benchmark("import.employees_xlsx", group="import", repeat=3, ops=lambda d: d.size,
+           restores=('employees',))
+def employees_xlsx(dataset: Dataset):
+    path = dataset.workdir / "employees.xlsx"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Employees")
+    ws.append(COLUMNS)
+    for row in _rows(dataset):
+        ws.append(row)
+    wb.save(str(path))
+    return _import(dataset, path)
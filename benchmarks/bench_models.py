@@ -0,0 +1,74 @@
+"""
+Model hydration and serialisation benchmarks
+"""
+from payroll_system.models.attendance import Attendance
+from payroll_system.models.employee import Employee
+from payroll_system.models.master_data import Department, Designation, Holiday
+from payroll_system.models.payroll import Payroll
+from payroll_system.models.payroll_batch import PayrollBatch
+from benchmarks.harness import Dataset, benchmark
+
+
+def _employee_docs(dataset: Dataset):
+    return list(dataset.database.employees.find({}))
+
+
+@benchmark("models.employee_from_dict", group="models", ops=lambda d: d.size)
+def employee_from_dict(dataset: Dataset):
+    docs = _employee_docs(dataset)
+    return lambda: [Employee.from_dict(doc) for doc in docs]
+
+
+@benchmark("models.employee_to_dict", group="models", ops=lambda d: d.size)
+def employee_to_dict(dataset: Dataset):
+    employees = [Employee.from_dict(doc) for doc in _employee_docs(dataset)]
+    return lambda: [employee.to_dict() for employee in employees]
+
+
+@benchmark("models.employee_init", group="models", ops=lambda d: d.size)
+def employee_init(dataset: Dataset):
+    docs = _employee_docs(dataset)
+    return lambda: [Employee(doc['employee_id'], doc['employee_name'], doc['email'], '',
+                             department_id=doc['department_id'], basic_salary=doc['basic_salary'])
+                    for doc in docs]
+
+
+@benchmark("models.attendance_from_dict", group="models", repeat=3,
+           ops=lambda d: d.database.attendance.estimated_document_count())
+def attendance_from_dict(dataset: Dataset):
+    docs = list(dataset.database.attendance.find({}))
+    return lambda: [Attendance.from_dict(doc) for doc in docs]
+
+
+@benchmark("models.payroll_from_dict", group="models",
+           ops=lambda d: d.database.payrolls.estimated_document_count())
+def payroll_from_dict(dataset: Dataset):
+    docs = list(dataset.database.payrolls.find({}))
+    return lambda: [Payroll.from_dict(doc) for doc in docs]
+
+
+@benchmark("models.master_data_from_dict", group="models")
+def master_data_from_dict(dataset: Dataset):
+    database = dataset.database
+    departments = list(database.departments.find({}))
+    designations = list(database.designations.find({}))
+    holidays = list(database.holidays.find({}))
+    return lambda: ([Department.from_dict(d) for d in departments],
+                    [Designation.from_dict(d) for d in designations],
+                    [Holiday.from_dict(d) for d in holidays])
+
+
+@benchmark("models.payroll_batch_from_cursor", group="models",
+           ops=lambda d: d.database.payrolls.estimated_document_count())
+def payroll_batch_from_cursor(dataset: Dataset):
+    docs = list(dataset.database.payrolls.find({}))
+    return lambda: PayrollBatch.from_cursor(docs)
+
+
+@benchmark("models.payroll_batch_group_totals", group="models",
+           ops=lambda d: d.database.payrolls.estimated_document_count())
+def payroll_batch_group_totals(dataset: Dataset):
+    batch = PayrollBatch.from_cursor(dataset.database.payrolls.find({}))
+    departments = {d['employee_id']: d['department_id']
+                   for d in dataset.database.employees.find({}, {'employee_id': 1, 'department_id': 1})}
+    return lambda: (batch.group_totals('employee_id'), batch.group_totals(departments))
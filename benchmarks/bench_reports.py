@@ -0,0 +1,115 @@
+"""
+Excel export and payslip PDF benchmarks
+
+Reports are written to the dataset's temporary work directory instead of the
+application's exports folder, which is restored when each benchmark ends.
+"""
+from contextlib import contextmanager
+from payroll_system.reports import excel_export, payslip_generator
+from payroll_system.reports.excel_export import ExcelExporter
+from payroll_system.reports.payslip_generator import PayslipGenerator
+from payroll_system.services.attendance_service import AttendanceService
+from payroll_system.services.employee_service import EmployeeService
+from payroll_system.services.payroll_service import PayrollService
+from payroll_system.services.reconciliation import RECONCILE_FIELDS, ReconciliationService, reconcile
+from benchmarks.harness import Dataset, benchmark
+
+
+@contextmanager
+def _redirect_output(dataset: Dataset):
+    saved = excel_export.EXPORTS_DIR, payslip_generator.PAYSLIPS_DIR
+    excel_export.EXPORTS_DIR = payslip_generator.PAYSLIPS_DIR = dataset.workdir
+    try:
+        yield
+    finally:
+        excel_export.EXPORTS_DIR, payslip_generator.PAYSLIPS_DIR = saved
+
+
+def _history_month(dataset: Dataset) -> int:
+    return dataset.month - 1
+
+
+@benchmark("reports.export_payroll_report", group="reports", repeat=3, ops=lambda d: d.size,
+           context=_redirect_output)
+def export_payroll_report(dataset: Dataset):
+    month = _history_month(dataset)
+    service = PayrollService()
+    exporter = ExcelExporter()
+    return lambda: exporter.export_payroll_report(service.iter_payrolls(month, dataset.year), month, dataset.year)
+
+
+@benchmark("reports.export_employee_list", group="reports", repeat=3, ops=lambda d: d.size,
+           context=_redirect_output)
+def export_employee_list(dataset: Dataset):
+    service = EmployeeService()
+    exporter = ExcelExporter()
+    return lambda: exporter.export_employee_list(service.iter_employees(status=1))
+
+
+@benchmark("reports.export_attendance_report", group="reports", repeat=3,
+           ops=lambda d: d.size, max_size=10000, context=_redirect_output)
+def export_attendance_report(dataset: Dataset):
+    service = AttendanceService()
+    exporter = ExcelExporter()
+    # Streams the month from the database on every call, as the Reports page does
+    return lambda: exporter.export_attendance_report(
+        service.iter_month_attendance(dataset.month, dataset.year), dataset.month, dataset.year)
+
+
+@benchmark("reports.generate_salary_summary", group="reports", repeat=3, ops=lambda d: d.size,
+           context=_redirect_output)
+def generate_salary_summary(dataset: Dataset):
+    service = PayrollService()
+    payrolls = []
+    for month in range(1, dataset.month):
+        payrolls.extend(service.get_all_payrolls(month, dataset.year))
+    exporter = ExcelExporter()
+    return lambda: exporter.generate_salary_summary(payrolls, dataset.year)
+
+
+@benchmark("reports.generate_salary_summary_batch", group="reports", repeat=3, ops=lambda d: d.size,
+           context=_redirect_output)
+def generate_salary_summary_batch(dataset: Dataset):
+    service = PayrollService()
+    exporter = ExcelExporter()
+    return lambda: exporter.generate_salary_summary(service.get_payroll_batch(dataset.year), dataset.year)
+
+
+@benchmark("reports.generate_salary_summary_grouped", group="reports", repeat=3, ops=lambda d: d.size,
+           context=_redirect_output)
+def generate_salary_summary_grouped(dataset: Dataset):
+    service = PayrollService()
+    exporter = ExcelExporter()
+    return lambda: exporter.generate_salary_summary(service.get_annual_totals(dataset.year), dataset.year)
+
+
+@benchmark("reports.reconcile_month", group="reports", repeat=3, ops=lambda d: d.size,
+           context=_redirect_output)
+def reconcile_month(dataset: Dataset):
+    month = _history_month(dataset)
+    service = ReconciliationService()
+    exporter = ExcelExporter()
+    return lambda: exporter.export_reconciliation(service.reconcile_month(month, dataset.year))
+
+
+@benchmark("reports.reconcile_join", group="reports", repeat=3, ops=lambda d: d.size * 100)
+def reconcile_join(dataset: Dataset):
+    # The join alone on two synthetic months of size * 100 rows (100k at size 1000)
+    rows = dataset.size * 100
+    ids = [f"SIM{i:07d}" for i in range(rows)]
+    previous = {'employee_id': ids[:-50]}
+    current = {'employee_id': ids[50:]}
+    for n, field in enumerate(RECONCILE_FIELDS):
+        previous[field] = [20000.0 + (i * 37 + n) % 9000 for i in range(rows - 50)]
+        current[field] = [20000.0 + (i * 41 + n) % 9000 for i in range(rows - 50)]
+    return lambda: reconcile(current, previous, ids[:-20], 2, 2025).counts()
+
+
+@benchmark("reports.payslip_pdf", group="reports", context=_redirect_output)
+def payslip_pdf(dataset: Dataset):
+    month = _history_month(dataset)
+    employee_id = dataset.database.payrolls.find_one({'month': month, 'year': dataset.year})['employee_id']
+    employee = EmployeeService().get_employee(employee_id)
+    payroll = PayrollService().get_payroll(employee_id, month, dataset.year)
+    generator = PayslipGenerator()
+    return lambda: generator.generate_payslip(employee, payroll)
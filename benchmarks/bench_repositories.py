@@ -0,0 +1,75 @@
+"""
+Repository read benchmarks
+"""
+from datetime import date
+from payroll_system.repository.attendance_repository import AttendanceRepository
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.migration_repository import ATTENDANCE_BUCKETS
+from payroll_system.repository.salary_history_repository import SalaryHistoryRepository
+from payroll_system.models.salary_history import SalaryRecord, salary_date
+from payroll_system.tools.migrate_storage import MIGRATIONS, MigrationRunner
+from benchmarks.harness import Dataset, benchmark
+
+MONTH_SCAN_EMPLOYEES = 50
+
+
+@benchmark("repository.employee_get_all", group="repository", ops=lambda d: d.size)
+def employee_get_all(dataset: Dataset):
+    repo = EmployeeRepository()
+    return lambda: repo.get_all(status=1)
+
+
+@benchmark("repository.employee_search", group="repository")
+def employee_search(dataset: Dataset):
+    repo = EmployeeRepository()
+    return lambda: repo.search("kumar")
+
+
+def _collection_stats(name: str):
+    def stats(dataset: Dataset) -> dict:
+        info = dataset.database.command('collStats', name)
+        return {'documents': info['count'], 'data_bytes': info['size'],
+                'index_bytes': info.get('totalIndexSize', 0)}
+    return stats
+
+
+def _month_scan(dataset: Dataset, layout: str):
+    repo = AttendanceRepository(layout)
+    employee_ids = dataset.sample_ids(MONTH_SCAN_EMPLOYEES)
+
+    def body():
+        for employee_id in employee_ids:
+            repo.get_by_employee_month(employee_id, dataset.month, dataset.year)
+    return body
+
+
+@benchmark("repository.attendance_month_daily", group="repository",
+           ops=lambda d: len(d.sample_ids(MONTH_SCAN_EMPLOYEES)), stats=_collection_stats('attendance'))
+def attendance_month_daily(dataset: Dataset):
+    return _month_scan(dataset, 'daily')
+
+
+@benchmark("repository.attendance_month_monthly", group="repository",
+           ops=lambda d: len(d.sample_ids(MONTH_SCAN_EMPLOYEES)), stats=_collection_stats('attendance_months'))
+def attendance_month_monthly(dataset: Dataset):
+    # Bucket the dataset's attendance once per size
+    MigrationRunner(dataset.database, batch_size=5000, progress=lambda message: None).run(
+        MIGRATIONS[ATTENDANCE_BUCKETS])
+    return _month_scan(dataset, 'monthly')
+
+
+@benchmark("repository.attendance_all_by_month", group="repository", ops=lambda d: d.size)
+def attendance_all_by_month(dataset: Dataset):
+    repo = AttendanceRepository('daily')
+    return lambda: sum(1 for _ in repo.get_all_by_month(dataset.month, dataset.year))
+
+
+@benchmark("repository.salary_as_of", group="repository", ops=lambda d: d.size,
+           restores=('salary_history',))
+def salary_as_of(dataset: Dataset):
+    # Three records for each of size synthetic IDs, one after the month
+    repo = SalaryHistoryRepository()
+    repo.save_many(SalaryRecord(f"HIST{i:07d}", date(year, 4, 1), 20000.0 + (year - 2023) * 1000)
+                   for i in range(dataset.size) for year in (2023, 2024, 2025))
+    on = salary_date(dataset.month, dataset.year)
+    return lambda: repo.get_salaries_as_of(on)
@@ -0,0 +1,140 @@
+"""
+Attendance and payroll service benchmarks
+"""
+from datetime import date
+from payroll_system.services.arrears_service import ArrearsService
+from payroll_system.services.attendance_service import AttendanceService
+from payroll_system.services.payroll_service import PayrollService
+from payroll_system.services.salary_revision import SalaryRevision, SalaryRevisionService, simulate
+from benchmarks.harness import Dataset, benchmark
+
+SAMPLE = 50
+
+# Collections written by payroll generation (restored after each benchmark)
+PAYROLLS = ('payrolls', 'payroll_runs')
+
+
+@benchmark("service.attendance_summary", group="service", ops=lambda d: min(SAMPLE, d.size))
+def attendance_summary(dataset: Dataset):
+    service = AttendanceService()
+    ids = dataset.sample_ids(SAMPLE)
+    return lambda: [service.calculate_attendance_summary(i, dataset.month, dataset.year) for i in ids]
+
+
+@benchmark("service.working_days", group="service", repeat=20)
+def working_days(dataset: Dataset):
+    service = PayrollService()
+    return lambda: service._calculate_working_days(dataset.month, dataset.year)
+
+
+@benchmark("service.generate_payroll_single", group="service", ops=lambda d: min(SAMPLE, d.size),
+           restores=PAYROLLS)
+def generate_payroll_single(dataset: Dataset):
+    service = PayrollService()
+    ids = dataset.sample_ids(SAMPLE)
+
+    def body():
+        for employee_id in ids:
+            service.delete_payroll(employee_id, dataset.month, dataset.year)
+            service.generate_payroll(employee_id, dataset.month, dataset.year)
+    return body
+
+
+@benchmark("service.generate_payroll_batch", group="service", repeat=3,
+           ops=lambda d: len(d.employee_ids), max_size=10000, restores=PAYROLLS)
+def generate_payroll_batch(dataset: Dataset):
+    service = PayrollService()
+    payrolls = dataset.database.payrolls
+
+    def body():
+        payrolls.delete_many({'month': dataset.month, 'year': dataset.year})
+        for employee_id in dataset.employee_ids:
+            service.generate_payroll(employee_id, dataset.month, dataset.year)
+    return body
+
+
+@benchmark("service.generate_payroll_run", group="service", repeat=3, ops=lambda d: len(d.employee_ids),
+           restores=PAYROLLS)
+def generate_payroll_run(dataset: Dataset):
+    service = PayrollService()
+    payrolls = dataset.database.payrolls
+
+    def body():
+        payrolls.delete_many({'month': dataset.month, 'year': dataset.year})
+        service.generate_payroll_run(dataset.month, dataset.year)
+    return body
+
+
+@benchmark("service.calculate_batch", group="service", ops=lambda d: len(d.employee_ids))
+def calculate_batch(dataset: Dataset):
+    service = PayrollService()
+    employees = service.employee_repo.get_all(status=1)
+    summaries = service.attendance_service.calculate_attendance_summaries(
+        [employee.employee_id for employee in employees], dataset.month, dataset.year)
+    working_days = service._calculate_working_days(dataset.month, dataset.year)
+    return lambda: service.calculator.calculate_batch(employees, dataset.month, dataset.year,
+                                                      summaries, working_days)
+
+
+@benchmark("service.recompute_stale", group="service", repeat=3, ops=lambda d: len(d.employee_ids),
+           restores=PAYROLLS)
+def recompute_stale(dataset: Dataset):
+    service = PayrollService()
+    payrolls = dataset.database.payrolls
+    payrolls.delete_many({'month': dataset.month, 'year': dataset.year})
+    service.generate_payroll_run(dataset.month, dataset.year)
+
+    def body():
+        # As after a holiday change: every payroll of the month is stale
+        payrolls.update_many({'month': dataset.month, 'year': dataset.year}, {'$set': {'stale': True}})
+        service.recompute_stale(dataset.month, dataset.year)
+    return body
+
+
+@benchmark("service.preview_payroll_run", group="service", repeat=3, ops=lambda d: len(d.employee_ids),
+           restores=PAYROLLS)
+def preview_payroll_run(dataset: Dataset):
+    service = PayrollService()
+    dataset.database.payrolls.delete_many({'month': dataset.month, 'year': dataset.year})
+    return lambda: service.preview_payroll_run(dataset.month, dataset.year)
+
+
+REVISION = SalaryRevision(percent=5, slabs=((0, 20000, 12), (20000, 50000, 8)), round_to=100)
+
+
+@benchmark("service.salary_revision", group="service", repeat=3, ops=lambda d: len(d.employee_ids))
+def salary_revision(dataset: Dataset):
+    service = SalaryRevisionService()
+
+    def body():
+        impact = service.simulate_revision(REVISION)
+        return impact.totals(), impact.rollup('department'), impact.rollup('branch')
+    return body
+
+
+@benchmark("service.salary_revision_simulate", group="service", repeat=3, ops=lambda d: d.size * 100)
+def salary_revision_simulate(dataset: Dataset):
+    # The calculation alone on size * 100 synthetic employees (100k at size 1000)
+    rows = dataset.size * 100
+    employees = {
+        'employee_id': [f"SIM{i:07d}" for i in range(rows)],
+        'basic_salary': [8000.0 + (i % 200) * 450 for i in range(rows)],
+        'department_id': [f"DEPT{i % 8 + 1:03d}" for i in range(rows)],
+        'branch_id': [f"BR{i % 5 + 1:03d}" for i in range(rows)],
+        'location': [("Pune", "Mumbai", "Bengaluru")[i % 3] for i in range(rows)],
+    }
+
+    def body():
+        impact = simulate(employees, REVISION)
+        return impact.totals(), impact.rollup('department'), impact.rollup('branch')
+    return body
+
+
+@benchmark("service.compute_arrears", group="service", repeat=3,
+           ops=lambda d: len(d.employee_ids) * (d.month - 1), restores=('employees', 'arrears'))
+def compute_arrears(dataset: Dataset):
+    # A revision effective from January over the whole payroll history
+    service = ArrearsService()
+    dataset.database.employees.update_many({}, {'$inc': {'basic_salary': 1000}})
+    through = (dataset.year, dataset.month - 1)
+    return lambda: service.compute_arrears(date(dataset.year, 1, 1), 'bench', through=through)
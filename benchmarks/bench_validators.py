@@ -0,0 +1,76 @@
+"""
+Validation benchmarks
+
+Columns of ``size * 1000`` synthetic employee rows (a million at size 1000),
+about 1% of them invalid. ``validators.rows`` checks them one row at a time
+with the single-value functions, as the importer used to; ``validators.columns``
+checks the same data with ``validate_columns``.
+"""
+from payroll_system.utils.validators import (calculate_pt, calculate_pt_batch, validate_bank_account,
+                                             validate_columns, validate_date, validate_email,
+                                             validate_phone, validate_salary)
+from benchmarks.harness import Dataset, benchmark
+
+ROWS_PER_EMPLOYEE = 1000
+REQUIRED = ('employee_id', 'employee_name', 'email')
+
+
+def _rows(dataset: Dataset) -> int:
+    return dataset.size * ROWS_PER_EMPLOYEE
+
+
+def _columns(rows: int):
+    bad = lambda i: i % 97 == 0  # noqa: E731
+    return {
+        'employee_id': [f"EMP{i:07d}" for i in range(rows)],
+        'employee_name': [f"Employee {i}" for i in range(rows)],
+        'email': [f"employee.{i}@example" if bad(i) else f"employee.{i}@example.com" for i in range(rows)],
+        'mobile_number': [f"9{i:09d}" for i in range(rows)],
+        'bank_account_number': [f"{i:012d}" for i in range(rows)],
+        'basic_salary': [str(8000 + (i % 60) * 500) for i in range(rows)],
+        'dob': ["1990-02-30" if bad(i + 1) else "1990-05-17" for i in range(rows)],
+        'joining_date': ["2024-04-01"] * rows,
+    }
+
+
+def _first_error(row: dict):
+    for name in REQUIRED:
+        if not row.get(name):
+            return f"Missing {name.replace('_', ' ')}"
+    if not validate_email(row['email']):
+        return "Invalid email format"
+    if row['mobile_number'] and not validate_phone(row['mobile_number']):
+        return "Invalid phone number"
+    if row['bank_account_number'] and not validate_bank_account(row['bank_account_number']):
+        return "Invalid bank account number"
+    if row['basic_salary'] and not validate_salary(row['basic_salary']):
+        return "Invalid basic salary"
+    for name in ('dob', 'joining_date'):
+        if row[name] and not validate_date(row[name]):
+            return f"Invalid {name.replace('_', ' ')} (expected YYYY-MM-DD)"
+    return None
+
+
+@benchmark("validators.rows", group="validators", repeat=3, ops=_rows)
+def rows(dataset: Dataset):
+    columns = _columns(_rows(dataset))
+    table = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return lambda: [error for error in map(_first_error, table) if error]
+
+
+@benchmark("validators.columns", group="validators", repeat=3, ops=_rows)
+def columns(dataset: Dataset):
+    data = _columns(_rows(dataset))
+    return lambda: validate_columns(data, required=REQUIRED)
+
+
+@benchmark("validators.pt", group="validators", repeat=3, ops=_rows)
+def pt(dataset: Dataset):
+    salaries = _columns(_rows(dataset))['basic_salary']
+    return lambda: [calculate_pt(salary) for salary in salaries]
+
+
+@benchmark("validators.pt_batch", group="validators", repeat=3, ops=_rows)
+def pt_batch(dataset: Dataset):
+    salaries = _columns(_rows(dataset))['basic_salary']
+    return lambda: calculate_pt_batch(salaries)
@@ -0,0 +1,229 @@
+"""
+Benchmark registry, dataset fixture, timing and baseline comparison
+"""
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence, Tuple
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+
+from payroll_system.utils.database import db
+from payroll_system.utils.query_budget import QueryBudget
+from payroll_system.tools.generate_data import BulkLoader, WorkforceGenerator
+
+# Month/year every dataset is generated for. Attendance covers BENCH_MONTHS
+# months; payroll history stops one month earlier so payroll generation has an
+# unprocessed month (BENCH_MONTHS) to work on.
+BENCH_YEAR = 2025
+BENCH_MONTHS = 3
+BENCH_MONTH = BENCH_MONTHS
+
+
+@dataclass
+class Dataset:
+    """Synthetic data loaded into a fresh in-memory store.
+
+    ``workdir`` holds the files benchmarks write (exports, payslips, import
+    files); use the dataset as a context manager, or call ``close``, to delete it.
+    """
+    size: int
+    year: int = BENCH_YEAR
+    month: int = BENCH_MONTH
+    workdir: Path = field(default_factory=lambda: Path(tempfile.mkdtemp(prefix="payroll_bench_")))
+    employee_ids: List[str] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, size: int, seed: int = 42) -> 'Dataset':
+        db.disconnect()
+        # Metrics on for the round trip counts
+        database = db.connect(backend="memory", metrics=True)
+        generator = WorkforceGenerator(size, BENCH_YEAR, seed=seed,
+                                       payroll_months=BENCH_MONTHS - 1, months=BENCH_MONTHS)
+        # The empty store was marked migrated at connect; generated documents
+        # are already in the current storage format
+        generator.generate(BulkLoader(database, batch_size=5000))
+        dataset = cls(size)
+        dataset.employee_ids = [d['employee_id'] for d in database.employees.find({'status': 1}, {'employee_id': 1})]
+        return dataset
+
+    def close(self) -> None:
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self) -> 'Dataset':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def database(self):
+        return db.get_db()
+
+    def snapshot(self, names: Sequence[str]) -> Dict[str, List[dict]]:
+        """Copies of every document of the named collections"""
+        return {name: list(self.database[name].find()) for name in names}
+
+    def restore(self, snapshot: Dict[str, List[dict]]) -> None:
+        """Put the collections back as they were in ``snapshot``"""
+        for name, docs in snapshot.items():
+            collection = self.database[name]
+            collection.delete_many({})
+            if docs:
+                collection.insert_many(docs)
+
+    def sample_ids(self, count: int) -> List[str]:
+        """Evenly spaced active employee IDs"""
+        step = max(len(self.employee_ids) // max(count, 1), 1)
+        return self.employee_ids[::step][:count]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[Dataset], Callable[[], object]]
+    group: str
+    repeat: int = 5
+    # Number of logical operations per call, used for per-op figures
+    ops: Callable[[Dataset], int] = lambda dataset: 1
+    max_size: Optional[int] = None
+    # Extra figures recorded with the result, e.g. storage sizes
+    stats: Optional[Callable[[Dataset], dict]] = None
+    # Collections the benchmark writes; restored afterwards so later
+    # benchmarks see the generated dataset whatever ran before them
+    restores: Tuple[str, ...] = ()
+    # Entered around the setup and the timed calls (e.g. to redirect output
+    # files); it must undo whatever it changes on exit
+    context: Optional[Callable[[Dataset], ContextManager]] = None
+
+
+REGISTRY: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, group: str, repeat: int = 5, ops=None, max_size: Optional[int] = None,
+              stats=None, restores: Sequence[str] = (), context=None):
+    """Register ``setup(dataset) -> callable`` as a benchmark.
+
+    The setup function runs once per dataset size; the returned callable is the
+    timed body and may be called several times. ``stats(dataset)`` may return
+    extra figures (e.g. collection sizes) stored with the result. Benchmarks
+    that change data name the collections in ``restores``; ``context(dataset)``
+    returns a context manager held while the benchmark runs.
+    """
+    def decorator(setup):
+        REGISTRY[name] = Benchmark(name, setup, group, repeat,
+                                   ops or (lambda dataset: 1), max_size, stats, tuple(restores), context)
+        return setup
+    return decorator
+
+
+def run_benchmark(bench: Benchmark, dataset: Dataset) -> dict:
+    snapshot = dataset.snapshot(bench.restores)
+    try:
+        with bench.context(dataset) if bench.context else nullcontext():
+            return _run_benchmark(bench, dataset)
+    finally:
+        dataset.restore(snapshot)
+
+
+def _run_benchmark(bench: Benchmark, dataset: Dataset) -> dict:
+    body = bench.setup(dataset)
+    ops = max(bench.ops(dataset), 1)
+    # Warm-up call, also counting round trips. Shapes repeated more than once
+    # per logical operation are reported as N+1 suspects.
+    with QueryBudget(f"{bench.name}@{dataset.size}", max_repeats=max(ops, 5)) as budget:
+        body()
+    timings = []
+    for _ in range(bench.repeat):
+        started = time.perf_counter()
+        body()
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    result = {
+        'benchmark': bench.name,
+        'group': bench.group,
+        'size': dataset.size,
+        'repeat': bench.repeat,
+        'min': min(timings),
+        'median': median,
+        'mean': statistics.fmean(timings),
+        'ops': ops,
+        'per_op': median / ops,
+        'queries': budget.count,
+        'repeated_shapes': len(budget.repeated()),
+    }
+    if bench.stats:
+        result['stats'] = bench.stats(dataset)
+    return result
+
+
+def run_all(sizes: List[int], names: Optional[List[str]] = None, seed: int = 42,
+            progress: Callable[[str], None] = print) -> dict:
+    """Run the selected benchmarks at every dataset size"""
+    selected = [b for n, b in REGISTRY.items() if not names or any(p in n for p in names)]
+    results = {}
+    for size in sizes:
+        progress(f"Building dataset with {size:,} employees...")
+        with Dataset.build(size, seed=seed) as dataset:
+            for bench in selected:
+                if bench.max_size and size > bench.max_size:
+                    continue
+                result = run_benchmark(bench, dataset)
+                results[f"{bench.name}@{size}"] = result
+                progress(f"  {bench.name:<40} {result['median'] * 1000:>10.2f} ms  "
+                         f"({result['per_op'] * 1e6:,.1f} us/op, {result['queries']:,} queries)")
+                if 'stats' in result:
+                    progress("      " + ", ".join(f"{k}={v:,}" for k, v in result['stats'].items()))
+    db.disconnect()
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.20,
+            overrides: Optional[Dict[str, float]] = None) -> List[dict]:
+    """Compare median timings against a baseline.
+
+    A benchmark regresses when ``current / baseline - 1`` exceeds its
+    tolerance. ``overrides`` maps benchmark names (without the size suffix) to
+    their own tolerance.
+    """
+    overrides = overrides or {}
+    rows = []
+    for key, result in current['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if not base or not base['median']:
+            continue
+        allowed = overrides.get(result['benchmark'], tolerance)
+        change = result['median'] / base['median'] - 1
+        rows.append({
+            'key': key,
+            'baseline': base['median'],
+            'current': result['median'],
+            'change': change,
+            'tolerance': allowed,
+            'regressed': change > allowed,
+        })
+    return rows
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def save_results(results: dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(results, fh, indent=2)
@@ -0,0 +1,73 @@
+"""
+Benchmark runner
+
+Examples:
+    python -m benchmarks.run --sizes 100,1000 --output results.json
+    python -m benchmarks.run --sizes 1000 --baseline benchmarks/baseline.json --tolerance 0.25
+    python -m benchmarks.run --only models,reports --tolerance-for reports.payslip_pdf=0.5
+
+Exits with status 1 when any benchmark regresses beyond its tolerance.
+"""
+import argparse
+import logging
+import sys
+
+from benchmarks.harness import REGISTRY, compare, load_results, run_all, save_results
+# Importing the modules registers their benchmarks
+from benchmarks import bench_models, bench_repositories, bench_services, bench_reports, bench_import, \
+    bench_validators  # noqa: F401
+
+
+def _parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        name, _, tolerance = value.partition('=')
+        overrides[name] = float(tolerance)
+    return overrides
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run payroll performance benchmarks")
+    parser.add_argument("--sizes", default="100,1000", help="comma separated employee counts")
+    parser.add_argument("--only", help="comma separated substrings of benchmark names to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="compare against a stored JSON result file")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="allowed slowdown vs baseline (0.20 = 20%%)")
+    parser.add_argument("--tolerance-for", action="append", metavar="NAME=TOL",
+                        help="per-benchmark tolerance override")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, bench in sorted(REGISTRY.items()):
+            print(f"{bench.group:<12}{name}")
+        return 0
+
+    logging.basicConfig(level=logging.WARNING)
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    names = args.only.split(',') if args.only else None
+    results = run_all(sizes, names, seed=args.seed)
+
+    if args.output:
+        save_results(results, args.output)
+        print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    rows = compare(results, load_results(args.baseline), args.tolerance,
+                   _parse_overrides(args.tolerance_for))
+    regressions = [r for r in rows if r['regressed']]
+    print(f"\n{'benchmark':<48}{'baseline ms':>12}{'current ms':>12}{'change':>9}")
+    for row in rows:
+        flag = "  REGRESSION" if row['regressed'] else ""
+        print(f"{row['key']:<48}{row['baseline'] * 1000:>12.2f}{row['current'] * 1000:>12.2f}"
+              f"{row['change']:>+9.1%}{flag}")
+    print(f"\n{len(regressions)} regression(s) out of {len(rows)} compared benchmark(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
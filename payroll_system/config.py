@@ -22,6 +22,25 @@ MONGODB_HOST = os.getenv("MONGODB_HOST", "localhost")
 MONGODB_PORT = int(os.getenv("MONGODB_PORT", 27017))
 MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "payroll_management")
 
+# Storage backend
+# - "mongo":  MongoDB server (MONGODB_URI / host / port above)
+# - "memory": in-process store, discarded on exit (tests, benchmarks)
+# - "file":   in-process store persisted to STORAGE_PATH (offline use)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").strip().lower()
+STORAGE_PATH = os.getenv("STORAGE_PATH", str(Path(__file__).parent / "local_store.db"))
+
+# Attendance storage layout
+# - "daily":   one document per employee per day in `attendance`
+# - "monthly": one bucket document per employee-month in `attendance_months`,
+#              holding that month's days keyed by day of month
+# Convert existing data with `python -m payroll_system.tools.migrate_storage
+# --only attendance_monthly_buckets` before switching to "monthly".
+ATTENDANCE_LAYOUT = os.getenv("ATTENDANCE_LAYOUT", "daily").strip().lower()
+
+# Documents fetched per cursor round trip by the repositories' streaming
+# (iter_*) reads; exports and batch payroll runs hold at most one batch
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 1000))
+
 # Application Configuration
 APP_NAME = "Payroll Management System"
 APP_VERSION = "1.0.0"
@@ -32,9 +51,25 @@ WINDOW_HEIGHT = 800
 # (Handy if you changed it or imported old data.)
 RESET_DEFAULT_ADMIN = os.getenv("RESET_DEFAULT_ADMIN", "0").strip() == "1"
 
+# Live dashboard updates.
+# When enabled the dashboard watches the database for changes (MongoDB change
+# streams) and updates its counters in place. On a standalone mongod, where
+# change streams are not available, it falls back to polling the counts.
+LIVE_DASHBOARD = os.getenv("LIVE_DASHBOARD", "1").strip() == "1"
+LIVE_DASHBOARD_POLL_MS = int(os.getenv("LIVE_DASHBOARD_POLL_MS", 15000))
+
 # Statutory Deduction Rates (Indian context - can be customized)
+# These form the default rule set. Versioned rule sets per state and
+# effective date are stored in the `statutory_rules` collection and take
+# precedence (see services/statutory_rules.py).
 PF_RATE = 0.12  # 12% of basic salary
+PF_CAP = 1800  # maximum monthly PF contribution
 ESI_RATE = 0.0075  # 0.75% of gross salary (if applicable)
+ESI_THRESHOLD = 21000  # ESI applies while gross salary is below this
+HRA_RATE = 0.40  # of basic salary
+DA_RATE = 0.20  # of basic salary
+ALLOWANCE_RATE = 0.10  # of basic salary
+OVERTIME_MULTIPLIER = 1.5  # of the hourly rate
 PT_SLABS = {
     (0, 5999): 0,
     (6000, 8999): 80,
@@ -42,6 +77,32 @@ PT_SLABS = {
     (12000, float('inf')): 200
 }
 
+# State whose rule sets apply at an employee's location. Employee.location
+# holds the branch city; locations not listed are taken to be state names.
+CITY_STATES = {
+    "Ahmedabad": "Gujarat",
+    "Bangalore": "Karnataka",
+    "Bengaluru": "Karnataka",
+    "Chennai": "Tamil Nadu",
+    "Delhi": "Delhi",
+    "New Delhi": "Delhi",
+    "Gurgaon": "Haryana",
+    "Gurugram": "Haryana",
+    "Hyderabad": "Telangana",
+    "Kolkata": "West Bengal",
+    "Mumbai": "Maharashtra",
+    "Noida": "Uttar Pradesh",
+    "Pune": "Maharashtra",
+}
+# Seconds the loaded rule sets are used before refresh_rules() checks the
+# stored ones for changes again
+RULES_REFRESH_S = float(os.getenv("RULES_REFRESH_S", 60))
+
+# Month-over-month reconciliation flags a change of a payroll amount when it
+# is at least this many percent of last month's figure and this many rupees
+RECONCILE_VARIANCE_PERCENT = float(os.getenv("RECONCILE_VARIANCE_PERCENT", 10))
+RECONCILE_VARIANCE_AMOUNT = float(os.getenv("RECONCILE_VARIANCE_AMOUNT", 500))
+
 # File Paths
 BASE_DIR = Path(__file__).parent
 REPORTS_DIR = BASE_DIR / "reports"
@@ -53,6 +114,15 @@ REPORTS_DIR.mkdir(exist_ok=True)
 PAYSLIPS_DIR.mkdir(exist_ok=True)
 EXPORTS_DIR.mkdir(exist_ok=True)
 
+# Database command instrumentation (off by default; DB_METRICS_ENABLED=1).
+# Commands slower than SLOW_QUERY_MS are logged with their filter shape.
+# Metrics are written to METRICS_FILE (Prometheus text format) every
+# METRICS_INTERVAL_S seconds; set METRICS_FILE to an empty string to disable.
+DB_METRICS_ENABLED = os.getenv("DB_METRICS_ENABLED", "0").strip() == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+METRICS_FILE = os.getenv("METRICS_FILE", str(REPORTS_DIR / "db_metrics.prom")).strip()
+METRICS_INTERVAL_S = float(os.getenv("METRICS_INTERVAL_S", 30))
+
 # Role Codes
 ROLE_ADMIN = 1
 ROLE_HR = 2
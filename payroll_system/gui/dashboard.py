@@ -8,8 +8,8 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont, QColor
 from payroll_system.models.employee import Employee
-from payroll_system.repository.employee_repository import EmployeeRepository
-from payroll_system.repository.master_data_repository import MasterDataRepository
+from payroll_system.gui.live_updates import LiveStatsWatcher, load_active_counts
+from payroll_system.config import LIVE_DASHBOARD
 from datetime import datetime
 
 class DashboardWidget(QWidget):
@@ -18,10 +18,17 @@ class DashboardWidget(QWidget):
     def __init__(self, employee: Employee):
         super().__init__()
         self.employee = employee
-        self.employee_repo = EmployeeRepository()
-        self.master_repo = MasterDataRepository()
+        self.counts = {}
         self.init_ui()
         self.load_statistics()
+        
+        # Keep counters live between navigations
+        self.live_watcher = None
+        if LIVE_DASHBOARD:
+            self.live_watcher = LiveStatsWatcher(self)
+            self.live_watcher.count_changed.connect(self.apply_count_delta)
+            self.live_watcher.counts_loaded.connect(self.apply_counts)
+            self.live_watcher.start()
     
     def init_ui(self):
         """Initialize UI"""
@@ -111,6 +118,16 @@ class DashboardWidget(QWidget):
         
         layout.addLayout(grid)
         
+        # Map watched collections to their cards
+        self.stat_cards = {
+            'employees': self.employee_card,
+            'departments': self.department_card,
+            'designations': self.designation_card,
+            'branches': self.branch_card,
+            'shifts': self.shift_card,
+            'holidays': self.holiday_card,
+        }
+        
         return section
     
     def create_stat_card(self, title: str, value: str, color: str, icon_name: str = ""):
@@ -168,33 +185,24 @@ class DashboardWidget(QWidget):
     def load_statistics(self):
         """Load and display statistics"""
         try:
-            # Count employees
-            employees = self.employee_repo.get_all(status=1)
-            self.update_stat_card(self.employee_card, str(len(employees)))
-            
-            # Count departments
-            departments = self.master_repo.get_all_departments()
-            self.update_stat_card(self.department_card, str(len(departments)))
-            
-            # Count designations
-            designations = self.master_repo.get_all_designations()
-            self.update_stat_card(self.designation_card, str(len(designations)))
-            
-            # Count branches
-            branches = self.master_repo.get_all_branches()
-            self.update_stat_card(self.branch_card, str(len(branches)))
-            
-            # Count shifts
-            shifts = self.master_repo.get_all_shifts()
-            self.update_stat_card(self.shift_card, str(len(shifts)))
-            
-            # Count holidays
-            holidays = self.master_repo.get_all_holidays()
-            self.update_stat_card(self.holiday_card, str(len(holidays)))
-            
+            self.apply_counts(load_active_counts())
         except Exception as e:
             print(f"Error loading statistics: {e}")
     
+    def apply_counts(self, counts: dict):
+        """Set absolute counts for one or more collections"""
+        for collection, value in counts.items():
+            self.counts[collection] = value
+            card = self.stat_cards.get(collection)
+            if card is not None:
+                self.update_stat_card(card, str(value))
+    
+    def apply_count_delta(self, collection: str, delta: int):
+        """Apply a live count change pushed by the watcher"""
+        if collection not in self.counts:
+            return
+        self.apply_counts({collection: max(self.counts[collection] + delta, 0)})
+    
     def update_stat_card(self, card: QFrame, value: str):
         """Update stat card value"""
         value_label = card.findChild(QLabel, "CardValue")
@@ -203,4 +211,6 @@ class DashboardWidget(QWidget):
 
     def refresh_data(self):
         """Refresh data when tab is active"""
-        self.load_statistics()
+        # Live counters are already current; only rescan without a watcher
+        if self.live_watcher is None:
+            self.load_statistics()
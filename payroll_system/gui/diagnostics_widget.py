@@ -0,0 +1,127 @@
+"""
+Diagnostics widget showing database command metrics (admins only)
+"""
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                              QPushButton, QTableWidget, QTableWidgetItem,
+                              QHeaderView, QCheckBox)
+from PySide6.QtCore import Qt, QTimer
+from payroll_system.utils.instrumentation import command_metrics
+from payroll_system.utils.database import db
+from payroll_system.config import METRICS_FILE, SLOW_QUERY_MS
+
+class DiagnosticsWidget(QWidget):
+    """Per-repository database latency and slow query log"""
+
+    METRIC_COLUMNS = [
+        ("Source", 'source'), ("Collection", 'collection'), ("Command", 'command'),
+        ("Calls", 'count'), ("Errors", 'errors'), ("Avg ms", 'avg_ms'),
+        ("p95 ms", 'p95_ms'), ("Max ms", 'max_ms'), ("Total ms", 'total_ms'), ("KB returned", 'bytes'),
+    ]
+
+    def __init__(self):
+        super().__init__()
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(2000)
+        self.refresh_timer.timeout.connect(self.refresh_data)
+        self.init_ui()
+
+    def init_ui(self):
+        """Initialize UI"""
+        layout = QVBoxLayout()
+        layout.setSpacing(20)
+        layout.setContentsMargins(32, 24, 32, 24)
+
+        header = QLabel("Database Diagnostics")
+        header.setObjectName("PageTitle")
+        layout.addWidget(header)
+
+        self.info_label = QLabel()
+        self.info_label.setStyleSheet("color: #94a3b8;")
+        layout.addWidget(self.info_label)
+
+        action_row = QHBoxLayout()
+        self.auto_refresh = QCheckBox("Auto refresh")
+        self.auto_refresh.toggled.connect(self.toggle_auto_refresh)
+        action_row.addWidget(self.auto_refresh)
+        action_row.addStretch()
+
+        refresh_btn = QPushButton("🔄 Refresh")
+        refresh_btn.clicked.connect(self.refresh_data)
+        action_row.addWidget(refresh_btn)
+
+        reset_btn = QPushButton("🧹 Reset Metrics")
+        reset_btn.clicked.connect(self.reset_metrics)
+        action_row.addWidget(reset_btn)
+        layout.addLayout(action_row)
+
+        # Command metrics
+        self.metrics_table = QTableWidget()
+        self.metrics_table.setColumnCount(len(self.METRIC_COLUMNS))
+        self.metrics_table.setHorizontalHeaderLabels([title for title, _ in self.METRIC_COLUMNS])
+        self._style_table(self.metrics_table)
+        self.metrics_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.metrics_table, 2)
+
+        # Slow queries
+        slow_label = QLabel(f"Slow Queries (≥ {SLOW_QUERY_MS:g} ms)")
+        slow_label.setObjectName("SectionTitle")
+        layout.addWidget(slow_label)
+
+        self.slow_table = QTableWidget()
+        self.slow_table.setColumnCount(6)
+        self.slow_table.setHorizontalHeaderLabels(
+            ["Time", "Source", "Collection", "Command", "Duration (ms)", "Filter Shape"])
+        self._style_table(self.slow_table)
+        self.slow_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.slow_table, 1)
+
+        self.setLayout(layout)
+        self.refresh_data()
+
+    def _style_table(self, table: QTableWidget):
+        table.setAlternatingRowColors(True)
+        table.setShowGrid(False)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectRows)
+
+    def toggle_auto_refresh(self, enabled: bool):
+        if enabled:
+            self.refresh_timer.start()
+        else:
+            self.refresh_timer.stop()
+
+    def reset_metrics(self):
+        command_metrics.reset()
+        self.refresh_data()
+
+    def refresh_data(self):
+        """Reload metrics from the global collector"""
+        rows = command_metrics.snapshot()
+        total_calls = sum(r['count'] for r in rows)
+        metrics_file = METRICS_FILE or "disabled"
+        if not db.metrics_enabled:
+            metrics_file = "instrumentation off (set DB_METRICS_ENABLED=1)"
+        self.info_label.setText(f"Backend: {db.backend or 'not connected'}  •  "
+                                f"{total_calls:,} commands  •  Metrics file: {metrics_file}")
+
+        self.metrics_table.setRowCount(len(rows))
+        for row_idx, row in enumerate(rows):
+            for col_idx, (_, key) in enumerate(self.METRIC_COLUMNS):
+                value = row[key]
+                if key == 'bytes':
+                    value = f"{value / 1024:,.1f}"
+                elif isinstance(value, float):
+                    value = f"{value:,.2f}"
+                item = QTableWidgetItem(str(value))
+                if col_idx >= 3:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.metrics_table.setItem(row_idx, col_idx, item)
+
+        slow = list(reversed(command_metrics.slow_queries))
+        self.slow_table.setRowCount(len(slow))
+        for row_idx, record in enumerate(slow):
+            values = [record['time'], record['source'], record['collection'], record['command'],
+                      f"{record['duration_ms']:,.1f}", str(record['shape'])]
+            for col_idx, value in enumerate(values):
+                self.slow_table.setItem(row_idx, col_idx, QTableWidgetItem(value))
@@ -7,14 +7,16 @@ from PySide6.QtWidgets import (
     QPushButton, QTableWidget, QTableWidgetItem,
     QLineEdit, QMessageBox, QDialog, QFormLayout,
     QComboBox, QDateEdit, QDoubleSpinBox, QHeaderView,
-    QFrame, QSizePolicy
+    QFrame, QSizePolicy, QFileDialog, QApplication
 )
 from PySide6.QtCore import Qt, QDate
 from PySide6.QtGui import QFont, QColor
 from payroll_system.services.employee_service import EmployeeService
+from payroll_system.services.import_service import EmployeeImportService
 from payroll_system.repository.master_data_repository import MasterDataRepository
 from payroll_system.models.employee import Employee
-from payroll_system.config import ROLE_ADMIN, ROLE_HR, ROLE_EMPLOYEE
+from payroll_system.config import ROLE_ADMIN, ROLE_HR, ROLE_EMPLOYEE, EXPORTS_DIR
+from datetime import datetime
 import re
 
 class EmployeeManagementWidget(QWidget):
@@ -90,6 +92,12 @@ class EmployeeManagementWidget(QWidget):
         refresh_btn.clicked.connect(self.load_employees)
         toolbar.addWidget(refresh_btn)
         
+        import_btn = QPushButton("📤 Import")
+        import_btn.setObjectName("SecondaryButton")
+        import_btn.setToolTip("Import employees from an Excel (.xlsx) or CSV file")
+        import_btn.clicked.connect(self.import_employees)
+        toolbar.addWidget(import_btn)
+        
         add_btn = QPushButton("➕ Add Employee")
         add_btn.setObjectName("PrimaryButton")
         add_btn.clicked.connect(self.add_employee)
@@ -159,6 +167,8 @@ class EmployeeManagementWidget(QWidget):
     def load_employees(self):
         try:
             employees = self.employee_service.get_all_employees(status=1)
+            dept_names = self.master_repo.get_department_names()
+            desig_names = self.master_repo.get_designation_names()
             self.table.setRowCount(len(employees))
             
             for row, employee in enumerate(employees):
@@ -188,14 +198,8 @@ class EmployeeManagementWidget(QWidget):
                 self.table.setItem(row, 4, loc_item)
                 
                 # Get department and designation names
-                dept_name = "N/A"
-                desig_name = "N/A"
-                if employee.department_id:
-                    dept = self.master_repo.get_department(employee.department_id)
-                    dept_name = dept.department_name if dept else "N/A"
-                if employee.designation_id:
-                    desig = self.master_repo.get_designation(employee.designation_id)
-                    desig_name = desig.designation_name if desig else "N/A"
+                dept_name = dept_names.get(employee.department_id) or "N/A"
+                desig_name = desig_names.get(employee.designation_id) or "N/A"
                 
                 # Department
                 dept_item = QTableWidgetItem(dept_name)
@@ -312,6 +316,8 @@ class EmployeeManagementWidget(QWidget):
 
         try:
             employees = self.employee_service.search_employees(term)
+            dept_names = self.master_repo.get_department_names()
+            desig_names = self.master_repo.get_designation_names()
             self.table.setRowCount(len(employees))
 
             for row, employee in enumerate(employees):
@@ -322,14 +328,8 @@ class EmployeeManagementWidget(QWidget):
                 self.table.setItem(row, 4, QTableWidgetItem(employee.location))
                 
                 # Get department and designation names
-                dept_name = "N/A"
-                desig_name = "N/A"
-                if employee.department_id:
-                    dept = self.master_repo.get_department(employee.department_id)
-                    dept_name = dept.department_name if dept else "N/A"
-                if employee.designation_id:
-                    desig = self.master_repo.get_designation(employee.designation_id)
-                    desig_name = desig.designation_name if desig else "N/A"
+                dept_name = dept_names.get(employee.department_id) or "N/A"
+                desig_name = desig_names.get(employee.designation_id) or "N/A"
                 
                 self.table.setItem(row, 5, QTableWidgetItem(dept_name))
                 self.table.setItem(row, 6, QTableWidgetItem(desig_name))
@@ -350,6 +350,29 @@ class EmployeeManagementWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    def import_employees(self):
+        """Bulk import employees from an Excel or CSV file"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import Employees", "", "Employee files (*.xlsx *.csv)"
+        )
+        if not path:
+            return
+        
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            report = EmployeeImportService().import_file(path)
+        finally:
+            QApplication.restoreOverrideCursor()
+        
+        message = report.summary()
+        if report.errors:
+            errors_path = EXPORTS_DIR / f"employee_import_errors_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            message += f"\n\nRejected rows are listed in:\n{report.write_errors(errors_path)}"
+            QMessageBox.warning(self, "Import Employees", message)
+        else:
+            QMessageBox.information(self, "Import Employees", message)
+        self.load_employees()
+    
     def add_employee(self):
         dialog = EmployeeDialog(self)
         if dialog.exec() == QDialog.Accepted:
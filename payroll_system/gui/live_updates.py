@@ -0,0 +1,195 @@
+"""
+Live statistics updates for the dashboard
+
+Watches the employee and master data collections and pushes count deltas to
+the GUI through Qt signals. MongoDB change streams are used when the server
+supports them (replica sets / Atlas); on a standalone mongod the watcher falls
+back to polling the active counts on a timer.
+"""
+from typing import Dict, Optional
+from PySide6.QtCore import QObject, QThread, QTimer, QCoreApplication, Signal
+from pymongo.errors import OperationFailure, PyMongoError
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.master_data_repository import MasterDataRepository
+from payroll_system.utils.database import db
+from payroll_system.config import LIVE_DASHBOARD_POLL_MS
+import logging
+
+logger = logging.getLogger(__name__)
+
+_UNSEEN = object()
+
+# Collections whose active-record counts are shown on the dashboard. Payrolls
+# and attendance have no dashboard counter; watching them would stream an
+# event per punch and per generated payroll for nothing.
+WATCHED_COLLECTIONS = ('employees', 'departments', 'designations', 'branches', 'shifts', 'holidays')
+
+# Last seen statuses kept by a change stream worker; cleared when exceeded
+STATUS_CACHE_SIZE = 10000
+
+# Server error codes meaning "change streams are not available here"
+_CHANGE_STREAM_UNSUPPORTED = {
+    40573,  # The $changeStream stage is only supported on replica sets
+    40324,  # Unrecognized pipeline stage name (very old servers)
+    115,    # CommandNotSupported
+}
+
+
+def load_active_counts() -> dict:
+    """Count active records in every watched collection"""
+    counts = MasterDataRepository().get_active_counts()
+    counts['employees'] = EmployeeRepository().count(status=1)
+    return counts
+
+
+def _status_delta(event: dict, statuses: Dict[tuple, object]) -> Optional[int]:
+    """Translate a change event into a +1/-1/0 change of the active count.
+
+    ``statuses`` holds the last status seen per document and is updated from
+    the event. Returns None when the delta cannot be derived because the
+    document's previous status was not seen, so the collection has to be
+    recounted.
+    """
+    op = event.get('operationType')
+    key = (event.get('ns', {}).get('coll'), event.get('documentKey', {}).get('_id'))
+    previous = statuses.pop(key, _UNSEEN)
+    if op in ('insert', 'replace'):
+        status = event.get('fullDocument', {}).get('status')
+    elif op == 'update':
+        description = event.get('updateDescription', {})
+        updated = description.get('updatedFields', {})
+        if 'status' in updated:
+            status = updated['status']
+        elif 'status' in description.get('removedFields', ()):
+            status = None
+        elif previous is not _UNSEEN:
+            status = previous
+        else:
+            # Another field changed; the active count did not
+            return 0
+    elif op == 'delete':
+        status = None
+    else:
+        return None
+    if op != 'delete':
+        if len(statuses) >= STATUS_CACHE_SIZE:
+            statuses.clear()
+        statuses[key] = status
+    if op == 'insert':
+        return 1 if status == 1 else 0
+    if previous is _UNSEEN:
+        return None
+    # The same status written again is not a change
+    return (status == 1) - (previous == 1)
+
+
+class _ChangeStreamWorker(QThread):
+    """Background thread consuming a database-level change stream"""
+
+    delta = Signal(str, int)
+    resync = Signal(str)
+    unsupported = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._running = True
+        self._resume_token = None
+        # (collection, _id) -> last status seen, to tell real status changes
+        self._statuses: Dict[tuple, object] = {}
+
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        pipeline = [{'$match': {'ns.coll': {'$in': list(WATCHED_COLLECTIONS)}}}]
+        while self._running:
+            try:
+                with db.get_db().watch(pipeline,
+                                       max_await_time_ms=1000,
+                                       resume_after=self._resume_token) as stream:
+                    while self._running and stream.alive:
+                        event = stream.try_next()
+                        if event is None:
+                            continue
+                        self._resume_token = stream.resume_token
+                        collection = event.get('ns', {}).get('coll')
+                        change = _status_delta(event, self._statuses)
+                        if change is None:
+                            self.resync.emit(collection)
+                        elif change:
+                            self.delta.emit(collection, change)
+            except OperationFailure as e:
+                if e.code in _CHANGE_STREAM_UNSUPPORTED:
+                    logger.info("Change streams not supported by server, using polling")
+                    self.unsupported.emit()
+                    return
+                logger.warning(f"Change stream failed, resuming: {e}")
+                self.msleep(1000)
+            except PyMongoError as e:
+                logger.warning(f"Change stream interrupted, resuming: {e}")
+                self.msleep(1000)
+
+
+class LiveStatsWatcher(QObject):
+    """Pushes active-count changes of the watched collections to the GUI.
+
+    ``count_changed`` carries a delta for one collection, ``counts_loaded``
+    carries absolute counts (initial load, resync or polling result).
+    """
+
+    count_changed = Signal(str, int)
+    counts_loaded = Signal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._worker = None
+        self._timer = None
+        self._counts = {}
+
+    def start(self):
+        """Start watching, preferring change streams over polling"""
+        self._worker = _ChangeStreamWorker(self)
+        self._worker.delta.connect(self.count_changed)
+        self._worker.resync.connect(self._resync_collection)
+        self._worker.unsupported.connect(self._start_polling)
+        self._worker.start()
+        QCoreApplication.instance().aboutToQuit.connect(self.stop)
+
+    def stop(self):
+        """Stop the change stream thread and the polling timer"""
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker.wait(3000)
+            self._worker = None
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+    def _start_polling(self):
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._poll)
+        self._timer.start(LIVE_DASHBOARD_POLL_MS)
+
+    def _poll(self):
+        """Emit only when counts differ from the last poll"""
+        try:
+            counts = load_active_counts()
+        except Exception as e:
+            logger.error(f"Error polling dashboard counts: {e}")
+            return
+        if counts != self._counts:
+            self._counts = counts
+            self.counts_loaded.emit(counts)
+
+    def _resync_collection(self, collection: str):
+        """Recount one collection after an event that carries no delta"""
+        try:
+            if collection == 'employees':
+                count = EmployeeRepository().count(status=1)
+            else:
+                count = MasterDataRepository().get_active_counts([collection]).get(collection, 0)
+        except Exception as e:
+            logger.error(f"Error recounting {collection}: {e}")
+            return
+        self._counts[collection] = count
+        self.counts_loaded.emit({collection: count})
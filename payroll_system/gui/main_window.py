@@ -25,6 +25,7 @@ from payroll_system.gui.attendance_management import AttendanceManagementWidget
 from payroll_system.gui.payroll_management import PayrollManagementWidget
 from payroll_system.gui.reports_widget import ReportsWidget
 from payroll_system.gui.master_data_widgets import MasterDataWidget
+from payroll_system.gui.diagnostics_widget import DiagnosticsWidget
 
 from typing import Dict, List, Tuple
 
@@ -259,6 +260,11 @@ class MainWindow(QMainWindow):
         self.stacked_widget.addWidget(self.reports)
         self.stacked_widget.addWidget(self.master_data)
         
+        # Database diagnostics are only exposed to admins
+        if self.current_employee.role == ROLE_ADMIN:
+            self.diagnostics = DiagnosticsWidget()
+            self.stacked_widget.addWidget(self.diagnostics)
+        
         # Show dashboard by default
         self.stacked_widget.setCurrentIndex(0)
         self._set_active_nav(0)
@@ -383,6 +389,8 @@ class MainWindow(QMainWindow):
                 ("📈", "Reports", 4),
                 ("⚙️", "Master Data", 5),
             ]
+            if self.current_employee.role == ROLE_ADMIN:
+                nav_items.append(("🩺", "Diagnostics", 6))
         else:
             nav_items = [
                 ("📊", "Dashboard", 0),
@@ -557,6 +565,7 @@ class MainWindow(QMainWindow):
             3: "Monthly Payroll Processing",
             4: "Reports & Analytics",
             5: "Master Data Management",
+            6: "Database Diagnostics",
         }
         self.page_title.setText(titles.get(index, "PayMaster"))
     
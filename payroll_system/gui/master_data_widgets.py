@@ -11,6 +11,7 @@ from PySide6.QtCore import Qt, QDate, QTime
 from PySide6.QtGui import QFont, QIcon
 from payroll_system.repository.master_data_repository import MasterDataRepository
 from payroll_system.models.master_data import Department, Designation, Branch, Shift, Holiday
+from payroll_system.services.payroll_service import PayrollService
 from datetime import datetime, time
 
 class MasterDataWidget(QWidget):
@@ -278,7 +279,11 @@ class MasterDataTableWidget(QWidget):
                 elif self.data_type == "Shift":
                     success = self.master_repo.delete_shift(item_id)
                 elif self.data_type == "Holiday":
+                    holiday = self.master_repo.get_holiday(item_id)
                     success = self.master_repo.delete_holiday(item_id)
+                    if success and holiday and holiday.holiday_date:
+                        # Working days of that month changed
+                        PayrollService().mark_holiday_changed(holiday.holiday_date)
                 
                 if success:
                     QMessageBox.information(self, "Success", f"{self.data_type} deleted successfully")
@@ -443,6 +448,9 @@ class MasterDataDialog(QDialog):
                     holiday_date=self.date_edit.date().toPython()
                 )
                 success = self.master_repo.create_holiday(obj)
+                if success:
+                    # Working days of that month changed
+                    PayrollService().mark_holiday_changed(obj.holiday_date)
             
             if success:
                 QMessageBox.information(self, "Success", f"{self.data_type} saved successfully.")
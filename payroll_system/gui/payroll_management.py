@@ -5,7 +5,7 @@ Payroll management widget
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                               QPushButton, QTableWidget, QTableWidgetItem,
                               QComboBox, QSpinBox, QDoubleSpinBox, QMessageBox,
-                              QFileDialog, QHeaderView)
+                              QFileDialog, QHeaderView, QApplication)
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 from payroll_system.services.payroll_service import PayrollService
@@ -13,6 +13,7 @@ from payroll_system.services.employee_service import EmployeeService
 from payroll_system.reports.payslip_generator import PayslipGenerator
 from payroll_system.reports.excel_export import ExcelExporter
 from datetime import datetime
+from itertools import chain
 
 class PayrollManagementWidget(QWidget):
     """Payroll management widget"""
@@ -99,6 +100,15 @@ class PayrollManagementWidget(QWidget):
         generate_btn.clicked.connect(self.generate_payroll)
         action_row.addWidget(generate_btn)
         
+        generate_all_btn = QPushButton("👥 Generate for All")
+        generate_all_btn.clicked.connect(self.generate_payroll_run)
+        action_row.addWidget(generate_all_btn)
+        
+        recompute_btn = QPushButton("🔄 Recompute Changed")
+        recompute_btn.setToolTip("Recalculate payrolls whose attendance, salary or holidays changed")
+        recompute_btn.clicked.connect(self.recompute_stale)
+        action_row.addWidget(recompute_btn)
+        
         layout.addLayout(action_row)
         
         # Payroll details table
@@ -190,6 +200,123 @@ class PayrollManagementWidget(QWidget):
             else:
                 QMessageBox.critical(self, "Error", message)
     
+    def generate_payroll_run(self):
+        """Preview missing payrolls for all active employees, then generate them
+        in a checkpointed run (resuming the month's unfinished run, if any)"""
+        month = self.month_combo.currentIndex() + 1
+        year = self.year_spin.value()
+        bonus = self.bonus_spin.value()
+        month_name = self.month_combo.currentText()
+        
+        try:
+            unfinished = self.payroll_service.get_unfinished_run(month, year)
+            if unfinished:
+                # The run keeps its own bonus, so a preview with this one would mislead
+                reply = QMessageBox.question(
+                    self, "Generate Payroll",
+                    f"A payroll run for {month_name} {year} stopped after "
+                    f"{unfinished.get('checkpoint') or 'no employees'} "
+                    f"({unfinished.get('error') or unfinished.get('status')}).\n"
+                    f"Generated so far: {unfinished.get('generated', 0)}\n\n"
+                    f"Resume it with its bonus per employee ₹{unfinished['bonus']:,.2f}?",
+                    QMessageBox.Yes | QMessageBox.No
+                )
+                if reply != QMessageBox.Yes:
+                    return
+            else:
+                QApplication.setOverrideCursor(Qt.WaitCursor)
+                try:
+                    preview = self.payroll_service.preview_payroll_run(month, year, bonus)
+                finally:
+                    QApplication.restoreOverrideCursor()
+                if preview.error:
+                    QMessageBox.critical(
+                        self, "Payroll Run",
+                        f"The preview for {month_name} {year} stopped early ({preview.error}).\n"
+                        f"Nothing was saved; try again.")
+                    return
+                if not len(preview.batch):
+                    QMessageBox.information(
+                        self, "Payroll Run",
+                        f"No payrolls to generate for {month_name} {year}.\n"
+                        f"Already existing: {preview.skipped}\nFailed: {preview.failed}")
+                    return
+                
+                totals, variances = preview.totals(), preview.variances()
+                lines = [f"{label}: ₹{totals[field]:,.2f} ({variances[field]:+,.2f} vs last month)"
+                         for label, field in (("Gross", 'gross_salary'), ("Deductions", 'total_deductions'),
+                                              ("Net", 'net_salary'))]
+                reply = QMessageBox.question(
+                    self, "Generate Payroll",
+                    f"Preview for {month_name} {year}, bonus per employee ₹{bonus:,.2f}:\n\n"
+                    f"Payrolls to generate: {len(preview.batch)}\n" + "\n".join(lines) +
+                    f"\n\nAlready existing (unchanged): {preview.skipped}\nFailed: {preview.failed}\n\n"
+                    f"Generate these payrolls?",
+                    QMessageBox.Yes | QMessageBox.No
+                )
+                if reply != QMessageBox.Yes:
+                    return
+            
+            # Payrolls are recalculated and saved a shard at a time; a run that
+            # stops part way resumes from its checkpoint next time
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                counts = self.payroll_service.generate_payroll_run(
+                    month, year, bonus, progress=lambda counts: QApplication.processEvents())
+            finally:
+                QApplication.restoreOverrideCursor()
+            message = (f"Generated: {counts['generated']}\n"
+                       f"Already existing: {counts['skipped']}\n"
+                       f"Failed: {counts['failed']}")
+            stopped = self.payroll_service.get_unfinished_run(month, year)
+            if stopped:
+                QMessageBox.critical(
+                    self, "Payroll Run",
+                    f"The payroll run stopped ({stopped.get('error') or 'unknown error'}).\n{message}\n\n"
+                    f"Generate for All again to resume it.")
+            elif counts['failed']:
+                QMessageBox.warning(self, "Payroll Run", message)
+            else:
+                QMessageBox.information(self, "Payroll Run", message)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error generating payroll: {str(e)}")
+    
+    def recompute_stale(self):
+        """Recalculate the selected month's payrolls whose inputs changed"""
+        month = self.month_combo.currentIndex() + 1
+        year = self.year_spin.value()
+        month_name = self.month_combo.currentText()
+        
+        try:
+            stale = self.payroll_service.get_stale_payrolls(month, year)
+            if not stale:
+                QMessageBox.information(self, "Recompute Payroll",
+                                        f"No payrolls for {month_name} {year} need recalculating.")
+                return
+            
+            reply = QMessageBox.question(
+                self, "Recompute Payroll",
+                f"{len(stale)} payroll(s) for {month_name} {year} were calculated before their "
+                f"attendance, salary or holidays changed.\nRecalculate them now? Bonuses are kept; "
+                f"other payrolls are not touched.",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+            
+            counts = self.payroll_service.recompute_stale(month, year)
+            message = (f"Recalculated: {counts['recomputed']}\n"
+                       f"Paid meanwhile (unchanged): {counts['skipped']}\n"
+                       f"Failed: {counts['failed']}")
+            if counts['failed']:
+                QMessageBox.warning(self, "Recompute Payroll", message)
+            else:
+                QMessageBox.information(self, "Recompute Payroll", message)
+            if self.employee_combo.currentData():
+                self.view_payroll()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error recalculating payroll: {str(e)}")
+    
     def view_payroll(self):
         """View payroll"""
         employee_id = self.employee_combo.currentData()
@@ -317,12 +444,13 @@ class PayrollManagementWidget(QWidget):
         year = self.year_spin.value()
         
         try:
-            payrolls = self.payroll_service.get_all_payrolls(month, year)
-            if not payrolls:
+            payrolls = self.payroll_service.iter_payrolls(month, year)
+            first = next(payrolls, None)
+            if first is None:
                 QMessageBox.warning(self, "Warning", "No payrolls found for selected period")
                 return
             
-            filepath = self.excel_exporter.export_payroll_report(payrolls, month, year)
+            filepath = self.excel_exporter.export_payroll_report(chain([first], payrolls), month, year)
             QMessageBox.information(self, "Success", f"Payroll exported to:\n{filepath}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error exporting: {str(e)}")
@@ -10,8 +10,12 @@ from PySide6.QtGui import QFont
 from payroll_system.services.employee_service import EmployeeService
 from payroll_system.services.payroll_service import PayrollService
 from payroll_system.services.attendance_service import AttendanceService
+from payroll_system.services.reconciliation import ReconciliationService
 from payroll_system.reports.excel_export import ExcelExporter
+from payroll_system.utils.query_budget import QueryBudget
+from payroll_system.config import RECONCILE_VARIANCE_AMOUNT, RECONCILE_VARIANCE_PERCENT
 from datetime import datetime
+from itertools import chain
 
 class ReportsWidget(QWidget):
     """Reports widget"""
@@ -21,6 +25,7 @@ class ReportsWidget(QWidget):
         self.employee_service = EmployeeService()
         self.payroll_service = PayrollService()
         self.attendance_service = AttendanceService()
+        self.reconciliation_service = ReconciliationService()
         self.excel_exporter = ExcelExporter()
         self.init_ui()
     
@@ -75,6 +80,15 @@ class ReportsWidget(QWidget):
         )
         grid.addWidget(summary_card, 1, 1)
         
+        # Reconciliation Card
+        reconciliation_card = self.create_report_card(
+            "🔍 Payroll Reconciliation",
+            "Compare a month with the previous one: large changes, new joiners and missing payrolls",
+            "Reconcile",
+            self.export_reconciliation
+        )
+        grid.addWidget(reconciliation_card, 2, 0)
+        
         layout.addLayout(grid)
         layout.addStretch()
         
@@ -116,8 +130,9 @@ class ReportsWidget(QWidget):
     def export_employee_list(self):
         """Export employee list to Excel"""
         try:
-            employees = self.employee_service.get_all_employees(status=1)
-            if not employees:
+            employees = self.employee_service.iter_employees(status=1)
+            first = next(employees, None)
+            if first is None:
                 QMessageBox.warning(self, "Warning", "No employees found")
                 return
             
@@ -139,7 +154,7 @@ class ReportsWidget(QWidget):
                 # It ignores my filepath! 
                 # I should just call it and let it save to default, then show message.
                 
-                path = self.excel_exporter.export_employee_list(employees)
+                path = self.excel_exporter.export_employee_list(chain([first], employees))
                 QMessageBox.information(self, "Success", f"Employee list exported to:\n{path}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error exporting: {str(e)}")
@@ -176,12 +191,14 @@ class ReportsWidget(QWidget):
                 month = month_spin.value()
                 year = year_spin.value()
                 
-                payrolls = self.payroll_service.get_all_payrolls(month, year)
-                if not payrolls:
-                    QMessageBox.warning(self, "Warning", f"No payrolls found for {month}/{year}")
-                    return
-                
-                path = self.excel_exporter.export_payroll_report(payrolls, month, year)
+                with QueryBudget("payroll report export", max_queries=5):
+                    payrolls = self.payroll_service.iter_payrolls(month, year)
+                    first = next(payrolls, None)
+                    if first is None:
+                        QMessageBox.warning(self, "Warning", f"No payrolls found for {month}/{year}")
+                        return
+                    
+                    path = self.excel_exporter.export_payroll_report(chain([first], payrolls), month, year)
                 QMessageBox.information(self, "Success", f"Payroll report exported to:\n{path}")
                     
         except Exception as e:
@@ -219,22 +236,15 @@ class ReportsWidget(QWidget):
                 month = month_spin.value()
                 year = year_spin.value()
                 
-                # We need all attendance for all employees
-                # The service might not have a "get_all_attendance_by_month" method.
-                # I might need to iterate employees and fetch.
-                # Let's check attendance_service. available methods: get_monthly_attendance(emp_id, month, year)
-                
-                employees = self.employee_service.get_all_employees(status=1)
-                all_attendance = []
-                for emp in employees:
-                    atts = self.attendance_service.get_monthly_attendance(emp.employee_id, month, year)
-                    all_attendance.extend(atts)
-                
-                if not all_attendance:
-                    QMessageBox.warning(self, "Warning", "No attendance records found")
-                    return
+                with QueryBudget("attendance report export"):
+                    attendances = self.attendance_service.iter_month_attendance(month, year)
+                    first = next(attendances, None)
+                    if first is None:
+                        QMessageBox.warning(self, "Warning", "No attendance records found")
+                        return
 
-                path = self.excel_exporter.export_attendance_report(all_attendance, month, year)
+                    path = self.excel_exporter.export_attendance_report(
+                        chain([first], attendances), month, year)
                 QMessageBox.information(self, "Success", f"Attendance report exported to:\n{path}")
 
         except Exception as e:
@@ -265,25 +275,84 @@ class ReportsWidget(QWidget):
             if dialog.exec() == QDialog.Accepted:
                 year = year_spin.value()
                 
-                # Fetch all payrolls for the year
-                # payroll_service.get_all_payrolls takes (month, year)
-                # We need a new method or loop months.
-                # Looping months 1-12
-                all_payrolls = []
-                for m in range(1, 13):
-                    payrolls = self.payroll_service.get_all_payrolls(m, year)
-                    all_payrolls.extend(payrolls)
-                
-                if not all_payrolls:
-                     QMessageBox.warning(self, "Warning", f"No payroll data found for {year}")
-                     return
+                # Totals are grouped per employee by the database
+                with QueryBudget("salary summary export", max_queries=2):
+                    totals = self.payroll_service.get_annual_totals(year)
+                    
+                    if not totals:
+                         QMessageBox.warning(self, "Warning", f"No payroll data found for {year}")
+                         return
 
-                path = self.excel_exporter.generate_salary_summary(all_payrolls, year)
+                    path = self.excel_exporter.generate_salary_summary(totals, year)
                 QMessageBox.information(self, "Success", f"Salary summary exported to:\n{path}")
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error generating summary: {str(e)}")
 
+    def export_reconciliation(self):
+        """Export month-over-month reconciliation"""
+        try:
+            from PySide6.QtWidgets import QDialog, QDialogButtonBox, QFormLayout
+            
+            dialog = QDialog(self)
+            dialog.setWindowTitle("Select Month")
+            dialog.setMinimumWidth(300)
+            layout = QFormLayout(dialog)
+            
+            month_spin = QSpinBox()
+            month_spin.setMinimum(1)
+            month_spin.setMaximum(12)
+            month_spin.setValue(datetime.now().month)
+            
+            year_spin = QSpinBox()
+            year_spin.setMinimum(2020)
+            year_spin.setMaximum(2100)
+            year_spin.setValue(datetime.now().year)
+            
+            percent_spin = QSpinBox()
+            percent_spin.setRange(0, 1000)
+            percent_spin.setSuffix(" %")
+            percent_spin.setValue(int(RECONCILE_VARIANCE_PERCENT))
+            
+            amount_spin = QSpinBox()
+            amount_spin.setRange(0, 10000000)
+            amount_spin.setSingleStep(100)
+            amount_spin.setValue(int(RECONCILE_VARIANCE_AMOUNT))
+            
+            layout.addRow("Month:", month_spin)
+            layout.addRow("Year:", year_spin)
+            layout.addRow("Flag changes over:", percent_spin)
+            layout.addRow("and at least:", amount_spin)
+            
+            buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+            buttons.accepted.connect(dialog.accept)
+            buttons.rejected.connect(dialog.reject)
+            layout.addRow(buttons)
+            
+            if dialog.exec() == QDialog.Accepted:
+                month = month_spin.value()
+                year = year_spin.value()
+                
+                with QueryBudget("payroll reconciliation"):
+                    reconciliation = self.reconciliation_service.reconcile_month(
+                        month, year, percent=percent_spin.value(), amount=amount_spin.value())
+                    counts = reconciliation.counts()
+                    if not counts['ok'] + counts['changed'] + counts['new']:
+                        QMessageBox.warning(self, "Warning", f"No payrolls found for {month}/{year}")
+                        return
+                    
+                    path = self.excel_exporter.export_reconciliation(reconciliation)
+                net = reconciliation.totals()['net_salary']
+                QMessageBox.information(
+                    self, "Reconciliation",
+                    f"Changed: {counts['changed']}\nNew: {counts['new']}\n"
+                    f"Missing: {counts['missing']}\nLeft: {counts['left']}\nOK: {counts['ok']}\n\n"
+                    f"Net salary: {net['previous']:,.2f} → {net['current']:,.2f} ({net['change']:+,.2f})\n\n"
+                    f"Exported to:\n{path}")
+        
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error reconciling: {str(e)}")
+    
     def refresh_data(self):
         """Refresh data when tab is active"""
         pass
@@ -0,0 +1,62 @@
+"""
+Arrears data model
+"""
+from datetime import date
+from payroll_system.models.fields import parse_date, parse_timestamp, to_datetime, today_if_missing
+from payroll_system.models.payroll import period_key
+
+# Payroll amounts an arrear corrects (recomputed minus already paid)
+ARREAR_FIELDS = (
+    'basic_salary', 'hra', 'da', 'allowances', 'overtime_pay', 'gross_salary',
+    'pf', 'esi', 'pt', 'lop_deduction', 'total_deductions', 'net_salary',
+)
+
+class Arrear:
+    """Difference owed for one employee's past payroll month under one revision"""
+
+    __slots__ = ('employee_id', 'month', 'year', 'reference', 'effective_from',
+                 'created_date', 'status') + ARREAR_FIELDS
+
+    def __init__(self, employee_id: str, month: int, year: int, reference: str,
+                 effective_from: date, **kwargs):
+        self.employee_id = employee_id
+        self.month = month
+        self.year = year
+        # Identifies the revision (e.g. "2026 appraisal"); one arrear per
+        # employee, month and reference
+        self.reference = reference
+        self.effective_from = effective_from
+        for name in ARREAR_FIELDS:
+            setattr(self, name, kwargs.get(name, 0.0))
+        self.created_date = today_if_missing(kwargs, 'created_date')
+        self.status = kwargs.get('status', 'pending')  # pending, paid
+
+    def to_dict(self):
+        data = {
+            'employee_id': self.employee_id,
+            'month': self.month,
+            'year': self.year,
+            'period': period_key(self.year, self.month),
+            'reference': self.reference,
+            'effective_from': to_datetime(self.effective_from),
+        }
+        for name in ARREAR_FIELDS:
+            data[name] = getattr(self, name)
+        data['created_date'] = to_datetime(self.created_date)
+        data['status'] = self.status
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        get = data.get
+        arrear = cls.__new__(cls)
+        arrear.employee_id = data['employee_id']
+        arrear.month = data['month']
+        arrear.year = data['year']
+        arrear.reference = data['reference']
+        arrear.effective_from = parse_date(get('effective_from'))
+        for name in ARREAR_FIELDS:
+            setattr(arrear, name, get(name, 0.0))
+        arrear.created_date = parse_timestamp(get('created_date'))
+        arrear.status = get('status', 'pending')
+        return arrear
@@ -1,12 +1,16 @@
 """
 Attendance data model
 """
-from datetime import datetime, date, time
+from datetime import date, time
 from typing import Optional
+from payroll_system.models.fields import iso, parse_date, parse_time, to_datetime
 
 class Attendance:
     """Attendance model"""
     
+    __slots__ = ('attendance_id', 'employee_id', 'date', 'checkin_time', 'checkout_time',
+                 'status', 'overtime_hours', 'lop')
+    
     def __init__(self, employee_id: str, date: date, 
                  checkin_time: Optional[time] = None,
                  checkout_time: Optional[time] = None,
@@ -25,9 +29,9 @@ class Attendance:
         return {
             'attendance_id': self.attendance_id,
             'employee_id': self.employee_id,
-            'date': self.date.isoformat() if isinstance(self.date, date) else str(self.date),
-            'checkin_time': self.checkin_time.isoformat() if self.checkin_time else None,
-            'checkout_time': self.checkout_time.isoformat() if self.checkout_time else None,
+            'date': to_datetime(self.date),
+            'checkin_time': iso(self.checkin_time) if self.checkin_time else None,
+            'checkout_time': iso(self.checkout_time) if self.checkout_time else None,
             'status': self.status,
             'overtime_hours': self.overtime_hours,
             'lop': self.lop
@@ -36,39 +40,14 @@ class Attendance:
     @classmethod
     def from_dict(cls, data: dict):
         """Create attendance from dictionary"""
-        from datetime import datetime as dt
-        
-        # Parse date
-        att_date = None
-        if data.get('date'):
-            if isinstance(data['date'], str):
-                att_date = dt.strptime(data['date'], '%Y-%m-%d').date()
-            else:
-                att_date = data['date']
-        
-        # Parse times
-        checkin = None
-        if data.get('checkin_time'):
-            if isinstance(data['checkin_time'], str):
-                checkin = dt.strptime(data['checkin_time'], '%H:%M:%S').time()
-            else:
-                checkin = data['checkin_time']
-        
-        checkout = None
-        if data.get('checkout_time'):
-            if isinstance(data['checkout_time'], str):
-                checkout = dt.strptime(data['checkout_time'], '%H:%M:%S').time()
-            else:
-                checkout = data['checkout_time']
-        
-        return cls(
-            employee_id=data['employee_id'],
-            date=att_date,
-            checkin_time=checkin,
-            checkout_time=checkout,
-            attendance_id=data.get('attendance_id'),
-            status=data.get('status', 'present'),
-            overtime_hours=data.get('overtime_hours', 0.0),
-            lop=data.get('lop', False)
-        )
-
+        get = data.get
+        attendance = cls.__new__(cls)
+        attendance.attendance_id = get('attendance_id')
+        attendance.employee_id = data['employee_id']
+        attendance.date = parse_date(get('date'))
+        attendance.checkin_time = parse_time(get('checkin_time'))
+        attendance.checkout_time = parse_time(get('checkout_time'))
+        attendance.status = get('status', 'present')
+        attendance.overtime_hours = get('overtime_hours', 0.0)
+        attendance.lop = get('lop', False)
+        return attendance
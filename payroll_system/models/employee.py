@@ -1,12 +1,23 @@
 """
 Employee data model
 """
-from datetime import datetime, date
+from datetime import date
 from payroll_system.config import ROLE_ADMIN, ROLE_HR, ROLE_EMPLOYEE
+from payroll_system.models.fields import iso, parse_date, parse_timestamp, today_if_missing
+from payroll_system.models.tracking import ChangeTracking
 
-class Employee:
+class Employee(ChangeTracking):
     """Employee model"""
     
+    __slots__ = (
+        'employee_id', 'employee_name', 'email', 'password', 'role',
+        'current_address', 'permanent_address', 'mobile_number', 'gender', 'dob',
+        'qualification', 'city', 'joining_date', 'registration_date',
+        'department_id', 'branch_id', 'designation_id', 'shift_id',
+        'basic_salary', 'bank_account_number', 'pan_number', 'uan_number',
+        'location', 'pt', 'created_date', 'modified_date', 'status',
+    )
+    
     def __init__(self, employee_id: str, employee_name: str, email: str, 
                  password: str, role: int = ROLE_EMPLOYEE, **kwargs):
         self.employee_id = employee_id
@@ -25,8 +36,8 @@ class Employee:
         self.city = kwargs.get('city', '')
         
         # Employment Information
-        self.joining_date = kwargs.get('joining_date', datetime.now().date())
-        self.registration_date = kwargs.get('registration_date', datetime.now().date())
+        self.joining_date = today_if_missing(kwargs, 'joining_date')
+        self.registration_date = today_if_missing(kwargs, 'registration_date')
         self.department_id = kwargs.get('department_id', None)
         self.branch_id = kwargs.get('branch_id', None)
         self.designation_id = kwargs.get('designation_id', None)
@@ -41,9 +52,10 @@ class Employee:
         self.pt = float(kwargs.get('pt', 0))
         
         # Metadata
-        self.created_date = kwargs.get('created_date', datetime.now().date())
-        self.modified_date = kwargs.get('modified_date', datetime.now().date())
+        self.created_date = today_if_missing(kwargs, 'created_date')
+        self.modified_date = today_if_missing(kwargs, 'modified_date')
         self.status = kwargs.get('status', 1)  # 1 = Active, 0 = Inactive
+        self._loaded = None
     
     def to_dict(self):
         """Convert employee to dictionary for MongoDB storage"""
@@ -57,11 +69,11 @@ class Employee:
             'permanent_address': self.permanent_address,
             'mobile_number': self.mobile_number,
             'gender': self.gender,
-            'dob': self.dob.isoformat() if self.dob else None,
+            'dob': iso(self.dob) if self.dob else None,
             'qualification': self.qualification,
             'city': self.city,
-            'joining_date': self.joining_date.isoformat() if isinstance(self.joining_date, date) else str(self.joining_date),
-            'registration_date': self.registration_date.isoformat() if isinstance(self.registration_date, date) else str(self.registration_date),
+            'joining_date': iso(self.joining_date),
+            'registration_date': iso(self.registration_date),
             'department_id': self.department_id,
             'branch_id': self.branch_id,
             'designation_id': self.designation_id,
@@ -72,65 +84,46 @@ class Employee:
             'uan_number': self.uan_number,
             'location': self.location,
             'pt': self.pt,
-            'created_date': self.created_date.isoformat() if isinstance(self.created_date, date) else str(self.created_date),
-            'modified_date': self.modified_date.isoformat() if isinstance(self.modified_date, date) else str(self.modified_date),
+            'created_date': iso(self.created_date),
+            'modified_date': iso(self.modified_date),
             'status': self.status
         }
     
     @classmethod
     def from_dict(cls, data: dict):
-        """Create employee from dictionary"""
-        from datetime import datetime as dt
-        
-        # Parse dates
-        dob = None
-        if data.get('dob'):
-            if isinstance(data['dob'], str):
-                dob = dt.strptime(data['dob'], '%Y-%m-%d').date()
-            else:
-                dob = data['dob']
-        
-        joining_date = None
-        if data.get('joining_date'):
-            if isinstance(data['joining_date'], str):
-                joining_date = dt.strptime(data['joining_date'], '%Y-%m-%d').date()
-            else:
-                joining_date = data['joining_date']
+        """Create employee from dictionary.
         
-        registration_date = None
-        if data.get('registration_date'):
-            if isinstance(data['registration_date'], str):
-                registration_date = dt.strptime(data['registration_date'], '%Y-%m-%d').date()
-            else:
-                registration_date = data['registration_date']
-        
-        return cls(
-            employee_id=data['employee_id'],
-            employee_name=data['employee_name'],
-            email=data['email'],
-            password=data.get('password', ''),
-            role=data.get('role', ROLE_EMPLOYEE),
-            current_address=data.get('current_address', ''),
-            permanent_address=data.get('permanent_address', ''),
-            mobile_number=data.get('mobile_number', ''),
-            gender=data.get('gender', 'Male'),
-            dob=dob,
-            qualification=data.get('qualification', ''),
-            city=data.get('city', ''),
-            joining_date=joining_date,
-            registration_date=registration_date,
-            department_id=data.get('department_id'),
-            branch_id=data.get('branch_id'),
-            designation_id=data.get('designation_id'),
-            shift_id=data.get('shift_id'),
-            basic_salary=data.get('basic_salary', 0),
-            bank_account_number=data.get('bank_account_number', ''),
-            pan_number=data.get('pan_number', ''),
-            uan_number=data.get('uan_number', ''),
-            location=data.get('location', ''),
-            pt=data.get('pt', 0),
-            created_date=data.get('created_date', datetime.now().date()),
-            modified_date=data.get('modified_date', datetime.now().date()),
-            status=data.get('status', 1)
-        )
-
+        Hydrates the slots directly instead of going through ``__init__``;
+        the defaults match the constructor's.
+        """
+        get = data.get
+        employee = cls.__new__(cls)
+        employee.employee_id = data['employee_id']
+        employee.employee_name = data['employee_name']
+        employee.email = data['email']
+        employee.password = get('password', '')
+        employee.role = get('role', ROLE_EMPLOYEE)
+        employee.current_address = get('current_address', '')
+        employee.permanent_address = get('permanent_address', '')
+        employee.mobile_number = get('mobile_number', '')
+        employee.gender = get('gender', 'Male')
+        employee.dob = parse_date(get('dob'))
+        employee.qualification = get('qualification', '')
+        employee.city = get('city', '')
+        employee.joining_date = parse_date(get('joining_date'))
+        employee.registration_date = parse_date(get('registration_date'))
+        employee.department_id = get('department_id')
+        employee.branch_id = get('branch_id')
+        employee.designation_id = get('designation_id')
+        employee.shift_id = get('shift_id')
+        employee.basic_salary = float(get('basic_salary', 0))
+        employee.bank_account_number = get('bank_account_number', '')
+        employee.pan_number = get('pan_number', '')
+        employee.uan_number = get('uan_number', '')
+        employee.location = get('location', '')
+        employee.pt = float(get('pt', 0))
+        employee.created_date = parse_timestamp(get('created_date')) or date.today()
+        employee.modified_date = parse_timestamp(get('modified_date')) or date.today()
+        employee.status = get('status', 1)
+        employee._loaded = data
+        return employee
@@ -0,0 +1,71 @@
+"""
+Field conversion helpers shared by the models
+"""
+from datetime import date, datetime, time
+from functools import lru_cache
+
+# Marks a keyword argument that was not passed at all (as opposed to None)
+MISSING = object()
+
+# Dates and times repeat heavily across records (joining dates, attendance
+# days, shift times) and are immutable, so parsed values are shared.
+_date_from_iso = lru_cache(maxsize=8192)(lambda value: date.fromisoformat(value[:10]))
+_time_from_iso = lru_cache(maxsize=4096)(time.fromisoformat)
+
+
+def parse_date(value):
+    """ISO string / datetime / date -> date (None and '' stay None)"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return _date_from_iso(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def parse_timestamp(value):
+    """ISO string / datetime / date -> datetime when it has a time, else date"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return datetime.fromisoformat(value) if len(value) > 10 else _date_from_iso(value)
+    return value
+
+
+def parse_time(value):
+    """'HH:MM[:SS]' string -> time (None and '' stay None)"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return _time_from_iso(value)
+    return value
+
+
+def iso(value):
+    """date/datetime/time -> ISO string for storage (datetimes keep their time);
+    strings pass through, None stays None"""
+    if value is None:
+        return None
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def to_datetime(value):
+    """date / ISO string -> naive datetime (midnight for dates), stored as a native BSON date"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        value = parse_timestamp(value)
+        if isinstance(value, datetime):
+            return value
+    return datetime(value.year, value.month, value.day)
+
+
+def today_if_missing(kwargs: dict, key: str):
+    """``kwargs[key]`` if given, otherwise today's date (computed only when needed)"""
+    value = kwargs.get(key, MISSING)
+    return date.today() if value is MISSING else value
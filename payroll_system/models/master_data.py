@@ -1,37 +1,53 @@
 """
 Master data models (Department, Designation, Branch, Shift, Holiday)
 """
-from datetime import datetime, date
+from datetime import date
+from payroll_system.models.fields import iso, parse_date, parse_timestamp, today_if_missing
 
 class Department:
     """Department model"""
     
+    __slots__ = ('department_id', 'department_name', 'created_date', 'modified_date', 'status')
+    
     def __init__(self, department_id: str, department_name: str, **kwargs):
         self.department_id = department_id
         self.department_name = department_name
-        self.created_date = kwargs.get('created_date', datetime.now().date())
-        self.modified_date = kwargs.get('modified_date', datetime.now().date())
+        self.created_date = today_if_missing(kwargs, 'created_date')
+        self.modified_date = today_if_missing(kwargs, 'modified_date')
         self.status = kwargs.get('status', 1)
     
     def to_dict(self):
         return {
             'department_id': self.department_id,
             'department_name': self.department_name,
-            'created_date': self.created_date.isoformat() if isinstance(self.created_date, date) else str(self.created_date),
-            'modified_date': self.modified_date.isoformat() if isinstance(self.modified_date, date) else str(self.modified_date),
+            'created_date': iso(self.created_date),
+            'modified_date': iso(self.modified_date),
             'status': self.status
         }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            department_id=data['department_id'],
+            department_name=data['department_name'],
+            created_date=parse_timestamp(data.get('created_date')),
+            modified_date=parse_timestamp(data.get('modified_date')),
+            status=data.get('status', 1)
+        )
 
 class Designation:
     """Designation model"""
     
+    __slots__ = ('designation_id', 'designation_name', 'department_id',
+                 'created_date', 'modified_date', 'status')
+    
     def __init__(self, designation_id: str, designation_name: str, 
                  department_id: str, **kwargs):
         self.designation_id = designation_id
         self.designation_name = designation_name
         self.department_id = department_id
-        self.created_date = kwargs.get('created_date', datetime.now().date())
-        self.modified_date = kwargs.get('modified_date', datetime.now().date())
+        self.created_date = today_if_missing(kwargs, 'created_date')
+        self.modified_date = today_if_missing(kwargs, 'modified_date')
         self.status = kwargs.get('status', 1)
     
     def to_dict(self):
@@ -39,14 +55,28 @@ class Designation:
             'designation_id': self.designation_id,
             'designation_name': self.designation_name,
             'department_id': self.department_id,
-            'created_date': self.created_date.isoformat() if isinstance(self.created_date, date) else str(self.created_date),
-            'modified_date': self.modified_date.isoformat() if isinstance(self.modified_date, date) else str(self.modified_date),
+            'created_date': iso(self.created_date),
+            'modified_date': iso(self.modified_date),
             'status': self.status
         }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            designation_id=data['designation_id'],
+            designation_name=data['designation_name'],
+            department_id=data.get('department_id'),
+            created_date=parse_timestamp(data.get('created_date')),
+            modified_date=parse_timestamp(data.get('modified_date')),
+            status=data.get('status', 1)
+        )
 
 class Branch:
     """Branch model"""
     
+    __slots__ = ('branch_id', 'name', 'branch_address', 'phone_number', 'email',
+                 'establishment_date', 'created_by', 'created_date', 'modified_date', 'status')
+    
     def __init__(self, branch_id: str, name: str, branch_address: str,
                  phone_number: str, email: str, **kwargs):
         self.branch_id = branch_id
@@ -54,10 +84,10 @@ class Branch:
         self.branch_address = branch_address
         self.phone_number = phone_number
         self.email = email
-        self.establishment_date = kwargs.get('establishment_date', datetime.now().date())
+        self.establishment_date = today_if_missing(kwargs, 'establishment_date')
         self.created_by = kwargs.get('created_by', '')
-        self.created_date = kwargs.get('created_date', datetime.now().date())
-        self.modified_date = kwargs.get('modified_date', datetime.now().date())
+        self.created_date = today_if_missing(kwargs, 'created_date')
+        self.modified_date = today_if_missing(kwargs, 'modified_date')
         self.status = kwargs.get('status', 1)
     
     def to_dict(self):
@@ -67,24 +97,42 @@ class Branch:
             'branch_address': self.branch_address,
             'phone_number': self.phone_number,
             'email': self.email,
-            'establishment_date': self.establishment_date.isoformat() if isinstance(self.establishment_date, date) else str(self.establishment_date),
+            'establishment_date': iso(self.establishment_date),
             'created_by': self.created_by,
-            'created_date': self.created_date.isoformat() if isinstance(self.created_date, date) else str(self.created_date),
-            'modified_date': self.modified_date.isoformat() if isinstance(self.modified_date, date) else str(self.modified_date),
+            'created_date': iso(self.created_date),
+            'modified_date': iso(self.modified_date),
             'status': self.status
         }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            branch_id=data['branch_id'],
+            name=data['name'],
+            branch_address=data['branch_address'],
+            phone_number=data['phone_number'],
+            email=data['email'],
+            establishment_date=parse_date(data.get('establishment_date')),
+            created_by=data.get('created_by', ''),
+            created_date=parse_timestamp(data.get('created_date')),
+            modified_date=parse_timestamp(data.get('modified_date')),
+            status=data.get('status', 1)
+        )
 
 class Shift:
     """Shift model"""
     
+    __slots__ = ('shift_id', 'shift_name', 'in_time', 'out_time',
+                 'created_date', 'modified_date', 'status')
+    
     def __init__(self, shift_id: str, shift_name: str, in_time: str,
                  out_time: str, **kwargs):
         self.shift_id = shift_id
         self.shift_name = shift_name
         self.in_time = in_time  # Format: "HH:MM:SS"
         self.out_time = out_time
-        self.created_date = kwargs.get('created_date', datetime.now().date())
-        self.modified_date = kwargs.get('modified_date', datetime.now().date())
+        self.created_date = today_if_missing(kwargs, 'created_date')
+        self.modified_date = today_if_missing(kwargs, 'modified_date')
         self.status = kwargs.get('status', 1)
     
     def to_dict(self):
@@ -93,22 +141,37 @@ class Shift:
             'shift_name': self.shift_name,
             'in_time': self.in_time,
             'out_time': self.out_time,
-            'created_date': self.created_date.isoformat() if isinstance(self.created_date, date) else str(self.created_date),
-            'modified_date': self.modified_date.isoformat() if isinstance(self.modified_date, date) else str(self.modified_date),
+            'created_date': iso(self.created_date),
+            'modified_date': iso(self.modified_date),
             'status': self.status
         }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            shift_id=data['shift_id'],
+            shift_name=data['shift_name'],
+            in_time=data['in_time'],
+            out_time=data['out_time'],
+            created_date=parse_timestamp(data.get('created_date')),
+            modified_date=parse_timestamp(data.get('modified_date')),
+            status=data.get('status', 1)
+        )
 
 class Holiday:
     """Holiday model"""
     
+    __slots__ = ('holiday_id', 'holiday_name', 'holiday_description', 'holiday_date',
+                 'created_date', 'modified_date', 'status')
+    
     def __init__(self, holiday_id: str, holiday_name: str, 
                  holiday_date: date, **kwargs):
         self.holiday_id = holiday_id
         self.holiday_name = holiday_name
         self.holiday_description = kwargs.get('holiday_description', '')
         self.holiday_date = holiday_date
-        self.created_date = kwargs.get('created_date', datetime.now().date())
-        self.modified_date = kwargs.get('modified_date', datetime.now().date())
+        self.created_date = today_if_missing(kwargs, 'created_date')
+        self.modified_date = today_if_missing(kwargs, 'modified_date')
         self.status = kwargs.get('status', 1)
     
     def to_dict(self):
@@ -116,9 +179,20 @@ class Holiday:
             'holiday_id': self.holiday_id,
             'holiday_name': self.holiday_name,
             'holiday_description': self.holiday_description,
-            'holiday_date': self.holiday_date.isoformat() if isinstance(self.holiday_date, date) else str(self.holiday_date),
-            'created_date': self.created_date.isoformat() if isinstance(self.created_date, date) else str(self.created_date),
-            'modified_date': self.modified_date.isoformat() if isinstance(self.modified_date, date) else str(self.modified_date),
+            'holiday_date': iso(self.holiday_date),
+            'created_date': iso(self.created_date),
+            'modified_date': iso(self.modified_date),
             'status': self.status
         }
-
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            holiday_id=data['holiday_id'],
+            holiday_name=data['holiday_name'],
+            holiday_date=parse_date(data.get('holiday_date')),
+            holiday_description=data.get('holiday_description', ''),
+            created_date=parse_timestamp(data.get('created_date')),
+            modified_date=parse_timestamp(data.get('modified_date')),
+            status=data.get('status', 1)
+        )
@@ -1,11 +1,25 @@
 """
 Payroll data model
 """
-from datetime import datetime, date
+from payroll_system.models.fields import parse_timestamp, to_datetime, today_if_missing
+
+
+def period_key(year: int, month: int) -> int:
+    """Compact, sortable month key (yyyymm) stored as ``period``"""
+    return year * 100 + month
+
 
 class Payroll:
     """Payroll model"""
     
+    __slots__ = (
+        'payroll_id', 'employee_id', 'month', 'year',
+        'present_days', 'working_days', 'absent_days', 'leave_days', 'lop_days', 'overtime_hours',
+        'basic_salary', 'hra', 'da', 'allowances', 'bonus', 'overtime_pay', 'gross_salary',
+        'pf', 'esi', 'pt', 'lop_deduction', 'other_deductions', 'total_deductions',
+        'net_salary', 'created_date', 'status',
+    )
+    
     def __init__(self, employee_id: str, month: int, year: int, **kwargs):
         self.payroll_id = kwargs.get('payroll_id', None)
         self.employee_id = employee_id
@@ -41,7 +55,7 @@ class Payroll:
         self.net_salary = kwargs.get('net_salary', 0.0)
         
         # Metadata
-        self.created_date = kwargs.get('created_date', datetime.now().date())
+        self.created_date = today_if_missing(kwargs, 'created_date')
         self.status = kwargs.get('status', 'draft')  # draft, processed, paid
     
     def to_dict(self):
@@ -51,6 +65,7 @@ class Payroll:
             'employee_id': self.employee_id,
             'month': self.month,
             'year': self.year,
+            'period': period_key(self.year, self.month),
             'present_days': self.present_days,
             'working_days': self.working_days,
             'absent_days': self.absent_days,
@@ -71,48 +86,31 @@ class Payroll:
             'other_deductions': self.other_deductions,
             'total_deductions': self.total_deductions,
             'net_salary': self.net_salary,
-            'created_date': self.created_date.isoformat() if isinstance(self.created_date, date) else str(self.created_date),
+            'created_date': to_datetime(self.created_date),
             'status': self.status
         }
     
+    # Numeric fields and their defaults, in storage order
+    AMOUNT_FIELDS = (
+        ('present_days', 0), ('working_days', 0), ('absent_days', 0), ('leave_days', 0),
+        ('lop_days', 0), ('overtime_hours', 0.0),
+        ('basic_salary', 0.0), ('hra', 0.0), ('da', 0.0), ('allowances', 0.0), ('bonus', 0.0),
+        ('overtime_pay', 0.0), ('gross_salary', 0.0),
+        ('pf', 0.0), ('esi', 0.0), ('pt', 0.0), ('lop_deduction', 0.0), ('other_deductions', 0.0),
+        ('total_deductions', 0.0), ('net_salary', 0.0),
+    )
+    
     @classmethod
     def from_dict(cls, data: dict):
         """Create payroll from dictionary"""
-        from datetime import datetime as dt
-        
-        created_date = None
-        if data.get('created_date'):
-            if isinstance(data['created_date'], str):
-                created_date = dt.strptime(data['created_date'], '%Y-%m-%d').date()
-            else:
-                created_date = data['created_date']
-        
-        return cls(
-            employee_id=data['employee_id'],
-            month=data['month'],
-            year=data['year'],
-            payroll_id=data.get('payroll_id'),
-            present_days=data.get('present_days', 0),
-            working_days=data.get('working_days', 0),
-            absent_days=data.get('absent_days', 0),
-            leave_days=data.get('leave_days', 0),
-            lop_days=data.get('lop_days', 0),
-            overtime_hours=data.get('overtime_hours', 0.0),
-            basic_salary=data.get('basic_salary', 0.0),
-            hra=data.get('hra', 0.0),
-            da=data.get('da', 0.0),
-            allowances=data.get('allowances', 0.0),
-            bonus=data.get('bonus', 0.0),
-            overtime_pay=data.get('overtime_pay', 0.0),
-            gross_salary=data.get('gross_salary', 0.0),
-            pf=data.get('pf', 0.0),
-            esi=data.get('esi', 0.0),
-            pt=data.get('pt', 0.0),
-            lop_deduction=data.get('lop_deduction', 0.0),
-            other_deductions=data.get('other_deductions', 0.0),
-            total_deductions=data.get('total_deductions', 0.0),
-            net_salary=data.get('net_salary', 0.0),
-            created_date=created_date,
-            status=data.get('status', 'draft')
-        )
-
+        get = data.get
+        payroll = cls.__new__(cls)
+        payroll.payroll_id = get('payroll_id')
+        payroll.employee_id = data['employee_id']
+        payroll.month = data['month']
+        payroll.year = data['year']
+        for name, default in cls.AMOUNT_FIELDS:
+            setattr(payroll, name, get(name, default))
+        payroll.created_date = parse_timestamp(get('created_date'))
+        payroll.status = get('status', 'draft')
+        return payroll
@@ -0,0 +1,157 @@
+"""
+Column-oriented container for month- and year-level payroll data
+"""
+from array import array
+from math import fsum
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+from payroll_system.models.payroll import Payroll
+
+# Stored as doubles; fields whose Payroll default is an int are returned as ints
+NUMERIC_FIELDS = tuple(name for name, _ in Payroll.AMOUNT_FIELDS)
+_INT_FIELDS = frozenset(name for name, default in Payroll.AMOUNT_FIELDS if isinstance(default, int))
+TEXT_FIELDS = ('payroll_id', 'employee_id', 'status')
+PERIOD_FIELDS = ('month', 'year')
+
+GroupKey = Union[str, Mapping[str, object], Callable[[str], object]]
+
+
+class PayrollBatch:
+    """Payroll rows stored as one column per field.
+
+    Amounts and day counts are ``array('d')`` columns, month/year are
+    ``array('i')`` and identifiers are plain lists, so a year of payroll for a
+    large workforce costs a few bytes per value instead of a Python object per
+    row. Aggregations work column-wise.
+    """
+
+    __slots__ = ('columns', 'created_dates')
+
+    def __init__(self, columns: Optional[Dict[str, Sequence]] = None,
+                 created_dates: Optional[list] = None):
+        if columns is None:
+            columns = {name: array('d') for name in NUMERIC_FIELDS}
+            columns.update((name, array('i')) for name in PERIOD_FIELDS)
+            columns.update((name, []) for name in TEXT_FIELDS)
+        self.columns = columns
+        self.created_dates = created_dates if created_dates is not None else []
+
+    # -- construction --------------------------------------------------------
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[dict]) -> 'PayrollBatch':
+        """Build straight from payroll documents, e.g. a pymongo cursor"""
+        batch = cls()
+        columns = batch.columns
+        numeric = [(columns[name].append, name) for name in NUMERIC_FIELDS]
+        month, year = columns['month'].append, columns['year'].append
+        payroll_id, employee_id = columns['payroll_id'].append, columns['employee_id'].append
+        status, created = columns['status'].append, batch.created_dates.append
+        for doc in documents:
+            get = doc.get
+            for append, name in numeric:
+                append(get(name) or 0.0)
+            month(doc['month'])
+            year(doc['year'])
+            payroll_id(get('payroll_id'))
+            employee_id(doc['employee_id'])
+            status(get('status', 'draft'))
+            created(get('created_date'))
+        return batch
+
+    from_cursor = from_documents
+
+    @classmethod
+    def from_payrolls(cls, payrolls: Iterable[Payroll]) -> 'PayrollBatch':
+        return cls.from_documents(payroll.to_dict() for payroll in payrolls)
+
+    def to_payrolls(self) -> List[Payroll]:
+        """Materialize the rows as ``Payroll`` objects"""
+        return [Payroll.from_dict(row) for row in self.rows()]
+
+    def rows(self) -> Iterable[dict]:
+        """Rows as payroll documents"""
+        names = list(self.columns)
+        columns = [self.columns[name] for name in names]
+        for i in range(len(self)):
+            row = {name: column[i] for name, column in zip(names, columns)}
+            for name in _INT_FIELDS:
+                value = row[name]
+                if value.is_integer():
+                    row[name] = int(value)
+            row['created_date'] = self.created_dates[i]
+            yield row
+
+    # -- selection -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.columns['employee_id'])
+
+    def column(self, name: str) -> Sequence:
+        return self.columns[name]
+
+    def take(self, indices: Sequence[int]) -> 'PayrollBatch':
+        """New batch with the rows at ``indices``"""
+        columns = {}
+        for name, column in self.columns.items():
+            picked = [column[i] for i in indices]
+            columns[name] = array(column.typecode, picked) if isinstance(column, array) else picked
+        return PayrollBatch(columns, [self.created_dates[i] for i in indices])
+
+    def filter(self, mask: Optional[Sequence[bool]] = None, **conditions) -> 'PayrollBatch':
+        """Rows where ``mask`` is true and every ``field=value`` condition holds.
+
+        A list/tuple/set value matches any of its members, e.g.
+        ``batch.filter(month=(1, 2, 3), status='paid')``.
+        """
+        keep = list(mask) if mask is not None else [True] * len(self)
+        for name, expected in conditions.items():
+            column = self.columns[name]
+            if isinstance(expected, (list, tuple, set, frozenset)):
+                allowed = set(expected)
+                keep = [k and v in allowed for k, v in zip(keep, column)]
+            else:
+                keep = [k and v == expected for k, v in zip(keep, column)]
+        return self.take([i for i, k in enumerate(keep) if k])
+
+    # -- aggregation ---------------------------------------------------------
+
+    def totals(self, fields: Iterable[str] = NUMERIC_FIELDS) -> Dict[str, float]:
+        return {name: fsum(self.columns[name]) for name in fields}
+
+    def group_keys(self, key: GroupKey) -> list:
+        """Group value per row.
+
+        ``key`` is a column name (``'employee_id'``, ``'month'``), a mapping
+        from employee ID to group (e.g. department ID) or a callable taking the
+        employee ID.
+        """
+        if isinstance(key, str):
+            return list(self.columns[key])
+        lookup = key.get if isinstance(key, Mapping) else key
+        return [lookup(employee_id) for employee_id in self.columns['employee_id']]
+
+    def group_totals(self, key: GroupKey,
+                     fields: Iterable[str] = NUMERIC_FIELDS) -> Dict[object, Dict[str, float]]:
+        """Per-group column sums (plus a row ``count``), in first-seen order"""
+        fields = list(fields)
+        keys = self.group_keys(key)
+        slots: Dict[object, int] = {}
+        group_of = [slots.setdefault(k, len(slots)) for k in keys]
+        result = {k: {'count': 0} for k in slots}
+        groups = list(result.values())
+        for g in group_of:
+            groups[g]['count'] += 1
+        for name in fields:
+            sums = [0.0] * len(slots)
+            for g, value in zip(group_of, self.columns[name]):
+                sums[g] += value
+            for group, total in zip(groups, sums):
+                group[name] = total
+        return result
+
+    def group_by(self, key: GroupKey) -> Dict[object, 'PayrollBatch']:
+        """Split into one batch per group"""
+        indices: Dict[object, List[int]] = {}
+        for i, k in enumerate(self.group_keys(key)):
+            indices.setdefault(k, []).append(i)
+        return {k: self.take(rows) for k, rows in indices.items()}
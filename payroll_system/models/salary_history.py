@@ -0,0 +1,43 @@
+"""
+Salary history data model
+"""
+from calendar import monthrange
+from datetime import date
+from payroll_system.models.fields import parse_date, parse_timestamp, to_datetime, today_if_missing
+
+class SalaryRecord:
+    """Monthly basic salary of an employee from one effective date"""
+
+    __slots__ = ('employee_id', 'effective_from', 'basic_salary', 'reason', 'created_date')
+
+    def __init__(self, employee_id: str, effective_from: date, basic_salary: float, **kwargs):
+        self.employee_id = employee_id
+        self.effective_from = effective_from
+        self.basic_salary = float(basic_salary)
+        self.reason = kwargs.get('reason', '')
+        self.created_date = today_if_missing(kwargs, 'created_date')
+
+    def to_dict(self):
+        return {
+            'employee_id': self.employee_id,
+            'effective_from': to_datetime(self.effective_from),
+            'basic_salary': self.basic_salary,
+            'reason': self.reason,
+            'created_date': to_datetime(self.created_date),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            employee_id=data['employee_id'],
+            effective_from=parse_date(data['effective_from']),
+            basic_salary=data['basic_salary'],
+            reason=data.get('reason', ''),
+            created_date=parse_timestamp(data.get('created_date')),
+        )
+
+
+def salary_date(month: int, year: int) -> date:
+    """Date whose salary a month's payroll uses: the last day of the month,
+    so a revision effective during the month applies to all of it"""
+    return date(year, month, monthrange(year, month)[1])
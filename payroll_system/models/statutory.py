@@ -0,0 +1,74 @@
+"""
+Statutory rule set data model
+"""
+from datetime import date
+from typing import List, Optional, Tuple
+from payroll_system.models.fields import parse_date, parse_timestamp, to_datetime, today_if_missing
+
+# Rule set applied to employees whose location has no rule set of its own
+DEFAULT_STATE = '*'
+
+class StatutoryRuleSet:
+    """Statutory rates, caps and PT slabs for one state from one effective date"""
+
+    __slots__ = ('state', 'effective_from', 'pf_rate', 'pf_cap', 'esi_rate', 'esi_threshold',
+                 'hra_rate', 'da_rate', 'allowance_rate', 'overtime_multiplier', 'pt_slabs',
+                 'description', 'created_date', 'modified_date')
+
+    def __init__(self, state: str, effective_from: date, pf_rate: float, pf_cap: float,
+                 esi_rate: float, esi_threshold: float, hra_rate: float, da_rate: float,
+                 allowance_rate: float, overtime_multiplier: float,
+                 pt_slabs: List[Tuple[float, Optional[float], float]], **kwargs):
+        self.state = state
+        self.effective_from = effective_from
+        self.pf_rate = float(pf_rate)
+        self.pf_cap = float(pf_cap)
+        self.esi_rate = float(esi_rate)
+        self.esi_threshold = float(esi_threshold)
+        self.hra_rate = float(hra_rate)
+        self.da_rate = float(da_rate)
+        self.allowance_rate = float(allowance_rate)
+        self.overtime_multiplier = float(overtime_multiplier)
+        # (low, high, amount); high None = no upper bound
+        self.pt_slabs = [(float(low), None if high is None else float(high), float(amount))
+                         for low, high, amount in pt_slabs]
+        self.description = kwargs.get('description', '')
+        self.created_date = today_if_missing(kwargs, 'created_date')
+        self.modified_date = today_if_missing(kwargs, 'modified_date')
+
+    def to_dict(self):
+        return {
+            'state': self.state,
+            'effective_from': to_datetime(self.effective_from),
+            'pf_rate': self.pf_rate,
+            'pf_cap': self.pf_cap,
+            'esi_rate': self.esi_rate,
+            'esi_threshold': self.esi_threshold,
+            'hra_rate': self.hra_rate,
+            'da_rate': self.da_rate,
+            'allowance_rate': self.allowance_rate,
+            'overtime_multiplier': self.overtime_multiplier,
+            'pt_slabs': [list(slab) for slab in self.pt_slabs],
+            'description': self.description,
+            'created_date': to_datetime(self.created_date),
+            'modified_date': to_datetime(self.modified_date),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            state=data['state'],
+            effective_from=parse_date(data['effective_from']),
+            pf_rate=data['pf_rate'],
+            pf_cap=data['pf_cap'],
+            esi_rate=data['esi_rate'],
+            esi_threshold=data['esi_threshold'],
+            hra_rate=data['hra_rate'],
+            da_rate=data['da_rate'],
+            allowance_rate=data['allowance_rate'],
+            overtime_multiplier=data.get('overtime_multiplier', 1.5),
+            pt_slabs=data.get('pt_slabs', []),
+            description=data.get('description', ''),
+            created_date=parse_timestamp(data.get('created_date')),
+            modified_date=parse_timestamp(data.get('modified_date')),
+        )
@@ -0,0 +1,30 @@
+"""
+Change tracking for models loaded from the database
+"""
+
+
+class ChangeTracking:
+    """Remembers the document a model was loaded from, so an update can
+    ``$set`` only the fields that changed.
+
+    ``from_dict`` stores the loaded document in ``_loaded``; ``__init__``
+    sets it to None, since a new model has no stored state yet. Keeping a
+    reference is all hydration costs; the comparison runs on update only.
+    """
+    __slots__ = ('_loaded',)
+
+    def changes(self) -> dict:
+        """Stored fields that differ from the loaded document (all of them for a new model)"""
+        current = self.to_dict()
+        if self._loaded is None:
+            return current
+        # Compare against the snapshot as this model would store it, so a
+        # different stored representation (a datetime instead of an ISO
+        # date string, a missing default) does not count as a change
+        original = type(self).from_dict(self._loaded).to_dict()
+        return {key: value for key, value in current.items()
+                if key not in original or original[key] != value}
+
+    def mark_clean(self):
+        """Record that the database now holds the model's current values"""
+        self._loaded = self.to_dict()
@@ -2,42 +2,94 @@
 Excel export functionality using openpyxl
 """
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Mapping, Sequence, Tuple, Union
 from payroll_system.models.attendance import Attendance
 from payroll_system.models.payroll import Payroll
+from payroll_system.models.payroll_batch import PayrollBatch
 from payroll_system.models.employee import Employee
 from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.reconciliation import PayrollReconciliation
 from payroll_system.config import EXPORTS_DIR
 from datetime import datetime
 import os
 
+# Column widths of the streamed exports, set up front since write-only
+# sheets cannot be measured after the rows are written
+PAYROLL_COLUMN_WIDTHS = (14, 30) + (14,) * 13 + (13, 13, 10)
+EMPLOYEE_COLUMN_WIDTHS = (14, 30, 30, 14, 10, 14, 14, 14, 14, 10)
+ATTENDANCE_COLUMN_WIDTHS = (12, 14, 30, 10, 10, 10)
+RECONCILIATION_COLUMN_WIDTHS = (14, 30, 10, 30)
+
+# Distinct employees per name lookup while streaming rows
+NAME_LOOKUP_CHUNK = 500
+
+HEADER_FILL = PatternFill(start_color="5C7EB5", end_color="5C7EB5", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF", size=12)
+BORDER = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+CENTER = Alignment(horizontal='center', vertical='center')
+LEFT = Alignment(horizontal='left', vertical='center')
+RIGHT = Alignment(horizontal='right', vertical='center')
+
 class ExcelExporter:
     """Export payroll data to Excel"""
     
     def __init__(self):
         self.employee_repo = EmployeeRepository()
     
-    def export_payroll_report(self, payrolls: List[Payroll], 
+    def _stream_sheet(self, title: str, headers: List[str], widths: Sequence[int]):
+        """Write-only workbook whose sheet has fixed column widths and a styled header row.
+        
+        Write-only mode streams rows to disk instead of keeping a cell grid,
+        so widths must be set before the first row is appended.
+        """
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title)
+        for col_num, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = width
+        
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.fill = HEADER_FILL
+            cell.font = HEADER_FONT
+            cell.alignment = CENTER
+            cell.border = BORDER
+            header_cells.append(cell)
+        ws.append(header_cells)
+        return wb, ws
+    
+    @staticmethod
+    def _cell(ws, value, amount: bool = False) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.border = BORDER
+        if amount:
+            cell.number_format = '#,##0.00'
+            cell.alignment = RIGHT
+        else:
+            cell.alignment = LEFT
+        return cell
+    
+    def _with_names(self, records: Iterable) -> Iterator[Tuple[object, str]]:
+        """Pair records with their employee's name, one lookup per chunk of employees"""
+        chunk, employees = [], set()
+        for record in records:
+            if record.employee_id not in employees and len(employees) >= NAME_LOOKUP_CHUNK:
+                names = self.employee_repo.get_names_by_ids(employees)
+                yield from ((r, names.get(r.employee_id, "N/A")) for r in chunk)
+                chunk, employees = [], set()
+            employees.add(record.employee_id)
+            chunk.append(record)
+        if chunk:
+            names = self.employee_repo.get_names_by_ids(employees)
+            yield from ((r, names.get(r.employee_id, "N/A")) for r in chunk)
+    
+    def export_payroll_report(self, payrolls: Iterable[Payroll],
                             month: int, year: int) -> str:
-        """Export payroll report to Excel"""
+        """Export payroll report to Excel (``payrolls`` may be a stream)"""
         try:
-            # Create workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = f"Payroll_{year}_{month:02d}"
-            
-            # Define styles
-            header_fill = PatternFill(start_color="5C7EB5", end_color="5C7EB5", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF", size=12)
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
             # Headers
             headers = [
                 'Employee ID', 'Employee Name', 'Basic Salary', 'HRA', 'DA',
@@ -45,21 +97,11 @@ class ExcelExporter:
                 'PF', 'ESI', 'PT', 'LOP Deduction', 'Total Deductions', 'Net Salary',
                 'Present Days', 'Working Days', 'LOP Days'
             ]
-            
-            # Write headers
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num)
-                cell.value = header
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = border
+            wb, ws = self._stream_sheet(f"Payroll_{year}_{month:02d}", headers, PAYROLL_COLUMN_WIDTHS)
             
             # Write data
-            for row_num, payroll in enumerate(payrolls, 2):
-                employee = self.employee_repo.get_by_id(payroll.employee_id)
-                employee_name = employee.employee_name if employee else "N/A"
-                
+            rows = 0
+            for payroll, employee_name in self._with_names(payrolls):
                 row_data = [
                     payroll.employee_id,
                     employee_name,
@@ -80,45 +122,22 @@ class ExcelExporter:
                     payroll.working_days,
                     payroll.lop_days
                 ]
-                
-                for col_num, value in enumerate(row_data, 1):
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.value = value
-                    cell.border = border
-                    if col_num >= 3:  # Numeric columns
-                        cell.number_format = '#,##0.00'
-                        cell.alignment = Alignment(horizontal='right', vertical='center')
-                    else:
-                        cell.alignment = Alignment(horizontal='left', vertical='center')
+                # Numeric columns from the third on
+                ws.append([self._cell(ws, value, amount=col_num >= 3)
+                           for col_num, value in enumerate(row_data, 1)])
+                rows += 1
             
-            # Auto-adjust column widths
-            for col_num in range(1, len(headers) + 1):
-                column_letter = get_column_letter(col_num)
-                max_length = 0
-                for row in ws[column_letter]:
-                    try:
-                        if len(str(row.value)) > max_length:
-                            max_length = len(str(row.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 30)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Add summary row
-            summary_row = len(payrolls) + 3
-            ws.cell(row=summary_row, column=1).value = "TOTAL"
-            ws.cell(row=summary_row, column=1).font = Font(bold=True)
-            
-            # Calculate totals
-            total_cols = [3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+            # Add summary row after a blank one
+            ws.append([])
+            total_cols = range(3, 16)
+            summary = [WriteOnlyCell(ws, value="TOTAL"), None]
+            summary[0].font = Font(bold=True)
             for col_num in total_cols:
                 col_letter = get_column_letter(col_num)
-                formula = f"=SUM({col_letter}2:{col_letter}{len(payrolls) + 1})"
-                cell = ws.cell(row=summary_row, column=col_num)
-                cell.value = formula
+                cell = self._cell(ws, f"=SUM({col_letter}2:{col_letter}{rows + 1})", amount=True)
                 cell.font = Font(bold=True)
-                cell.number_format = '#,##0.00'
-                cell.border = border
+                summary.append(cell)
+            ws.append(summary)
             
             # Save file
             filename = f"payroll_report_{year}_{month:02d}.xlsx"
@@ -129,39 +148,18 @@ class ExcelExporter:
         except Exception as e:
             raise Exception(f"Error exporting to Excel: {str(e)}")
     
-    def export_employee_list(self, employees: List[Employee]) -> str:
-        """Export employee list to Excel"""
+    def export_employee_list(self, employees: Iterable[Employee]) -> str:
+        """Export employee list to Excel (``employees`` may be a stream)"""
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Employees"
-            
-            # Styles
-            header_fill = PatternFill(start_color="5C7EB5", end_color="5C7EB5", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF", size=12)
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
             # Headers
             headers = [
                 'Employee ID', 'Employee Name', 'Email', 'Mobile', 'Gender',
                 'Department', 'Designation', 'Branch', 'Basic Salary', 'Status'
             ]
-            
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num)
-                cell.value = header
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = border
+            wb, ws = self._stream_sheet("Employees", headers, EMPLOYEE_COLUMN_WIDTHS)
             
             # Write data
-            for row_num, employee in enumerate(employees, 2):
+            for employee in employees:
                 row_data = [
                     employee.employee_id,
                     employee.employee_name,
@@ -174,29 +172,9 @@ class ExcelExporter:
                     employee.basic_salary,
                     "Active" if employee.status == 1 else "Inactive"
                 ]
-                
-                for col_num, value in enumerate(row_data, 1):
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.value = value
-                    cell.border = border
-                    if col_num == 9:  # Salary column
-                        cell.number_format = '#,##0.00'
-                        cell.alignment = Alignment(horizontal='right', vertical='center')
-                    else:
-                        cell.alignment = Alignment(horizontal='left', vertical='center')
-            
-            # Auto-adjust column widths
-            for col_num in range(1, len(headers) + 1):
-                column_letter = get_column_letter(col_num)
-                max_length = 0
-                for row in ws[column_letter]:
-                    try:
-                        if len(str(row.value)) > max_length:
-                            max_length = len(str(row.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 30)
-                ws.column_dimensions[column_letter].width = adjusted_width
+                # Salary is the ninth column
+                ws.append([self._cell(ws, value, amount=col_num == 9)
+                           for col_num, value in enumerate(row_data, 1)])
             
             # Save file
             filename = f"employee_list_{datetime.now().strftime('%Y%m%d')}.xlsx"
@@ -207,34 +185,17 @@ class ExcelExporter:
         except Exception as e:
             raise Exception(f"Error exporting employee list: {str(e)}")
 
-    def export_attendance_report(self, attendances: List[Attendance], month: int, year: int) -> str:
-        """Export attendance report to Excel"""
+    def export_attendance_report(self, attendances: Iterable[Attendance], month: int, year: int) -> str:
+        """Export attendance report to Excel.
+        
+        ``attendances`` may be a stream (see ``AttendanceService.iter_month_attendance``);
+        rows are written as they arrive so the month is never held in memory.
+        """
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = f"Attendance_{year}_{month:02d}"
-            
-            # Styles
-            header_fill = PatternFill(start_color="5C7EB5", end_color="5C7EB5", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF", size=12)
-            border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-            
-            # Headers
             headers = ['Date', 'Employee ID', 'Name', 'Check In', 'Check Out', 'Status']
+            wb, ws = self._stream_sheet(f"Attendance_{year}_{month:02d}", headers, ATTENDANCE_COLUMN_WIDTHS)
             
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num)
-                cell.value = header
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = border
-            
-            # Write data
-            for row_num, att in enumerate(attendances, 2):
-                employee = self.employee_repo.get_by_id(att.employee_id)
-                name = employee.employee_name if employee else "N/A"
-                
+            for att, name in self._with_names(attendances):
                 row_data = [
                     att.date,
                     att.employee_id,
@@ -243,25 +204,7 @@ class ExcelExporter:
                     att.checkout_time,
                     att.status
                 ]
-                
-                for col_num, value in enumerate(row_data, 1):
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.value = value
-                    cell.border = border
-                    cell.alignment = Alignment(horizontal='left', vertical='center')
-            
-            # Auto-adjust column widths
-            for col_num in range(1, len(headers) + 1):
-                column_letter = get_column_letter(col_num)
-                max_length = 0
-                for row in ws[column_letter]:
-                    try:
-                        if len(str(row.value)) > max_length:
-                            max_length = len(str(row.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 30)
-                ws.column_dimensions[column_letter].width = adjusted_width
+                ws.append([self._cell(ws, value) for value in row_data])
             
             filename = f"attendance_report_{year}_{month:02d}.xlsx"
             filepath = EXPORTS_DIR / filename
@@ -271,9 +214,48 @@ class ExcelExporter:
         except Exception as e:
             raise Exception(f"Error exporting attendance: {str(e)}")
 
-    def generate_salary_summary(self, payrolls: List[Payroll], year: int) -> str:
-        """Generate annual salary summary"""
+    def export_reconciliation(self, reconciliation: PayrollReconciliation,
+                              only_exceptions: bool = True) -> str:
+        """Export a month-over-month reconciliation (only rows that are not ok by default)"""
+        try:
+            titles = [name.replace('_', ' ').title() for name in reconciliation.fields]
+            headers = ['Employee ID', 'Employee Name', 'Status', 'Flagged']
+            for title in titles:
+                headers.extend([f'Previous {title}', f'Current {title}', f'Change {title}'])
+            widths = RECONCILIATION_COLUMN_WIDTHS + (16,) * (3 * len(titles))
+            month, year = reconciliation.month, reconciliation.year
+            wb, ws = self._stream_sheet(f"Reconciliation_{year}_{month:02d}", headers, widths)
+            
+            for row, employee_name in self._with_names(reconciliation.rows(only_exceptions)):
+                cells = [self._cell(ws, row.employee_id), self._cell(ws, employee_name),
+                         self._cell(ws, row.status), self._cell(ws, ', '.join(row.flagged))]
+                for previous, current in zip(row.previous, row.current):
+                    cells.extend(self._cell(ws, value, amount=True)
+                                 for value in (previous, current, current - previous))
+                ws.append(cells)
+            
+            filename = f"payroll_reconciliation_{year}_{month:02d}.xlsx"
+            filepath = EXPORTS_DIR / filename
+            wb.save(str(filepath))
+            
+            return str(filepath)
+        except Exception as e:
+            raise Exception(f"Error exporting reconciliation: {str(e)}")
+    
+    def generate_salary_summary(self, payrolls: Union[List[Payroll], PayrollBatch, Mapping[str, Dict[str, float]]],
+                                year: int) -> str:
+        """Generate annual salary summary.
+        
+        ``payrolls`` is a list of payrolls, a columnar batch, or per-employee
+        totals already grouped by the database (``PayrollService.get_annual_totals``).
+        """
         try:
+            if isinstance(payrolls, Mapping):
+                summary = payrolls
+            else:
+                batch = payrolls if isinstance(payrolls, PayrollBatch) else PayrollBatch.from_payrolls(payrolls)
+                summary = batch.group_totals('employee_id', ('gross_salary', 'total_deductions', 'net_salary', 'bonus'))
+
             wb = Workbook()
             ws = wb.active
             ws.title = f"Salary_Summary_{year}"
@@ -294,25 +276,14 @@ class ExcelExporter:
                 cell.alignment = Alignment(horizontal='center', vertical='center')
                 cell.border = border
             
-            # Aggregate data by employee
-            summary = {}
-            for p in payrolls:
-                if p.employee_id not in summary:
-                    employee = self.employee_repo.get_by_id(p.employee_id)
-                    summary[p.employee_id] = {
-                        'name': employee.employee_name if employee else "N/A",
-                        'gross': 0, 'deductions': 0, 'net': 0, 'bonus': 0
-                    }
-                summary[p.employee_id]['gross'] += p.gross_salary
-                summary[p.employee_id]['deductions'] += p.total_deductions
-                summary[p.employee_id]['net'] += p.net_salary
-                summary[p.employee_id]['bonus'] += p.bonus
+            names = self.employee_repo.get_names_by_ids(summary)
             
             # Write data
             row_num = 2
             for emp_id, data in summary.items():
                 row_data = [
-                    emp_id, data['name'], data['gross'], data['deductions'], data['net'], data['bonus']
+                    emp_id, names.get(emp_id, "N/A"), data['gross_salary'], data['total_deductions'],
+                    data['net_salary'], data['bonus']
                 ]
                 
                 for col_num, value in enumerate(row_data, 1):
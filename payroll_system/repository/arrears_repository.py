@@ -0,0 +1,87 @@
+"""
+Arrears repository for database operations
+"""
+from typing import Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from payroll_system.models.arrears import Arrear
+from payroll_system.models.payroll import period_key
+from payroll_system.utils.database import db
+from payroll_system.utils.indexes import IndexSpec, QueryShape
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (year, month)
+Period = Tuple[int, int]
+
+class ArrearsRepository:
+    """Repository for arrears line items"""
+
+    INDEXES = (
+        IndexSpec('arrears', (('employee_id', 1), ('period', 1), ('reference', 1)), unique=True),
+        IndexSpec('arrears', (('reference', 1), ('employee_id', 1))),
+    )
+
+    QUERY_SHAPES = (
+        QueryShape('ArrearsRepository.get_for_periods', 'arrears',
+                   {'employee_id': {'$in': ['EMP0000001', 'EMP0000002']},
+                    'period': {'$gte': 202504, '$lte': 202603}}),
+        QueryShape('ArrearsRepository.get_by_reference', 'arrears', {'reference': '2026 appraisal'},
+                   sort=(('reference', 1), ('employee_id', 1))),
+    )
+
+    def __init__(self):
+        self.collection = db.get_db().arrears
+
+    def get_for_periods(self, start: Period, end: Period,
+                        employee_ids: Optional[List[str]] = None) -> List[Arrear]:
+        """Arrears for payroll months ``start`` to ``end`` (inclusive), optionally of some employees.
+
+        Raises if they cannot be read: treating arrears already paid as
+        missing would pay them again.
+        """
+        try:
+            query = {'period': {'$gte': period_key(*start), '$lte': period_key(*end)}}
+            if employee_ids is not None:
+                query['employee_id'] = {'$in': employee_ids}
+            return [Arrear.from_dict(data) for data in self.collection.find(query)]
+        except Exception as e:
+            logger.error(f"Error getting arrears: {e}")
+            raise
+
+    def get_by_reference(self, reference: str) -> List[Arrear]:
+        """Arrears of one revision, by employee"""
+        try:
+            cursor = self.collection.find({'reference': reference}).sort([('reference', 1), ('employee_id', 1)])
+            return [Arrear.from_dict(data) for data in cursor]
+        except Exception as e:
+            logger.error(f"Error getting arrears for {reference}: {e}")
+            return []
+
+    def save_many(self, arrears: Iterable[Arrear]) -> int:
+        """Insert or replace arrears (keyed by employee, month and reference) in one bulk write.
+
+        Arrears already marked paid are not replaced. Returns how many were written.
+        """
+        try:
+            requests = []
+            for arrear in arrears:
+                data = arrear.to_dict()
+                created_date = data.pop('created_date')
+                requests.append(UpdateOne(
+                    {'employee_id': arrear.employee_id, 'period': data['period'],
+                     'reference': arrear.reference, 'status': {'$ne': 'paid'}},
+                    {'$set': data, '$setOnInsert': {'created_date': created_date}},
+                    upsert=True))
+            if not requests:
+                return 0
+            result = self.collection.bulk_write(requests, ordered=False)
+            return result.upserted_count + result.matched_count
+        except BulkWriteError as e:
+            # The rest of the batch was written
+            logger.error(f"Error saving arrears: {len(e.details.get('writeErrors', []))} failed")
+            return e.details.get('nUpserted', 0) + e.details.get('nMatched', 0)
+        except Exception as e:
+            logger.error(f"Error saving arrears: {e}")
+            return 0
@@ -1,27 +1,282 @@
 """
 Attendance repository for database operations
 """
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence
 from datetime import date, datetime
+from itertools import groupby
+from operator import attrgetter
+from payroll_system.config import ATTENDANCE_LAYOUT, STREAM_BATCH_SIZE
 from payroll_system.models.attendance import Attendance
+from payroll_system.models.fields import to_datetime
+from payroll_system.models.payroll import period_key
+from payroll_system.repository.migration_repository import MigrationRepository, ATTENDANCE_DATES
 from payroll_system.utils.database import db
+from payroll_system.utils.indexes import IndexSpec, QueryShape
 import logging
 
 logger = logging.getLogger(__name__)
 
-class AttendanceRepository:
-    """Repository for attendance data operations"""
+# Fields kept per day inside a monthly bucket
+_BUCKET_OMIT = ('_id', 'employee_id', 'date')
+
+# Rough number of days per bucket, to size bucket cursor batches
+_DAYS_PER_BUCKET = 20
+
+
+def _month_bounds(month: int, year: int):
+    """First day of the month and first day of the next month"""
+    start = date(year, month, 1)
+    return start, (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1))
+
+
+def day_key(day: date) -> str:
+    """Key of a day inside a monthly bucket's ``days`` document"""
+    return f"{day.day:02d}"
+
+
+def to_day_entry(data: dict) -> dict:
+    """Daily attendance document -> entry stored in a monthly bucket"""
+    return {k: v for k, v in data.items() if k not in _BUCKET_OMIT}
+
+
+class DailyAttendanceLayout:
+    """One document per employee per day in ``attendance``"""
+    
+    INDEXES = (
+        IndexSpec('attendance', (('employee_id', 1), ('date', 1)), unique=True),
+    )
+    
+    QUERY_SHAPES = (
+        QueryShape('AttendanceRepository.get_by_employee_and_date (daily)', 'attendance',
+                   {'employee_id': 'EMP0000001', 'date': datetime(2025, 1, 2)}),
+        QueryShape('AttendanceRepository.get_by_employee_month (daily)', 'attendance',
+                   {'employee_id': 'EMP0000001',
+                    'date': {'$gte': datetime(2025, 1, 1), '$lt': datetime(2025, 2, 1)}}),
+        QueryShape('AttendanceRepository.get_all_by_employee (daily)', 'attendance',
+                   {'employee_id': 'EMP0000001'}, sort=(('date', -1),)),
+        QueryShape('AttendanceRepository.get_all_by_month (daily)', 'attendance',
+                   {'date': {'$gte': datetime(2025, 1, 1), '$lt': datetime(2025, 2, 1)}},
+                   sort=(('employee_id', 1), ('date', 1))),
+    )
     
     def __init__(self):
         self.collection = db.get_db().attendance
+        # Until the date migration has finished, records may still hold ISO
+        # string dates, so lookups match both representations.
+        self.dual_read = not MigrationRepository().is_complete(ATTENDANCE_DATES)
+    
+    def _date_condition(self, att_date):
+        """Query condition matching one day"""
+        value = to_datetime(att_date)
+        if self.dual_read:
+            return {'$in': [value, value.date().isoformat()]}
+        return value
+    
+    def _range_query(self, start: date, end: date) -> dict:
+        """Query fragment matching days in [start, end)"""
+        query = {'date': {'$gte': to_datetime(start), '$lt': to_datetime(end)}}
+        if self.dual_read:
+            legacy = {'date': {'$gte': start.isoformat(), '$lt': end.isoformat()}}
+            return {'$or': [query, legacy]}
+        return query
+    
+    def insert(self, attendance: Attendance) -> bool:
+        result = self.collection.insert_one(attendance.to_dict())
+        return result.inserted_id is not None
+    
+    def find_day(self, employee_id: str, att_date: date) -> Optional[Attendance]:
+        data = self.collection.find_one({
+            'employee_id': employee_id,
+            'date': self._date_condition(att_date)
+        })
+        return Attendance.from_dict(data) if data else None
+    
+    def find_month(self, employee_id: str, month: int, year: int) -> List[Attendance]:
+        start_date, end_date = _month_bounds(month, year)
+        return [Attendance.from_dict(data) for data in self.collection.find({
+            'employee_id': employee_id,
+            **self._range_query(start_date, end_date)
+        })]
+    
+    def iter_month(self, month: int, year: int, employee_ids: Optional[List[str]] = None,
+                   fields: Optional[Sequence[str]] = None,
+                   batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Attendance]:
+        query = self._range_query(*_month_bounds(month, year))
+        if employee_ids is not None:
+            query['employee_id'] = {'$in': employee_ids}
+        projection = None
+        if fields is not None:
+            projection = dict.fromkeys(('employee_id', 'date', *fields), 1)
+            projection['_id'] = 0
+        cursor = (self.collection.find(query, projection)
+                  .sort([('employee_id', 1), ('date', 1)])
+                  .batch_size(batch_size))
+        rows = (Attendance.from_dict(data) for data in cursor)
+        if not self.dual_read:
+            yield from rows
+            return
+        # String and date values sort in separate type brackets, so order
+        # each employee's days again (one employee is buffered at a time)
+        for _, days in groupby(rows, key=attrgetter('employee_id')):
+            yield from sorted(days, key=attrgetter('date'))
+    
+    def replace(self, attendance: Attendance) -> bool:
+        result = self.collection.update_one(
+            {
+                'employee_id': attendance.employee_id,
+                'date': self._date_condition(attendance.date)
+            },
+            {'$set': attendance.to_dict()}
+        )
+        return result.modified_count > 0
+    
+    def iter_employee(self, employee_id: str, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Attendance]:
+        cursor = self.collection.find({'employee_id': employee_id}).sort('date', -1).batch_size(batch_size)
+        rows = (Attendance.from_dict(data) for data in cursor)
+        if self.dual_read:
+            # String and date values sort in separate type brackets
+            rows = iter(sorted(rows, key=attrgetter('date'), reverse=True))
+        yield from rows
+    
+    def remove(self, employee_id: str, att_date: date) -> bool:
+        result = self.collection.delete_one({
+            'employee_id': employee_id,
+            'date': self._date_condition(att_date)
+        })
+        return result.deleted_count > 0
+
+
+class MonthlyAttendanceLayout:
+    """One bucket per employee-month in ``attendance_months``.
+    
+    ``{'employee_id', 'period', 'year', 'month', 'days': {'01': {...}, ...}}``
+    keeps a month of attendance in a single document, so a month scan reads
+    one document and the index holds one entry per employee-month instead of
+    one per day.
+    """
+    
+    INDEXES = (
+        IndexSpec('attendance_months', (('employee_id', 1), ('period', 1)), unique=True),
+        # Month-wide reads in employee order
+        IndexSpec('attendance_months', (('period', 1), ('employee_id', 1))),
+    )
+    
+    QUERY_SHAPES = (
+        QueryShape('AttendanceRepository.get_by_employee_month (monthly)', 'attendance_months',
+                   {'employee_id': 'EMP0000001', 'period': 202501}),
+        QueryShape('AttendanceRepository.get_all_by_employee (monthly)', 'attendance_months',
+                   {'employee_id': 'EMP0000001'}, sort=(('period', -1),)),
+        QueryShape('AttendanceRepository.get_all_by_month (monthly)', 'attendance_months',
+                   {'period': 202501}, sort=(('employee_id', 1),)),
+    )
+    
+    def __init__(self):
+        self.collection = db.get_db().attendance_months
+    
+    @staticmethod
+    def _bucket_filter(employee_id: str, day: date) -> dict:
+        return {'employee_id': employee_id, 'period': period_key(day.year, day.month)}
+    
+    @staticmethod
+    def _expand(bucket: dict, reverse: bool = False) -> List[Attendance]:
+        year, month, employee_id = bucket['year'], bucket['month'], bucket['employee_id']
+        days = bucket.get('days') or {}
+        return [
+            Attendance.from_dict({**days[key], 'employee_id': employee_id,
+                                  'date': date(year, month, int(key))})
+            for key in sorted(days, reverse=reverse) if days[key]
+        ]
+    
+    def insert(self, attendance: Attendance) -> bool:
+        day = attendance.date
+        field = f"days.{day_key(day)}"
+        # Upserting on a filter that requires the day to be absent fails with a
+        # duplicate key error if it is already marked, like a daily insert.
+        result = self.collection.update_one(
+            {**self._bucket_filter(attendance.employee_id, day), field: {'$exists': False}},
+            {'$set': {field: to_day_entry(attendance.to_dict())},
+             '$setOnInsert': {'year': day.year, 'month': day.month}},
+            upsert=True
+        )
+        return result.upserted_id is not None or result.modified_count > 0
+    
+    def find_day(self, employee_id: str, att_date: date) -> Optional[Attendance]:
+        key = day_key(att_date)
+        bucket = self.collection.find_one(self._bucket_filter(employee_id, att_date),
+                                          {f"days.{key}": 1, 'employee_id': 1, 'year': 1, 'month': 1})
+        if not bucket or not (bucket.get('days') or {}).get(key):
+            return None
+        return self._expand(bucket)[0]
+    
+    def find_month(self, employee_id: str, month: int, year: int) -> List[Attendance]:
+        bucket = self.collection.find_one({'employee_id': employee_id, 'period': period_key(year, month)})
+        return self._expand(bucket) if bucket else []
+    
+    def iter_month(self, month: int, year: int, employee_ids: Optional[List[str]] = None,
+                   fields: Optional[Sequence[str]] = None,
+                   batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Attendance]:
+        # A bucket is already one employee-month, so ``fields`` is not applied
+        query = {'period': period_key(year, month)}
+        if employee_ids is not None:
+            query['employee_id'] = {'$in': employee_ids}
+        cursor = (self.collection.find(query).sort('employee_id', 1)
+                  .batch_size(max(batch_size // _DAYS_PER_BUCKET, 1)))
+        for bucket in cursor:
+            yield from self._expand(bucket)
+    
+    def replace(self, attendance: Attendance) -> bool:
+        field = f"days.{day_key(attendance.date)}"
+        result = self.collection.update_one(
+            {**self._bucket_filter(attendance.employee_id, attendance.date), field: {'$exists': True}},
+            {'$set': {field: to_day_entry(attendance.to_dict())}}
+        )
+        return result.modified_count > 0
+    
+    def iter_employee(self, employee_id: str, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Attendance]:
+        cursor = (self.collection.find({'employee_id': employee_id}).sort('period', -1)
+                  .batch_size(max(batch_size // _DAYS_PER_BUCKET, 1)))
+        for bucket in cursor:
+            yield from self._expand(bucket, reverse=True)
+    
+    def remove(self, employee_id: str, att_date: date) -> bool:
+        field = f"days.{day_key(att_date)}"
+        result = self.collection.update_one(
+            {**self._bucket_filter(employee_id, att_date), field: {'$exists': True}},
+            {'$unset': {field: ''}}
+        )
+        return result.modified_count > 0
+
+
+LAYOUTS = {
+    'daily': DailyAttendanceLayout,
+    'monthly': MonthlyAttendanceLayout,
+}
+
+
+class AttendanceRepository:
+    """Repository for attendance data operations
+    
+    Storage follows ``ATTENDANCE_LAYOUT``; callers always work with
+    ``Attendance`` objects.
+    """
+    
+    # Both layouts stay indexed so either can be switched to at any time
+    INDEXES = DailyAttendanceLayout.INDEXES + MonthlyAttendanceLayout.INDEXES
+    QUERY_SHAPES = DailyAttendanceLayout.QUERY_SHAPES + MonthlyAttendanceLayout.QUERY_SHAPES
+    
+    def __init__(self, layout: Optional[str] = None):
+        layout = layout or ATTENDANCE_LAYOUT
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown attendance layout: {layout!r} (expected one of {', '.join(LAYOUTS)})")
+        self.layout = LAYOUTS[layout]()
+        self.collection = self.layout.collection
     
     def create(self, attendance: Attendance) -> bool:
         """Create attendance record"""
         try:
-            attendance_dict = attendance.to_dict()
-            result = self.collection.insert_one(attendance_dict)
+            created = self.layout.insert(attendance)
             logger.info(f"Created attendance for employee: {attendance.employee_id}")
-            return result.inserted_id is not None
+            return created
         except Exception as e:
             logger.error(f"Error creating attendance: {e}")
             return False
@@ -29,13 +284,7 @@ class AttendanceRepository:
     def get_by_employee_and_date(self, employee_id: str, att_date: date) -> Optional[Attendance]:
         """Get attendance by employee ID and date"""
         try:
-            data = self.collection.find_one({
-                'employee_id': employee_id,
-                'date': att_date.isoformat() if isinstance(att_date, date) else str(att_date)
-            })
-            if data:
-                return Attendance.from_dict(data)
-            return None
+            return self.layout.find_day(employee_id, att_date)
         except Exception as e:
             logger.error(f"Error getting attendance: {e}")
             return None
@@ -43,57 +292,56 @@ class AttendanceRepository:
     def get_by_employee_month(self, employee_id: str, month: int, year: int) -> List[Attendance]:
         """Get all attendance records for an employee in a month"""
         try:
-            start_date = f"{year}-{month:02d}-01"
-            if month == 12:
-                end_date = f"{year + 1}-01-01"
-            else:
-                end_date = f"{year}-{month + 1:02d}-01"
-            
-            attendances = []
-            for data in self.collection.find({
-                'employee_id': employee_id,
-                'date': {'$gte': start_date, '$lt': end_date}
-            }):
-                attendances.append(Attendance.from_dict(data))
-            return attendances
+            return self.layout.find_month(employee_id, month, year)
         except Exception as e:
             logger.error(f"Error getting monthly attendance: {e}")
             return []
     
+    def get_all_by_month(self, month: int, year: int, employee_ids: Optional[Iterable[str]] = None,
+                         fields: Optional[Sequence[str]] = None,
+                         batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Attendance]:
+        """Stream a month of attendance for all (or the given) employees.
+        
+        Records come ordered by employee, then date, straight from a cursor,
+        so the month is never held in memory. ``fields`` limits the loaded
+        attendance fields (employee ID and date are always included). A read
+        error is logged and raised rather than ending the stream early.
+        """
+        try:
+            ids = None if employee_ids is None else list(employee_ids)
+            yield from self.layout.iter_month(month, year, ids, fields, batch_size)
+        except Exception as e:
+            logger.error(f"Error streaming monthly attendance: {e}")
+            raise
+    
     def update(self, attendance: Attendance) -> bool:
         """Update attendance record"""
         try:
-            attendance_dict = attendance.to_dict()
-            result = self.collection.update_one(
-                {
-                    'employee_id': attendance.employee_id,
-                    'date': attendance.date.isoformat() if isinstance(attendance.date, date) else str(attendance.date)
-                },
-                {'$set': attendance_dict}
-            )
-            return result.modified_count > 0
+            return self.layout.replace(attendance)
         except Exception as e:
             logger.error(f"Error updating attendance: {e}")
             return False
     
-    def get_all_by_employee(self, employee_id: str) -> List[Attendance]:
-        """Get all attendance records for an employee"""
+    def iter_by_employee(self, employee_id: str, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Attendance]:
+        """Stream all attendance records for an employee, newest first"""
         try:
-            attendances = []
-            for data in self.collection.find({'employee_id': employee_id}).sort('date', -1):
-                attendances.append(Attendance.from_dict(data))
-            return attendances
+            yield from self.layout.iter_employee(employee_id, batch_size)
         except Exception as e:
-            logger.error(f"Error getting employee attendance: {e}")
+            logger.error(f"Error streaming employee attendance: {e}")
+            raise
+    
+    def get_all_by_employee(self, employee_id: str) -> List[Attendance]:
+        """Get all attendance records for an employee (empty if the read fails)"""
+        try:
+            return list(self.iter_by_employee(employee_id))
+        except Exception:
+            # Logged by iter_by_employee; never return part of the list
+            return []
+    
     def delete(self, employee_id: str, att_date: date) -> bool:
         """Delete attendance record"""
         try:
-            result = self.collection.delete_one({
-                'employee_id': employee_id,
-                'date': att_date.isoformat() if isinstance(att_date, date) else str(att_date)
-            })
-            return result.deleted_count > 0
+            return self.layout.remove(employee_id, att_date)
         except Exception as e:
             logger.error(f"Error deleting attendance: {e}")
             return False
-
@@ -1,9 +1,15 @@
 """
 Employee repository for database operations
 """
-from typing import List, Optional
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from payroll_system.config import STREAM_BATCH_SIZE
 from payroll_system.models.employee import Employee
+from payroll_system.models.fields import iso
 from payroll_system.utils.database import db
+from payroll_system.utils.indexes import IndexSpec, QueryShape
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +17,41 @@ logger = logging.getLogger(__name__)
 class EmployeeRepository:
     """Repository for employee data operations"""
     
+    INDEXES = (
+        IndexSpec('employees', 'employee_id', unique=True),
+        IndexSpec('employees', 'email', unique=True),
+        # Status listings and counts, streamed in employee ID order
+        IndexSpec('employees', (('status', 1), ('employee_id', 1))),
+        # Covers the department ID listing
+        IndexSpec('employees', (('department_id', 1), ('employee_id', 1))),
+    )
+    
+    QUERY_SHAPES = (
+        QueryShape('EmployeeRepository.get_by_id', 'employees', {'employee_id': 'EMP0000001'}),
+        QueryShape('EmployeeRepository.get_by_email', 'employees', {'email': 'admin@payroll.com'}),
+        QueryShape('EmployeeRepository.get_names_by_ids', 'employees',
+                   {'employee_id': {'$in': ['EMP0000001', 'EMP0000002']}},
+                   {'_id': 0, 'employee_id': 1, 'employee_name': 1}),
+        QueryShape('EmployeeRepository.find_existing', 'employees',
+                   {'$or': [{'employee_id': {'$in': ['EMP0000001']}}, {'email': {'$in': ['a@example.com']}}]},
+                   {'_id': 0, 'employee_id': 1, 'email': 1}),
+        QueryShape('EmployeeRepository.get_by_ids', 'employees',
+                   {'employee_id': {'$in': ['EMP0000001', 'EMP0000002']}}),
+        QueryShape('EmployeeRepository.iter_all', 'employees', {'status': 1}, sort=(('employee_id', 1),)),
+        QueryShape('EmployeeRepository.get_page', 'employees',
+                   {'status': 1, 'employee_id': {'$gt': 'EMP0000001'}}, sort=(('employee_id', 1),)),
+        QueryShape('EmployeeRepository.get_columns', 'employees',
+                   {'department_id': {'$in': ['DEPT001', 'DEPT002']}, 'status': 1},
+                   {'_id': 0, 'employee_id': 1, 'basic_salary': 1, 'department_id': 1}),
+        QueryShape('EmployeeRepository.get_ids', 'employees', {'department_id': 'DEPT001'},
+                   {'_id': 0, 'employee_id': 1}),
+        QueryShape('EmployeeRepository.search', 'employees',
+                   {'$or': [{'employee_name': {'$regex': 'kumar', '$options': 'i'}},
+                            {'email': {'$regex': 'kumar', '$options': 'i'}},
+                            {'employee_id': {'$regex': 'kumar', '$options': 'i'}}]},
+                   allow_collscan=True),
+    )
+    
     def __init__(self):
         self.collection = db.get_db().employees
     
@@ -19,12 +60,57 @@ class EmployeeRepository:
         try:
             employee_dict = employee.to_dict()
             result = self.collection.insert_one(employee_dict)
+            employee.mark_clean()
             logger.info(f"Created employee: {employee.employee_id}")
             return result.inserted_id is not None
         except Exception as e:
             logger.error(f"Error creating employee: {e}")
             return False
     
+    def create_many(self, employees: List[Employee]) -> Tuple[int, List[Tuple[int, str]]]:
+        """Insert employees in one unordered bulk write.
+        
+        Returns the number inserted and ``(index, message)`` for each
+        employee that was rejected.
+        """
+        if not employees:
+            return 0, []
+        try:
+            result = self.collection.insert_many([e.to_dict() for e in employees], ordered=False)
+            for employee in employees:
+                employee.mark_clean()
+            logger.info(f"Created {len(result.inserted_ids)} employees")
+            return len(result.inserted_ids), []
+        except BulkWriteError as e:
+            failures = []
+            for err in e.details.get('writeErrors', []):
+                message = "Employee ID or email already exists" if err.get('code') == 11000 else err.get('errmsg', '')
+                failures.append((err['index'], message))
+            logger.info(f"Created {e.details.get('nInserted', 0)} employees, {len(failures)} rejected")
+            return e.details.get('nInserted', 0), failures
+        except Exception as e:
+            logger.error(f"Error creating employees: {e}")
+            return 0, [(i, str(e)) for i in range(len(employees))]
+    
+    def find_existing(self, employee_ids: List[str], emails: List[str]) -> Tuple[Set[str], Set[str]]:
+        """Which of these employee IDs and emails are already taken, in one query"""
+        try:
+            cursor = self.collection.find(
+                {'$or': [{'employee_id': {'$in': employee_ids}}, {'email': {'$in': emails}}]},
+                {'_id': 0, 'employee_id': 1, 'email': 1})
+            ids, taken = set(employee_ids), set(emails)
+            existing_ids, existing_emails = set(), set()
+            for data in cursor:
+                if data.get('employee_id') in ids:
+                    existing_ids.add(data['employee_id'])
+                if data.get('email') in taken:
+                    existing_emails.add(data['email'])
+            return existing_ids, existing_emails
+        except Exception as e:
+            # The unique indexes still reject duplicates on insert
+            logger.error(f"Error checking existing employees: {e}")
+            return set(), set()
+    
     def get_by_id(self, employee_id: str) -> Optional[Employee]:
         """Get employee by ID"""
         try:
@@ -47,35 +133,214 @@ class EmployeeRepository:
             logger.error(f"Error getting employee by email: {e}")
             return None
     
-    def get_all(self, status: Optional[int] = None) -> List[Employee]:
-        """Get all employees, optionally filtered by status"""
+    def get_by_ids(self, employee_ids: Iterable[str]) -> Dict[str, Employee]:
+        """Employees by ID with a single query.
+
+        Raises if they cannot be read, so callers cannot mistake a failed
+        read for employees that do not exist.
+        """
+        try:
+            ids = list(set(employee_ids))
+            if not ids:
+                return {}
+            return {data['employee_id']: Employee.from_dict(data)
+                    for data in self.collection.find({'employee_id': {'$in': ids}})}
+        except Exception as e:
+            logger.error(f"Error getting employees: {e}")
+            raise
+    
+    def get_names_by_ids(self, employee_ids: Iterable[str]) -> Dict[str, str]:
+        """Map employee IDs to names with a single query"""
+        try:
+            ids = list(set(employee_ids))
+            if not ids:
+                return {}
+            cursor = self.collection.find({'employee_id': {'$in': ids}},
+                                          {'_id': 0, 'employee_id': 1, 'employee_name': 1})
+            return {data['employee_id']: data.get('employee_name', '') for data in cursor}
+        except Exception as e:
+            logger.error(f"Error getting employee names: {e}")
+            return {}
+    
+    def get_ids(self, department_id: Optional[str] = None, status: Optional[int] = None) -> List[str]:
+        """Employee IDs, optionally filtered by department and status"""
+        try:
+            query = {}
+            if department_id is not None:
+                query['department_id'] = department_id
+            if status is not None:
+                query['status'] = status
+            return [data['employee_id'] for data in self.collection.find(query, {'_id': 0, 'employee_id': 1})]
+        except Exception as e:
+            logger.error(f"Error getting employee IDs: {e}")
+            return []
+    
+    def get_columns(self, fields: Iterable[str], status: Optional[int] = 1,
+                    **filters: Optional[Iterable[str]]) -> Dict[str, list]:
+        """Employee fields as columns (``{field: [values]}``, always including
+        employee_id) with a single query.
+        
+        ``filters`` restrict fields to sets of values, e.g.
+        ``department_id=['DEPT001']``; None means no restriction.
+        """
+        fields = ['employee_id'] + [f for f in fields if f != 'employee_id']
+        columns = {field: [] for field in fields}
+        try:
+            query = {}
+            if status is not None:
+                query['status'] = status
+            for field, values in filters.items():
+                if values is not None:
+                    query[field] = {'$in': list(values)}
+            projection = dict.fromkeys(fields, 1)
+            projection['_id'] = 0
+            appends = [(columns[field].append, field) for field in fields]
+            for data in self.collection.find(query, projection):
+                for append, field in appends:
+                    append(data.get(field))
+            return columns
+        except Exception as e:
+            logger.error(f"Error getting employee columns: {e}")
+            return {field: [] for field in fields}
+    
+    def get_field_map(self, field: str, employee_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Map employee IDs to one field (e.g. department_id) with a single query"""
+        try:
+            query = {}
+            if employee_ids is not None:
+                query['employee_id'] = {'$in': list(set(employee_ids))}
+            cursor = self.collection.find(query, {'_id': 0, 'employee_id': 1, field: 1})
+            return {data['employee_id']: data.get(field) for data in cursor}
+        except Exception as e:
+            logger.error(f"Error getting employee {field} map: {e}")
+            return {}
+    
+    def iter_all(self, status: Optional[int] = None, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Employee]:
+        """Stream employees in employee ID order, optionally filtered by status.
+        
+        A read error is logged and raised, so a stream is never silently cut short.
+        """
         try:
             query = {}
             if status is not None:
                 query['status'] = status
             
-            employees = []
-            for data in self.collection.find(query):
-                employees.append(Employee.from_dict(data))
-            return employees
+            for data in self.collection.find(query).sort('employee_id', 1).batch_size(batch_size):
+                yield Employee.from_dict(data)
         except Exception as e:
-            logger.error(f"Error getting all employees: {e}")
+            logger.error(f"Error streaming employees: {e}")
+            raise
+    
+    def get_page(self, limit: int, after: Optional[str] = None,
+                 status: Optional[int] = None) -> Optional[List[Employee]]:
+        """Up to ``limit`` employees after employee ID ``after``, in employee ID order.
+        
+        A read error returns None, so callers can tell a failure from the
+        last page.
+        """
+        try:
+            query = {}
+            if status is not None:
+                query['status'] = status
+            if after is not None:
+                query['employee_id'] = {'$gt': after}
+            cursor = self.collection.find(query).sort('employee_id', 1).limit(limit)
+            return [Employee.from_dict(data) for data in cursor]
+        except Exception as e:
+            logger.error(f"Error getting employees after {after}: {e}")
+            return None
+    
+    def get_all(self, status: Optional[int] = None) -> List[Employee]:
+        """Get all employees, optionally filtered by status (empty if the read fails)"""
+        try:
+            return list(self.iter_all(status))
+        except Exception:
+            # Logged by iter_all; never return part of the list
             return []
     
-    def update(self, employee: Employee) -> bool:
-        """Update employee"""
+    def count(self, status: Optional[int] = None) -> int:
+        """Count employees, optionally filtered by status"""
         try:
-            employee_dict = employee.to_dict()
+            query = {}
+            if status is not None:
+                query['status'] = status
+            return self.collection.count_documents(query)
+        except Exception as e:
+            logger.error(f"Error counting employees: {e}")
+            return 0
+    
+    @staticmethod
+    def _change_set(employee: Employee, changes: Optional[dict] = None) -> Optional[dict]:
+        """``$set`` fields for the employee's changes, with a new modified date (None if unchanged).
+        
+        ``changes`` is the result of ``employee.changes()`` when the caller
+        already computed it; it is updated in place.
+        """
+        if changes is None:
+            changes = employee.changes()
+        changes.pop('modified_date', None)
+        if not changes:
+            return None
+        employee.modified_date = date.today()
+        changes['modified_date'] = iso(employee.modified_date)
+        return changes
+    
+    def update(self, employee: Employee, changes: Optional[dict] = None) -> bool:
+        """Update the fields that changed since the employee was loaded.
+        
+        Pass ``changes`` when ``employee.changes()`` was already called, to
+        skip comparing the employee again. Nothing is written (and True
+        returned) when no field changed.
+        """
+        try:
+            changes = self._change_set(employee, changes)
+            if changes is None:
+                logger.info(f"No changes to employee: {employee.employee_id}")
+                return True
             result = self.collection.update_one(
                 {'employee_id': employee.employee_id},
-                {'$set': employee_dict}
+                {'$set': changes}
             )
-            logger.info(f"Updated employee: {employee.employee_id}")
-            return result.modified_count > 0
+            if result.matched_count:
+                employee.mark_clean()
+            logger.info(f"Updated employee: {employee.employee_id} ({', '.join(changes)})")
+            return result.matched_count > 0
         except Exception as e:
             logger.error(f"Error updating employee: {e}")
             return False
     
+    def update_many(self, employees: Iterable[Employee]) -> int:
+        """Write the changed fields of many employees in one bulk write.
+        
+        Unchanged employees are skipped. Employees whose write fails keep
+        their pending changes. Returns how many were updated.
+        """
+        try:
+            changed, requests = [], []
+            for employee in employees:
+                changes = self._change_set(employee)
+                if changes is not None:
+                    changed.append(employee)
+                    requests.append(UpdateOne({'employee_id': employee.employee_id}, {'$set': changes}))
+            if not requests:
+                return 0
+            result = self.collection.bulk_write(requests, ordered=False)
+            for employee in changed:
+                employee.mark_clean()
+            logger.info(f"Updated {result.matched_count} employees")
+            return result.matched_count
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            failed = {error['index'] for error in errors}
+            for index, employee in enumerate(changed):
+                if index not in failed:
+                    employee.mark_clean()
+            logger.error(f"Error updating employees: {len(failed)} failed, first: {errors[0].get('errmsg')}")
+            return e.details.get('nMatched', 0)
+        except Exception as e:
+            logger.error(f"Error updating employees: {e}")
+            return 0
+    
     def delete(self, employee_id: str) -> bool:
         """Delete employee (soft delete by setting status to 0)"""
         try:
@@ -1,9 +1,10 @@
 """
 Master data repository for database operations
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from payroll_system.models.master_data import Department, Designation, Branch, Shift, Holiday
 from payroll_system.utils.database import db
+from payroll_system.utils.indexes import IndexSpec, QueryShape
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +12,28 @@ logger = logging.getLogger(__name__)
 class MasterDataRepository:
     """Repository for master data operations"""
     
+    INDEXES = (
+        IndexSpec('departments', 'department_id'),
+        IndexSpec('designations', 'designation_id'),
+        IndexSpec('branches', 'branch_id'),
+        IndexSpec('shifts', 'shift_id'),
+        IndexSpec('holidays', 'holiday_id'),
+    )
+    
+    # Master tables hold a few dozen rows; listing them is a scan by design
+    QUERY_SHAPES = (
+        QueryShape('MasterDataRepository.get_department', 'departments', {'department_id': 'DEPT001'}),
+        QueryShape('MasterDataRepository.get_designation', 'designations', {'designation_id': 'DES00101'}),
+        QueryShape('MasterDataRepository.get_holiday', 'holidays', {'holiday_id': 'HOL202501'}),
+        QueryShape('MasterDataRepository.get_all_departments', 'departments', {'status': 1},
+                   allow_collscan=True),
+        QueryShape('MasterDataRepository.get_all_designations', 'designations', {'status': 1},
+                   allow_collscan=True),
+        QueryShape('MasterDataRepository.get_all_branches', 'branches', {'status': 1}, allow_collscan=True),
+        QueryShape('MasterDataRepository.get_all_shifts', 'shifts', {'status': 1}, allow_collscan=True),
+        QueryShape('MasterDataRepository.get_all_holidays', 'holidays', {'status': 1}, allow_collscan=True),
+    )
+    
     def __init__(self):
         self.departments = db.get_db().departments
         self.designations = db.get_db().designations
@@ -31,13 +54,7 @@ class MasterDataRepository:
         try:
             data = self.departments.find_one({'department_id': department_id})
             if data:
-                return Department(
-                    department_id=data['department_id'],
-                    department_name=data['department_name'],
-                    created_date=data.get('created_date'),
-                    modified_date=data.get('modified_date'),
-                    status=data.get('status', 1)
-                )
+                return Department.from_dict(data)
             return None
         except Exception as e:
             logger.error(f"Error getting department: {e}")
@@ -47,13 +64,7 @@ class MasterDataRepository:
         try:
             departments = []
             for data in self.departments.find({'status': 1}):
-                departments.append(Department(
-                    department_id=data['department_id'],
-                    department_name=data['department_name'],
-                    created_date=data.get('created_date'),
-                    modified_date=data.get('modified_date'),
-                    status=data.get('status', 1)
-                ))
+                departments.append(Department.from_dict(data))
             return departments
         except Exception as e:
             logger.error(f"Error getting departments: {e}")
@@ -72,14 +83,7 @@ class MasterDataRepository:
         try:
             data = self.designations.find_one({'designation_id': designation_id})
             if data:
-                return Designation(
-                    designation_id=data['designation_id'],
-                    designation_name=data['designation_name'],
-                    department_name=data['department_name'],
-                    created_date=data.get('created_date'),
-                    modified_date=data.get('modified_date'),
-                    status=data.get('status', 1)
-                )
+                return Designation.from_dict(data)
             return None
         except Exception as e:
             logger.error(f"Error getting designation: {e}")
@@ -89,14 +93,7 @@ class MasterDataRepository:
         try:
             designations = []
             for data in self.designations.find({'status': 1}):
-                designations.append(Designation(
-                    designation_id=data['designation_id'],
-                    designation_name=data['designation_name'],
-                    department_name=data['department_name'],
-                    created_date=data.get('created_date'),
-                    modified_date=data.get('modified_date'),
-                    status=data.get('status', 1)
-                ))
+                designations.append(Designation.from_dict(data))
             return designations
         except Exception as e:
             logger.error(f"Error getting designations: {e}")
@@ -115,18 +112,7 @@ class MasterDataRepository:
         try:
             branches = []
             for data in self.branches.find({'status': 1}):
-                branches.append(Branch(
-                    branch_id=data['branch_id'],
-                    name=data['name'],
-                    branch_address=data['branch_address'],
-                    phone_number=data['phone_number'],
-                    email=data['email'],
-                    establishment_date=data.get('establishment_date'),
-                    created_by=data.get('created_by', ''),
-                    created_date=data.get('created_date'),
-                    modified_date=data.get('modified_date'),
-                    status=data.get('status', 1)
-                ))
+                branches.append(Branch.from_dict(data))
             return branches
         except Exception as e:
             logger.error(f"Error getting branches: {e}")
@@ -145,15 +131,7 @@ class MasterDataRepository:
         try:
             shifts = []
             for data in self.shifts.find({'status': 1}):
-                shifts.append(Shift(
-                    shift_id=data['shift_id'],
-                    shift_name=data['shift_name'],
-                    in_time=data['in_time'],
-                    out_time=data['out_time'],
-                    created_date=data.get('created_date'),
-                    modified_date=data.get('modified_date'),
-                    status=data.get('status', 1)
-                ))
+                shifts.append(Shift.from_dict(data))
             return shifts
         except Exception as e:
             logger.error(f"Error getting shifts: {e}")
@@ -168,32 +146,55 @@ class MasterDataRepository:
             logger.error(f"Error creating holiday: {e}")
             return False
     
+    def get_holiday(self, holiday_id: str) -> Optional[Holiday]:
+        try:
+            data = self.holidays.find_one({'holiday_id': holiday_id})
+            if data:
+                return Holiday.from_dict(data)
+            return None
+        except Exception as e:
+            logger.error(f"Error getting holiday: {e}")
+            return None
+    
     def get_all_holidays(self) -> List[Holiday]:
         try:
             holidays = []
             for data in self.holidays.find({'status': 1}):
-                from datetime import datetime as dt
-                holiday_date = None
-                if data.get('holiday_date'):
-                    if isinstance(data['holiday_date'], str):
-                        holiday_date = dt.strptime(data['holiday_date'], '%Y-%m-%d').date()
-                    else:
-                        holiday_date = data['holiday_date']
-                
-                holidays.append(Holiday(
-                    holiday_id=data['holiday_id'],
-                    holiday_name=data['holiday_name'],
-                    holiday_date=holiday_date,
-                    holiday_description=data.get('holiday_description', ''),
-                    created_date=data.get('created_date'),
-                    modified_date=data.get('modified_date'),
-                    status=data.get('status', 1)
-                ))
+                holidays.append(Holiday.from_dict(data))
             return holidays
         except Exception as e:
             logger.error(f"Error getting holidays: {e}")
             return []
 
+    # Name lookups (one query per collection, for list views and reports)
+    def get_department_names(self) -> Dict[str, str]:
+        try:
+            cursor = self.departments.find({}, {'_id': 0, 'department_id': 1, 'department_name': 1})
+            return {data['department_id']: data.get('department_name', '') for data in cursor}
+        except Exception as e:
+            logger.error(f"Error getting department names: {e}")
+            return {}
+
+    def get_designation_names(self) -> Dict[str, str]:
+        try:
+            cursor = self.designations.find({}, {'_id': 0, 'designation_id': 1, 'designation_name': 1})
+            return {data['designation_id']: data.get('designation_name', '') for data in cursor}
+        except Exception as e:
+            logger.error(f"Error getting designation names: {e}")
+            return {}
+
+    # Count operations
+    def get_active_counts(self, names: Optional[List[str]] = None) -> Dict[str, int]:
+        """Count active records in the given (default: all) master data collections"""
+        counts = {}
+        for name in names or ('departments', 'designations', 'branches', 'shifts', 'holidays'):
+            try:
+                counts[name] = getattr(self, name).count_documents({'status': 1})
+            except Exception as e:
+                logger.error(f"Error counting {name}: {e}")
+                counts[name] = 0
+        return counts
+
     # Delete operations
     def delete_department(self, department_id: str) -> bool:
         try:
@@ -0,0 +1,92 @@
+"""
+Migration state repository for database operations
+"""
+from datetime import datetime
+from typing import Dict, List
+from payroll_system.utils.database import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Storage migrations (see payroll_system.tools.migrate_storage)
+ATTENDANCE_DATES = 'attendance_bson_dates'
+PAYROLL_PERIODS = 'payroll_period_keys'
+ATTENDANCE_BUCKETS = 'attendance_monthly_buckets'
+
+STATUS_RUNNING = 'running'
+STATUS_COMPLETE = 'complete'
+
+# Collection and query selecting documents still in the old format (the
+# bucket copy is optional and has none)
+PENDING_QUERIES = {
+    ATTENDANCE_DATES: ('attendance', {'date': {'$type': 'string'}}),
+    PAYROLL_PERIODS: ('payrolls', {'$or': [{'period': {'$exists': False}},
+                                           {'created_date': {'$type': 'string'}}]}),
+}
+
+# Completion flags, read once per connection (see ``mark_finished``)
+_completed: Dict[str, bool] = {}
+
+class MigrationRepository:
+    """Repository for the progress of online storage migrations"""
+
+    def __init__(self):
+        self.collection = db.get_db().migrations
+
+    def get_state(self, name: str) -> dict:
+        """Get the saved state of a migration (empty if it never ran)"""
+        try:
+            return self.collection.find_one({'_id': name}) or {}
+        except Exception as e:
+            logger.error(f"Error getting migration state: {e}")
+            return {}
+
+    def save_state(self, name: str, **fields) -> bool:
+        """Merge ``fields`` into the migration's state"""
+        try:
+            fields['updated_at'] = datetime.now()
+            self.collection.update_one({'_id': name}, {'$set': fields}, upsert=True)
+            if 'status' in fields:
+                _completed[name] = fields['status'] == STATUS_COMPLETE
+            return True
+        except Exception as e:
+            logger.error(f"Error saving migration state: {e}")
+            return False
+
+    def reset(self, name: str) -> bool:
+        try:
+            self.collection.delete_one({'_id': name})
+            _completed.pop(name, None)
+            return True
+        except Exception as e:
+            logger.error(f"Error resetting migration state: {e}")
+            return False
+
+    def is_complete(self, name: str) -> bool:
+        """Whether a migration has finished (read from the database once per connection)"""
+        if name not in _completed:
+            _completed[name] = self.get_state(name).get('status') == STATUS_COMPLETE
+        return _completed[name]
+
+    def mark_finished(self) -> List[str]:
+        """Mark migrations complete when no document is left in the old format.
+
+        Called at connect, so a new database (or one migrated by another
+        process) starts without the dual-format reads. Returns the names
+        marked.
+        """
+        _completed.clear()
+        marked = []
+        database = self.collection.database
+        for name, (collection, query) in PENDING_QUERIES.items():
+            if self.is_complete(name):
+                continue
+            try:
+                if database[collection].find_one(query, {'_id': 1}) is not None:
+                    continue
+            except Exception as e:
+                logger.error(f"Error checking migration {name}: {e}")
+                continue
+            if self.save_state(name, status=STATUS_COMPLETE, remaining=0, completed_at=datetime.now()):
+                marked.append(name)
+        return marked
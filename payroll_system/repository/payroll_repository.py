@@ -1,18 +1,96 @@
 """
 Payroll repository for database operations
 """
-from typing import List, Optional
-from payroll_system.models.payroll import Payroll
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from payroll_system.config import STREAM_BATCH_SIZE
+from payroll_system.models.payroll import Payroll, period_key
+from payroll_system.models.payroll_batch import PayrollBatch
+from payroll_system.repository.migration_repository import MigrationRepository, PAYROLL_PERIODS
 from payroll_system.utils.database import db
+from payroll_system.utils.indexes import IndexSpec, QueryShape
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (year, month)
+Period = Tuple[int, int]
+
+# Amounts summed by the annual salary summary
+SUMMARY_FIELDS = ('gross_salary', 'total_deductions', 'net_salary', 'bonus')
+
+# Why a payroll was marked stale (stored in 'stale_reasons')
+STALE_ATTENDANCE = 'attendance'
+STALE_SALARY = 'salary'
+STALE_HOLIDAYS = 'holidays'
+
+# Paid payrolls are final; input changes after payment do not mark them
+_UNPAID = {'$ne': 'paid'}
+
 class PayrollRepository:
     """Repository for payroll data operations"""
     
+    INDEXES = (
+        IndexSpec('payrolls', (('employee_id', 1), ('month', 1), ('year', 1)), unique=True),
+        # Month and year listings; (year, month) also serves year scans sorted by month
+        IndexSpec('payrolls', (('year', 1), ('month', 1))),
+        # Spans of months, e.g. a financial year
+        IndexSpec('payrolls', 'period'),
+        # Only stale payrolls carry the flag, so the stale listing scans a small index
+        IndexSpec('payrolls', (('stale', 1), ('year', 1), ('month', 1), ('employee_id', 1)), sparse=True),
+    )
+    
+    QUERY_SHAPES = (
+        QueryShape('PayrollRepository.get_by_employee_month', 'payrolls',
+                   {'employee_id': 'EMP0000001', 'month': 1, 'year': 2025}),
+        QueryShape('PayrollRepository.get_all_by_month', 'payrolls', {'month': 1, 'year': 2025}),
+        QueryShape('PayrollRepository.get_existing_employee_ids', 'payrolls',
+                   {'employee_id': {'$in': ['EMP0000001', 'EMP0000002']}, 'month': 1, 'year': 2025},
+                   {'_id': 0, 'employee_id': 1}),
+        QueryShape('PayrollRepository.get_batch_by_year', 'payrolls', {'year': 2025}, sort=(('month', 1),)),
+        QueryShape('PayrollRepository.get_all_by_employee', 'payrolls', {'employee_id': 'EMP0000001'},
+                   sort=(('year', -1), ('month', -1))),
+        QueryShape('PayrollRepository.get_by_period_range', 'payrolls',
+                   {'period': {'$gte': 202404, '$lte': 202503}}, sort=(('period', 1),)),
+        QueryShape('PayrollRepository.get_by_period_range (before period migration)', 'payrolls',
+                   {'year': 2025, 'month': {'$gte': 1, '$lte': 3}}, sort=(('year', 1), ('month', 1))),
+        QueryShape('PayrollRepository.get_by_employees_month', 'payrolls',
+                   {'employee_id': {'$in': ['EMP0000001', 'EMP0000002']}, 'month': 1, 'year': 2025}),
+        QueryShape('PayrollRepository.get_stale', 'payrolls',
+                   {'stale': True, 'status': _UNPAID, 'year': 2025, 'month': 1},
+                   {'_id': 0, 'employee_id': 1, 'month': 1, 'year': 1},
+                   sort=(('year', 1), ('month', 1), ('employee_id', 1))),
+        QueryShape('PayrollRepository.mark_stale', 'payrolls',
+                   {'employee_id': {'$in': ['EMP0000001']}, 'month': 1, 'year': 2025, 'status': _UNPAID}),
+        QueryShape('PayrollRepository.mark_stale (since)', 'payrolls',
+                   {'employee_id': {'$in': ['EMP0000001']}, 'period': {'$gte': 202504, '$lte': 999912},
+                    'status': _UNPAID}),
+        QueryShape('PayrollRepository.iter_by_period_range (employees)', 'payrolls',
+                   {'employee_id': {'$in': ['EMP0000001', 'EMP0000002']},
+                    'period': {'$gte': 202404, '$lte': 202503}}, sort=(('period', 1),)),
+    )
+    
     def __init__(self):
         self.collection = db.get_db().payrolls
+        # Payrolls written before the period migration have no 'period' key
+        self.periods_ready = MigrationRepository().is_complete(PAYROLL_PERIODS)
+    
+    def _period_query(self, start: Period, end: Period) -> dict:
+        """Filter for payrolls from ``start`` to ``end`` inclusive"""
+        if self.periods_ready:
+            return {'period': {'$gte': period_key(*start), '$lte': period_key(*end)}}
+        (start_year, start_month), (end_year, end_month) = start, end
+        if start_year == end_year:
+            return {'year': start_year, 'month': {'$gte': start_month, '$lte': end_month}}
+        return {'$or': [
+            {'year': start_year, 'month': {'$gte': start_month}},
+            {'year': {'$gt': start_year, '$lt': end_year}},
+            {'year': end_year, 'month': {'$lte': end_month}},
+        ]}
+    
+    def _period_sort(self) -> list:
+        return [('period', 1)] if self.periods_ready else [('year', 1), ('month', 1)]
     
     def create(self, payroll: Payroll) -> bool:
         """Create payroll record"""
@@ -25,6 +103,55 @@ class PayrollRepository:
             logger.error(f"Error creating payroll: {e}")
             return False
     
+    def create_if_absent(self, payroll: Payroll) -> Optional[bool]:
+        """Insert a payroll unless the employee already has one for the month.
+        
+        Relies on the unique index instead of reading first: True if
+        inserted, False if it already existed, None if the insert failed.
+        """
+        try:
+            self.collection.insert_one(payroll.to_dict())
+            logger.info(f"Created payroll for employee: {payroll.employee_id}")
+            return True
+        except DuplicateKeyError:
+            return False
+        except Exception as e:
+            logger.error(f"Error creating payroll: {e}")
+            return None
+    
+    def create_many(self, payrolls: List[Payroll]) -> Tuple[int, int]:
+        """Insert payrolls in one unordered bulk write.
+        
+        Returns (inserted, already existing); payrolls that fail for any
+        other reason count as neither.
+        """
+        if not payrolls:
+            return 0, 0
+        try:
+            result = self.collection.insert_many([p.to_dict() for p in payrolls], ordered=False)
+            return len(result.inserted_ids), 0
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            duplicates = sum(1 for err in errors if err.get('code') == 11000)
+            if len(errors) > duplicates:
+                logger.error(f"Error creating payrolls: {len(errors) - duplicates} failed, "
+                             f"first: {errors[0].get('errmsg')}")
+            return e.details.get('nInserted', 0), duplicates
+        except Exception as e:
+            logger.error(f"Error creating payrolls: {e}")
+            return 0, 0
+    
+    def get_existing_employee_ids(self, month: int, year: int, employee_ids: List[str]) -> Set[str]:
+        """Which of ``employee_ids`` already have a payroll for the month"""
+        try:
+            cursor = self.collection.find(
+                {'employee_id': {'$in': employee_ids}, 'month': month, 'year': year},
+                {'_id': 0, 'employee_id': 1})
+            return {data['employee_id'] for data in cursor}
+        except Exception as e:
+            logger.error(f"Error checking existing payrolls: {e}")
+            return set()
+    
     def get_by_employee_month(self, employee_id: str, month: int, year: int) -> Optional[Payroll]:
         """Get payroll by employee, month, and year"""
         try:
@@ -40,43 +167,204 @@ class PayrollRepository:
             logger.error(f"Error getting payroll: {e}")
             return None
     
+    def get_by_employees_month(self, month: int, year: int, employee_ids: List[str]) -> Dict[str, Payroll]:
+        """Payrolls of several employees for one month, by employee ID"""
+        try:
+            cursor = self.collection.find({'employee_id': {'$in': employee_ids}, 'month': month, 'year': year})
+            return {data['employee_id']: Payroll.from_dict(data) for data in cursor}
+        except Exception as e:
+            logger.error(f"Error getting payrolls: {e}")
+            return {}
+    
+    def iter_by_month(self, month: int, year: int, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Payroll]:
+        """Stream payrolls for a month"""
+        try:
+            for data in self.collection.find({'month': month, 'year': year}).batch_size(batch_size):
+                yield Payroll.from_dict(data)
+        except Exception as e:
+            logger.error(f"Error streaming monthly payrolls: {e}")
+            raise
+    
     def get_all_by_month(self, month: int, year: int) -> List[Payroll]:
-        """Get all payrolls for a month"""
+        """Get all payrolls for a month (empty if the read fails)"""
+        try:
+            return list(self.iter_by_month(month, year))
+        except Exception:
+            # Logged by iter_by_month; never return part of the list
+            return []
+    
+    def get_batch_by_month(self, month: int, year: int,
+                           employee_ids: Optional[List[str]] = None) -> PayrollBatch:
+        """Get all payrolls for a month (or those of ``employee_ids``) as a columnar batch"""
+        try:
+            query = {'month': month, 'year': year}
+            if employee_ids is not None:
+                query['employee_id'] = {'$in': employee_ids}
+            return PayrollBatch.from_cursor(self.collection.find(query))
+        except Exception as e:
+            logger.error(f"Error getting monthly payroll batch: {e}")
+            return PayrollBatch()
+    
+    def get_batch_by_year(self, year: int) -> PayrollBatch:
+        """Get all payrolls for a year as a columnar batch, ordered by month"""
+        return self.get_batch_by_period_range((year, 1), (year, 12))
+    
+    def iter_by_period_range(self, start: Period, end: Period, batch_size: int = STREAM_BATCH_SIZE,
+                             employee_ids: Optional[List[str]] = None) -> Iterator[Payroll]:
+        """Stream payrolls from ``start`` to ``end`` (inclusive (year, month) pairs), oldest first,
+        optionally only of ``employee_ids``. Read errors are logged and raised."""
         try:
-            payrolls = []
-            for data in self.collection.find({'month': month, 'year': year}):
-                payrolls.append(Payroll.from_dict(data))
-            return payrolls
+            query = self._period_query(start, end)
+            if employee_ids is not None:
+                query['employee_id'] = {'$in': list(employee_ids)}
+            cursor = (self.collection.find(query)
+                      .sort(self._period_sort()).batch_size(batch_size))
+            for data in cursor:
+                yield Payroll.from_dict(data)
         except Exception as e:
-            logger.error(f"Error getting monthly payrolls: {e}")
+            logger.error(f"Error streaming payrolls for period range: {e}")
+            raise
+    
+    def get_by_period_range(self, start: Period, end: Period) -> List[Payroll]:
+        """Get payrolls from ``start`` to ``end`` (inclusive (year, month) pairs), oldest first
+        (empty if the read fails)"""
+        try:
+            return list(self.iter_by_period_range(start, end))
+        except Exception:
+            # Logged by iter_by_period_range; never return part of the list
             return []
     
+    def get_batch_by_period_range(self, start: Period, end: Period) -> PayrollBatch:
+        """Get payrolls from ``start`` to ``end`` as a columnar batch, oldest first"""
+        try:
+            cursor = self.collection.find(self._period_query(start, end)).sort(self._period_sort())
+            return PayrollBatch.from_cursor(cursor)
+        except Exception as e:
+            logger.error(f"Error getting payroll batch for period range: {e}")
+            return PayrollBatch()
+    
+    def get_employee_totals(self, start: Period, end: Period,
+                            fields: Iterable[str] = SUMMARY_FIELDS) -> Dict[str, Dict[str, float]]:
+        """Per-employee sums of ``fields`` (plus a ``count`` of payrolls) over a span of months.
+        
+        Grouped on the server, so only one row per employee is transferred.
+        """
+        try:
+            group = {'_id': '$employee_id', 'count': {'$sum': 1}}
+            group.update((name, {'$sum': f'${name}'}) for name in fields)
+            pipeline = [
+                {'$match': self._period_query(start, end)},
+                {'$group': group},
+                {'$sort': {'_id': 1}},
+            ]
+            return {row.pop('_id'): row for row in self.collection.aggregate(pipeline)}
+        except Exception as e:
+            logger.error(f"Error aggregating payroll totals: {e}")
+            return {}
+    
     def update(self, payroll: Payroll) -> bool:
-        """Update payroll record"""
+        """Update payroll record (a paid payroll is final, so its stale flag is cleared)"""
         try:
             payroll_dict = payroll.to_dict()
+            changes = {'$set': payroll_dict}
+            if payroll.status == 'paid':
+                changes['$unset'] = {'stale': '', 'stale_reasons': ''}
             result = self.collection.update_one(
                 {
                     'employee_id': payroll.employee_id,
                     'month': payroll.month,
                     'year': payroll.year
                 },
-                {'$set': payroll_dict}
+                changes
             )
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error updating payroll: {e}")
             return False
     
-    def get_all_by_employee(self, employee_id: str) -> List[Payroll]:
-        """Get all payrolls for an employee"""
+    def mark_stale(self, reason: str, employee_ids: Optional[List[str]] = None,
+                   month: Optional[int] = None, year: Optional[int] = None,
+                   since: Optional[Period] = None) -> int:
+        """Flag unpaid payrolls whose inputs changed.
+        
+        Marks the payrolls of ``employee_ids`` (all employees if None) in
+        ``month``/``year``, or from ``since`` onward (every month if neither).
+        Returns how many matched.
+        """
+        query = {'status': _UNPAID}
+        if employee_ids is not None:
+            query['employee_id'] = {'$in': list(employee_ids)}
+        if month is not None and year is not None:
+            query['month'], query['year'] = month, year
+        elif since is not None:
+            query.update(self._period_query(since, (9999, 12)))
+        if len(query) == 1:
+            raise ValueError("mark_stale needs employee IDs or a month")
         try:
-            payrolls = []
-            for data in self.collection.find({'employee_id': employee_id}).sort([('year', -1), ('month', -1)]):
-                payrolls.append(Payroll.from_dict(data))
-            return payrolls
+            result = self.collection.update_many(
+                query, {'$set': {'stale': True}, '$addToSet': {'stale_reasons': reason}})
+            if result.matched_count:
+                logger.info(f"Marked {result.matched_count} payrolls stale ({reason})")
+            return result.matched_count
         except Exception as e:
-            logger.error(f"Error getting employee payrolls: {e}")
+            logger.error(f"Error marking payrolls stale: {e}")
+            return 0
+    
+    def get_stale(self, month: Optional[int] = None, year: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """(employee ID, month, year) of stale unpaid payrolls, ordered by month and employee"""
+        try:
+            # Payrolls flagged before they were paid are final
+            query = {'stale': True, 'status': _UNPAID}
+            if month is not None and year is not None:
+                query['year'], query['month'] = year, month
+            cursor = (self.collection.find(query, {'_id': 0, 'employee_id': 1, 'month': 1, 'year': 1})
+                      .sort([('year', 1), ('month', 1), ('employee_id', 1)]))
+            return [(data['employee_id'], data['month'], data['year']) for data in cursor]
+        except Exception as e:
+            logger.error(f"Error getting stale payrolls: {e}")
+            return []
+    
+    def replace_stale(self, payrolls: List[Payroll]) -> int:
+        """Write recomputed amounts over stale payrolls in one bulk write and
+        clear their flag. Payrolls paid in the meantime are left alone.
+        Returns how many were updated.
+        """
+        if not payrolls:
+            return 0
+        try:
+            requests = []
+            for payroll in payrolls:
+                amounts = {name: getattr(payroll, name) for name, _ in Payroll.AMOUNT_FIELDS}
+                requests.append(UpdateOne(
+                    {'employee_id': payroll.employee_id, 'month': payroll.month, 'year': payroll.year,
+                     'stale': True, 'status': _UNPAID},
+                    {'$set': amounts, '$unset': {'stale': '', 'stale_reasons': ''}}))
+            result = self.collection.bulk_write(requests, ordered=False)
+            logger.info(f"Recomputed {result.matched_count} stale payrolls")
+            return result.matched_count
+        except Exception as e:
+            logger.error(f"Error updating stale payrolls: {e}")
+            return 0
+    
+    def iter_by_employee(self, employee_id: str, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Payroll]:
+        """Stream an employee's payrolls, newest first"""
+        try:
+            cursor = (self.collection.find({'employee_id': employee_id})
+                      .sort([('year', -1), ('month', -1)]).batch_size(batch_size))
+            for data in cursor:
+                yield Payroll.from_dict(data)
+        except Exception as e:
+            logger.error(f"Error streaming employee payrolls: {e}")
+            raise
+    
+    def get_all_by_employee(self, employee_id: str) -> List[Payroll]:
+        """Get all payrolls for an employee (empty if the read fails)"""
+        try:
+            return list(self.iter_by_employee(employee_id))
+        except Exception:
+            # Logged by iter_by_employee; never return part of the list
+            return []
+    
     def delete(self, employee_id: str, month: int, year: int) -> bool:
         """Delete payroll record"""
         try:
@@ -0,0 +1,70 @@
+"""
+Payroll run state repository for database operations
+"""
+from datetime import datetime
+from typing import List, Optional
+from payroll_system.utils.database import db
+from payroll_system.utils.indexes import IndexSpec, QueryShape
+import logging
+
+logger = logging.getLogger(__name__)
+
+RUN_RUNNING = 'running'
+RUN_FAILED = 'failed'
+RUN_COMPLETE = 'complete'
+
+class PayrollRunRepository:
+    """Repository for the progress of month-end payroll runs (``_id`` is the run ID)"""
+
+    INDEXES = (
+        IndexSpec('payroll_runs', (('year', 1), ('month', 1), ('started_at', -1))),
+    )
+
+    QUERY_SHAPES = (
+        QueryShape('PayrollRunRepository.get_by_month', 'payroll_runs', {'month': 1, 'year': 2025},
+                   sort=(('year', 1), ('month', 1), ('started_at', -1))),
+        QueryShape('PayrollRunRepository.get_unfinished', 'payroll_runs',
+                   {'month': 1, 'year': 2025, 'status': {'$ne': RUN_COMPLETE}},
+                   sort=(('year', 1), ('month', 1), ('started_at', -1))),
+    )
+
+    def __init__(self):
+        self.collection = db.get_db().payroll_runs
+
+    def get(self, run_id: str) -> dict:
+        """Get the saved state of a run (empty if unknown)"""
+        try:
+            return self.collection.find_one({'_id': run_id}) or {}
+        except Exception as e:
+            logger.error(f"Error getting payroll run {run_id}: {e}")
+            return {}
+
+    def get_by_month(self, month: int, year: int) -> List[dict]:
+        """Runs for a month, latest first"""
+        try:
+            cursor = self.collection.find({'month': month, 'year': year}).sort(
+                [('year', 1), ('month', 1), ('started_at', -1)])
+            return list(cursor)
+        except Exception as e:
+            logger.error(f"Error getting payroll runs: {e}")
+            return []
+
+    def get_unfinished(self, month: int, year: int) -> Optional[dict]:
+        """Latest run for the month that did not complete"""
+        try:
+            cursor = self.collection.find({'month': month, 'year': year, 'status': {'$ne': RUN_COMPLETE}}).sort(
+                [('year', 1), ('month', 1), ('started_at', -1)]).limit(1)
+            return next(iter(cursor), None)
+        except Exception as e:
+            logger.error(f"Error getting unfinished payroll run: {e}")
+            return None
+
+    def save_state(self, run_id: str, **fields) -> bool:
+        """Merge ``fields`` into the run's state"""
+        try:
+            fields['updated_at'] = datetime.now()
+            self.collection.update_one({'_id': run_id}, {'$set': fields}, upsert=True)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving payroll run state: {e}")
+            return False
@@ -0,0 +1,106 @@
+"""
+Salary history repository for database operations
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set
+from pymongo import UpdateOne
+from payroll_system.models.fields import to_datetime
+from payroll_system.models.salary_history import SalaryRecord
+from payroll_system.utils.database import db
+from payroll_system.utils.indexes import IndexSpec, QueryShape
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SalaryHistoryRepository:
+    """Repository for effective-dated basic salaries"""
+
+    INDEXES = (
+        IndexSpec('salary_history', (('employee_id', 1), ('effective_from', 1)), unique=True),
+    )
+
+    QUERY_SHAPES = (
+        # $match and $sort stages of the get_salaries_as_of pipeline
+        QueryShape('SalaryHistoryRepository.get_salaries_as_of', 'salary_history',
+                   {'employee_id': {'$in': ['EMP0000001', 'EMP0000002']},
+                    'effective_from': {'$lte': datetime(2025, 1, 31)}},
+                   sort=(('employee_id', 1), ('effective_from', 1))),
+        QueryShape('SalaryHistoryRepository.get_history', 'salary_history', {'employee_id': 'EMP0000001'},
+                   sort=(('employee_id', 1), ('effective_from', 1))),
+        QueryShape('SalaryHistoryRepository.get_employee_ids_with_history', 'salary_history',
+                   {'employee_id': {'$in': ['EMP0000001', 'EMP0000002']}}, {'_id': 0, 'employee_id': 1}),
+    )
+
+    def __init__(self):
+        self.collection = db.get_db().salary_history
+
+    def get_salaries_as_of(self, on: date, employee_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Basic salary in force on ``on`` per employee (all, or ``employee_ids``), with one query.
+
+        The server keeps the latest record per employee, so only one row per
+        employee is returned. Employees without a record effective by then
+        are left out. Raises if the history cannot be read: falling back to
+        the current salary would pay the wrong amount.
+        """
+        try:
+            query = {'effective_from': {'$lte': to_datetime(on)}}
+            if employee_ids is not None:
+                query['employee_id'] = {'$in': list(employee_ids)}
+            pipeline = [
+                {'$match': query},
+                # Served by the (employee_id, effective_from) index
+                {'$sort': {'employee_id': 1, 'effective_from': 1}},
+                {'$group': {'_id': '$employee_id', 'basic_salary': {'$last': '$basic_salary'}}},
+            ]
+            return {data['_id']: data['basic_salary'] for data in self.collection.aggregate(pipeline)}
+        except Exception as e:
+            logger.error(f"Error getting salaries as of {on}: {e}")
+            raise
+
+    def get_history(self, employee_id: str) -> List[SalaryRecord]:
+        """Salary records of an employee, oldest first"""
+        try:
+            cursor = self.collection.find({'employee_id': employee_id}).sort(
+                [('employee_id', 1), ('effective_from', 1)])
+            return [SalaryRecord.from_dict(data) for data in cursor]
+        except Exception as e:
+            logger.error(f"Error getting salary history for {employee_id}: {e}")
+            return []
+
+    def get_employee_ids_with_history(self, employee_ids: Iterable[str]) -> Set[str]:
+        try:
+            cursor = self.collection.find({'employee_id': {'$in': list(employee_ids)}}, {'_id': 0, 'employee_id': 1})
+            return {data['employee_id'] for data in cursor}
+        except Exception as e:
+            logger.error(f"Error checking salary history: {e}")
+            return set()
+
+    def save_many(self, records: Iterable[SalaryRecord]) -> int:
+        """Insert or replace records (keyed by employee and effective date) in one bulk write.
+
+        Returns how many were written.
+        """
+        try:
+            requests = []
+            for record in records:
+                data = record.to_dict()
+                created_date = data.pop('created_date')
+                requests.append(UpdateOne(
+                    {'employee_id': record.employee_id, 'effective_from': data['effective_from']},
+                    {'$set': data, '$setOnInsert': {'created_date': created_date}},
+                    upsert=True))
+            if not requests:
+                return 0
+            result = self.collection.bulk_write(requests, ordered=False)
+            return result.upserted_count + result.matched_count
+        except Exception as e:
+            logger.error(f"Error saving salary history: {e}")
+            return 0
+
+    def delete(self, employee_id: str, effective_from: date) -> bool:
+        try:
+            result = self.collection.delete_one({'employee_id': employee_id, 'effective_from': to_datetime(effective_from)})
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.error(f"Error deleting salary record: {e}")
+            return False
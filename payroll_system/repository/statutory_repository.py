@@ -0,0 +1,74 @@
+"""
+Statutory rule set repository for database operations
+"""
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from payroll_system.models.fields import to_datetime
+from payroll_system.models.statutory import StatutoryRuleSet
+from payroll_system.utils.database import db
+from payroll_system.utils.indexes import IndexSpec, QueryShape
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StatutoryRuleRepository:
+    """Repository for versioned statutory rule sets"""
+
+    INDEXES = (
+        IndexSpec('statutory_rules', (('state', 1), ('effective_from', 1)), unique=True),
+    )
+
+    # The whole table is read once per process, in index order
+    QUERY_SHAPES = (
+        QueryShape('StatutoryRuleRepository.get_all', 'statutory_rules', {},
+                   sort=(('state', 1), ('effective_from', 1))),
+    )
+
+    def __init__(self):
+        self.collection = db.get_db().statutory_rules
+
+    def get_all(self) -> List[StatutoryRuleSet]:
+        """Every rule set, ordered by state and effective date"""
+        try:
+            cursor = self.collection.find({}).sort([('state', 1), ('effective_from', 1)])
+            return [StatutoryRuleSet.from_dict(data) for data in cursor]
+        except Exception as e:
+            logger.error(f"Error getting statutory rules: {e}")
+            return []
+
+    def get_version(self) -> Optional[Tuple[int, Optional[datetime]]]:
+        """(rule sets, latest save) stamp; changes whenever a rule set is saved
+        or deleted. None if it cannot be read."""
+        try:
+            result = list(self.collection.aggregate([
+                {'$group': {'_id': None, 'count': {'$sum': 1}, 'updated': {'$max': '$updated_at'}}}]))
+            if not result:
+                return 0, None
+            return result[0]['count'], result[0]['updated']
+        except Exception as e:
+            logger.error(f"Error getting statutory rules version: {e}")
+            return None
+
+    def save(self, rule_set: StatutoryRuleSet) -> bool:
+        """Insert or replace the rule set for its state and effective date"""
+        try:
+            rule_set.modified_date = date.today()
+            data = rule_set.to_dict()
+            data['updated_at'] = datetime.now()
+            created_date = data.pop('created_date')
+            self.collection.update_one(
+                {'state': rule_set.state, 'effective_from': data['effective_from']},
+                {'$set': data, '$setOnInsert': {'created_date': created_date}},
+                upsert=True)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving statutory rules: {e}")
+            return False
+
+    def delete(self, state: str, effective_from: date) -> bool:
+        try:
+            result = self.collection.delete_one({'state': state, 'effective_from': to_datetime(effective_from)})
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.error(f"Error deleting statutory rules: {e}")
+            return False
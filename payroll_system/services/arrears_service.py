@@ -0,0 +1,167 @@
+"""
+Arrears (retro pay) for past payroll months
+
+After a salary revision with an earlier effective date, past payrolls were
+calculated with the old salary. ``ArrearsService.compute_arrears``
+recalculates every month from the effective month with the salary in force
+for that month (salary history, else the current salary) and the attendance
+on record, and stores the difference
+against what was already paid (the payroll plus arrears of other revisions)
+as arrear line items. Payroll documents are never modified.
+"""
+from datetime import date
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+from payroll_system.config import STREAM_BATCH_SIZE
+from payroll_system.models.arrears import ARREAR_FIELDS, Arrear
+from payroll_system.models.payroll import Payroll
+from payroll_system.repository.arrears_repository import ArrearsRepository
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.payroll_repository import PayrollRepository
+from payroll_system.services.attendance_service import AttendanceService
+from payroll_system.services.payroll_calculator import PayrollCalculator
+from payroll_system.services.salary_history import SalaryHistoryService
+from payroll_system.services.statutory_rules import refresh_rules
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (year, month)
+Period = Tuple[int, int]
+
+# Differences below half a paisa are rounding noise, not arrears
+MIN_DIFFERENCE = 0.005
+
+
+def _previous_month(on: date) -> Period:
+    return (on.year, on.month - 1) if on.month > 1 else (on.year - 1, 12)
+
+
+class ArrearsService:
+    """Service for arrears computation"""
+
+    def __init__(self):
+        self.repository = ArrearsRepository()
+        self.payroll_repo = PayrollRepository()
+        self.employee_repo = EmployeeRepository()
+        self.attendance_service = AttendanceService()
+        self.calculator = PayrollCalculator()
+        self.salary_history = SalaryHistoryService()
+
+    def compute_arrears(self, effective_from: date, reference: str,
+                        employee_ids: Optional[List[str]] = None,
+                        through: Optional[Period] = None,
+                        batch_size: int = STREAM_BATCH_SIZE) -> Dict[str, int]:
+        """Arrears for payrolls from the month of ``effective_from`` through
+        ``through`` (default: last month) for ``employee_ids`` (default: all).
+
+        The effective month is recalculated in full. Each payroll keeps its
+        working days and bonus; attendance is re-read. Payrolls marked stale
+        are left to ``PayrollService.recompute_stale``. Running again with the
+        same ``reference`` replaces its unpaid arrears. Per month and batch
+        this costs one employee, one attendance, one salary history and one
+        arrears query and one bulk write. Returns counts of arrears written, unchanged, skipped
+        (stale, or this revision's arrear already paid) and failed payrolls.
+        Raises if payrolls, employees, attendance, salary history or earlier
+        arrears cannot be read; the batch being computed is not written,
+        arrears written so far stay, and running again with the same
+        ``reference`` completes them.
+        """
+        start = (effective_from.year, effective_from.month)
+        end = through or _previous_month(date.today())
+        counts = {'arrears': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+        if start > end:
+            return counts
+
+        refresh_rules()
+        stale = {(employee_id, month, year) for employee_id, month, year in self.payroll_repo.get_stale()}
+        payrolls = self.payroll_repo.iter_by_period_range(start, end, batch_size, employee_ids)
+        for (year, month), month_payrolls in groupby(payrolls, key=lambda p: (p.year, p.month)):
+            batch = []
+            for payroll in month_payrolls:
+                if (payroll.employee_id, month, year) in stale:
+                    counts['skipped'] += 1
+                    continue
+                batch.append(payroll)
+                if len(batch) == batch_size:
+                    self._compute_batch(batch, month, year, effective_from, reference, counts)
+                    batch = []
+            if batch:
+                self._compute_batch(batch, month, year, effective_from, reference, counts)
+        logger.info(f"Arrears '{reference}' from {effective_from}: {counts}")
+        return counts
+
+    def _compute_batch(self, payrolls: List[Payroll], month: int, year: int, effective_from: date,
+                       reference: str, counts: Dict[str, int]):
+        employee_ids = [payroll.employee_id for payroll in payrolls]
+        employees = self.employee_repo.get_by_ids(employee_ids)
+        summaries = self.attendance_service.calculate_attendance_summaries(list(employees), month, year)
+        salaries = self.salary_history.month_salaries(month, year, employee_ids)
+        # Arrears of other revisions were paid on top of the payroll; this
+        # revision's own unpaid arrears are replaced, paid ones are final
+        settled: Dict[str, Dict[str, float]] = {}
+        replaced, paid_out = set(), set()
+        for arrear in self.repository.get_for_periods((year, month), (year, month), employee_ids):
+            if arrear.reference == reference:
+                (paid_out if arrear.status == 'paid' else replaced).add(arrear.employee_id)
+                continue
+            totals = settled.setdefault(arrear.employee_id, dict.fromkeys(ARREAR_FIELDS, 0.0))
+            for name in ARREAR_FIELDS:
+                totals[name] += getattr(arrear, name)
+
+        rules = {}
+        arrears = []
+        for payroll in payrolls:
+            if payroll.employee_id in paid_out:
+                counts['skipped'] += 1
+                continue
+            employee = employees.get(payroll.employee_id)
+            if employee is None:
+                logger.error(f"Cannot compute arrears {month}/{year}: employee {payroll.employee_id} not found")
+                counts['failed'] += 1
+                continue
+            try:
+                if employee.location not in rules:
+                    rules[employee.location] = self.calculator.rules_for(employee, month, year)
+                summary = summaries[employee.employee_id]
+                revised = self.calculator.calculate_payroll(
+                    employee=employee,
+                    month=month,
+                    year=year,
+                    present_days=summary['present_days'],
+                    working_days=payroll.working_days,
+                    lop_days=summary['lop_days'],
+                    overtime_hours=summary['total_overtime'],
+                    bonus=payroll.bonus,
+                    rules=rules[employee.location],
+                    monthly_salary=salaries.get(employee.employee_id)
+                )
+            except Exception as e:
+                logger.error(f"Error computing arrears for {employee.employee_id}: {e}")
+                counts['failed'] += 1
+                continue
+            paid = settled.get(employee.employee_id)
+            differences = {name: getattr(revised, name) - getattr(payroll, name) - (paid[name] if paid else 0.0)
+                           for name in ARREAR_FIELDS}
+            if all(abs(value) < MIN_DIFFERENCE for value in differences.values()):
+                counts['unchanged'] += 1
+                if employee.employee_id not in replaced:
+                    continue
+                # Overwrite an earlier run's arrear that no longer applies
+                differences = dict.fromkeys(ARREAR_FIELDS, 0.0)
+            arrears.append(Arrear(employee.employee_id, month, year, reference, effective_from,
+                                  **differences))
+        counts['arrears'] += self.repository.save_many(arrears)
+
+    def get_arrears(self, reference: str) -> List[Arrear]:
+        """Arrear line items of one revision, by employee"""
+        return self.repository.get_by_reference(reference)
+
+    def get_employee_totals(self, reference: str) -> Dict[str, Dict[str, float]]:
+        """Per-employee sums of the arrear amounts of one revision"""
+        totals: Dict[str, Dict[str, float]] = {}
+        for arrear in self.repository.get_by_reference(reference):
+            employee_totals = totals.setdefault(arrear.employee_id, dict.fromkeys(ARREAR_FIELDS, 0.0))
+            for name in ARREAR_FIELDS:
+                employee_totals[name] += getattr(arrear, name)
+        return totals
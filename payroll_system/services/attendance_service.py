@@ -1,19 +1,49 @@
 """
 Attendance service for business logic
 """
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
 from datetime import date, time, datetime
+from itertools import groupby
+from operator import attrgetter
 from payroll_system.models.attendance import Attendance
 from payroll_system.repository.attendance_repository import AttendanceRepository
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.payroll_repository import PayrollRepository, STALE_ATTENDANCE
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Attendance fields read by the monthly summary
+SUMMARY_FIELDS = ('status', 'lop', 'overtime_hours')
+
+
+def summarize_attendance(attendances: Iterable[Attendance]) -> dict:
+    """Present, absent and LOP days and overtime of a month's attendance"""
+    summary = {'present_days': 0, 'absent_days': 0, 'lop_days': 0, 'total_overtime': 0, 'total_days': 0}
+    for att in attendances:
+        if att.status == 'present':
+            summary['present_days'] += 1
+        elif att.status == 'absent':
+            summary['absent_days'] += 1
+        if att.lop:
+            summary['lop_days'] += 1
+        summary['total_overtime'] += att.overtime_hours
+        summary['total_days'] += 1
+    return summary
+
 class AttendanceService:
     """Service for attendance business logic"""
     
     def __init__(self):
         self.repository = AttendanceRepository()
+        self.employee_repo = EmployeeRepository()
+        self.payroll_repo = PayrollRepository()
+    
+    def _attendance_changed(self, employee_id: str, att_date: date, saved: bool) -> bool:
+        """Flag the month's payroll for recomputation once a change is saved"""
+        if saved:
+            self.payroll_repo.mark_stale(STALE_ATTENDANCE, [employee_id], att_date.month, att_date.year)
+        return saved
     
     def mark_attendance(self, employee_id: str, att_date: date, 
                        checkin_time: Optional[time] = None,
@@ -28,7 +58,7 @@ class AttendanceService:
                 existing.checkin_time = checkin_time
                 existing.checkout_time = checkout_time
                 existing.status = 'present' if checkin_time else 'absent'
-                return self.repository.update(existing)
+                return self._attendance_changed(employee_id, att_date, self.repository.update(existing))
             else:
                 # Create new attendance
                 attendance = Attendance(
@@ -37,7 +67,7 @@ class AttendanceService:
                     checkin_time=checkin_time,
                     checkout_time=checkout_time
                 )
-                return self.repository.create(attendance)
+                return self._attendance_changed(employee_id, att_date, self.repository.create(attendance))
         except Exception as e:
             logger.error(f"Error marking attendance: {e}")
             return False
@@ -50,38 +80,47 @@ class AttendanceService:
         """Get all attendance records for a month"""
         return self.repository.get_by_employee_month(employee_id, month, year)
     
+    def iter_month_attendance(self, month: int, year: int, department_id: Optional[str] = None,
+                              fields: Optional[Sequence[str]] = None) -> Iterator[Attendance]:
+        """Stream a month of attendance for every employee (or one department),
+        ordered by employee and date"""
+        employee_ids = None
+        if department_id:
+            employee_ids = self.employee_repo.get_ids(department_id=department_id)
+        return self.repository.get_all_by_month(month, year, employee_ids=employee_ids, fields=fields)
+    
     def mark_lop(self, employee_id: str, att_date: date) -> bool:
         """Mark Loss of Pay for an employee"""
         try:
             attendance = self.repository.get_by_employee_and_date(employee_id, att_date)
-            if not attendance:
+            existing = attendance is not None
+            if not existing:
                 attendance = Attendance(employee_id=employee_id, date=att_date)
             
             attendance.lop = True
             attendance.status = 'lop'
-            return self.repository.update(attendance) if attendance.attendance_id else self.repository.create(attendance)
+            # Bulk-loaded records have no attendance_id; update whatever was found
+            saved = self.repository.update(attendance) if existing else self.repository.create(attendance)
+            return self._attendance_changed(employee_id, att_date, saved)
         except Exception as e:
             logger.error(f"Error marking LOP: {e}")
             return False
     
     def calculate_attendance_summary(self, employee_id: str, month: int, year: int) -> dict:
         """Calculate attendance summary for a month"""
-        attendances = self.get_monthly_attendance(employee_id, month, year)
-        
-        present_days = sum(1 for att in attendances if att.status == 'present')
-        absent_days = sum(1 for att in attendances if att.status == 'absent')
-        lop_days = sum(1 for att in attendances if att.lop)
-        total_overtime = sum(att.overtime_hours for att in attendances)
-        
-        return {
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'lop_days': lop_days,
-            'total_overtime': total_overtime,
-            'total_days': len(attendances)
-        }
+        return summarize_attendance(self.get_monthly_attendance(employee_id, month, year))
+    
+    def calculate_attendance_summaries(self, employee_ids: List[str], month: int, year: int) -> Dict[str, dict]:
+        """Attendance summaries of several employees for a month, from one query"""
+        attendances = self.repository.get_all_by_month(month, year, employee_ids=employee_ids,
+                                                       fields=SUMMARY_FIELDS)
+        summaries = {}
+        for employee_id, days in groupby(attendances, key=attrgetter('employee_id')):
+            summaries[employee_id] = summarize_attendance(days)
+        empty = summarize_attendance(())
+        return {employee_id: summaries.get(employee_id, empty) for employee_id in employee_ids}
 
     def delete_attendance(self, employee_id: str, att_date: date) -> bool:
         """Delete attendance record"""
-        return self.repository.delete(employee_id, att_date)
+        return self._attendance_changed(employee_id, att_date, self.repository.delete(employee_id, att_date))
 
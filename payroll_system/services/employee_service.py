@@ -1,20 +1,30 @@
 """
 Employee service for business logic
 """
-from typing import List, Optional, Tuple
+from datetime import date
+from typing import Iterator, List, Optional, Tuple
 from payroll_system.models.employee import Employee
 from payroll_system.repository.employee_repository import EmployeeRepository
-from payroll_system.utils.validators import validate_email, validate_phone, validate_bank_account, calculate_pt
+from payroll_system.repository.payroll_repository import PayrollRepository, STALE_SALARY
+from payroll_system.services.salary_history import SalaryHistoryService
+from payroll_system.services.statutory_rules import get_rules_engine
+from payroll_system.utils.validators import validate_email, validate_phone, validate_bank_account
 from payroll_system.config import ROLE_ADMIN, ROLE_HR, ROLE_EMPLOYEE
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Stored password of an account that cannot log in until one is set
+# (employees added by an import or without a password)
+NO_PASSWORD = ''
+
 class EmployeeService:
     """Service for employee business logic"""
     
     def __init__(self):
         self.repository = EmployeeRepository()
+        self.payroll_repo = PayrollRepository()
+        self.salary_history = SalaryHistoryService()
     
     def create_employee(self, employee_data: dict) -> Tuple[bool, str]:
         """Create a new employee with validation"""
@@ -36,10 +46,10 @@ class EmployeeService:
             if employee_data.get('bank_account_number') and not validate_bank_account(employee_data['bank_account_number']):
                 return False, "Invalid bank account number"
             
-            # Calculate PT based on basic salary
+            # Calculate PT based on basic salary and the location's slabs
             basic_salary = float(employee_data.get('basic_salary', 0))
-            pt = calculate_pt(basic_salary)
-            employee_data['pt'] = pt
+            rules = get_rules_engine().rules_for(employee_data.get('location'), date.today())
+            employee_data['pt'] = rules.pt(basic_salary)
             
             # Create employee
             employee = Employee(**employee_data)
@@ -61,24 +71,47 @@ class EmployeeService:
         """Get all active employees"""
         return self.repository.get_all(status)
     
-    def update_employee(self, employee_id: str, employee_data: dict) -> Tuple[bool, str]:
-        """Update employee"""
+    def iter_employees(self, status: Optional[int] = 1) -> Iterator[Employee]:
+        """Stream employees (active by default) in employee ID order"""
+        return self.repository.iter_all(status)
+    
+    def update_employee(self, employee_id: str, employee_data: dict,
+                        salary_effective_from: Optional[date] = None) -> Tuple[bool, str]:
+        """Update employee.
+        
+        A basic salary change is recorded in the salary history from
+        ``salary_effective_from`` (default today).
+        """
         try:
             employee = self.repository.get_by_id(employee_id)
             if not employee:
                 return False, "Employee not found"
+            previous_salary = employee.basic_salary
             
             # Update fields
             for key, value in employee_data.items():
                 if hasattr(employee, key):
                     setattr(employee, key, value)
             
-            # Recalculate PT if basic salary changed
-            if 'basic_salary' in employee_data:
-                employee.pt = calculate_pt(employee.basic_salary)
+            # Recalculate PT if basic salary or location changed
+            if 'basic_salary' in employee_data or 'location' in employee_data:
+                rules = get_rules_engine().rules_for(employee.location, date.today())
+                employee.pt = rules.pt(employee.basic_salary)
             
-            success = self.repository.update(employee)
+            changes = employee.changes()
+            if not changes:
+                return True, "No changes to save"
+            
+            success = self.repository.update(employee, changes)
             if success:
+                if 'basic_salary' in changes:
+                    self.salary_history.record_changes([(employee, previous_salary)], salary_effective_from)
+                # Unpaid payrolls from this month (or the effective month) on were
+                # calculated with the old salary or PT slabs; earlier months are
+                # settled through arrears
+                if 'basic_salary' in changes or 'location' in changes:
+                    since = max(date.today(), salary_effective_from or date.min)
+                    self.payroll_repo.mark_stale(STALE_SALARY, [employee_id], since=(since.year, since.month))
                 return True, "Employee updated successfully"
             else:
                 return False, "Failed to update employee"
@@ -113,6 +146,9 @@ class EmployeeService:
             if not employee:
                 return None, "Invalid email or password"
             
+            if employee.password == NO_PASSWORD:
+                return None, "No password has been set for this account"
+            
             if employee.password != password:
                 return None, "Invalid email or password"
             
@@ -0,0 +1,251 @@
+"""
+Bulk employee import from Excel or CSV files
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+import csv
+import logging
+import time
+
+from openpyxl import load_workbook
+
+from payroll_system.config import ROLE_EMPLOYEE, ROLE_HR
+from payroll_system.models.employee import Employee
+from payroll_system.models.fields import parse_date
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.employee_service import NO_PASSWORD
+from payroll_system.services.statutory_rules import get_rules_engine
+from payroll_system.utils.validators import COLUMN_RULES, first_errors, validate_columns
+
+logger = logging.getLogger(__name__)
+
+# Rows validated, checked against the database and inserted together
+IMPORT_CHUNK_SIZE = 1000
+
+REQUIRED_FIELDS = ('employee_id', 'employee_name', 'email')
+
+# Column labels accepted besides the field names themselves; the labels of
+# the employee list export are included so an export can be re-imported
+COLUMN_ALIASES = {
+    'id': 'employee_id',
+    'name': 'employee_name',
+    'mobile': 'mobile_number',
+    'phone': 'mobile_number',
+    'department': 'department_id',
+    'designation': 'designation_id',
+    'branch': 'branch_id',
+    'shift': 'shift_id',
+    'salary': 'basic_salary',
+    'bank_account': 'bank_account_number',
+    'bank_a/c': 'bank_account_number',
+    'pan': 'pan_number',
+    'uan': 'uan_number',
+    'date_of_birth': 'dob',
+}
+
+DATE_FIELDS = ('dob', 'joining_date')
+
+# Export placeholders meaning "no value"
+_BLANK = {'', 'n/a', 'none', 'null'}
+
+# Roles an import may assign, by number or name; admin accounts are only
+# created in the application
+IMPORT_ROLES = {str(ROLE_HR): ROLE_HR, 'hr': ROLE_HR,
+                str(ROLE_EMPLOYEE): ROLE_EMPLOYEE, 'employee': ROLE_EMPLOYEE}
+
+# Status values, as written by the employee list export or as numbers
+IMPORT_STATUSES = {'1': 1, 'active': 1, '0': 0, 'inactive': 0}
+
+
+def _one_of(choices) -> Callable[[str], bool]:
+    return lambda value: value.lower() in choices or value.lower() in _BLANK
+
+
+# Column checks of an import: the employee rules plus role and status
+IMPORT_RULES = {
+    **COLUMN_RULES,
+    'role': (_one_of(IMPORT_ROLES), "Invalid role (expected HR or Employee)"),
+    'status': (_one_of(IMPORT_STATUSES), "Invalid status (expected Active or Inactive)"),
+}
+
+
+def _column_name(label) -> str:
+    name = str(label or '').strip().lower().replace(' ', '_')
+    return COLUMN_ALIASES.get(name, name)
+
+
+def _text(value) -> str:
+    """Cell value as text; Excel stores digit strings such as phone numbers as floats"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def read_rows(path) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Stream ``(row number, {field: text})`` from an .xlsx or .csv file.
+
+    Workbooks are opened in read-only mode, so neither format is loaded
+    into memory. Row numbers match what a spreadsheet shows (header = 1).
+    """
+    path = Path(path)
+    if path.suffix.lower() in ('.xlsx', '.xlsm'):
+        wb = load_workbook(str(path), read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [_column_name(label) for label in next(rows, ())]
+            for row_number, values in enumerate(rows, 2):
+                if any(value is not None and value != '' for value in values):
+                    yield row_number, {name: _text(value) for name, value in zip(header, values) if name}
+        finally:
+            wb.close()
+    elif path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = [_column_name(label) for label in next(reader, [])]
+            for row_number, values in enumerate(reader, 2):
+                if any(value.strip() for value in values):
+                    yield row_number, {name: value.strip() for name, value in zip(header, values) if name}
+    else:
+        raise ValueError(f"Unsupported file type: {path.suffix} (expected .xlsx or .csv)")
+
+
+@dataclass
+class ImportReport:
+    """Outcome of an import: counts, per-row errors and throughput"""
+    source: str
+    rows: int = 0
+    imported: int = 0
+    errors: List[Tuple[int, str, str]] = field(default_factory=list)  # (row, employee ID, message)
+    seconds: float = 0.0
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.imported:,} of {self.rows:,} rows imported, {self.failed:,} rejected "
+                f"in {self.seconds:.1f}s ({self.rows_per_second:,.0f} rows/s)")
+
+    def write_errors(self, path) -> str:
+        """Write the rejected rows as CSV and return the path"""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Row', 'Employee ID', 'Error'])
+            writer.writerows(sorted(self.errors))
+        return str(path)
+
+
+class EmployeeImportService:
+    """Imports employees in chunks: validate, one uniqueness query, one bulk insert"""
+
+    def __init__(self, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.repository = EmployeeRepository()
+        self.chunk_size = chunk_size
+
+    def import_file(self, path, progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+        """Import every row of ``path``; rows that fail are listed in the report"""
+        report = ImportReport(source=str(path))
+        started = time.perf_counter()
+        # IDs and emails seen earlier in the file, to reject duplicate rows
+        seen_ids: Set[str] = set()
+        seen_emails: Set[str] = set()
+        chunk = []
+        try:
+            for row_number, row in read_rows(path):
+                report.rows += 1
+                chunk.append((row_number, row))
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk, seen_ids, seen_emails, report)
+                    chunk = []
+                    report.seconds = time.perf_counter() - started
+                    if progress:
+                        progress(report)
+            if chunk:
+                self._import_chunk(chunk, seen_ids, seen_emails, report)
+        except Exception as e:
+            logger.error(f"Error importing employees from {path}: {e}")
+            report.errors.append((0, '', f"Import stopped: {e}"))
+        report.seconds = time.perf_counter() - started
+        logger.info(f"Employee import from {path}: {report.summary()}")
+        return report
+
+    def _import_chunk(self, chunk: List[Tuple[int, Dict[str, str]]], seen_ids: Set[str],
+                      seen_emails: Set[str], report: ImportReport):
+        errors = first_errors(validate_columns(self._columns(chunk), required=REQUIRED_FIELDS,
+                                               rules=IMPORT_RULES))
+        valid = []
+        for position, (row_number, row) in enumerate(chunk):
+            error = errors.get(position)
+            if error is None:
+                valid.append((row_number, row))
+            else:
+                report.errors.append((row_number, row.get('employee_id', ''), error.message))
+        if not valid:
+            return
+
+        existing_ids, existing_emails = self.repository.find_existing(
+            [row['employee_id'] for _, row in valid], [row['email'] for _, row in valid])
+        employees, row_numbers = [], []
+        for row_number, row in valid:
+            employee_id, email = row['employee_id'], row['email']
+            if employee_id in seen_ids:
+                report.errors.append((row_number, employee_id, "Employee ID repeated in file"))
+                continue
+            if email in seen_emails:
+                report.errors.append((row_number, employee_id, "Email repeated in file"))
+                continue
+            if employee_id in existing_ids:
+                report.errors.append((row_number, employee_id, "Employee ID already exists"))
+                continue
+            if email in existing_emails:
+                report.errors.append((row_number, employee_id, "Email already exists"))
+                continue
+            seen_ids.add(employee_id)
+            seen_emails.add(email)
+            employees.append(self._to_employee(row))
+            row_numbers.append(row_number)
+
+        # PT from the slabs in force today at each employee's location
+        engine, today = get_rules_engine(), date.today()
+        for employee in employees:
+            employee.pt = engine.rules_for(employee.location, today).pt(employee.basic_salary)
+
+        inserted, failures = self.repository.create_many(employees)
+        report.imported += inserted
+        for index, message in failures:
+            report.errors.append((row_numbers[index], employees[index].employee_id, message))
+
+    @staticmethod
+    def _columns(chunk: List[Tuple[int, Dict[str, str]]]) -> Dict[str, List[str]]:
+        """The validated fields of a chunk as columns; dates keep their YYYY-MM-DD part"""
+        columns = {}
+        for name in REQUIRED_FIELDS + tuple(n for n in IMPORT_RULES if n not in REQUIRED_FIELDS):
+            values = [row.get(name, '') for _, row in chunk]
+            columns[name] = [value[:10] for value in values] if name in DATE_FIELDS else values
+        return columns
+
+    @staticmethod
+    def _to_employee(row: Dict[str, str]) -> Employee:
+        data = {name: value for name, value in row.items()
+                if name in Employee.__slots__ and value.lower() not in _BLANK}
+        # No password: the account cannot log in until one is set
+        data.setdefault('password', NO_PASSWORD)
+        # Validated against IMPORT_ROLES / IMPORT_STATUSES
+        data['role'] = IMPORT_ROLES.get(data.get('role', '').lower(), ROLE_EMPLOYEE)
+        data['status'] = IMPORT_STATUSES.get(data.pop('status', '').lower(), 1)
+        for name in DATE_FIELDS:
+            if name in data:
+                data[name] = parse_date(data[name])
+        return Employee(**data)
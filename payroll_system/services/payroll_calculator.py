@@ -1,10 +1,11 @@
 """
 Payroll calculation engine with statutory deductions
 """
+from datetime import date
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 from payroll_system.models.payroll import Payroll
 from payroll_system.models.employee import Employee
-from payroll_system.config import PF_RATE, ESI_RATE, PT_SLABS
-from payroll_system.utils.validators import calculate_pt
+from payroll_system.services.statutory_rules import StatutoryRules, StatutoryRulesEngine, get_rules_engine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,13 +13,35 @@ logger = logging.getLogger(__name__)
 class PayrollCalculator:
     """Payroll calculation engine"""
     
+    def __init__(self, rules: Optional[StatutoryRulesEngine] = None):
+        # None: the process-wide engine (reloaded rules are picked up)
+        self._rules = rules
+    
+    @property
+    def rules(self) -> StatutoryRulesEngine:
+        return self._rules or get_rules_engine()
+    
+    def rules_for(self, employee: Employee, month: int, year: int) -> StatutoryRules:
+        """Statutory rules for the employee's location in force at the start of the month"""
+        return self.rules.rules_for(employee.location, date(year, month, 1))
+    
     def calculate_payroll(self, employee: Employee, month: int, year: int,
                          present_days: int, working_days: int, lop_days: int,
-                         overtime_hours: float = 0.0, bonus: float = 0.0) -> Payroll:
-        """Calculate complete payroll with all deductions"""
+                         overtime_hours: float = 0.0, bonus: float = 0.0,
+                         rules: Optional[StatutoryRules] = None,
+                         monthly_salary: Optional[float] = None) -> Payroll:
+        """Calculate complete payroll with all deductions.
+        
+        ``monthly_salary`` overrides the employee's current basic salary,
+        e.g. with the one in force for the month from the salary history.
+        """
+        if rules is None:
+            rules = self.rules_for(employee, month, year)
+        if monthly_salary is None:
+            monthly_salary = employee.basic_salary
         
         # Calculate daily salary
-        daily_salary = employee.basic_salary / working_days if working_days > 0 else 0
+        daily_salary = monthly_salary / working_days if working_days > 0 else 0
         
         # Calculate basic salary for present days
         basic_salary = daily_salary * present_days
@@ -26,34 +49,28 @@ class PayrollCalculator:
         # Calculate LOP deduction
         lop_deduction = daily_salary * lop_days
         
-        # Calculate HRA (40% of basic salary)
-        hra = basic_salary * 0.40
-        
-        # Calculate DA (20% of basic salary)
-        da = basic_salary * 0.20
+        # Calculate HRA, DA and allowances (percentages of basic salary)
+        hra = basic_salary * rules.hra_rate
+        da = basic_salary * rules.da_rate
+        allowances = basic_salary * rules.allowance_rate
         
-        # Calculate allowances (10% of basic salary)
-        allowances = basic_salary * 0.10
-        
-        # Calculate overtime pay (1.5x hourly rate)
+        # Calculate overtime pay (multiple of the hourly rate)
         hourly_rate = basic_salary / (working_days * 8) if working_days > 0 else 0
-        overtime_pay = overtime_hours * hourly_rate * 1.5
+        overtime_pay = overtime_hours * hourly_rate * rules.overtime_multiplier
         
         # Calculate gross salary
         gross_salary = basic_salary + hra + da + allowances + bonus + overtime_pay
         
         # Calculate statutory deductions
         
-        # PF (12% of basic salary, capped at 1800)
-        pf = min(basic_salary * PF_RATE, 1800)
+        # PF (share of basic salary, capped)
+        pf = rules.pf(basic_salary)
         
-        # ESI (0.75% of gross salary, if applicable - typically for salary < 21000)
-        esi = 0.0
-        if gross_salary < 21000:
-            esi = gross_salary * ESI_RATE
+        # ESI (share of gross salary, below the ESI threshold)
+        esi = rules.esi(gross_salary)
         
-        # Professional Tax (based on salary slabs)
-        pt = calculate_pt(basic_salary)
+        # Professional Tax (based on the state's salary slabs)
+        pt = rules.pt(basic_salary)
         
         # Total deductions
         total_deductions = pf + esi + pt + lop_deduction
@@ -90,4 +107,39 @@ class PayrollCalculator:
         )
         
         return payroll
-
+    
+    def calculate_batch(self, employees: Iterable[Employee], month: int, year: int,
+                        summaries: Dict[str, dict], working_days: int, bonus: float = 0.0,
+                        bonuses: Optional[Mapping[str, float]] = None,
+                        salaries: Optional[Mapping[str, float]] = None) -> Tuple[List[Payroll], List[str]]:
+        """Payrolls for many employees from their attendance summaries.
+        
+        ``bonuses`` overrides ``bonus`` and ``salaries`` the current basic
+        salary per employee ID. Rules are resolved once per location.
+        Returns the payrolls and the IDs of employees whose calculation
+        failed.
+        """
+        payrolls, failed = [], []
+        period_rules: Dict[str, StatutoryRules] = {}
+        for employee in employees:
+            try:
+                rules = period_rules.get(employee.location)
+                if rules is None:
+                    rules = period_rules[employee.location] = self.rules_for(employee, month, year)
+                summary = summaries[employee.employee_id]
+                payrolls.append(self.calculate_payroll(
+                    employee=employee,
+                    month=month,
+                    year=year,
+                    present_days=summary['present_days'],
+                    working_days=working_days,
+                    lop_days=summary['lop_days'],
+                    overtime_hours=summary['total_overtime'],
+                    bonus=bonuses.get(employee.employee_id, bonus) if bonuses else bonus,
+                    rules=rules,
+                    monthly_salary=salaries.get(employee.employee_id) if salaries else None
+                ))
+            except Exception as e:
+                logger.error(f"Error calculating payroll for {employee.employee_id}: {e}")
+                failed.append(employee.employee_id)
+        return payrolls, failed
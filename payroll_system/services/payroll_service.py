@@ -1,20 +1,63 @@
 """
 Payroll service for business logic
 """
-from typing import List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, date
 from calendar import monthrange
+from itertools import groupby
+from payroll_system.config import STREAM_BATCH_SIZE
+from payroll_system.models.employee import Employee
 from payroll_system.models.payroll import Payroll
-from payroll_system.repository.payroll_repository import PayrollRepository
+from payroll_system.models.payroll_batch import PayrollBatch
+from payroll_system.repository.payroll_repository import PayrollRepository, STALE_HOLIDAYS
+from payroll_system.repository.payroll_run_repository import (
+    PayrollRunRepository, RUN_COMPLETE, RUN_FAILED, RUN_RUNNING)
 from payroll_system.repository.attendance_repository import AttendanceRepository
 from payroll_system.repository.employee_repository import EmployeeRepository
 from payroll_system.repository.master_data_repository import MasterDataRepository
 from payroll_system.services.attendance_service import AttendanceService
 from payroll_system.services.payroll_calculator import PayrollCalculator
+from payroll_system.services.salary_history import SalaryHistoryService
+from payroll_system.services.statutory_rules import refresh_rules
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Counts kept in a payroll run's checkpoint
+RUN_COUNTS = ('generated', 'skipped', 'failed')
+
+
+@dataclass
+class PayrollPreview:
+    """Payrolls calculated but not saved, with last month's for comparison"""
+    month: int
+    year: int
+    batch: PayrollBatch
+    # Last month's payrolls of the previewed employees
+    previous: PayrollBatch
+    skipped: int = 0  # already have a payroll for the month
+    failed: int = 0
+    committed: bool = False
+    # Why the preview stopped early (employees or attendance could not be
+    # read); such a preview covers part of the workforce and cannot be committed
+    error: Optional[str] = None
+
+    def totals(self) -> Dict[str, float]:
+        return self.batch.totals()
+
+    def variances(self) -> Dict[str, float]:
+        """Change of each total against last month"""
+        previous = self.previous.totals()
+        return {name: total - previous[name] for name, total in self.totals().items()}
+
+    def employee_variances(self, field: str = 'net_salary') -> Dict[str, Optional[float]]:
+        """Change of ``field`` per employee against last month (None if they had no payroll)"""
+        previous = dict(zip(self.previous.column('employee_id'), self.previous.column(field)))
+        return {employee_id: (value - previous[employee_id] if employee_id in previous else None)
+                for employee_id, value in zip(self.batch.column('employee_id'), self.batch.column(field))}
+
+
 class PayrollService:
     """Service for payroll business logic"""
     
@@ -24,15 +67,19 @@ class PayrollService:
         self.employee_repo = EmployeeRepository()
         self.attendance_service = AttendanceService()
         self.calculator = PayrollCalculator()
+        self.salary_history = SalaryHistoryService()
+        self.run_repo = PayrollRunRepository()
     
     def generate_payroll(self, employee_id: str, month: int, year: int, 
                         bonus: float = 0.0) -> Tuple[bool, Optional[Payroll], str]:
-        """Generate payroll for an employee for a specific month"""
+        """Generate payroll for an employee for a specific month.
+        
+        The payroll is inserted without checking for an existing one first;
+        the unique index rejects duplicates, and only then is the existing
+        payroll read.
+        """
         try:
-            # Check if payroll already exists
-            existing = self.repository.get_by_employee_month(employee_id, month, year)
-            if existing:
-                return False, existing, "Payroll already exists for this month"
+            refresh_rules()
             
             # Get employee
             employee = self.employee_repo.get_by_id(employee_id)
@@ -47,6 +94,9 @@ class PayrollService:
             # Calculate working days (excluding holidays)
             working_days = self._calculate_working_days(month, year)
             
+            # Salary in force for the month, if it was ever revised
+            salaries = self.salary_history.month_salaries(month, year, [employee_id])
+            
             # Calculate payroll using calculator
             payroll = self.calculator.calculate_payroll(
                 employee=employee,
@@ -56,19 +106,290 @@ class PayrollService:
                 working_days=working_days,
                 lop_days=attendance_summary['lop_days'],
                 overtime_hours=attendance_summary['total_overtime'],
-                bonus=bonus
+                bonus=bonus,
+                monthly_salary=salaries.get(employee_id)
             )
             
             # Save to database
-            success = self.repository.create(payroll)
-            if success:
+            created = self.repository.create_if_absent(payroll)
+            if created:
                 return True, payroll, "Payroll generated successfully"
-            else:
-                return False, None, "Failed to save payroll"
+            if created is False:
+                existing = self.repository.get_by_employee_month(employee_id, month, year)
+                return False, existing, "Payroll already exists for this month"
+            return False, None, "Failed to save payroll"
         except Exception as e:
             logger.error(f"Error generating payroll: {e}")
             return False, None, f"Error: {str(e)}"
     
+    def generate_payroll_run(self, month: int, year: int, bonus: float = 0.0,
+                             batch_size: int = STREAM_BATCH_SIZE,
+                             progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                             resume: bool = True) -> Dict[str, int]:
+        """Generate missing payrolls for all active employees.
+        
+        Employees are read and processed ``batch_size`` at a time (a shard):
+        one attendance query and one bulk insert per shard, so memory stays
+        bounded whatever the headcount. Payrolls are inserted without an
+        existence check; those the unique index rejects count as skipped.
+        
+        Progress is checkpointed in ``payroll_runs`` after every shard. A
+        shard whose employees, attendance or salary history cannot be read or
+        whose payrolls cannot all be written stops the run as failed without
+        moving the checkpoint, as does a checkpoint that cannot be saved. With
+        ``resume``, the month's latest unfinished run continues after its
+        checkpoint, with its own bonus and batch size. Returns counts of
+        generated, skipped (already existing) and failed payrolls for the
+        whole run.
+        """
+        refresh_rules()
+        run = self.run_repo.get_unfinished(month, year) if resume else None
+        if run:
+            run_id = run['_id']
+            bonus, batch_size = run['bonus'], run['batch_size']
+            counts = {name: run.get(name, 0) for name in RUN_COUNTS}
+            after, shards = run.get('checkpoint'), run.get('shards_done', 0)
+            saved = self.run_repo.save_state(run_id, status=RUN_RUNNING, error=None)
+            logger.info(f"Resuming payroll run {run_id} after {after} ({shards} shards done)")
+        else:
+            run_id = f"{year}{month:02d}-{datetime.now():%Y%m%d%H%M%S%f}"
+            counts = dict.fromkeys(RUN_COUNTS, 0)
+            after, shards = None, 0
+            saved = self.run_repo.save_state(run_id, month=month, year=year, bonus=bonus, batch_size=batch_size,
+                                             status=RUN_RUNNING, started_at=datetime.now(), checkpoint=None,
+                                             shards_done=0, error=None, **counts)
+        # Without a checkpoint a failure part way could not be resumed
+        if not saved:
+            return self._fail_run(run_id, counts, "could not save the run state")
+        
+        working_days = self._calculate_working_days(month, year)
+        while True:
+            employees = self.employee_repo.get_page(batch_size, after, status=1)
+            if employees is None:
+                return self._fail_run(run_id, counts, f"could not read employees after {after}")
+            if not employees:
+                break
+            shard_counts = dict.fromkeys(RUN_COUNTS, 0)
+            try:
+                salaries = self.salary_history.month_salaries(
+                    month, year, [employee.employee_id for employee in employees])
+                unwritten = self._generate_batch(employees, month, year, bonus, working_days, salaries,
+                                                 shard_counts, check_existing=False)
+            except Exception as e:
+                return self._fail_run(run_id, counts, f"shard after {after} failed: {e}")
+            if unwritten:
+                return self._fail_run(run_id, counts, f"{unwritten} payrolls after {after} could not be saved")
+            for name in RUN_COUNTS:
+                counts[name] += shard_counts[name]
+            if not self.run_repo.save_state(run_id, checkpoint=employees[-1].employee_id,
+                                            shards_done=shards + 1, **counts):
+                # Resuming repeats this shard; its payrolls then count as skipped
+                return self._fail_run(run_id, counts, f"could not save the checkpoint of the shard after {after}")
+            after, shards = employees[-1].employee_id, shards + 1
+            if progress:
+                progress(counts)
+        if not self.run_repo.save_state(run_id, status=RUN_COMPLETE, completed_at=datetime.now()):
+            logger.error(f"Payroll run {run_id} finished but could not be marked complete")
+        logger.info(f"Payroll run {run_id} for {month}/{year}: {counts}")
+        return counts
+    
+    def _fail_run(self, run_id: str, counts: Dict[str, int], error: str) -> Dict[str, int]:
+        self.run_repo.save_state(run_id, status=RUN_FAILED, error=error)
+        logger.error(f"Payroll run {run_id} stopped, resume it by running the month again: {error}")
+        return counts
+    
+    def get_payroll_runs(self, month: int, year: int) -> List[dict]:
+        """Saved state of the month's payroll runs, latest first"""
+        return self.run_repo.get_by_month(month, year)
+    
+    def get_unfinished_run(self, month: int, year: int) -> Optional[dict]:
+        """Saved state of the month's run that ``generate_payroll_run`` would resume, if any"""
+        return self.run_repo.get_unfinished(month, year)
+    
+    def _calculate_pending(self, employees: List[Employee], month: int, year: int, bonus: float,
+                           working_days: int, salaries: Dict[str, float],
+                           counts: Dict[str, int], check_existing: bool = True) -> List[Payroll]:
+        """Payrolls for the employees (only those that have none for the month
+        yet if ``check_existing``)"""
+        pending = employees
+        if check_existing:
+            existing = self.repository.get_existing_employee_ids(
+                month, year, [employee.employee_id for employee in employees])
+            pending = [employee for employee in employees if employee.employee_id not in existing]
+            counts['skipped'] += len(existing)
+        if not pending:
+            return []
+        
+        summaries = self.attendance_service.calculate_attendance_summaries(
+            [employee.employee_id for employee in pending], month, year)
+        payrolls, failed = self.calculator.calculate_batch(
+            pending, month, year, summaries, working_days, bonus, salaries=salaries)
+        counts['failed'] += len(failed)
+        return payrolls
+    
+    def _generate_batch(self, employees: List[Employee], month: int, year: int, bonus: float,
+                        working_days: int, salaries: Dict[str, float], counts: Dict[str, int],
+                        check_existing: bool = True) -> int:
+        """Calculate and bulk-insert; returns how many payrolls could not be written"""
+        payrolls = self._calculate_pending(employees, month, year, bonus, working_days, salaries, counts,
+                                           check_existing)
+        inserted, duplicates = self.repository.create_many(payrolls)
+        counts['generated'] += inserted
+        # Already existing (or generated concurrently by someone else)
+        counts['skipped'] += duplicates
+        unwritten = len(payrolls) - inserted - duplicates
+        counts['failed'] += unwritten
+        return unwritten
+    
+    def preview_payroll_run(self, month: int, year: int, bonus: float = 0.0,
+                            employee_ids: Optional[List[str]] = None,
+                            batch_size: int = STREAM_BATCH_SIZE) -> PayrollPreview:
+        """Calculate the month's missing payrolls without saving them.
+        
+        Covers all active employees, or ``employee_ids`` (e.g. one employee).
+        Runs the same batch path as ``generate_payroll_run``; the result is
+        columnar, with last month's payrolls of the same employees for
+        variances. Save it with ``commit_preview``. Employees are read a page
+        at a time like ``generate_payroll_run``; if a page, its attendance or
+        its salary history cannot be read, the preview stops and records
+        ``error``.
+        """
+        refresh_rules()
+        counts = {'skipped': 0, 'failed': 0}
+        error = None
+        working_days = self._calculate_working_days(month, year)
+        
+        def pages() -> Iterator[List[Employee]]:
+            nonlocal error
+            if employee_ids is not None:
+                try:
+                    found = self.employee_repo.get_by_ids(employee_ids)
+                except Exception as e:
+                    error = f"could not read employees: {e}"
+                    return
+                counts['failed'] += len(set(employee_ids) - set(found))
+                employees = list(found.values())
+                for start in range(0, len(employees), batch_size):
+                    yield employees[start:start + batch_size]
+                return
+            after = None
+            while True:
+                page = self.employee_repo.get_page(batch_size, after, status=1)
+                if page is None:
+                    error = f"could not read employees after {after}"
+                    return
+                if not page:
+                    return
+                yield page
+                after = page[-1].employee_id
+        
+        def documents():
+            nonlocal error
+            for page in pages():
+                try:
+                    salaries = self.salary_history.month_salaries(
+                        month, year, [employee.employee_id for employee in page])
+                    payrolls = self._calculate_pending(page, month, year, bonus, working_days, salaries, counts)
+                except Exception as e:
+                    error = f"could not calculate payrolls from {page[0].employee_id}: {e}"
+                    return
+                for payroll in payrolls:
+                    yield payroll.to_dict()
+        
+        result = PayrollBatch.from_documents(documents())
+        if error:
+            logger.error(f"Payroll preview {month}/{year} incomplete: {error}")
+        previous_month, previous_year = (month - 1, year) if month > 1 else (12, year - 1)
+        previewed = list(result.column('employee_id'))
+        if employee_ids is None:
+            previous = self.repository.get_batch_by_month(previous_month, previous_year)
+            previous = previous.filter(employee_id=set(previewed))
+        else:
+            previous = self.repository.get_batch_by_month(previous_month, previous_year, previewed)
+        logger.info(f"Payroll preview {month}/{year}: {len(result)} calculated, {counts}")
+        return PayrollPreview(month, year, result, previous, counts['skipped'], counts['failed'], error=error)
+    
+    def commit_preview(self, preview: PayrollPreview) -> Dict[str, int]:
+        """Save previewed payrolls as calculated, in one bulk insert.
+        
+        Nothing is recalculated, so input changes made after the preview are
+        not reflected. Payrolls created meanwhile by someone else are
+        skipped. Returns counts of generated, skipped and failed payrolls.
+        """
+        if preview.committed:
+            raise ValueError("Payroll preview was already committed")
+        if preview.error:
+            raise ValueError(f"Payroll preview is incomplete and cannot be saved: {preview.error}")
+        payrolls = preview.batch.to_payrolls()
+        inserted, duplicates = self.repository.create_many(payrolls)
+        preview.committed = True
+        counts = {'generated': inserted, 'skipped': duplicates,
+                  'failed': len(payrolls) - inserted - duplicates}
+        logger.info(f"Payroll preview {preview.month}/{preview.year} committed: {counts}")
+        return counts
+    
+    def mark_holiday_changed(self, holiday_date: date) -> int:
+        """Flag the month's unpaid payrolls after a holiday was added or removed"""
+        return self.repository.mark_stale(STALE_HOLIDAYS, month=holiday_date.month, year=holiday_date.year)
+    
+    def get_stale_payrolls(self, month: Optional[int] = None,
+                           year: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """(employee ID, month, year) of payrolls whose inputs changed since they were calculated"""
+        return self.repository.get_stale(month, year)
+    
+    def recompute_stale(self, month: Optional[int] = None, year: Optional[int] = None,
+                        batch_size: int = STREAM_BATCH_SIZE,
+                        progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+        """Recalculate stale payrolls (of one month, or all) and bulk-update them.
+        
+        Only the stale records are read and written; each keeps its bonus,
+        status and creation date. Per month and batch this costs one
+        employee, one payroll, one attendance and one salary history query
+        and one bulk write.
+        Returns counts of recomputed, skipped (paid in the meantime) and
+        failed payrolls.
+        """
+        refresh_rules()
+        counts = {'recomputed': 0, 'skipped': 0, 'failed': 0}
+        stale = self.repository.get_stale(month, year)
+        for (stale_year, stale_month), keys in groupby(stale, key=lambda key: (key[2], key[1])):
+            employee_ids = [employee_id for employee_id, _, _ in keys]
+            working_days = self._calculate_working_days(stale_month, stale_year)
+            for start in range(0, len(employee_ids), batch_size):
+                batch = employee_ids[start:start + batch_size]
+                try:
+                    self._recompute_batch(batch, stale_month, stale_year, working_days, counts)
+                except Exception as e:
+                    # The batch stays stale for the next recompute
+                    logger.error(f"Error recomputing payrolls {stale_month}/{stale_year}: {e}")
+                    counts['failed'] += len(batch)
+                if progress:
+                    progress(counts)
+        logger.info(f"Stale payroll recompute: {counts}")
+        return counts
+    
+    def _recompute_batch(self, employee_ids: List[str], month: int, year: int, working_days: int,
+                         counts: Dict[str, int]):
+        employees = self.employee_repo.get_by_ids(employee_ids)
+        for employee_id in employee_ids:
+            if employee_id not in employees:
+                logger.error(f"Cannot recompute payroll {month}/{year}: employee {employee_id} not found")
+                counts['failed'] += 1
+        if not employees:
+            return
+        
+        current = self.repository.get_by_employees_month(month, year, list(employees))
+        summaries = self.attendance_service.calculate_attendance_summaries(list(employees), month, year)
+        payrolls, failed = self.calculator.calculate_batch(
+            employees.values(), month, year, summaries, working_days,
+            bonuses={employee_id: payroll.bonus for employee_id, payroll in current.items()},
+            salaries=self.salary_history.month_salaries(month, year, list(employees)))
+        counts['failed'] += len(failed)
+        
+        updated = self.repository.replace_stale(payrolls)
+        counts['recomputed'] += updated
+        counts['skipped'] += len(payrolls) - updated
+    
     def _calculate_working_days(self, month: int, year: int) -> int:
         """Calculate working days excluding weekends and holidays"""
         # Get total days in month
@@ -106,6 +427,30 @@ class PayrollService:
         """Get all payrolls for a month"""
         return self.repository.get_all_by_month(month, year)
     
+    def iter_payrolls(self, month: int, year: int) -> Iterator[Payroll]:
+        """Stream all payrolls for a month"""
+        return self.repository.iter_by_month(month, year)
+    
+    def get_payroll_batch(self, year: int, month: Optional[int] = None) -> PayrollBatch:
+        """Get a month (or a whole year) of payroll as a columnar batch"""
+        if month is not None:
+            return self.repository.get_batch_by_month(month, year)
+        return self.repository.get_batch_by_year(year)
+    
+    def get_employee_totals(self, start: Tuple[int, int], end: Tuple[int, int]) -> Dict[str, Dict[str, float]]:
+        """Per-employee payroll totals from ``start`` to ``end`` ((year, month), inclusive)"""
+        return self.repository.get_employee_totals(start, end)
+    
+    def get_annual_totals(self, year: int) -> Dict[str, Dict[str, float]]:
+        """Per-employee payroll totals for a calendar year"""
+        return self.repository.get_employee_totals((year, 1), (year, 12))
+    
+    def get_totals_by(self, dimension: str, batch: PayrollBatch) -> Dict[object, Dict[str, float]]:
+        """Payroll totals per department or branch (``dimension`` is 'department' or 'branch')"""
+        field = {'department': 'department_id', 'branch': 'branch_id'}[dimension]
+        groups = self.employee_repo.get_field_map(field, batch.column('employee_id'))
+        return batch.group_totals(groups)
+    
     def update_payroll(self, payroll: Payroll) -> bool:
         """Update payroll"""
         return self.repository.update(payroll)
@@ -0,0 +1,181 @@
+"""
+Month-over-month payroll reconciliation
+
+Joins a month's payrolls with the previous month's, column by column, and
+classifies every employee: amounts changed beyond the thresholds, new
+(no payroll last month), missing (active and joined by the end of the month,
+but no payroll this month), left (payroll last month only, no longer active)
+or ok. Reads two payroll batches and two employee columns; nothing is
+written. Deactivation is not dated, so an employee deactivated since the
+month is reported as left rather than missing.
+"""
+from array import array
+from calendar import monthrange
+from datetime import date
+from math import fsum
+from typing import Dict, Iterator, NamedTuple, Optional, Sequence, Tuple
+from payroll_system.config import RECONCILE_VARIANCE_AMOUNT, RECONCILE_VARIANCE_PERCENT
+from payroll_system.models.fields import parse_date
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.payroll_repository import PayrollRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Amounts compared between the two months
+RECONCILE_FIELDS = ('basic_salary', 'gross_salary', 'total_deductions', 'net_salary')
+
+STATUS_OK = 'ok'
+STATUS_CHANGED = 'changed'
+STATUS_NEW = 'new'
+STATUS_MISSING = 'missing'
+STATUS_LEFT = 'left'
+STATUSES = (STATUS_CHANGED, STATUS_NEW, STATUS_MISSING, STATUS_LEFT, STATUS_OK)
+
+
+class ReconciliationRow(NamedTuple):
+    employee_id: str
+    status: str
+    # Fields whose change is beyond the thresholds
+    flagged: Tuple[str, ...]
+    previous: Tuple[float, ...]
+    current: Tuple[float, ...]
+
+
+class PayrollReconciliation:
+    """One row per employee with last month's and this month's amounts, stored as columns.
+
+    ``columns`` holds employee_id, status and flagged lists plus
+    ``previous_<field>`` / ``current_<field>`` arrays for every field in
+    ``fields`` (0 where there is no payroll).
+    """
+
+    __slots__ = ('month', 'year', 'fields', 'columns')
+
+    def __init__(self, month: int, year: int, fields: Sequence[str], columns: Dict[str, Sequence]):
+        self.month = month
+        self.year = year
+        self.fields = tuple(fields)
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns['employee_id'])
+
+    def column(self, name: str) -> Sequence:
+        return self.columns[name]
+
+    def counts(self) -> Dict[str, int]:
+        """Employees per status"""
+        counts = dict.fromkeys(STATUSES, 0)
+        for status in self.columns['status']:
+            counts[status] += 1
+        return counts
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """``{field: {'previous', 'current', 'change'}}`` over all employees"""
+        result = {}
+        for field in self.fields:
+            previous = fsum(self.columns[f'previous_{field}'])
+            current = fsum(self.columns[f'current_{field}'])
+            result[field] = {'previous': previous, 'current': current, 'change': current - previous}
+        return result
+
+    def rows(self, only_exceptions: bool = False) -> Iterator[ReconciliationRow]:
+        """Rows in order (only those not ok if ``only_exceptions``)"""
+        columns = self.columns
+        previous = [columns[f'previous_{field}'] for field in self.fields]
+        current = [columns[f'current_{field}'] for field in self.fields]
+        for i, (employee_id, status, flagged) in enumerate(
+                zip(columns['employee_id'], columns['status'], columns['flagged'])):
+            if only_exceptions and status == STATUS_OK:
+                continue
+            yield ReconciliationRow(employee_id, status, flagged,
+                                    tuple(column[i] for column in previous),
+                                    tuple(column[i] for column in current))
+
+
+def previous_month(month: int, year: int) -> Tuple[int, int]:
+    """(month, year) before ``month``/``year``"""
+    return (month - 1, year) if month > 1 else (12, year - 1)
+
+
+def reconcile(current: Dict[str, Sequence], previous: Dict[str, Sequence], active_ids: Sequence[str],
+              month: int, year: int, fields: Sequence[str] = RECONCILE_FIELDS,
+              percent: float = RECONCILE_VARIANCE_PERCENT,
+              amount: float = RECONCILE_VARIANCE_AMOUNT) -> PayrollReconciliation:
+    """Join two months of payroll columns (``employee_id`` plus ``fields``).
+
+    ``active_ids`` are the employees expected to have a payroll this month.
+    A field is flagged when its change is at least ``amount`` and at least
+    ``percent`` of last month's value.
+    """
+    ratio = percent / 100
+    previous_row = {employee_id: i for i, employee_id in enumerate(previous['employee_id'])}
+    current_ids = current['employee_id']
+    columns = {'employee_id': list(current_ids), 'status': [], 'flagged': []}
+    # Row of last month's batch per output row (-1: none)
+    joined = array('l', [previous_row.get(employee_id, -1) for employee_id in current_ids])
+
+    # Rows only in last month: active employees are missing, others left
+    seen = set(current_ids)
+    active = set(active_ids)
+    missing = [employee_id for employee_id in active_ids if employee_id not in seen]
+    left = [employee_id for employee_id in previous['employee_id']
+            if employee_id not in seen and employee_id not in active]
+    columns['employee_id'].extend(missing)
+    columns['employee_id'].extend(left)
+    joined.extend(previous_row.get(employee_id, -1) for employee_id in missing)
+    joined.extend(previous_row[employee_id] for employee_id in left)
+    matched = len(current_ids)
+
+    changes = []
+    for field in fields:
+        before = previous[field]
+        previous_values = array('d', [before[j] if j >= 0 else 0.0 for j in joined])
+        current_values = array('d', current[field])
+        current_values.extend([0.0] * (len(joined) - matched))
+        columns[f'previous_{field}'] = previous_values
+        columns[f'current_{field}'] = current_values
+        changes.append([abs(now - then) >= amount and abs(now - then) >= abs(then) * ratio
+                        for then, now in zip(previous_values[:matched], current_values)])
+
+    for i, j in enumerate(joined[:matched]):
+        if j < 0:
+            columns['status'].append(STATUS_NEW)
+            columns['flagged'].append(())
+            continue
+        flagged = tuple(field for field, changed in zip(fields, changes) if changed[i])
+        columns['status'].append(STATUS_CHANGED if flagged else STATUS_OK)
+        columns['flagged'].append(flagged)
+    columns['status'].extend([STATUS_MISSING] * len(missing) + [STATUS_LEFT] * len(left))
+    columns['flagged'].extend([()] * (len(missing) + len(left)))
+    return PayrollReconciliation(month, year, fields, columns)
+
+
+class ReconciliationService:
+    """Month-over-month payroll review before release"""
+
+    def __init__(self):
+        self.payroll_repo = PayrollRepository()
+        self.employee_repo = EmployeeRepository()
+
+    def reconcile_month(self, month: int, year: int, percent: Optional[float] = None,
+                        amount: Optional[float] = None,
+                        fields: Sequence[str] = RECONCILE_FIELDS) -> PayrollReconciliation:
+        """Compare ``month``/``year`` with the month before.
+
+        Thresholds default to ``RECONCILE_VARIANCE_PERCENT`` and
+        ``RECONCILE_VARIANCE_AMOUNT``. Costs three queries.
+        """
+        previous = self.payroll_repo.get_batch_by_month(*previous_month(month, year))
+        current = self.payroll_repo.get_batch_by_month(month, year)
+        # Employees who joined after the month are not expected in it
+        employees = self.employee_repo.get_columns(('joining_date',))
+        last_day = date(year, month, monthrange(year, month)[1])
+        active_ids = [employee_id for employee_id, joined in zip(employees['employee_id'], employees['joining_date'])
+                      if not joined or parse_date(joined) <= last_day]
+        result = reconcile(current.columns, previous.columns, active_ids, month, year, fields,
+                           RECONCILE_VARIANCE_PERCENT if percent is None else percent,
+                           RECONCILE_VARIANCE_AMOUNT if amount is None else amount)
+        logger.info(f"Payroll reconciliation {month}/{year}: {result.counts()}")
+        return result
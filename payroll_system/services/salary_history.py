@@ -0,0 +1,62 @@
+"""
+Effective-dated salary history
+
+``Employee.basic_salary`` holds the latest salary. Every change is also
+recorded with its effective date, so payrolls, arrears and simulations for
+any month can use the salary in force then. Employees without history (e.g.
+created before it existed) fall back to ``basic_salary``; the first change
+records their previous salary from the joining date as well.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from payroll_system.models.employee import Employee
+from payroll_system.models.salary_history import SalaryRecord, salary_date
+from payroll_system.repository.salary_history_repository import SalaryHistoryRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SalaryHistoryService:
+    """Service for salary history"""
+
+    def __init__(self):
+        self.repository = SalaryHistoryRepository()
+
+    def record_changes(self, changes: Iterable[Tuple[Employee, float]], effective_from: Optional[date] = None,
+                       reason: str = '') -> int:
+        """Record new basic salaries from ``effective_from`` (default today).
+
+        ``changes`` pairs each employee (holding the new salary) with the
+        previous salary. One query and one bulk write. Returns how many
+        records were written.
+        """
+        changes = list(changes)
+        if not changes:
+            return 0
+        effective_from = effective_from or date.today()
+        known = self.repository.get_employee_ids_with_history(employee.employee_id for employee, _ in changes)
+        records = []
+        for employee, previous_salary in changes:
+            if employee.employee_id not in known:
+                joined = employee.joining_date or date.min
+                if joined < effective_from:
+                    records.append(SalaryRecord(employee.employee_id, joined, previous_salary,
+                                                reason='salary before history'))
+            records.append(SalaryRecord(employee.employee_id, effective_from, employee.basic_salary,
+                                        reason=reason))
+        return self.repository.save_many(records)
+
+    def get_history(self, employee_id: str) -> List[SalaryRecord]:
+        return self.repository.get_history(employee_id)
+
+    def salaries_as_of(self, on: date, employee_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Recorded salary in force on ``on`` per employee (one query); employees
+        without history are left out, use their ``basic_salary``. Raises if the
+        history cannot be read."""
+        return self.repository.get_salaries_as_of(on, employee_ids)
+
+    def month_salaries(self, month: int, year: int,
+                       employee_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Recorded salary per employee for a month's payroll (see ``salary_date``)"""
+        return self.repository.get_salaries_as_of(salary_date(month, year), employee_ids)
@@ -0,0 +1,229 @@
+"""
+Salary revision what-if simulation
+
+Applies a percentage or slab-based increment to ``basic_salary`` for a set
+of employees and computes the monthly payroll impact (gross, PF, ESI, PT,
+deductions, net) before and after, column by column, with the statutory
+rules of each employee's location. Figures assume a full month's attendance
+without bonus or overtime. Nothing is written unless ``apply_revision`` is
+called.
+"""
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date
+from math import fsum
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.payroll_repository import PayrollRepository, STALE_SALARY
+from payroll_system.services.salary_history import SalaryHistoryService
+from payroll_system.services.statutory_rules import StatutoryRulesEngine, get_rules_engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Figures computed for the current and the revised salary
+IMPACT_FIELDS = ('basic_salary', 'gross_salary', 'pf', 'esi', 'pt', 'total_deductions', 'net_salary')
+
+# Employee fields read by the simulation
+EMPLOYEE_FIELDS = ('employee_id', 'basic_salary', 'department_id', 'branch_id', 'location')
+
+DIMENSIONS = {'department': 'department_id', 'branch': 'branch_id'}
+
+
+@dataclass(frozen=True)
+class SalaryRevision:
+    """An increment: ``percent`` for everyone, or per current-salary slab.
+
+    ``slabs`` are ``(low, high, percent)`` on the current basic salary
+    (``high`` None = no upper bound); salaries outside every slab get
+    ``percent``. ``round_to`` rounds revised salaries (e.g. to 100).
+    """
+    percent: float = 0.0
+    slabs: Tuple[Tuple[float, Optional[float], float], ...] = ()
+    round_to: float = 0.0
+
+    def revise(self, salaries: Sequence[float]) -> array:
+        """Revised salaries for a column of current ones"""
+        percent, round_to = self.percent, self.round_to
+        if self.slabs:
+            slabs = sorted(self.slabs)
+            lows = [low for low, _, _ in slabs]
+            highs = [float('inf') if high is None else high for _, high, _ in slabs]
+            rates = [rate for _, _, rate in slabs]
+            factors = []
+            for salary in salaries:
+                i = bisect_right(lows, salary) - 1
+                factors.append(1 + (rates[i] if i >= 0 and salary <= highs[i] else percent) / 100)
+            revised = [salary * factor for salary, factor in zip(salaries, factors)]
+        else:
+            factor = 1 + percent / 100
+            revised = [salary * factor for salary in salaries]
+        if round_to:
+            revised = [round(salary / round_to) * round_to for salary in revised]
+        return array('d', revised)
+
+
+class RevisionImpact:
+    """Current and revised monthly figures per employee, stored as columns.
+
+    ``columns`` holds employee_id, department_id, branch_id and location
+    lists plus ``current_<field>`` / ``revised_<field>`` arrays for every
+    field in ``IMPACT_FIELDS``.
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns: Dict[str, Sequence]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns['employee_id'])
+
+    def column(self, name: str) -> Sequence:
+        return self.columns[name]
+
+    def changes(self, field: str = 'net_salary') -> List[float]:
+        """Revised minus current ``field`` per row"""
+        return [revised - current for current, revised
+                in zip(self.columns[f'current_{field}'], self.columns[f'revised_{field}'])]
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """``{field: {'current', 'revised', 'change'}}`` over all employees"""
+        result = {}
+        for field in IMPACT_FIELDS:
+            current = fsum(self.columns[f'current_{field}'])
+            revised = fsum(self.columns[f'revised_{field}'])
+            result[field] = {'current': current, 'revised': revised, 'change': revised - current}
+        return result
+
+    def rollup(self, dimension: str) -> Dict[object, Dict[str, float]]:
+        """Per department or branch (``dimension``): employee count and the
+        current, revised and change totals of every field, in first-seen order"""
+        keys = self.columns[DIMENSIONS[dimension]]
+        slots: Dict[object, int] = {}
+        group_of = [slots.setdefault(key, len(slots)) for key in keys]
+        result = {key: {'count': 0} for key in slots}
+        groups = list(result.values())
+        for g in group_of:
+            groups[g]['count'] += 1
+        for field in IMPACT_FIELDS:
+            for prefix in ('current', 'revised'):
+                sums = [0.0] * len(slots)
+                for g, value in zip(group_of, self.columns[f'{prefix}_{field}']):
+                    sums[g] += value
+                for group, total in zip(groups, sums):
+                    group[f'{prefix}_{field}'] = total
+            for group in groups:
+                group[f'change_{field}'] = group[f'revised_{field}'] - group[f'current_{field}']
+        return result
+
+
+def _monthly_figures(salaries: Sequence[float], locations: Sequence, rules: StatutoryRulesEngine,
+                     on: date) -> Dict[str, array]:
+    """Gross, PF, ESI, PT, deductions and net for full-month salaries"""
+    gross, pf, esi, pt = array('d'), array('d'), array('d'), array('d')
+    # Rules are resolved once per distinct location
+    resolved = {location: rules.rules_for(location, on) for location in set(locations)}
+    for salary, location in zip(salaries, locations):
+        r = resolved[location]
+        g = salary * (1 + r.hra_rate + r.da_rate + r.allowance_rate)
+        gross.append(g)
+        pf.append(min(salary * r.pf_rate, r.pf_cap))
+        esi.append(g * r.esi_rate if g < r.esi_threshold else 0.0)
+        pt.append(r.pt(salary))
+    deductions = array('d', [a + b + c for a, b, c in zip(pf, esi, pt)])
+    net = array('d', [g - d for g, d in zip(gross, deductions)])
+    return {'basic_salary': array('d', salaries), 'gross_salary': gross, 'pf': pf, 'esi': esi,
+            'pt': pt, 'total_deductions': deductions, 'net_salary': net}
+
+
+def simulate(employees: Dict[str, Sequence], revision: SalaryRevision,
+             rules: Optional[StatutoryRulesEngine] = None, on: Optional[date] = None) -> RevisionImpact:
+    """Impact of ``revision`` on employees given as columns (see ``EMPLOYEE_FIELDS``)"""
+    rules = rules or get_rules_engine()
+    on = on or date.today()
+    current_salaries = [float(salary or 0) for salary in employees['basic_salary']]
+    locations = employees.get('location') or [None] * len(current_salaries)
+    columns = {name: list(employees.get(name) or [None] * len(current_salaries))
+               for name in ('employee_id', 'department_id', 'branch_id', 'location')}
+    current = _monthly_figures(current_salaries, locations, rules, on)
+    revised = _monthly_figures(revision.revise(current_salaries), locations, rules, on)
+    for field in IMPACT_FIELDS:
+        columns[f'current_{field}'] = current[field]
+        columns[f'revised_{field}'] = revised[field]
+    return RevisionImpact(columns)
+
+
+class SalaryRevisionService:
+    """What-if salary revisions over filtered sets of active employees"""
+
+    def __init__(self):
+        self.employee_repo = EmployeeRepository()
+        self.payroll_repo = PayrollRepository()
+        self.salary_history = SalaryHistoryService()
+
+    def simulate_revision(self, revision: SalaryRevision,
+                          department_ids: Optional[Iterable[str]] = None,
+                          branch_ids: Optional[Iterable[str]] = None,
+                          designation_ids: Optional[Iterable[str]] = None,
+                          employee_ids: Optional[Iterable[str]] = None,
+                          on: Optional[date] = None) -> RevisionImpact:
+        """Impact of ``revision`` on the active employees matching every given filter.
+
+        Current salaries are those in force on ``on`` (default today) per the
+        salary history. Reads the employees with one projected query and
+        the salary history with one more; no payroll data is read or written.
+        Raises if the salary history cannot be read.
+        """
+        employees = self.employee_repo.get_columns(
+            EMPLOYEE_FIELDS, department_id=department_ids, branch_id=branch_ids,
+            designation_id=designation_ids, employee_id=employee_ids)
+        on = on or date.today()
+        recorded = self.salary_history.salaries_as_of(
+            on, None if employee_ids is None else employees['employee_id'])
+        if recorded:
+            employees['basic_salary'] = [recorded.get(employee_id, salary) for employee_id, salary
+                                         in zip(employees['employee_id'], employees['basic_salary'])]
+        return simulate(employees, revision, on=on)
+
+    def apply_revision(self, impact: RevisionImpact, effective_from: Optional[date] = None,
+                       reason: str = '') -> int:
+        """Save the revised basic salaries (and PT) of a simulation.
+
+        Updates only employees whose salary changes, in one bulk write,
+        records the new salaries in the salary history from
+        ``effective_from`` (default today) and marks their unpaid payrolls
+        from this month on stale (earlier months are settled with
+        ``ArrearsService``). History and stale flags cover only employees
+        whose update was written; nothing else happens if none was. Returns
+        how many were updated.
+        """
+        revised = {employee_id: (salary, pt) for employee_id, current, salary, pt in zip(
+            impact.column('employee_id'), impact.column('current_basic_salary'),
+            impact.column('revised_basic_salary'), impact.column('revised_pt')) if salary != current}
+        if not revised:
+            return 0
+        try:
+            employees = self.employee_repo.get_by_ids(revised)
+        except Exception:
+            # Logged by get_by_ids
+            return 0
+        previous = {employee_id: employee.basic_salary for employee_id, employee in employees.items()}
+        for employee_id, employee in employees.items():
+            employee.basic_salary, employee.pt = revised[employee_id]
+        updated = self.employee_repo.update_many(employees.values())
+        if not updated:
+            logger.error("Salary revision not applied: no employee could be updated")
+            return 0
+        if updated < len(employees):
+            # Employees whose write failed still have pending changes
+            employees = {employee_id: employee for employee_id, employee in employees.items()
+                         if not employee.changes()}
+        self.salary_history.record_changes(
+            ((employee, previous[employee_id]) for employee_id, employee in employees.items()),
+            effective_from, reason)
+        since = max(date.today(), effective_from or date.min)
+        self.payroll_repo.mark_stale(STALE_SALARY, list(employees), since=(since.year, since.month))
+        logger.info(f"Salary revision applied to {updated} employees")
+        return updated
@@ -0,0 +1,176 @@
+"""
+Statutory rules engine
+
+Statutory rates, caps and Professional Tax slabs are versioned per state and
+effective date (``statutory_rules`` collection). The engine reads them once,
+compiles every version into a ``StatutoryRules`` object - plain attributes
+plus a bisect-based PT closure - and memoises which version applies to a
+(location, date). Employee locations are cities, mapped to their state with
+``CITY_STATES``. Payroll calculation then does no I/O and no per-employee
+allocation to find its rules. The rates in ``config.py`` form the default
+rule set, used where no stored rule set applies.
+
+Payroll calculations call ``refresh_rules()`` first, which reloads the rules
+when the stored rule sets changed since they were loaded. It checks (one
+small query) at most every ``RULES_REFRESH_S`` seconds.
+"""
+from bisect import bisect_right
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from payroll_system.config import (ALLOWANCE_RATE, CITY_STATES, DA_RATE, ESI_RATE, ESI_THRESHOLD,
+                                   HRA_RATE, OVERTIME_MULTIPLIER, PF_CAP, PF_RATE, PT_SLABS,
+                                   RULES_REFRESH_S)
+from payroll_system.models.statutory import DEFAULT_STATE, StatutoryRuleSet
+from payroll_system.repository.statutory_repository import StatutoryRuleRepository
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Resolved (location, date) pairs kept per engine; cleared when exceeded
+RESOLVED_CACHE_SIZE = 4096
+
+_CITY_STATES = {city.lower(): state.lower() for city, state in CITY_STATES.items()}
+
+
+def default_rule_set() -> StatutoryRuleSet:
+    """The rule set defined by config.py, effective since ever"""
+    slabs = [(low, None if high == float('inf') else high, amount)
+             for (low, high), amount in sorted(PT_SLABS.items())]
+    return StatutoryRuleSet(DEFAULT_STATE, date.min, PF_RATE, PF_CAP, ESI_RATE, ESI_THRESHOLD,
+                            HRA_RATE, DA_RATE, ALLOWANCE_RATE, OVERTIME_MULTIPLIER, slabs,
+                            description="config.py defaults")
+
+
+def compile_pt(slabs: Iterable[Tuple[float, Optional[float], float]]) -> Callable[[float], float]:
+    """PT lookup for a slab table; salaries between or outside the slabs pay 0"""
+    slabs = sorted(slabs)
+    lows = [low for low, _, _ in slabs]
+    highs = [float('inf') if high is None else high for _, high, _ in slabs]
+    amounts = [amount for _, _, amount in slabs]
+
+    def pt(basic: float) -> float:
+        i = bisect_right(lows, basic) - 1
+        return amounts[i] if i >= 0 and basic <= highs[i] else 0
+    return pt
+
+
+class StatutoryRules:
+    """One rule set compiled for calculation"""
+
+    __slots__ = ('state', 'effective_from', 'pf_rate', 'pf_cap', 'esi_rate', 'esi_threshold',
+                 'hra_rate', 'da_rate', 'allowance_rate', 'overtime_multiplier', 'pt')
+
+    def __init__(self, rule_set: StatutoryRuleSet):
+        self.state = rule_set.state
+        self.effective_from = rule_set.effective_from
+        self.pf_rate = rule_set.pf_rate
+        self.pf_cap = rule_set.pf_cap
+        self.esi_rate = rule_set.esi_rate
+        self.esi_threshold = rule_set.esi_threshold
+        self.hra_rate = rule_set.hra_rate
+        self.da_rate = rule_set.da_rate
+        self.allowance_rate = rule_set.allowance_rate
+        self.overtime_multiplier = rule_set.overtime_multiplier
+        self.pt = compile_pt(rule_set.pt_slabs)
+
+    def pf(self, basic: float) -> float:
+        return min(basic * self.pf_rate, self.pf_cap)
+
+    def esi(self, gross: float) -> float:
+        return gross * self.esi_rate if gross < self.esi_threshold else 0.0
+
+    def pt_batch(self, salaries: Iterable) -> List[float]:
+        """PT for each salary in a column"""
+        pt = self.pt
+        return [pt(float(salary or 0)) for salary in salaries]
+
+
+class StatutoryRulesEngine:
+    """Compiled rule sets by state, resolved by effective date"""
+
+    def __init__(self, rule_sets: Optional[Iterable[StatutoryRuleSet]] = None):
+        # Loaded from the database, the stamp of what was loaded and when it
+        # was last compared with the stored rule sets
+        self.stored = rule_sets is None
+        self.version = None
+        self.checked_at = time.monotonic()
+        if rule_sets is None:
+            repository = StatutoryRuleRepository()
+            self.version = repository.get_version()
+            rule_sets = repository.get_all()
+        by_state: Dict[str, List[StatutoryRuleSet]] = {}
+        for rule_set in rule_sets:
+            by_state.setdefault(self._key(rule_set.state), []).append(rule_set)
+        defaults = by_state.setdefault(DEFAULT_STATE, [])
+        if not any(rule_set.effective_from == date.min for rule_set in defaults):
+            defaults.append(default_rule_set())
+
+        # state -> (effective dates, compiled rules), both in date order
+        self._versions: Dict[str, Tuple[List[date], List[StatutoryRules]]] = {}
+        for state, versions in by_state.items():
+            versions.sort(key=lambda rule_set: rule_set.effective_from)
+            self._versions[state] = ([rule_set.effective_from for rule_set in versions],
+                                     [StatutoryRules(rule_set) for rule_set in versions])
+        self._resolved: Dict[Tuple[str, date], StatutoryRules] = {}
+
+    @staticmethod
+    def _key(location) -> str:
+        """State of a location (a city in CITY_STATES, else a state name)"""
+        key = (location or DEFAULT_STATE).strip().lower() or DEFAULT_STATE
+        return _CITY_STATES.get(key, key)
+
+    def _lookup(self, state: str, on: date) -> Optional[StatutoryRules]:
+        versions = self._versions.get(state)
+        if versions is None:
+            return None
+        i = bisect_right(versions[0], on) - 1
+        return versions[1][i] if i >= 0 else None
+
+    def rules_for(self, location: Optional[str], on: date) -> StatutoryRules:
+        """Rules in force at ``location`` (a city or state) on ``on``; the
+        default rule set where its state has none stored"""
+        resolved = self._resolved.get((location, on))
+        if resolved is None:
+            resolved = self._lookup(self._key(location), on) or self._lookup(DEFAULT_STATE, on)
+            if len(self._resolved) >= RESOLVED_CACHE_SIZE:
+                self._resolved.clear()
+            self._resolved[(location, on)] = resolved
+        return resolved
+
+    def states(self) -> List[str]:
+        return sorted(self._versions)
+
+
+_engine: Optional[StatutoryRulesEngine] = None
+
+
+def get_rules_engine() -> StatutoryRulesEngine:
+    """The process-wide engine, loaded from the database on first use"""
+    global _engine
+    if _engine is None:
+        _engine = StatutoryRulesEngine()
+        logger.info(f"Statutory rules loaded for: {', '.join(_engine.states())}")
+    return _engine
+
+
+def reload_rules():
+    """Drop the loaded rules; the next ``get_rules_engine()`` reads them again"""
+    global _engine
+    _engine = None
+
+
+def refresh_rules() -> StatutoryRulesEngine:
+    """The process-wide engine, reloaded first if rule sets were saved or
+    deleted since it was loaded (e.g. with ``tools.statutory_rules --load``).
+
+    The stored rule sets are checked at most every ``RULES_REFRESH_S``
+    seconds; ``reload_rules()`` forces a reload.
+    """
+    if _engine is not None and _engine.stored and time.monotonic() - _engine.checked_at >= RULES_REFRESH_S:
+        version = StatutoryRuleRepository().get_version()
+        _engine.checked_at = time.monotonic()
+        if version is not None and version != _engine.version:
+            logger.info("Statutory rules changed, reloading")
+            reload_rules()
+    return get_rules_engine()
@@ -0,0 +1,3 @@
+"""
+Command line tools (data generation, migrations, diagnostics)
+"""
@@ -0,0 +1,68 @@
+"""
+Index and query plan diagnostics
+
+Reconciles the indexes declared by the repositories (rebuilding changed ones
+only with ``--rebuild-indexes``), then runs ``explain()``
+for every declared repository query shape and prints the winning plan.
+Collection scans that are not marked as expected make the command exit with
+status 1, so it can run in CI against a seeded database.
+
+Run with:
+    python -m payroll_system.tools.explain_queries
+    python -m payroll_system.tools.explain_queries --backend file --path local_store.db
+    python -m payroll_system.tools.explain_queries --rebuild-indexes
+    python -m payroll_system.tools.explain_queries --no-reconcile --drop-unknown
+"""
+import argparse
+import logging
+import sys
+
+from payroll_system.utils.indexes import explain_shapes, reconcile_indexes
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check repository query plans against the declared indexes")
+    parser.add_argument("--backend", choices=("mongo", "memory", "file"), help="override STORAGE_BACKEND")
+    parser.add_argument("--path", help="store file for the file backend")
+    parser.add_argument("--no-reconcile", action="store_true",
+                        help="explain against the indexes as they are (connecting still creates missing ones)")
+    parser.add_argument("--rebuild-indexes", action="store_true",
+                        help="drop and recreate indexes whose keys or options changed")
+    parser.add_argument("--drop-unknown", action="store_true",
+                        help="drop indexes that no repository declares")
+    parser.add_argument("--only", help="substring of the query shape names to explain")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from payroll_system.utils.database import db
+
+    database = db.connect(backend=args.backend, path=args.path)
+    if not args.no_reconcile or args.rebuild_indexes or args.drop_unknown:
+        print("Indexes")
+        for collection, name, outcome in reconcile_indexes(database, rebuild=args.rebuild_indexes,
+                                                           drop_unknown=args.drop_unknown):
+            print(f"  {collection + '.' + name:<48} {outcome}")
+        print()
+
+    reports = explain_shapes(database)
+    if args.only:
+        reports = [r for r in reports if args.only in r.shape.name]
+    print(f"{'query':<66}{'plan':<38}{'index':<30}{'examined':>10}{'returned':>10}  flags")
+    for report in reports:
+        if report.error:
+            print(f"{report.shape.name:<66}ERROR {report.error}")
+            continue
+        plan = ' > '.join(report.stages)
+        print(f"{report.shape.name:<66}{plan:<38}{report.index or '-':<30}"
+              f"{report.docs_examined:>10,}{report.returned:>10,}  {', '.join(report.problems)}")
+
+    failed = [r for r in reports if not r.ok]
+    db.disconnect()
+    if failed:
+        print(f"\n{len(failed)} query shape(s) scan the whole collection or failed to explain")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""
+Synthetic workforce data generator
+
+Fills the database with a reproducible organisation of N employees: master
+data (departments, designations, branches, shifts, holidays), employees with a
+realistic salary spread, a year of daily attendance and the matching monthly
+payrolls. Documents are written with bulk inserts and the achieved load rate
+is reported per collection.
+
+Run with:
+    python -m payroll_system.tools.generate_data --employees 10000 --year 2025
+    python -m payroll_system.tools.generate_data --employees 100000 --backend file --drop
+"""
+from calendar import monthrange
+from contextlib import nullcontext
+from datetime import date, time, timedelta
+from typing import Dict, Iterator, List, Optional
+import argparse
+import logging
+import random
+import time as _time
+
+from pymongo.errors import BulkWriteError
+
+from payroll_system.models.attendance import Attendance
+from payroll_system.models.employee import Employee
+from payroll_system.models.master_data import Branch, Department, Designation, Holiday, Shift
+from payroll_system.services.payroll_calculator import PayrollCalculator
+from payroll_system.utils.validators import calculate_pt
+from payroll_system.config import ROLE_EMPLOYEE, ROLE_HR
+
+logger = logging.getLogger(__name__)
+
+DEPARTMENTS = [
+    "Engineering", "Operations", "Sales", "Marketing", "Finance", "Human Resources",
+    "Customer Support", "Quality Assurance", "Logistics", "Procurement", "Legal", "Administration",
+]
+
+# (title, median basic salary, share of workforce)
+DESIGNATION_LEVELS = [
+    ("Associate", 14000, 0.45),
+    ("Senior Associate", 26000, 0.30),
+    ("Team Lead", 42000, 0.15),
+    ("Manager", 68000, 0.08),
+    ("Director", 150000, 0.02),
+]
+
+BRANCHES = [
+    ("Bangalore", "MG Road"), ("Mumbai", "Andheri East"), ("Delhi", "Connaught Place"),
+    ("Chennai", "Guindy"), ("Hyderabad", "HITEC City"), ("Pune", "Hinjewadi"),
+    ("Kolkata", "Salt Lake"), ("Ahmedabad", "SG Highway"),
+]
+
+SHIFTS = [
+    ("General Shift", "09:00:00", "18:00:00"),
+    ("Early Shift", "06:00:00", "15:00:00"),
+    ("Late Shift", "14:00:00", "23:00:00"),
+]
+
+# (month, day, name)
+HOLIDAYS = [
+    (1, 1, "New Year's Day"), (1, 26, "Republic Day"), (3, 14, "Holi"),
+    (4, 14, "Ambedkar Jayanti"), (5, 1, "Labour Day"), (8, 15, "Independence Day"),
+    (8, 27, "Ganesh Chaturthi"), (10, 2, "Gandhi Jayanti"), (10, 20, "Dussehra"),
+    (11, 8, "Diwali"), (12, 25, "Christmas"),
+]
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan", "Rohan",
+    "Ananya", "Diya", "Aadhya", "Saanvi", "Priya", "Kavya", "Meera", "Isha", "Neha", "Pooja",
+    "Rahul", "Vikram", "Suresh", "Lakshmi", "Divya", "Karthik", "Nikhil", "Sneha", "Anjali", "Ravi",
+]
+
+LAST_NAMES = [
+    "Sharma", "Verma", "Iyer", "Reddy", "Nair", "Patel", "Gupta", "Mehta", "Rao", "Singh",
+    "Kumar", "Das", "Joshi", "Menon", "Pillai", "Bose", "Chopra", "Kulkarni", "Desai", "Shah",
+]
+
+# Daily attendance status mix for working days
+PRESENT_RATE = 0.90
+ABSENT_RATE = 0.06  # remaining days are LOP
+
+
+class BulkLoader:
+    """Buffers documents per collection and writes them with insert_many"""
+
+    def __init__(self, database, batch_size: int = 5000):
+        self.database = database
+        self.batch_size = batch_size
+        self.buffers: Dict[str, List[dict]] = {}
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, collection: str, document: dict) -> None:
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(document)
+        if len(buffer) >= self.batch_size:
+            self.flush(collection)
+
+    def flush(self, collection: Optional[str] = None) -> None:
+        names = [collection] if collection else list(self.buffers)
+        for name in names:
+            buffer = self.buffers.get(name)
+            if not buffer:
+                continue
+            started = _time.perf_counter()
+            inserted = len(buffer)
+            try:
+                self.database[name].insert_many(buffer, ordered=False)
+            except BulkWriteError as e:
+                failed = len(e.details.get('writeErrors', []))
+                inserted -= failed
+                self.errors[name] = self.errors.get(name, 0) + failed
+            self.seconds[name] = self.seconds.get(name, 0.0) + _time.perf_counter() - started
+            self.counts[name] = self.counts.get(name, 0) + inserted
+            self.buffers[name] = []
+
+    def report(self) -> Dict[str, dict]:
+        """Rows written, seconds spent and rows/second per collection"""
+        return {
+            name: {
+                'rows': rows,
+                'errors': self.errors.get(name, 0),
+                'seconds': round(self.seconds.get(name, 0.0), 3),
+                'rows_per_second': round(rows / self.seconds[name]) if self.seconds.get(name) else 0,
+            }
+            for name, rows in self.counts.items()
+        }
+
+
+class WorkforceGenerator:
+    """Reproducible synthetic organisation for load tests and sizing"""
+
+    def __init__(self, employees: int, year: int, seed: int = 42,
+                 attendance: bool = True, payroll_months: int = 12, months: int = 12):
+        self.employee_count = employees
+        self.year = year
+        self.seed = seed
+        self.attendance = attendance
+        self.months = max(1, min(months, 12))
+        self.payroll_months = max(0, min(payroll_months, self.months))
+        self.rng = random.Random(seed)
+        self.calculator = PayrollCalculator()
+        self.departments: List[Department] = []
+        self.designations: List[tuple] = []  # (Designation, level index)
+        self.branches: List[Branch] = []
+        self.shifts: List[Shift] = []
+        self.holidays: List[Holiday] = []
+        self._working_days: Dict[int, List[date]] = {}
+
+    # -- master data ---------------------------------------------------------
+
+    def build_master_data(self) -> None:
+        self.departments = [
+            Department(f"DEPT{i:03d}", name) for i, name in enumerate(DEPARTMENTS, 1)
+        ]
+        self.designations = []
+        for dept in self.departments:
+            for level, (title, _, _) in enumerate(DESIGNATION_LEVELS):
+                des_id = f"DES{dept.department_id[4:]}{level + 1:02d}"
+                self.designations.append(
+                    (Designation(des_id, f"{title} - {dept.department_name}", dept.department_id), level)
+                )
+        self.branches = [
+            Branch(f"BR{i:03d}", f"{city} Branch", f"{area}, {city}",
+                   f"080{self.rng.randint(1000000, 9999999)}", f"{city.lower()}@company.com")
+            for i, (city, area) in enumerate(BRANCHES, 1)
+        ]
+        self.shifts = [
+            Shift(f"SHIFT{i:03d}", name, in_time, out_time)
+            for i, (name, in_time, out_time) in enumerate(SHIFTS, 1)
+        ]
+        self.holidays = [
+            Holiday(f"HOL{self.year}{i:02d}", name, date(self.year, month, day))
+            for i, (month, day, name) in enumerate(HOLIDAYS, 1)
+        ]
+        holiday_dates = {h.holiday_date for h in self.holidays}
+        for month in range(1, 13):
+            self._working_days[month] = [
+                day for day in (date(self.year, month, d) for d in range(1, monthrange(self.year, month)[1] + 1))
+                if day.weekday() < 5 and day not in holiday_dates
+            ]
+
+    def load_master_data(self, loader: BulkLoader) -> None:
+        for dept in self.departments:
+            loader.add('departments', dept.to_dict())
+        for designation, _ in self.designations:
+            loader.add('designations', designation.to_dict())
+        for branch in self.branches:
+            loader.add('branches', branch.to_dict())
+        for shift in self.shifts:
+            loader.add('shifts', shift.to_dict())
+        for holiday in self.holidays:
+            loader.add('holidays', holiday.to_dict())
+        loader.flush()
+
+    # -- employees -----------------------------------------------------------
+
+    def iter_employees(self) -> Iterator[tuple]:
+        """Yield (employee, first active month, last active month)"""
+        rng = self.rng
+        level_weights = [share for _, _, share in DESIGNATION_LEVELS]
+        by_level: Dict[int, List[Designation]] = {}
+        for designation, level in self.designations:
+            by_level.setdefault(level, []).append(designation)
+
+        for i in range(1, self.employee_count + 1):
+            level = rng.choices(range(len(DESIGNATION_LEVELS)), level_weights)[0]
+            designation = rng.choice(by_level[level])
+            median = DESIGNATION_LEVELS[level][1]
+            basic_salary = round(median * rng.lognormvariate(0, 0.18), -2)
+
+            # ~10% joined during the year, ~5% left during the year
+            first_month, last_month = 1, 12
+            if rng.random() < 0.10:
+                first_month = rng.randint(1, 12)
+                joining_date = date(self.year, first_month, rng.randint(1, 28))
+            else:
+                joining_date = date(self.year, 1, 1) - timedelta(days=rng.randint(30, 3650))
+            status = 1
+            if rng.random() < 0.05:
+                last_month = rng.randint(first_month, 12)
+                status = 0
+
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            branch = rng.choice(self.branches)
+            employee = Employee(
+                employee_id=f"EMP{i:07d}",
+                employee_name=f"{first} {last}",
+                email=f"{first.lower()}.{last.lower()}.{i}@example.com",
+                password="changeme",
+                role=ROLE_HR if designation.department_id == "DEPT006" and level >= 2 else ROLE_EMPLOYEE,
+                mobile_number=f"9{rng.randint(100000000, 999999999)}",
+                gender=rng.choice(("Male", "Female")),
+                dob=date(rng.randint(1965, 2003), rng.randint(1, 12), rng.randint(1, 28)),
+                city=branch.name.replace(" Branch", ""),
+                location=branch.name.replace(" Branch", ""),
+                joining_date=joining_date,
+                registration_date=joining_date,
+                department_id=designation.department_id,
+                designation_id=designation.designation_id,
+                branch_id=branch.branch_id,
+                shift_id=rng.choice(self.shifts).shift_id,
+                basic_salary=basic_salary,
+                bank_account_number=str(rng.randint(10 ** 11, 10 ** 12 - 1)),
+                pan_number=f"{''.join(rng.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=5))}{rng.randint(1000, 9999)}"
+                           f"{rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}",
+                uan_number=str(rng.randint(10 ** 11, 10 ** 12 - 1)),
+                pt=calculate_pt(basic_salary),
+                status=status,
+            )
+            yield employee, first_month, last_month
+
+    # -- attendance / payroll ------------------------------------------------
+
+    def _month_attendance(self, employee: Employee, month: int, loader: BulkLoader) -> dict:
+        """Write one month of attendance and return its summary"""
+        rng = self.rng
+        present = lop = 0
+        overtime = 0.0
+        for day in self._working_days[month]:
+            if day < employee.joining_date:
+                continue
+            roll = rng.random()
+            if roll < PRESENT_RATE:
+                minute = min(max(int(rng.gauss(0, 12)), -30), 59)
+                checkin = time(9, minute) if minute >= 0 else time(8, 60 + minute)
+                hours = 9 + (rng.randint(1, 3) if rng.random() < 0.15 else 0)
+                checkout = time(min(checkin.hour + hours, 23), checkin.minute)
+                record = Attendance(employee.employee_id, day, checkin, checkout,
+                                    status='present', overtime_hours=float(hours - 9))
+                present += 1
+                overtime += hours - 9
+            elif roll < PRESENT_RATE + ABSENT_RATE:
+                record = Attendance(employee.employee_id, day, status='absent')
+            else:
+                record = Attendance(employee.employee_id, day, status='lop', lop=True)
+                lop += 1
+            if self.attendance:
+                loader.add('attendance', record.to_dict())
+        return {'present_days': present, 'lop_days': lop, 'total_overtime': overtime}
+
+    def generate(self, loader: BulkLoader) -> None:
+        """Generate and load the whole dataset"""
+        self.build_master_data()
+        self.load_master_data(loader)
+        last_payroll_month = self.payroll_months
+        for employee, first_month, last_month in self.iter_employees():
+            loader.add('employees', employee.to_dict())
+            for month in range(first_month, min(last_month, self.months) + 1):
+                summary = self._month_attendance(employee, month, loader)
+                if month > last_payroll_month:
+                    continue
+                bonus = round(employee.basic_salary * 0.1, -2) if month == 12 and self.rng.random() < 0.3 else 0.0
+                payroll = self.calculator.calculate_payroll(
+                    employee=employee,
+                    month=month,
+                    year=self.year,
+                    present_days=summary['present_days'],
+                    working_days=len(self._working_days[month]),
+                    lop_days=summary['lop_days'],
+                    overtime_hours=summary['total_overtime'],
+                    bonus=bonus,
+                )
+                payroll.status = 'paid' if month < last_payroll_month else 'processed'
+                payroll.created_date = date(self.year, month, monthrange(self.year, month)[1])
+                loader.add('payrolls', payroll.to_dict())
+        loader.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic payroll data")
+    parser.add_argument("--employees", type=int, default=1000, help="number of employees (1k to 1M)")
+    parser.add_argument("--year", type=int, default=date.today().year - 1, help="year of attendance/payroll")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for reproducible data")
+    parser.add_argument("--months", type=int, default=12, help="months of the year to generate (from January)")
+    parser.add_argument("--payroll-months", type=int, default=12, help="months of payroll history to generate")
+    parser.add_argument("--no-attendance", action="store_true", help="skip daily attendance documents")
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many call")
+    parser.add_argument("--backend", choices=("mongo", "memory", "file"), help="override STORAGE_BACKEND")
+    parser.add_argument("--path", help="store file for the file backend")
+    parser.add_argument("--drop", action="store_true", help="drop the generated collections first")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from payroll_system.utils.database import db
+
+    database = db.connect(backend=args.backend, path=args.path)
+    if args.drop:
+        for name in ('employees', 'departments', 'designations', 'branches', 'shifts',
+                     'holidays', 'attendance', 'payrolls'):
+            database[name].delete_many({})
+
+    generator = WorkforceGenerator(args.employees, args.year, seed=args.seed,
+                                   attendance=not args.no_attendance,
+                                   payroll_months=args.payroll_months,
+                                   months=args.months)
+    loader = BulkLoader(database, batch_size=args.batch_size)
+    # The file backend writes one snapshot at the end instead of logging every batch
+    batch = getattr(database.client, 'batch', nullcontext)
+    started = _time.perf_counter()
+    with batch():
+        generator.generate(loader)
+    elapsed = _time.perf_counter() - started
+
+    report = loader.report()
+    total = sum(r['rows'] for r in report.values())
+    print(f"{'collection':<14}{'rows':>12}{'errors':>9}{'seconds':>10}{'rows/s':>12}")
+    for name, stats in report.items():
+        print(f"{name:<14}{stats['rows']:>12,}{stats['errors']:>9,}{stats['seconds']:>10.2f}{stats['rows_per_second']:>12,}")
+    print(f"{'total':<14}{total:>12,}{'':>9}{elapsed:>10.2f}{round(total / elapsed) if elapsed else 0:>12,}")
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Bulk employee import
+
+Reads employees from an .xlsx or .csv file (header row with field names
+such as employee_id, employee_name, email, mobile_number, basic_salary, or
+the column labels of the employee list export), validates them in chunks
+and inserts the valid rows. Rejected rows are written to an error report.
+
+Run with:
+    python -m payroll_system.tools.import_employees employees.xlsx
+    python -m payroll_system.tools.import_employees employees.csv --errors rejected.csv --backend file
+"""
+import argparse
+import logging
+import sys
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import employees from an Excel or CSV file")
+    parser.add_argument("file", help=".xlsx or .csv file with a header row")
+    parser.add_argument("--errors", help="where to write rejected rows (CSV)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows validated and inserted together")
+    parser.add_argument("--backend", choices=("mongo", "memory", "file"), help="override STORAGE_BACKEND")
+    parser.add_argument("--path", help="store file for the file backend")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from payroll_system.utils.database import db
+
+    db.connect(backend=args.backend, path=args.path)
+    from payroll_system.services.import_service import EmployeeImportService
+
+    service = EmployeeImportService(chunk_size=args.chunk_size)
+    report = service.import_file(args.file, progress=lambda r: print(f"  {r.rows:,} rows read, {r.imported:,} imported"))
+    print(report.summary())
+    if report.errors:
+        for row, employee_id, message in sorted(report.errors)[:10]:
+            print(f"  row {row} {employee_id}: {message}")
+        if args.errors:
+            print(f"Rejected rows written to {report.write_errors(args.errors)}")
+    db.disconnect()
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
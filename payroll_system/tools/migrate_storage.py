@@ -0,0 +1,297 @@
+"""
+Online storage migrations
+
+Rewrites existing documents into the current storage format in small
+batches while the application keeps running:
+
+- attendance_bson_dates: attendance ``date`` from ISO strings to BSON dates
+- payroll_period_keys:   payroll ``period`` (yyyymm) key and BSON ``created_date``
+- attendance_monthly_buckets: copy daily ``attendance`` documents into
+  per employee-month buckets in ``attendance_months`` (ATTENDANCE_LAYOUT=monthly)
+
+Progress (last processed ``_id`` and counts) is saved in the ``migrations``
+collection after every batch, so an interrupted run resumes where it
+stopped. Repositories read both formats until a migration is marked
+complete; a database with nothing left to convert (e.g. a new install) is
+marked complete when the application connects.
+
+Run with:
+    python -m payroll_system.tools.migrate_storage
+    python -m payroll_system.tools.migrate_storage --only attendance_bson_dates --batch-size 500 --pause 0.2
+    python -m payroll_system.tools.migrate_storage --status
+
+The bucket copy leaves ``attendance`` in place. Run it (again with
+``--restart`` to pick up late edits; it is idempotent) before switching
+ATTENDANCE_LAYOUT to ``monthly``.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+import argparse
+import logging
+import time
+
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from payroll_system.models.fields import parse_date, to_datetime
+from payroll_system.models.payroll import period_key
+from payroll_system.repository.attendance_repository import day_key, to_day_entry
+from payroll_system.repository.migration_repository import (
+    MigrationRepository, ATTENDANCE_BUCKETS, ATTENDANCE_DATES, PAYROLL_PERIODS, PENDING_QUERIES,
+    STATUS_COMPLETE, STATUS_RUNNING)
+
+logger = logging.getLogger(__name__)
+
+
+class StorageMigration:
+    """One batched document rewrite.
+
+    Subclasses name the collection, the query selecting documents still in
+    the old format, and how to convert one of them.
+    """
+    name = ''
+    collection = ''
+    description = ''
+    # Optional migrations only run when named with --only
+    optional = False
+
+    def pending_query(self) -> dict:
+        raise NotImplementedError
+
+    def guard(self, doc: dict) -> dict:
+        """Extra filter so a document changed since it was read is skipped"""
+        return {}
+
+    def convert(self, doc: dict) -> dict:
+        """``$set`` fields bringing ``doc`` to the new format"""
+        raise NotImplementedError
+
+    def remaining(self, database, last_id=None) -> int:
+        """Documents still to convert"""
+        return database[self.collection].count_documents(self.pending_query())
+
+    def write_batch(self, database, docs: List[dict]) -> Tuple[int, int]:
+        """Convert one batch; returns (converted, duplicates removed)"""
+        collection = database[self.collection]
+        requests = [
+            UpdateOne({'_id': doc['_id'], **self.guard(doc)}, {'$set': self.convert(doc)})
+            for doc in docs
+        ]
+        try:
+            result = collection.bulk_write(requests, ordered=False)
+            return result.modified_count, 0
+        except BulkWriteError as e:
+            details = e.details
+            # A converted record for the same key already exists (written by an
+            # upgraded client), so the old-format copy is obsolete.
+            stale = [DeleteOne({'_id': docs[err['index']]['_id']})
+                     for err in details.get('writeErrors', []) if err.get('code') == 11000]
+            others = [err for err in details.get('writeErrors', []) if err.get('code') != 11000]
+            if others:
+                logger.error(f"{self.name}: {len(others)} documents failed to convert: "
+                             f"{others[0].get('errmsg')}")
+            if stale:
+                collection.bulk_write(stale, ordered=False)
+            return details.get('nModified', 0), len(stale)
+
+
+class AttendanceDatesMigration(StorageMigration):
+    name = ATTENDANCE_DATES
+    collection = 'attendance'
+    description = "attendance dates: ISO strings -> BSON dates"
+
+    def pending_query(self) -> dict:
+        return PENDING_QUERIES[self.name][1]
+
+    def guard(self, doc: dict) -> dict:
+        return {'date': doc['date']}
+
+    def convert(self, doc: dict) -> dict:
+        return {'date': to_datetime(doc['date'])}
+
+
+class PayrollPeriodsMigration(StorageMigration):
+    name = PAYROLL_PERIODS
+    collection = 'payrolls'
+    description = "payrolls: add yyyymm period key, BSON created_date"
+
+    def pending_query(self) -> dict:
+        return PENDING_QUERIES[self.name][1]
+
+    def convert(self, doc: dict) -> dict:
+        fields = {'period': period_key(doc['year'], doc['month'])}
+        created = doc.get('created_date')
+        if isinstance(created, str):
+            try:
+                fields['created_date'] = to_datetime(created)
+            except ValueError:
+                fields['created_date'] = None
+        return fields
+
+
+class AttendanceBucketsMigration(StorageMigration):
+    """Copies daily attendance into monthly buckets (source left untouched)"""
+    name = ATTENDANCE_BUCKETS
+    collection = 'attendance'
+    target = 'attendance_months'
+    description = "attendance: daily documents -> employee-month buckets"
+    optional = True
+
+    def pending_query(self) -> dict:
+        return {}
+
+    def remaining(self, database, last_id=None) -> int:
+        query = {} if last_id is None else {'_id': {'$gt': last_id}}
+        return database[self.collection].count_documents(query)
+
+    def write_batch(self, database, docs: List[dict]) -> Tuple[int, int]:
+        buckets: Dict[tuple, dict] = {}
+        for doc in docs:
+            day = parse_date(doc['date'])
+            key = (doc['employee_id'], period_key(day.year, day.month))
+            days = buckets.setdefault(key, {'year': day.year, 'month': day.month, 'days': {}})['days']
+            days[f"days.{day_key(day)}"] = to_day_entry(doc)
+        # Setting each day by path makes re-running a batch harmless
+        requests = [
+            UpdateOne({'employee_id': employee_id, 'period': period},
+                      {'$set': bucket['days'],
+                       '$setOnInsert': {'year': bucket['year'], 'month': bucket['month']}},
+                      upsert=True)
+            for (employee_id, period), bucket in buckets.items()
+        ]
+        database[self.target].bulk_write(requests, ordered=False)
+        return len(docs), 0
+
+
+MIGRATIONS: Dict[str, StorageMigration] = {
+    m.name: m for m in (AttendanceDatesMigration(), PayrollPeriodsMigration(),
+                        AttendanceBucketsMigration())
+}
+
+
+class MigrationRunner:
+    """Runs storage migrations in resumable batches"""
+
+    # Passes over the collection before giving up on documents that keep
+    # being written in the old format by clients that were not upgraded
+    MAX_PASSES = 3
+
+    def __init__(self, database, batch_size: int = 1000, pause: float = 0.0,
+                 progress: Callable[[str], None] = print):
+        self.database = database
+        self.batch_size = batch_size
+        self.pause = pause
+        self.progress = progress
+        self.states = MigrationRepository()
+
+    def run(self, migration: StorageMigration) -> dict:
+        """Run (or resume) one migration and return its final state"""
+        state = self.states.get_state(migration.name)
+        if state.get('status') == STATUS_COMPLETE:
+            self.progress(f"{migration.name}: already complete")
+            return state
+
+        collection = self.database[migration.collection]
+        last_id = state.get('last_id')
+        converted = state.get('converted', 0)
+        duplicates = state.get('duplicates', 0)
+        if not state:
+            self.states.save_state(migration.name, status=STATUS_RUNNING,
+                                   description=migration.description, started_at=datetime.now(),
+                                   converted=0, duplicates=0, last_id=None)
+        elif last_id is not None:
+            self.progress(f"{migration.name}: resuming after _id {last_id} ({converted:,} converted)")
+
+        pending = migration.pending_query()
+        for _ in range(self.MAX_PASSES):
+            while True:
+                query = dict(pending)
+                if last_id is not None:
+                    query = {'$and': [pending, {'_id': {'$gt': last_id}}]} if pending else {'_id': {'$gt': last_id}}
+                docs = list(collection.find(query).sort('_id', 1).limit(self.batch_size))
+                if not docs:
+                    break
+                done, dupes = migration.write_batch(self.database, docs)
+                converted += done
+                duplicates += dupes
+                last_id = docs[-1]['_id']
+                self.states.save_state(migration.name, status=STATUS_RUNNING, last_id=last_id,
+                                       converted=converted, duplicates=duplicates)
+                self.progress(f"{migration.name}: {converted:,} converted")
+                if self.pause:
+                    time.sleep(self.pause)
+            # Documents written in the old format behind the cursor need another pass
+            remaining = migration.remaining(self.database, last_id)
+            if not remaining:
+                break
+            last_id = None
+
+        if remaining:
+            self.progress(f"{migration.name}: {remaining:,} documents still in the old format; run again")
+            self.states.save_state(migration.name, last_id=None, remaining=remaining)
+        else:
+            self.states.save_state(migration.name, status=STATUS_COMPLETE, remaining=0,
+                                   completed_at=datetime.now())
+            self.progress(f"{migration.name}: complete ({converted:,} converted, "
+                          f"{duplicates:,} superseded duplicates removed)")
+        return self.states.get_state(migration.name)
+
+    def status(self) -> List[dict]:
+        rows = []
+        for name, migration in MIGRATIONS.items():
+            state = self.states.get_state(name)
+            pending = migration.remaining(self.database, state.get('last_id'))
+            rows.append({'name': name, 'status': state.get('status', 'not started'),
+                         'converted': state.get('converted', 0), 'pending': pending})
+        return rows
+
+
+def storage_stats(database, names=('attendance', 'attendance_months', 'payrolls')) -> List[dict]:
+    """Document count, data size and index size per collection (``collStats``)"""
+    rows = []
+    for name in names:
+        try:
+            stats = database.command('collStats', name)
+        except Exception as e:
+            logger.error(f"Error reading stats for {name}: {e}")
+            continue
+        rows.append({'collection': name, 'count': stats.get('count', 0), 'size': stats.get('size', 0),
+                     'avg_size': stats.get('avgObjSize', 0), 'index_size': stats.get('totalIndexSize', 0)})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate stored documents to the current format")
+    parser.add_argument("--only", choices=sorted(MIGRATIONS), action="append",
+                        help="run only this migration (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per batch")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--status", action="store_true", help="show progress and exit")
+    parser.add_argument("--restart", action="store_true", help="discard saved progress first")
+    parser.add_argument("--backend", choices=("mongo", "memory", "file"), help="override STORAGE_BACKEND")
+    parser.add_argument("--path", help="store file for the file backend")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from payroll_system.utils.database import db
+
+    database = db.connect(backend=args.backend, path=args.path)
+    runner = MigrationRunner(database, batch_size=args.batch_size, pause=args.pause)
+    if args.status:
+        print(f"{'migration':<28}{'status':>14}{'converted':>12}{'pending':>10}")
+        for row in runner.status():
+            print(f"{row['name']:<28}{row['status']:>14}{row['converted']:>12,}{row['pending']:>10,}")
+        print(f"\n{'collection':<28}{'documents':>12}{'data bytes':>14}{'avg bytes':>10}{'index bytes':>14}")
+        for row in storage_stats(database):
+            print(f"{row['collection']:<28}{row['count']:>12,}{row['size']:>14,}"
+                  f"{row['avg_size']:>10,.0f}{row['index_size']:>14,}")
+    else:
+        for name in args.only or [n for n, m in MIGRATIONS.items() if not m.optional]:
+            if args.restart:
+                runner.states.reset(name)
+            runner.run(MIGRATIONS[name])
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
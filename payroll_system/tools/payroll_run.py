@@ -0,0 +1,61 @@
+"""
+Month-end payroll run
+
+Generates the missing payrolls of all active employees for a month, in
+shards of ``--batch-size`` employees. Progress is checkpointed in the
+``payroll_runs`` collection after every shard; running the same month again
+resumes an interrupted or failed run after its checkpoint (with the bonus
+it was started with). Payrolls that already exist are skipped, so a run can
+be repeated safely.
+
+Run with:
+    python -m payroll_system.tools.payroll_run 2026 3 --bonus 1000
+    python -m payroll_system.tools.payroll_run 2026 3 --restart
+    python -m payroll_system.tools.payroll_run 2026 3 --status
+"""
+import argparse
+import logging
+import sys
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate (or resume) a month's payroll run")
+    parser.add_argument("year", type=int)
+    parser.add_argument("month", type=int, choices=range(1, 13), metavar="MONTH")
+    parser.add_argument("--bonus", type=float, default=0.0, help="bonus per employee (new runs only)")
+    parser.add_argument("--batch-size", type=int, help="employees per shard (new runs only)")
+    parser.add_argument("--restart", action="store_true", help="start a new run instead of resuming")
+    parser.add_argument("--status", action="store_true", help="print the month's runs and exit")
+    parser.add_argument("--backend", choices=("mongo", "memory", "file"), help="override STORAGE_BACKEND")
+    parser.add_argument("--path", help="store file for the file backend")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from payroll_system.utils.database import db
+
+    db.connect(backend=args.backend, path=args.path)
+    from payroll_system.config import STREAM_BATCH_SIZE
+    from payroll_system.repository.payroll_run_repository import RUN_COMPLETE
+    from payroll_system.services.payroll_service import PayrollService
+
+    service = PayrollService()
+    if not args.status:
+        counts = service.generate_payroll_run(
+            args.month, args.year, bonus=args.bonus, batch_size=args.batch_size or STREAM_BATCH_SIZE,
+            progress=lambda c: print(f"  {c['generated']:,} generated, {c['skipped']:,} skipped, "
+                                     f"{c['failed']:,} failed", end="\r"),
+            resume=not args.restart)
+        print(f"\n{counts['generated']:,} generated, {counts['skipped']:,} skipped, {counts['failed']:,} failed")
+
+    runs = service.get_payroll_runs(args.month, args.year)
+    print(f"{'run':<28}{'status':<10}{'shards':>8}{'generated':>11}{'skipped':>9}{'failed':>8}  checkpoint / error")
+    for run in runs:
+        note = run.get('error') or run.get('checkpoint') or ''
+        print(f"{run['_id']:<28}{run['status']:<10}{run.get('shards_done', 0):>8}{run.get('generated', 0):>11,}"
+              f"{run.get('skipped', 0):>9,}{run.get('failed', 0):>8,}  {note}")
+    db.disconnect()
+    return 0 if args.status or (runs and runs[0]['status'] == RUN_COMPLETE) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Statutory rule set maintenance
+
+Lists the stored rule sets or loads new versions from a JSON file holding a
+list of rule sets (one object per state and effective date, with the fields
+of ``models.statutory.StatutoryRuleSet``; PT slabs as ``[low, high, amount]``
+with ``null`` for an open upper bound). Loading a version with an existing
+state and effective date replaces it. State ``*`` is the default.
+
+Run with:
+    python -m payroll_system.tools.statutory_rules --list
+    python -m payroll_system.tools.statutory_rules --load rules_2026.json
+    python -m payroll_system.tools.statutory_rules --delete Karnataka 2026-04-01
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import date
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="List or load versioned statutory rule sets")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--list", action="store_true", help="print the stored rule sets")
+    action.add_argument("--load", metavar="FILE", help="JSON file with a list of rule sets")
+    action.add_argument("--delete", nargs=2, metavar=("STATE", "EFFECTIVE_FROM"),
+                        help="delete one rule set version")
+    parser.add_argument("--backend", choices=("mongo", "memory", "file"), help="override STORAGE_BACKEND")
+    parser.add_argument("--path", help="store file for the file backend")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from payroll_system.utils.database import db
+
+    db.connect(backend=args.backend, path=args.path)
+    from payroll_system.models.statutory import StatutoryRuleSet
+    from payroll_system.repository.statutory_repository import StatutoryRuleRepository
+
+    repository = StatutoryRuleRepository()
+    failed = 0
+    if args.load:
+        with open(args.load, encoding='utf-8') as f:
+            rule_sets = [StatutoryRuleSet.from_dict(data) for data in json.load(f)]
+        for rule_set in rule_sets:
+            saved = repository.save(rule_set)
+            failed += not saved
+            print(f"  {rule_set.state:<20} {rule_set.effective_from}  {'saved' if saved else 'FAILED'}")
+    elif args.delete:
+        state, effective_from = args.delete
+        if not repository.delete(state, date.fromisoformat(effective_from)):
+            print(f"No rule set for {state} from {effective_from}")
+            failed = 1
+    else:
+        print(f"{'state':<20}{'from':<12}{'PF':>7}{'PF cap':>9}{'ESI':>8}{'ESI below':>11}  PT slabs")
+        for rule_set in repository.get_all():
+            slabs = ', '.join(f"{low:g}-{'' if high is None else f'{high:g}'}: {amount:g}"
+                              for low, high, amount in rule_set.pt_slabs)
+            print(f"{rule_set.state:<20}{str(rule_set.effective_from):<12}{rule_set.pf_rate:>7.2%}"
+                  f"{rule_set.pf_cap:>9,.0f}{rule_set.esi_rate:>8.2%}{rule_set.esi_threshold:>11,.0f}  {slabs}")
+    db.disconnect()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,16 @@
 """
 Database connection utilities for MongoDB
+
+The ``Database`` singleton hands out pymongo-compatible database objects. The
+backend is chosen by ``STORAGE_BACKEND``: a MongoDB server, or the in-process
+store from ``memory_store`` (pure memory or persisted to a local file).
 """
+from typing import Optional
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 import logging
-from payroll_system.config import MONGODB_URI, MONGODB_HOST, MONGODB_PORT, MONGODB_DB_NAME
+from payroll_system.config import (MONGODB_URI, MONGODB_HOST, MONGODB_PORT, MONGODB_DB_NAME,
+                                   STORAGE_BACKEND, STORAGE_PATH, DB_METRICS_ENABLED)
 
 logger = logging.getLogger(__name__)
 
@@ -13,59 +19,115 @@ class Database:
     _instance = None
     _client = None
     _db = None
+    _backend = None
+    _metrics = False
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
         return cls._instance
     
-    def connect(self):
-        """Establish connection to MongoDB"""
+    def connect(self, backend: Optional[str] = None, path: Optional[str] = None,
+                metrics: Optional[bool] = None):
+        """Establish connection to the storage backend.
+
+        ``backend`` and ``path`` override STORAGE_BACKEND / STORAGE_PATH, e.g.
+        ``db.connect(backend="memory")`` in load tests and benchmarks;
+        ``metrics`` overrides DB_METRICS_ENABLED for a new client.
+        """
         try:
-            if self._client is None:
+            backend = backend or STORAGE_BACKEND
+            listeners = self._event_listeners(DB_METRICS_ENABLED if metrics is None else metrics)
+            if self._client is None and backend in ("memory", "file"):
+                from payroll_system.utils.memory_store import MemoryClient
+                
+                store_path = (path or STORAGE_PATH) if backend == "file" else None
+                self._client = MemoryClient(store_path, event_listeners=listeners)
+                self._db = self._client[MONGODB_DB_NAME]
+                self._backend = backend
+                logger.info(f"Using in-process {backend} storage backend")
+                self._create_indexes()
+                self._finish_migrations()
+            elif self._client is None:
                 if MONGODB_URI:
                     # Atlas / SRV / authenticated connection
                     self._client = MongoClient(
                         MONGODB_URI,
                         serverSelectionTimeoutMS=5000,
+                        event_listeners=listeners,
                     )
                 else:
                     # Local/host-port connection
                     self._client = MongoClient(
                         host=MONGODB_HOST,
                         port=MONGODB_PORT,
-                        serverSelectionTimeoutMS=5000
+                        serverSelectionTimeoutMS=5000,
+                        event_listeners=listeners,
                     )
                 # Test connection
                 self._client.admin.command('ping')
                 self._db = self._client[MONGODB_DB_NAME]
+                self._backend = "mongo"
                 if MONGODB_URI:
                     logger.info("Connected to MongoDB via MONGODB_URI")
                 else:
                     logger.info(f"Connected to MongoDB at {MONGODB_HOST}:{MONGODB_PORT}")
                 self._create_indexes()
+                self._finish_migrations()
             return self._db
         except ConnectionFailure as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
             raise
     
+    def _event_listeners(self, metrics: bool) -> list:
+        """Command listeners for a new client (metrics, slow query log)"""
+        if self._client is not None or not metrics:
+            return []
+        from payroll_system.utils.instrumentation import command_metrics, start_metrics_writer
+        
+        start_metrics_writer()
+        self._metrics = True
+        return [command_metrics]
+    
     def _create_indexes(self):
-        """Create necessary indexes for better query performance"""
+        """Create the indexes declared by the repositories (``INDEXES``) that are missing"""
         try:
-            # Employee indexes
-            self._db.employees.create_index("employee_id", unique=True)
-            self._db.employees.create_index("email", unique=True)
-            
-            # Attendance indexes
-            self._db.attendance.create_index([("employee_id", 1), ("date", 1)], unique=True)
+            from payroll_system.utils.indexes import INDEX_MISMATCH, reconcile_indexes
             
-            # Payroll indexes
-            self._db.payrolls.create_index([("employee_id", 1), ("month", 1), ("year", 1)], unique=True)
-            
-            logger.info("Database indexes created successfully")
+            report = reconcile_indexes(self._db)
+            changed = [f"{c}.{n} ({o})" for c, n, o in report if o not in ('ok', 'unknown', INDEX_MISMATCH)]
+            mismatched = [f"{c}.{n}" for c, n, o in report if o == INDEX_MISMATCH]
+            if changed:
+                logger.info(f"Indexes reconciled: {', '.join(changed)}")
+            else:
+                logger.info("Database indexes up to date")
+            if mismatched:
+                logger.warning(f"Indexes differ from their declaration: {', '.join(mismatched)}; "
+                               f"rebuild them with tools.explain_queries --rebuild-indexes")
         except Exception as e:
             logger.warning(f"Error creating indexes: {e}")
     
+    def _finish_migrations(self):
+        """Mark storage migrations with nothing left to convert as complete"""
+        try:
+            from payroll_system.repository.migration_repository import MigrationRepository
+            
+            marked = MigrationRepository().mark_finished()
+            if marked:
+                logger.info(f"Storage migrations complete: {', '.join(marked)}")
+        except Exception as e:
+            logger.warning(f"Error checking storage migrations: {e}")
+    
+    @property
+    def backend(self) -> Optional[str]:
+        """Name of the connected backend ("mongo", "memory" or "file")"""
+        return self._backend
+    
+    @property
+    def metrics_enabled(self) -> bool:
+        """Whether the connected client reports to the command metrics"""
+        return self._metrics
+    
     def get_db(self):
         """Get database instance"""
         if self._db is None:
@@ -78,7 +140,13 @@ class Database:
             self._client.close()
             self._client = None
             self._db = None
-            logger.info("Disconnected from MongoDB")
+            self._backend = None
+            if self._metrics:
+                from payroll_system.utils.instrumentation import stop_metrics_writer
+                
+                stop_metrics_writer()
+                self._metrics = False
+            logger.info("Disconnected from database")
 
 # Global database instance
 db = Database()
@@ -0,0 +1,227 @@
+"""
+Declarative index management and query plan checks
+
+Each repository declares the indexes it relies on (``INDEXES``) and the query
+shapes it issues (``QUERY_SHAPES``). At startup ``reconcile_indexes`` creates
+missing indexes and reports the ones whose keys or options changed; those are
+only rebuilt on request (``tools/explain_queries --rebuild-indexes``), as
+dropping an index on a large collection leaves its queries unindexed until the
+rebuild finishes. ``explain_shapes`` runs ``explain()`` for every declared
+shape and flags collection scans, in-memory sorts and projections that are not
+covered by an index.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Reconcile outcomes
+INDEX_OK = 'ok'
+INDEX_CREATED = 'created'
+INDEX_REBUILT = 'rebuilt'
+INDEX_MISMATCH = 'mismatch'
+INDEX_FAILED = 'failed'
+INDEX_UNKNOWN = 'unknown'
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """One index on one collection"""
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    sparse: bool = False
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if isinstance(self.keys, str):
+            object.__setattr__(self, 'keys', ((self.keys, 1),))
+        else:
+            object.__setattr__(self, 'keys', tuple((f, int(d)) for f, d in self.keys))
+        if self.name is None:
+            # Same naming as pymongo, so indexes created before the registry match
+            object.__setattr__(self, 'name', '_'.join(f"{f}_{d}" for f, d in self.keys))
+
+    def options(self) -> dict:
+        return {'unique': self.unique, 'sparse': self.sparse}
+
+    def matches(self, info: dict) -> bool:
+        """True if an ``index_information()`` entry has these keys and options"""
+        keys = tuple((f, int(d)) for f, d in info.get('key', ()))
+        return (keys == self.keys and bool(info.get('unique')) == self.unique
+                and bool(info.get('sparse')) == self.sparse)
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """A query a repository method issues, with representative values"""
+    name: str
+    collection: str
+    filter: dict
+    projection: Optional[dict] = None
+    sort: Optional[Sequence[Tuple[str, int]]] = None
+    # Tiny lookup tables and free-text search are expected to scan
+    allow_collscan: bool = False
+
+
+@dataclass
+class PlanReport:
+    shape: QueryShape
+    stages: List[str] = field(default_factory=list)
+    index: Optional[str] = None
+    docs_examined: int = 0
+    returned: int = 0
+    problems: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 'COLLSCAN' not in self.problems
+
+
+def _repositories():
+    # Imported here: the repositories import ``db`` from utils.database,
+    # which reconciles indexes on connect.
+    from payroll_system.repository.arrears_repository import ArrearsRepository
+    from payroll_system.repository.attendance_repository import AttendanceRepository
+    from payroll_system.repository.employee_repository import EmployeeRepository
+    from payroll_system.repository.master_data_repository import MasterDataRepository
+    from payroll_system.repository.migration_repository import MigrationRepository
+    from payroll_system.repository.payroll_repository import PayrollRepository
+    from payroll_system.repository.payroll_run_repository import PayrollRunRepository
+    from payroll_system.repository.salary_history_repository import SalaryHistoryRepository
+    from payroll_system.repository.statutory_repository import StatutoryRuleRepository
+
+    return (EmployeeRepository, AttendanceRepository, PayrollRepository,
+            MasterDataRepository, MigrationRepository, StatutoryRuleRepository, ArrearsRepository,
+            SalaryHistoryRepository, PayrollRunRepository)
+
+
+def registered_indexes() -> List[IndexSpec]:
+    """Every index declared by a repository (duplicates removed)"""
+    specs: Dict[tuple, IndexSpec] = {}
+    for repository in _repositories():
+        for spec in getattr(repository, 'INDEXES', ()):
+            specs.setdefault((spec.collection, spec.name), spec)
+    return list(specs.values())
+
+
+def registered_query_shapes() -> List[QueryShape]:
+    shapes = []
+    for repository in _repositories():
+        shapes.extend(getattr(repository, 'QUERY_SHAPES', ()))
+    return shapes
+
+
+def reconcile_indexes(database, specs: Optional[Iterable[IndexSpec]] = None,
+                      rebuild: bool = False, drop_unknown: bool = False) -> List[Tuple[str, str, str]]:
+    """Create missing indexes; rebuild changed ones if ``rebuild`` is set.
+
+    Changed indexes are otherwise left as they are and reported as
+    ``mismatch``. Indexes present in the database but not declared are left
+    alone (and reported) unless ``drop_unknown`` is set. Returns
+    ``(collection, index name, outcome)`` rows.
+    """
+    specs = list(specs if specs is not None else registered_indexes())
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    report = []
+    for name, collection_specs in by_collection.items():
+        collection = database[name]
+        try:
+            existing = collection.index_information()
+        except Exception as e:
+            logger.warning(f"Error reading indexes of {name}: {e}")
+            existing = {}
+        for spec in collection_specs:
+            info = existing.get(spec.name)
+            try:
+                if info is None:
+                    collection.create_index(list(spec.keys), name=spec.name, **spec.options())
+                    outcome = INDEX_CREATED
+                elif spec.matches(info):
+                    outcome = INDEX_OK
+                elif not rebuild:
+                    outcome = INDEX_MISMATCH
+                else:
+                    collection.drop_index(spec.name)
+                    collection.create_index(list(spec.keys), name=spec.name, **spec.options())
+                    outcome = INDEX_REBUILT
+            except Exception as e:
+                logger.warning(f"Error creating index {name}.{spec.name}: {e}")
+                outcome = INDEX_FAILED
+            report.append((name, spec.name, outcome))
+
+        declared = {spec.name for spec in collection_specs}
+        for index_name in existing:
+            if index_name == '_id_' or index_name in declared:
+                continue
+            if drop_unknown:
+                try:
+                    collection.drop_index(index_name)
+                    report.append((name, index_name, 'dropped'))
+                    continue
+                except Exception as e:
+                    logger.warning(f"Error dropping index {name}.{index_name}: {e}")
+            report.append((name, index_name, INDEX_UNKNOWN))
+    return report
+
+
+def plan_stages(plan: dict) -> List[str]:
+    """Stage names of a winning plan, outermost first"""
+    # Slot based engine output nests the classic plan under 'queryPlan'
+    plan = plan.get('queryPlan', plan)
+    stages = [plan.get('stage', '?')]
+    if 'inputStage' in plan:
+        stages += plan_stages(plan['inputStage'])
+    for child in plan.get('inputStages', ()):
+        stages += plan_stages(child)
+    return stages
+
+
+def _index_name(plan: dict) -> Optional[str]:
+    plan = plan.get('queryPlan', plan)
+    if plan.get('stage') == 'IXSCAN':
+        return plan.get('indexName')
+    for child in [plan.get('inputStage')] + list(plan.get('inputStages', ())):
+        if child:
+            name = _index_name(child)
+            if name:
+                return name
+    return None
+
+
+def explain_shape(database, shape: QueryShape) -> PlanReport:
+    """Explain one query shape and list its problems"""
+    report = PlanReport(shape)
+    try:
+        cursor = database[shape.collection].find(shape.filter, shape.projection)
+        if shape.sort:
+            cursor = cursor.sort(list(shape.sort))
+        explained = cursor.explain()
+    except Exception as e:
+        report.error = str(e)
+        return report
+
+    plan = explained.get('queryPlanner', {}).get('winningPlan', {})
+    stats = explained.get('executionStats', {})
+    report.stages = plan_stages(plan)
+    report.index = _index_name(plan)
+    report.docs_examined = stats.get('totalDocsExamined', 0)
+    report.returned = stats.get('nReturned', 0)
+
+    if 'COLLSCAN' in report.stages:
+        report.problems.append('COLLSCAN (expected)' if shape.allow_collscan else 'COLLSCAN')
+    if 'SORT' in report.stages:
+        report.problems.append('in-memory SORT')
+    if shape.projection and 'COLLSCAN' not in report.stages and 'IDHACK' not in report.stages \
+            and 'FETCH' in report.stages:
+        report.problems.append('not covered')
+    return report
+
+
+def explain_shapes(database, shapes: Optional[Iterable[QueryShape]] = None) -> List[PlanReport]:
+    return [explain_shape(database, shape) for shape in (shapes or registered_query_shapes())]
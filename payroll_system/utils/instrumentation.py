@@ -0,0 +1,334 @@
+"""
+Database command instrumentation
+
+A pymongo ``CommandListener`` that records, per calling repository method and
+command: call counts, failures, a latency histogram and bytes returned. Slow
+commands are logged with the shape of their filter (values replaced by type
+names) so they can be matched to a query without leaking data. Instrumentation
+is opt-in (``DB_METRICS_ENABLED``): it costs a short stack walk per command
+and, on MongoDB, encoding each reply to measure it.
+
+Metrics are shown in the Diagnostics page and written periodically to
+METRICS_FILE in the Prometheus text exposition format.
+"""
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+import sys
+import threading
+import time
+
+import bson
+from pymongo import monitoring
+
+from payroll_system.config import METRICS_FILE, METRICS_INTERVAL_S, SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Modules skipped when attributing a command to its caller
+_INTERNAL_MODULES = (
+    'payroll_system.utils.memory_store',
+    'payroll_system.utils.instrumentation',
+    'payroll_system.utils.query_budget',
+    'payroll_system.utils.database',
+)
+
+_REPOSITORY_PACKAGE = 'payroll_system.repository.'
+
+# Frames searched for the caller; repository methods issue their commands
+# within a few frames of the listener
+_MAX_CALLER_DEPTH = 20
+
+# Command document keys holding the query part of each command
+_FILTER_KEYS = ('filter', 'query', 'q', 'pipeline')
+
+
+def query_shape(value):
+    """Replace literal values with their type names, keeping keys and operators"""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(not isinstance(v, (dict, list, tuple)) for v in value):
+            return [type(value[0]).__name__]
+        return [query_shape(v) for v in value]
+    if value is None:
+        return None
+    return type(value).__name__
+
+
+def command_shape(command_name: str, command: dict):
+    """Filter shape of a command document, for grouping and slow query logs"""
+    if command_name in ('update', 'delete'):
+        key = 'updates' if command_name == 'update' else 'deletes'
+        statements = command.get(key) or []
+        return query_shape(statements[0].get('q', {})) if statements else {}
+    for key in _FILTER_KEYS:
+        if key in command:
+            return query_shape(command[key])
+    return {}
+
+
+def _frame_name(frame) -> str:
+    owner = frame.f_locals.get('self')
+    if owner is not None:
+        return f"{type(owner).__name__}.{frame.f_code.co_name}"
+    return f"{frame.f_globals['__name__'].rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+
+
+def calling_source() -> str:
+    """Name of the repository method (or other app function) issuing a command.
+
+    Stops at the first repository frame; a command issued outside the
+    repositories is attributed to the innermost application frame.
+    """
+    frame = sys._getframe(2)
+    fallback = None
+    for _ in range(_MAX_CALLER_DEPTH):
+        if frame is None:
+            break
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith(_REPOSITORY_PACKAGE):
+            return _frame_name(frame)
+        if (fallback is None and module.startswith('payroll_system.')
+                and not module.startswith(_INTERNAL_MODULES)):
+            fallback = frame
+        frame = frame.f_back
+    return _frame_name(fallback) if fallback is not None else 'unknown'
+
+
+class _Metric:
+    __slots__ = ('count', 'errors', 'total_ms', 'max_ms', 'bytes', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, duration_ms: float, reply_bytes: int, failed: bool) -> None:
+        self.count += 1
+        self.errors += failed
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.bytes += reply_bytes
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Approximate percentile (bucket upper bound) in milliseconds"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets[:-1]):
+            seen += count
+            if seen >= target:
+                return float(LATENCY_BUCKETS_MS[i])
+        return self.max_ms
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Collects command metrics keyed by (source, collection, command)"""
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS, slow_log_size: int = 200):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, tuple] = {}
+        self._metrics: Dict[Tuple[str, str, str], _Metric] = {}
+        self.slow_queries: Deque[dict] = deque(maxlen=slow_log_size)
+        self._observers: List = []
+
+    # -- CommandListener -----------------------------------------------------
+
+    def started(self, event) -> None:
+        command = event.command
+        # getMore and killCursors carry a cursor ID under the command name
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = command.get('collection', '')
+        key = (event.connection_id, event.request_id)
+        entry = (calling_source(), collection, command_shape(event.command_name, command))
+        with self._lock:
+            self._pending[key] = entry
+        for observer in list(self._observers):
+            observer(event.command_name, *entry)
+
+    def succeeded(self, event) -> None:
+        # Set by the in-process store, which has no wire reply to measure
+        reply_bytes = getattr(event, 'reply_bytes', None)
+        if reply_bytes is None:
+            try:
+                reply_bytes = len(bson.encode(event.reply))
+            except Exception:
+                reply_bytes = 0
+        self._finish(event, reply_bytes, failed=False)
+
+    def failed(self, event) -> None:
+        self._finish(event, 0, failed=True)
+
+    def _finish(self, event, reply_bytes: int, failed: bool) -> None:
+        with self._lock:
+            entry = self._pending.pop((event.connection_id, event.request_id), None)
+        if entry is None:
+            return
+        source, collection, shape = entry
+        duration_ms = event.duration_micros / 1000.0
+        key = (source, collection, event.command_name)
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = _Metric()
+            metric.observe(duration_ms, reply_bytes, failed)
+        if duration_ms >= self.slow_query_ms:
+            record = {
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'source': source,
+                'collection': collection,
+                'command': event.command_name,
+                'duration_ms': round(duration_ms, 2),
+                'shape': shape,
+            }
+            self.slow_queries.append(record)
+            logger.warning(f"Slow query ({duration_ms:.1f} ms) {source} "
+                           f"{event.command_name} {collection} {shape}")
+
+    # -- observers (query budgets) -------------------------------------------
+
+    def add_observer(self, callback) -> None:
+        """Call ``callback(command_name, source, collection, shape)`` on every command"""
+        self._observers.append(callback)
+
+    def remove_observer(self, callback) -> None:
+        if callback in self._observers:
+            self._observers.remove(callback)
+
+    # -- reporting -----------------------------------------------------------
+
+    def snapshot(self) -> List[dict]:
+        """Per-(source, collection, command) metrics, slowest total first"""
+        with self._lock:
+            items = list(self._metrics.items())
+        rows = []
+        for (source, collection, command), m in items:
+            rows.append({
+                'source': source,
+                'collection': collection,
+                'command': command,
+                'count': m.count,
+                'errors': m.errors,
+                'total_ms': round(m.total_ms, 2),
+                'avg_ms': round(m.total_ms / m.count, 3) if m.count else 0.0,
+                'p95_ms': m.percentile(0.95),
+                'max_ms': round(m.max_ms, 2),
+                'bytes': m.bytes,
+            })
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self.slow_queries.clear()
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        with self._lock:
+            items = [(k, m.count, m.errors, m.total_ms, m.bytes, list(m.buckets))
+                     for k, m in self._metrics.items()]
+        lines = [
+            "# HELP payroll_db_commands_total Database commands issued.",
+            "# TYPE payroll_db_commands_total counter",
+        ]
+
+        def labels(source, collection, command):
+            return f'source="{source}",collection="{collection}",command="{command}"'
+
+        for key, count, *_ in items:
+            lines.append(f"payroll_db_commands_total{{{labels(*key)}}} {count}")
+        lines += [
+            "# HELP payroll_db_command_errors_total Database commands that failed.",
+            "# TYPE payroll_db_command_errors_total counter",
+        ]
+        for key, _, errors, *_ in items:
+            lines.append(f"payroll_db_command_errors_total{{{labels(*key)}}} {errors}")
+        lines += [
+            "# HELP payroll_db_response_bytes_total Bytes returned by the server.",
+            "# TYPE payroll_db_response_bytes_total counter",
+        ]
+        for key, _, _, _, size, _ in items:
+            lines.append(f"payroll_db_response_bytes_total{{{labels(*key)}}} {size}")
+        lines += [
+            "# HELP payroll_db_command_duration_seconds Database command latency.",
+            "# TYPE payroll_db_command_duration_seconds histogram",
+        ]
+        for key, count, _, total_ms, _, buckets in items:
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS_MS, buckets):
+                cumulative += n
+                lines.append(f'payroll_db_command_duration_seconds_bucket{{{labels(*key)},le="{bound / 1000}"}} {cumulative}')
+            lines.append(f'payroll_db_command_duration_seconds_bucket{{{labels(*key)},le="+Inf"}} {count}')
+            lines.append(f"payroll_db_command_duration_seconds_sum{{{labels(*key)}}} {total_ms / 1000:.6f}")
+            lines.append(f"payroll_db_command_duration_seconds_count{{{labels(*key)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        target = Path(path)
+        tmp = target.with_suffix(target.suffix + '.tmp')
+        tmp.write_text(self.render_prometheus(), encoding='utf-8')
+        tmp.replace(target)
+
+
+class MetricsFileWriter(threading.Thread):
+    """Daemon thread writing the metrics file every ``interval`` seconds"""
+
+    def __init__(self, metrics: CommandMetrics, path: str, interval: float):
+        super().__init__(name="metrics-writer", daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self._write()
+
+    def _write(self) -> None:
+        try:
+            self.metrics.write_prometheus(self.path)
+        except OSError as e:
+            logger.warning(f"Error writing metrics file: {e}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._write()
+
+
+# Global metrics collector installed on every database client
+command_metrics = CommandMetrics()
+
+_writer: Optional[MetricsFileWriter] = None
+
+
+def start_metrics_writer() -> None:
+    """Start the periodic metrics file writer (once, if METRICS_FILE is set)"""
+    global _writer
+    if _writer is None and METRICS_FILE:
+        _writer = MetricsFileWriter(command_metrics, METRICS_FILE, METRICS_INTERVAL_S)
+        _writer.start()
+
+
+def stop_metrics_writer() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
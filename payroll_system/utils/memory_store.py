@@ -0,0 +1,1666 @@
+"""
+In-process storage backend
+
+A small stand-in for ``pymongo.MongoClient`` that keeps collections in memory
+(optionally persisted to a local file). It implements the subset of the
+pymongo ``Collection``/``Cursor`` API that the repositories use, including the
+query and update operators below, so the application, load tests and
+benchmarks can run on a machine without a MongoDB server.
+
+Query operators:  $eq $ne $gt $gte $lt $lte $in $nin $exists $type $regex
+                  $not $elemMatch $size $and $or $nor
+Update operators: $set $unset $inc $min $max $setOnInsert $push $addToSet $pull
+Aggregation:      $match $group $sort $skip $limit $project $addFields/$set
+                  $unwind $lookup $count
+
+Cursors support ``explain()`` with MongoDB-shaped plans (COLLSCAN, IXSCAN,
+FETCH, SORT, PROJECTION_COVERED), so index checks run on either backend.
+
+With a backing file, the store is kept as a snapshot plus an append-only log
+next to it (``<path>.log``), both MongoDB Extended JSON (``bson.json_util``),
+so only data is ever read back. Each write command appends the documents it
+changed to the log and syncs it; once the log outgrows the snapshot it is
+compacted into a new snapshot, written to a temporary file and renamed over
+the old one. A ``MemoryClient.batch()`` block and ``close()`` compact once.
+
+Clients created with ``event_listeners`` publish started/succeeded/failed
+command events shaped like pymongo's command monitoring events, so the same
+instrumentation works against either backend.
+"""
+from contextlib import contextmanager, suppress
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import itertools
+import json
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+
+import bson
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (BulkWriteResult, DeleteResult, InsertManyResult,
+                             InsertOneResult, UpdateResult)
+
+_MISSING = object()
+
+ASCENDING = 1
+DESCENDING = -1
+
+# Commands after which a file-backed store is saved
+_WRITE_COMMANDS = ('insert', 'update', 'delete', 'bulkWrite')
+
+# Canonical Extended JSON keeps BSON types (int vs double, dates, ObjectIds)
+_JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS
+
+# The log is compacted once it outgrows both this and the snapshot
+COMPACT_MIN_LOG_BYTES = 1 << 20
+
+
+# ---------------------------------------------------------------------------
+# Document helpers
+# ---------------------------------------------------------------------------
+
+def _copy(value):
+    """Copy a document; cheaper than deepcopy for BSON-like data"""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _get_path(doc, path: str):
+    """Return all values at a dotted path, descending into arrays"""
+    values = [doc]
+    for part in path.split('.'):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    found.append(value[int(part)])
+                else:
+                    for item in value:
+                        if isinstance(item, dict) and part in item:
+                            found.append(item[part])
+        values = found
+        if not values:
+            return []
+    return values
+
+
+def _get_one(doc, path: str, default=None):
+    """Return the first value at a dotted path"""
+    values = _get_path(doc, path)
+    return values[0] if values else default
+
+
+def _set_path(doc: dict, path: str, value) -> None:
+    parts = path.split('.')
+    target = doc
+    for part in parts[:-1]:
+        if isinstance(target, list):
+            target = target[int(part)]
+            continue
+        nxt = target.get(part)
+        if not isinstance(nxt, (dict, list)):
+            nxt = {}
+            target[part] = nxt
+        target = nxt
+    last = parts[-1]
+    if isinstance(target, list):
+        index = int(last)
+        while len(target) <= index:
+            target.append(None)
+        target[index] = value
+    else:
+        target[last] = value
+
+
+def _unset_path(doc: dict, path: str) -> None:
+    parts = path.split('.')
+    target = doc
+    for part in parts[:-1]:
+        if isinstance(target, list):
+            if not part.isdigit() or int(part) >= len(target):
+                return
+            target = target[int(part)]
+        elif isinstance(target, dict) and part in target:
+            target = target[part]
+        else:
+            return
+    if isinstance(target, dict):
+        target.pop(parts[-1], None)
+    elif isinstance(target, list) and parts[-1].isdigit() and int(parts[-1]) < len(target):
+        target[int(parts[-1])] = None
+
+
+def _type_rank(value) -> int:
+    """BSON comparison order of type brackets"""
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, (datetime, date)):
+        return 9
+    return 10
+
+
+_NUMBER_TYPES = ('int', 'long', 'double')
+
+
+def _bson_type(value) -> str:
+    """BSON type alias of a value, as used by $type"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int' if -2**31 <= value < 2**31 else 'long'
+    if isinstance(value, float):
+        return 'double'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, dict):
+        return 'object'
+    if isinstance(value, list):
+        return 'array'
+    if isinstance(value, ObjectId):
+        return 'objectId'
+    if isinstance(value, (datetime, date)):
+        return 'date'
+    return 'unknown'
+
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def _compare(a, b) -> Optional[int]:
+    """Compare two values within the same type bracket, None if incomparable"""
+    if _type_rank(a) != _type_rank(b):
+        return None
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        return None
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return ('__dict__', tuple((k, _hashable(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return ('__list__', tuple(_hashable(v) for v in value))
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Query matching
+# ---------------------------------------------------------------------------
+
+# id(list) -> (list, set) for long all-string $in lists, so matching a
+# document is a set lookup instead of a scan of the list. The list itself is
+# kept so its id cannot be reused while cached.
+_IN_SETS: Dict[int, tuple] = {}
+_IN_SET_MIN = 16
+
+
+def _string_set(arg) -> Optional[set]:
+    if not isinstance(arg, (list, tuple)) or len(arg) < _IN_SET_MIN:
+        return None
+    cached = _IN_SETS.get(id(arg))
+    if cached is not None and cached[0] is arg:
+        return cached[1]
+    if not all(isinstance(item, str) for item in arg):
+        return None
+    if len(_IN_SETS) >= 64:
+        _IN_SETS.clear()
+    members = set(arg)
+    _IN_SETS[id(arg)] = (arg, members)
+    return members
+
+
+def _match_operator(values: List[Any], op: str, arg) -> bool:
+    if op == '$eq':
+        return _match_equal(values, arg)
+    if op == '$ne':
+        return not _match_equal(values, arg)
+    if op in ('$gt', '$gte', '$lt', '$lte'):
+        for value in _expand(values):
+            cmp = _compare(value, arg)
+            if cmp is None:
+                continue
+            if ((op == '$gt' and cmp > 0) or (op == '$gte' and cmp >= 0)
+                    or (op == '$lt' and cmp < 0) or (op == '$lte' and cmp <= 0)):
+                return True
+        return False
+    if op == '$in':
+        members = _string_set(arg)
+        if members is not None:
+            return any(v in members for v in _expand(values) if isinstance(v, str))
+        return any(_match_equal(values, item) for item in arg)
+    if op == '$nin':
+        return not any(_match_equal(values, item) for item in arg)
+    if op == '$exists':
+        return bool(values) == bool(arg)
+    if op == '$regex':
+        pattern = arg if hasattr(arg, 'search') else re.compile(arg)
+        return any(isinstance(v, str) and pattern.search(v) for v in _expand(values))
+    if op == '$not':
+        return not _match_condition(values, arg)
+    if op == '$elemMatch':
+        for value in values:
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict) and _matches(item, arg):
+                        return True
+        return False
+    if op == '$size':
+        return any(isinstance(v, list) and len(v) == arg for v in values)
+    if op == '$type':
+        # Like MongoDB, an array matches by its own type or any element's
+        wanted = arg if isinstance(arg, (list, tuple)) else [arg]
+        return any(_bson_type(v) in wanted or ('number' in wanted and _bson_type(v) in _NUMBER_TYPES)
+                   for v in _expand(values))
+    if op == '$options':
+        return True
+    raise OperationFailure(f"unknown operator: {op}")
+
+
+def _expand(values: List[Any]) -> List[Any]:
+    """Values plus the elements of any array values"""
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _match_equal(values: List[Any], target) -> bool:
+    if target is None:
+        return not values or any(v is None for v in _expand(values))
+    if hasattr(target, 'search') and not isinstance(target, str):
+        return any(isinstance(v, str) and target.search(v) for v in _expand(values))
+    for value in _expand(values):
+        if _type_rank(value) == _type_rank(target) and value == target:
+            return True
+    return False
+
+
+def _match_condition(values: List[Any], condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+        if '$regex' in condition:
+            flags = 0
+            for flag in condition.get('$options', ''):
+                flags |= {'i': re.IGNORECASE, 'm': re.MULTILINE,
+                          's': re.DOTALL, 'x': re.VERBOSE}.get(flag, 0)
+            regex = condition['$regex']
+            pattern = regex if hasattr(regex, 'search') else re.compile(regex, flags)
+            rest = {k: v for k, v in condition.items() if k not in ('$regex', '$options')}
+            return (_match_operator(values, '$regex', pattern)
+                    and all(_match_operator(values, op, arg) for op, arg in rest.items()))
+        return all(_match_operator(values, op, arg) for op, arg in condition.items())
+    return _match_equal(values, condition)
+
+
+def _matches(doc: dict, query: Optional[dict]) -> bool:
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == '$nor':
+            if any(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == '$expr':
+            if not _evaluate(doc, condition):
+                return False
+        elif not _match_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Updates
+# ---------------------------------------------------------------------------
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False) -> bool:
+    """Apply update operators in place; return True if the document changed"""
+    before = _copy(doc)
+    if update and not any(k.startswith('$') for k in update):
+        # Replacement document
+        keep_id = doc.get('_id')
+        doc.clear()
+        doc.update(_copy(update))
+        if keep_id is not None:
+            doc['_id'] = keep_id
+        return doc != before
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == '$set':
+                _set_path(doc, path, _copy(value))
+            elif op == '$setOnInsert':
+                if inserting:
+                    _set_path(doc, path, _copy(value))
+            elif op == '$unset':
+                _unset_path(doc, path)
+            elif op == '$inc':
+                _set_path(doc, path, _get_one(doc, path, 0) + value)
+            elif op == '$min':
+                current = _get_one(doc, path, _MISSING)
+                if current is _MISSING or (_compare(value, current) or 0) < 0:
+                    _set_path(doc, path, value)
+            elif op == '$max':
+                current = _get_one(doc, path, _MISSING)
+                if current is _MISSING or (_compare(value, current) or 0) > 0:
+                    _set_path(doc, path, value)
+            elif op in ('$push', '$addToSet'):
+                current = _get_one(doc, path, _MISSING)
+                if current is _MISSING:
+                    current = []
+                    _set_path(doc, path, current)
+                items = value['$each'] if isinstance(value, dict) and '$each' in value else [value]
+                for item in items:
+                    if op == '$push' or item not in current:
+                        current.append(_copy(item))
+            elif op == '$pull':
+                current = _get_one(doc, path, _MISSING)
+                if isinstance(current, list):
+                    if isinstance(value, dict):
+                        current[:] = [i for i in current
+                                      if not (_matches(i, value) if isinstance(i, dict)
+                                              else _match_condition([i], value))]
+                    else:
+                        current[:] = [i for i in current if i != value]
+            else:
+                raise OperationFailure(f"Unknown modifier: {op}")
+    return doc != before
+
+
+def _upsert_seed(query: dict) -> dict:
+    """Document fields implied by the equality parts of a filter"""
+    seed = {}
+    for key, condition in (query or {}).items():
+        if key.startswith('$'):
+            if key == '$and':
+                for sub in condition:
+                    seed.update(_upsert_seed(sub))
+            continue
+        if isinstance(condition, dict) and any(k.startswith('$') for k in condition):
+            if '$eq' in condition:
+                _set_path(seed, key, _copy(condition['$eq']))
+            continue
+        _set_path(seed, key, _copy(condition))
+    return seed
+
+
+# ---------------------------------------------------------------------------
+# Projection and sorting
+# ---------------------------------------------------------------------------
+
+def _project(doc: dict, projection) -> dict:
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get('_id', 1)
+    fields = {k: v for k, v in projection.items() if k != '_id'}
+    if fields and all(v for v in fields.values()):
+        result = {}
+        if include_id and '_id' in doc:
+            result['_id'] = doc['_id']
+        for path in fields:
+            value = _get_one(doc, path, _MISSING)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+        return result
+    result = dict(doc)
+    for path in fields:
+        _unset_path(result, path)
+    if not include_id:
+        result.pop('_id', None)
+    return result
+
+
+def _project_stage(doc: dict, spec: dict) -> dict:
+    """$project stage: inclusion/exclusion flags plus computed fields"""
+    def is_flag(value):
+        return isinstance(value, (bool, int)) and value in (0, 1)
+
+    fields = {k: v for k, v in spec.items() if k != '_id'}
+    if fields and all(is_flag(v) and not v for v in fields.values()):
+        return _project(doc, spec)
+    row = {}
+    id_spec = spec.get('_id', 1)
+    if not is_flag(id_spec):
+        row['_id'] = _evaluate(doc, id_spec)
+    elif id_spec and '_id' in doc:
+        row['_id'] = doc['_id']
+    for path, value in fields.items():
+        if is_flag(value):
+            found = _get_one(doc, path, _MISSING)
+            if value and found is not _MISSING:
+                _set_path(row, path, found)
+        else:
+            _set_path(row, path, _evaluate(doc, value))
+    return row
+
+
+def _normalize_sort(key_or_list, direction=None) -> List[tuple]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or ASCENDING)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+def _sort_docs(docs: List[dict], spec: List[tuple]) -> List[dict]:
+    for key, direction in reversed(spec):
+        docs.sort(key=lambda d, k=key: _sort_key(_get_one(d, k, None)),
+                  reverse=direction == DESCENDING)
+    return docs
+
+
+# ---------------------------------------------------------------------------
+# Aggregation expressions
+# ---------------------------------------------------------------------------
+
+def _evaluate(doc: dict, expr):
+    if isinstance(expr, str):
+        if expr.startswith('$$ROOT'):
+            return doc
+        if expr.startswith('$'):
+            return _get_one(doc, expr[1:], None)
+        return expr
+    if isinstance(expr, list):
+        return [_evaluate(doc, e) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) == 1:
+        op, args = next(iter(expr.items()))
+        if op.startswith('$'):
+            return _evaluate_operator(doc, op, args)
+    return {k: _evaluate(doc, v) for k, v in expr.items()}
+
+
+def _evaluate_operator(doc: dict, op: str, args):
+    if op == '$literal':
+        return args
+    if op == '$cond':
+        if isinstance(args, dict):
+            args = [args['if'], args['then'], args['else']]
+        return _evaluate(doc, args[1] if _evaluate(doc, args[0]) else args[2])
+    if op == '$ifNull':
+        values = [_evaluate(doc, a) for a in args]
+        return next((v for v in values[:-1] if v is not None), values[-1])
+    values = [_evaluate(doc, a) for a in (args if isinstance(args, list) else [args])]
+    if op == '$add':
+        return sum(v or 0 for v in values)
+    if op == '$subtract':
+        return (values[0] or 0) - (values[1] or 0)
+    if op == '$multiply':
+        result = 1
+        for v in values:
+            result *= v or 0
+        return result
+    if op == '$divide':
+        return (values[0] or 0) / values[1] if values[1] else None
+    if op == '$abs':
+        return abs(values[0]) if values[0] is not None else None
+    if op == '$round':
+        return round(values[0], values[1] if len(values) > 1 else 0)
+    if op in ('$eq', '$ne', '$gt', '$gte', '$lt', '$lte'):
+        cmp = _compare(values[0], values[1])
+        if cmp is None:
+            cmp = (_type_rank(values[0]) > _type_rank(values[1])) - (_type_rank(values[0]) < _type_rank(values[1]))
+        return {'$eq': cmp == 0, '$ne': cmp != 0, '$gt': cmp > 0,
+                '$gte': cmp >= 0, '$lt': cmp < 0, '$lte': cmp <= 0}[op]
+    if op == '$and':
+        return all(values)
+    if op == '$or':
+        return any(values)
+    if op == '$not':
+        return not values[0]
+    if op == '$in':
+        return values[0] in (values[1] or [])
+    if op == '$concat':
+        return ''.join(str(v) for v in values if v is not None)
+    if op == '$toString':
+        return str(values[0]) if values[0] is not None else None
+    if op in ('$sum', '$max', '$min', '$avg'):
+        items = values[0] if len(values) == 1 and isinstance(values[0], list) else values
+        items = [v for v in items if isinstance(v, (int, float))]
+        if op == '$sum':
+            return sum(items)
+        if not items:
+            return None
+        if op == '$avg':
+            return sum(items) / len(items)
+        return max(items) if op == '$max' else min(items)
+    raise OperationFailure(f"Unsupported expression operator: {op}")
+
+
+def _getter(expr):
+    """Fast evaluator for the common ``'$field'`` and constant expressions"""
+    if isinstance(expr, str) and expr.startswith('$') and not expr.startswith('$$') and '.' not in expr:
+        field = expr[1:]
+        return lambda doc: doc.get(field)
+    if isinstance(expr, (int, float)) and not isinstance(expr, bool):
+        return lambda doc: expr
+    return lambda doc: _evaluate(doc, expr)
+
+
+class _Accumulator:
+    __slots__ = ('op', 'expr', 'get', 'value', 'count')
+
+    def __init__(self, op: str, expr):
+        self.op = op
+        self.expr = expr
+        self.get = _getter(expr)
+        self.count = 0
+        self.value = [] if op in ('$push', '$addToSet') else None
+
+    def add(self, doc: dict):
+        value = self.get(doc)
+        op = self.op
+        if op == '$sum':
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.value = (self.value or 0) + value
+            elif self.value is None:
+                self.value = 0
+        elif op == '$avg':
+            if isinstance(value, (int, float)):
+                self.value = (self.value or 0) + value
+                self.count += 1
+        elif op == '$min':
+            if value is not None and (self.value is None or (_compare(value, self.value) or 0) < 0):
+                self.value = value
+        elif op == '$max':
+            if value is not None and (self.value is None or (_compare(value, self.value) or 0) > 0):
+                self.value = value
+        elif op == '$first':
+            if self.count == 0:
+                self.value = value
+            self.count += 1
+        elif op == '$last':
+            self.value = value
+        elif op == '$push':
+            self.value.append(value)
+        elif op == '$addToSet':
+            if value not in self.value:
+                self.value.append(value)
+        else:
+            raise OperationFailure(f"Unsupported accumulator: {op}")
+
+    def result(self):
+        if self.op == '$avg':
+            return self.value / self.count if self.count else None
+        return self.value
+
+
+def _group(docs: Iterable[dict], spec: dict) -> List[dict]:
+    id_expr = spec['_id']
+    fields = {name: next(iter(acc.items())) for name, acc in spec.items() if name != '_id'}
+    groups: Dict[Any, tuple] = {}
+    get_key = _getter(id_expr)
+    for doc in docs:
+        key = get_key(doc)
+        hkey = _hashable(key)
+        entry = groups.get(hkey)
+        if entry is None:
+            entry = (key, {name: _Accumulator(op, expr) for name, (op, expr) in fields.items()})
+            groups[hkey] = entry
+        for acc in entry[1].values():
+            acc.add(doc)
+    results = []
+    for key, accs in groups.values():
+        row = {'_id': key}
+        for name, acc in accs.items():
+            row[name] = acc.result()
+        results.append(row)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Command monitoring
+# ---------------------------------------------------------------------------
+
+class _CommandEvent:
+    """Attribute-compatible stand-in for pymongo's command monitoring events"""
+
+    def __init__(self, command_name: str, database_name: str, request_id: int,
+                 connection_id, **fields):
+        self.command_name = command_name
+        self.database_name = database_name
+        self.request_id = request_id
+        self.operation_id = request_id
+        self.connection_id = connection_id
+        self.__dict__.update(fields)
+
+
+def _bson_size(docs: Iterable[dict]) -> int:
+    total = 0
+    for doc in docs:
+        try:
+            total += len(bson.encode(doc))
+        except Exception:
+            pass
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Cursor
+# ---------------------------------------------------------------------------
+
+class MemoryCursor:
+    """Lazy cursor mirroring ``pymongo.cursor.Cursor``"""
+
+    def __init__(self, collection: 'MemoryCollection', filter=None, projection=None,
+                 sort=None, skip: int = 0, limit: int = 0, batch_size: int = 0, **kwargs):
+        self._collection = collection
+        self._filter = filter or {}
+        self._projection = projection
+        self._sort = _normalize_sort(sort) if sort else []
+        self._skip = skip
+        self._limit = limit
+        self._batch_size = batch_size
+        self._iterator = None
+
+    def sort(self, key_or_list, direction=None) -> 'MemoryCursor':
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> 'MemoryCursor':
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> 'MemoryCursor':
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> 'MemoryCursor':
+        self._batch_size = batch_size
+        return self
+
+    def hint(self, index) -> 'MemoryCursor':
+        return self
+
+    def _select(self):
+        docs = self._collection._scan(self._filter)
+        if self._sort:
+            docs = _sort_docs(list(docs), self._sort)
+        if self._skip or self._limit:
+            stop = self._skip + self._limit if self._limit else None
+            docs = itertools.islice(docs, self._skip, stop)
+        projection = self._projection
+        return (_project(_copy(doc), projection) for doc in docs)
+
+    def explain(self) -> dict:
+        """Query plan in the shape of MongoDB's ``explain()`` output"""
+        collection = self._collection
+        started = time.perf_counter()
+        index, ids = collection._plan(self._filter)
+        returned = sum(1 for _ in self._select())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        projection = self._projection
+        covered = False
+        sort_index = None
+        if index is None and self._sort:
+            # Like MongoDB, walk a whole index to avoid sorting in memory
+            sort_index = next((ix for ix in collection._indexes.values()
+                               if not ix.sparse and _provides_sort(ix, {}, self._sort)), None)
+        if sort_index is not None:
+            plan = {'stage': 'FETCH', 'filter': self._filter,
+                    'inputStage': {'stage': 'IXSCAN', 'indexName': sort_index.name,
+                                   'keyPattern': dict(sort_index.keys), 'isMultiKey': False,
+                                   'isUnique': sort_index.unique}}
+            index, keys_examined = sort_index, len(collection._docs)
+        elif index is None:
+            plan = {'stage': 'COLLSCAN', 'filter': self._filter, 'direction': 'forward'}
+            keys_examined = 0
+        elif index == '_id_':
+            plan = {'stage': 'IDHACK'}
+            keys_examined = len(ids)
+        elif isinstance(index, _OrPlan):
+            plan = {'stage': 'FETCH', 'filter': self._filter, 'inputStage': {'stage': 'OR', 'inputStages': [
+                {'stage': 'IXSCAN', 'indexName': branch.name, 'keyPattern': dict(branch.keys),
+                 'isMultiKey': False, 'isUnique': branch.unique} for branch in index.branches]}}
+            keys_examined = len(ids)
+        else:
+            ixscan = {'stage': 'IXSCAN', 'indexName': index.name, 'keyPattern': dict(index.keys),
+                      'isMultiKey': False, 'isUnique': index.unique}
+            covered = _covered_by(index, self._filter, projection)
+            plan = (dict(stage='PROJECTION_COVERED', inputStage=ixscan) if covered
+                    else dict(stage='FETCH', inputStage=ixscan))
+            keys_examined = len(ids)
+        if self._sort and not (isinstance(index, _Index) and _provides_sort(index, self._filter, self._sort)):
+            plan = {'stage': 'SORT', 'sortPattern': dict(self._sort), 'inputStage': plan}
+        if self._limit:
+            plan = {'stage': 'LIMIT', 'limitAmount': self._limit, 'inputStage': plan}
+        if projection and not covered:
+            plan = {'stage': 'PROJECTION_SIMPLE', 'transformBy': projection, 'inputStage': plan}
+        return {
+            'queryPlanner': {
+                'namespace': collection.full_name,
+                'parsedQuery': self._filter,
+                'winningPlan': plan,
+                'rejectedPlans': [],
+            },
+            'executionStats': {
+                'nReturned': returned,
+                'executionTimeMillis': round(elapsed_ms),
+                'totalKeysExamined': keys_examined,
+                'totalDocsExamined': 0 if covered else (len(collection._docs) if ids is None else len(ids)),
+            },
+            'ok': 1.0,
+        }
+
+    def _run(self):
+        collection = self._collection
+        client = collection.database.client
+        if not client._listeners:
+            return self._select()
+        command = {'find': collection.name, 'filter': self._filter}
+        if self._sort:
+            command['sort'] = dict(self._sort)
+        if self._projection:
+            command['projection'] = self._projection
+        if self._limit:
+            command['limit'] = self._limit
+        # Monitored reads are materialized so the event covers the whole query
+        docs = client._command(collection.database.name, 'find', command,
+                               lambda: list(self._select()), reply_docs=lambda r: r)
+        return iter(docs)
+
+    def __iter__(self):
+        if self._iterator is None:
+            self._iterator = self._run()
+        return self._iterator
+
+    def __next__(self):
+        return next(iter(self))
+
+    def next(self):
+        return self.__next__()
+
+    @property
+    def alive(self) -> bool:
+        return True
+
+    def close(self):
+        self._iterator = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MemoryCommandCursor(MemoryCursor):
+    """Cursor over precomputed aggregation results"""
+
+    def __init__(self, docs: List[dict]):
+        self._docs = docs
+        self._iterator = None
+
+    def _run(self):
+        return iter(self._docs)
+
+
+_RANGE_OPERATORS = frozenset(('$gt', '$gte', '$lt', '$lte'))
+
+
+def _in_range(key, condition: dict) -> bool:
+    """True if an index key satisfies every range operator in ``condition``"""
+    if isinstance(key, tuple):
+        return False
+    return all(_match_operator([key], op, arg) for op, arg in condition.items())
+
+
+def _equality_fields(query: dict) -> set:
+    return {field for field, condition in query.items()
+            if not field.startswith('$') and not (isinstance(condition, dict)
+                                                  and any(k.startswith('$') for k in condition))}
+
+
+def _covered_by(index, query: dict, projection) -> bool:
+    """True if the index alone can answer the query and projection"""
+    if not projection:
+        return False
+    fields = {field for field, _ in index.keys}
+    included = {k for k, v in projection.items() if v and k != '_id'}
+    return (projection.get('_id', 1) == 0 and bool(included) and included <= fields
+            and all(not k.startswith('$') and k in fields for k in query))
+
+
+def _provides_sort(index, query: dict, sort: list) -> bool:
+    """True if walking the index returns documents in ``sort`` order"""
+    keys = list(index.keys)
+    equal = _equality_fields(query)
+    while keys and keys[0][0] in equal and keys[0][0] not in dict(sort):
+        keys.pop(0)
+    if len(keys) < len(sort):
+        return False
+    same = all(k == f and d == kd for (f, d), (k, kd) in zip(sort, keys))
+    reverse = all(k == f and d == -kd for (f, d), (k, kd) in zip(sort, keys))
+    return same or reverse
+
+
+# ---------------------------------------------------------------------------
+# Collection / database / client
+# ---------------------------------------------------------------------------
+
+class _Index:
+    __slots__ = ('name', 'keys', 'unique', 'sparse', 'postings', 'unique_keys')
+
+    def __init__(self, name: str, keys: List[tuple], unique: bool = False, sparse: bool = False):
+        self.name = name
+        self.keys = keys
+        self.unique = unique
+        self.sparse = sparse
+        # first-field value -> {_id: None} (insertion ordered), used to narrow scans
+        self.postings: Dict[Any, dict] = {}
+        # full key -> _id, used to enforce uniqueness
+        self.unique_keys: Dict[tuple, Any] = {}
+
+    def full_key(self, doc: dict) -> tuple:
+        return tuple(_hashable(_get_one(doc, field, None)) for field, _ in self.keys)
+
+    def first_key(self, doc: dict):
+        return _hashable(_get_one(doc, self.keys[0][0], None))
+
+    def skip(self, doc: dict) -> bool:
+        return self.sparse and not _get_path(doc, self.keys[0][0])
+
+
+class _OrPlan:
+    """A top-level ``$or`` whose branches are each served by an index"""
+
+    def __init__(self, branches: List['_Index']):
+        self.branches = branches
+
+
+class MemoryCollection:
+    """In-memory collection mirroring ``pymongo.collection.Collection``"""
+
+    def __init__(self, database: 'MemoryDatabase', name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, dict] = {}
+        self._indexes: Dict[str, _Index] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+    # -- indexes -------------------------------------------------------------
+
+    def create_index(self, keys, unique: bool = False, name: Optional[str] = None,
+                     sparse: bool = False, **kwargs) -> str:
+        keys = _normalize_sort(keys, ASCENDING)
+        name = name or '_'.join(f"{field}_{direction}" for field, direction in keys)
+        with self._lock:
+            if name in self._indexes:
+                return name
+            index = _Index(name, keys, unique=unique, sparse=sparse)
+            for _id, doc in self._docs.items():
+                self._index_add(index, _id, doc)
+            self._indexes[name] = index
+        self.database.client._written()
+        return name
+
+    def create_indexes(self, indexes) -> List[str]:
+        names = []
+        for model in indexes:
+            document = getattr(model, 'document', model)
+            keys = list(document['key'].items())
+            options = {k: v for k, v in document.items() if k not in ('key',)}
+            names.append(self.create_index(keys, **options))
+        return names
+
+    def drop_index(self, name) -> None:
+        with self._lock:
+            if name not in self._indexes:
+                raise OperationFailure(f"index not found with name [{name}]")
+            del self._indexes[name]
+        self.database.client._written()
+
+    def index_information(self) -> Dict[str, dict]:
+        info = {'_id_': {'key': [('_id', 1)], 'v': 2}}
+        for name, index in self._indexes.items():
+            entry = {'key': list(index.keys), 'v': 2}
+            if index.unique:
+                entry['unique'] = True
+            if index.sparse:
+                entry['sparse'] = True
+            info[name] = entry
+        return info
+
+    def list_indexes(self):
+        return MemoryCommandCursor([dict(info, name=name) for name, info in self.index_information().items()])
+
+    def _index_add(self, index: _Index, _id, doc: dict) -> None:
+        if index.skip(doc):
+            return
+        if index.unique:
+            key = index.full_key(doc)
+            owner = index.unique_keys.get(key, _MISSING)
+            if owner is not _MISSING and owner != _id:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.full_name} "
+                    f"index: {index.name} dup key: {dict(zip([f for f, _ in index.keys], key))}",
+                    11000)
+            index.unique_keys[key] = _id
+        index.postings.setdefault(index.first_key(doc), {})[_id] = None
+
+    def _index_remove(self, index: _Index, _id, doc: dict) -> None:
+        if index.skip(doc):
+            return
+        if index.unique:
+            key = index.full_key(doc)
+            if index.unique_keys.get(key) == _id:
+                del index.unique_keys[key]
+        ids = index.postings.get(index.first_key(doc))
+        if ids:
+            ids.pop(_id, None)
+            if not ids:
+                del index.postings[index.first_key(doc)]
+
+    def _check_unique(self, _id, doc: dict) -> None:
+        for index in self._indexes.values():
+            if index.unique and not index.skip(doc):
+                owner = index.unique_keys.get(index.full_key(doc), _MISSING)
+                if owner is not _MISSING and owner != _id:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.full_name} "
+                        f"index: {index.name}", 11000)
+
+    # -- scanning ------------------------------------------------------------
+
+    def _plan(self, query: dict):
+        """Pick the index narrowing a scan on an equality/$in field.
+
+        Returns ``(index, candidate _ids)``; ``index`` is None for a full scan
+        and ``'_id_'`` for a direct ``_id`` lookup.
+        """
+        if not query:
+            return None, None
+        if '_id' in query and not isinstance(query['_id'], dict):
+            return '_id_', ([query['_id']] if query['_id'] in self._docs else [])
+        if set(query) == {'$or'}:
+            # Union of one index scan per branch, if every branch has one
+            branches = [self._plan(branch) for branch in query['$or']]
+            if branches and all(isinstance(index, _Index) for index, _ in branches):
+                ids = list(dict.fromkeys(i for _, branch_ids in branches for i in branch_ids))
+                return _OrPlan([index for index, _ in branches]), ids
+            return None, None
+        best, best_index = None, None
+        for index in self._indexes.values():
+            field = index.keys[0][0]
+            # Sparse indexes qualify too: documents without the field can
+            # only match null, $exists or $ne conditions, which are not planned
+            if field not in query:
+                continue
+            condition = query[field]
+            if isinstance(condition, dict) and any(k.startswith('$') for k in condition):
+                if set(condition) <= _RANGE_OPERATORS:
+                    ids = [i for key, posting in index.postings.items()
+                           if _in_range(key, condition) for i in posting]
+                    if best is None or len(ids) < len(best):
+                        best, best_index = ids, index
+                    continue
+                if set(condition) != {'$in'}:
+                    continue
+                values = condition['$in']
+            else:
+                values = [condition]
+            if any(hasattr(v, 'search') or isinstance(v, (list, dict)) or v is None for v in values):
+                continue
+            ids = []
+            for v in values:
+                ids.extend(index.postings.get(_hashable(v), ()))
+            if best is None or len(ids) < len(best):
+                best, best_index = ids, index
+        return best_index, best
+
+    def _candidates(self, query: dict):
+        """Narrow the scan with an index on an equality/$in field"""
+        return self._plan(query)[1]
+
+    def _scan(self, query: dict):
+        with self._lock:
+            ids = self._candidates(query)
+            if ids is None:
+                docs = list(self._docs.values())
+            else:
+                docs = [self._docs[i] for i in ids if i in self._docs]
+        return (doc for doc in docs if _matches(doc, query))
+
+    # -- reads ---------------------------------------------------------------
+
+    def find(self, filter=None, projection=None, *args, **kwargs) -> MemoryCursor:
+        return MemoryCursor(self, filter, projection, **kwargs)
+
+    def find_one(self, filter=None, projection=None, *args, **kwargs) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {'_id': filter}
+        for doc in MemoryCursor(self, filter, projection, limit=1, **kwargs):
+            return doc
+        return None
+
+    def _command(self, name: str, command: dict, run, reply_docs=None):
+        client = self.database.client
+        if not client._listeners:
+            try:
+                return run()
+            finally:
+                client._command_done(name)
+        return client._command(self.database.name, name, dict({name: self.name}, **command),
+                               run, reply_docs=reply_docs)
+
+    def count_documents(self, filter: dict, **kwargs) -> int:
+        count = self._command('aggregate', {'pipeline': [{'$match': filter}, {'$count': 'n'}]},
+                              lambda: sum(1 for _ in self._scan(filter)))
+        skip = kwargs.get('skip', 0)
+        limit = kwargs.get('limit', 0)
+        count = max(count - skip, 0)
+        return min(count, limit) if limit else count
+
+    def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    def distinct(self, key: str, filter=None, **kwargs) -> list:
+        def run():
+            seen = {}
+            for doc in self._scan(filter or {}):
+                for value in _expand(_get_path(doc, key)):
+                    if not isinstance(value, list):
+                        seen.setdefault(_hashable(value), value)
+            return list(seen.values())
+        return self._command('distinct', {'key': key, 'query': filter or {}}, run)
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> MemoryCommandCursor:
+        return MemoryCommandCursor(self._command('aggregate', {'pipeline': pipeline},
+                                                 lambda: self._aggregate(pipeline),
+                                                 reply_docs=lambda r: r))
+
+    def _aggregate(self, pipeline: List[dict]) -> List[dict]:
+        docs: Iterable[dict] = None
+        stages = list(pipeline)
+        if stages and '$match' in stages[0]:
+            docs = self._scan(stages.pop(0)['$match'])
+        else:
+            docs = iter(list(self._docs.values()))
+        # $group only reads its input, so documents need no private copy
+        if not (stages and next(iter(stages[0])) == '$group'):
+            docs = (_copy(d) for d in docs)
+        for stage in stages:
+            (op, arg), = stage.items()
+            if op == '$match':
+                docs = [d for d in docs if _matches(d, arg)]
+            elif op == '$group':
+                docs = _group(docs, arg)
+            elif op == '$sort':
+                docs = _sort_docs(list(docs), _normalize_sort(arg))
+            elif op == '$skip':
+                docs = list(docs)[arg:]
+            elif op == '$limit':
+                docs = list(docs)[:arg]
+            elif op == '$project':
+                docs = [_project_stage(d, arg) for d in docs]
+            elif op in ('$addFields', '$set'):
+                new_docs = []
+                for d in docs:
+                    for k, expr in arg.items():
+                        _set_path(d, k, _evaluate(d, expr))
+                    new_docs.append(d)
+                docs = new_docs
+            elif op == '$unwind':
+                path = arg if isinstance(arg, str) else arg['path']
+                keep_empty = isinstance(arg, dict) and arg.get('preserveNullAndEmptyArrays')
+                new_docs = []
+                for d in docs:
+                    values = _get_one(d, path[1:], None)
+                    if isinstance(values, list) and values:
+                        for v in values:
+                            row = _copy(d)
+                            _set_path(row, path[1:], v)
+                            new_docs.append(row)
+                    elif keep_empty or (values is not None and not isinstance(values, list)):
+                        new_docs.append(d)
+                docs = new_docs
+            elif op == '$lookup':
+                foreign = self.database[arg['from']]
+                new_docs = []
+                for d in docs:
+                    local = _get_one(d, arg['localField'], None)
+                    cond = {'$in': local} if isinstance(local, list) else local
+                    d[arg['as']] = [_copy(f) for f in foreign._scan({arg['foreignField']: cond})]
+                    new_docs.append(d)
+                docs = new_docs
+            elif op == '$count':
+                docs = [{arg: sum(1 for _ in docs)}]
+            else:
+                raise OperationFailure(f"Unrecognized pipeline stage name: '{op}'")
+        return list(docs)
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", 40573)
+
+    # -- writes --------------------------------------------------------------
+
+    def _insert(self, document: dict) -> Any:
+        if '_id' not in document:
+            document['_id'] = ObjectId()
+        doc = _copy(document)
+        _id = doc['_id']
+        with self._lock:
+            if _id in self._docs:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.full_name} index: _id_", 11000)
+            self._check_unique(_id, doc)
+            for index in self._indexes.values():
+                self._index_add(index, _id, doc)
+            self._docs[_id] = doc
+        self.database.client._changed(self, _id)
+        return _id
+
+    def _replace_doc(self, _id, old: dict, new: dict) -> None:
+        with self._lock:
+            self._check_unique(_id, new)
+            for index in self._indexes.values():
+                self._index_remove(index, _id, old)
+                self._index_add(index, _id, new)
+            self._docs[_id] = new
+        self.database.client._changed(self, _id)
+
+    def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        _id = self._command('insert', {'documents': [document]}, lambda: self._insert(document))
+        return InsertOneResult(_id, True)
+
+    def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        return self._command('insert', {'documents': documents, 'ordered': ordered},
+                             lambda: self._insert_many(documents, ordered))
+
+    def _insert_many(self, documents: List[dict], ordered: bool) -> InsertManyResult:
+        inserted, errors = [], []
+        for i, document in enumerate(documents):
+            try:
+                inserted.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({'index': i, 'code': 11000, 'errmsg': str(e), 'op': document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': [],
+                                  'nInserted': len(inserted), 'nUpserted': 0, 'nMatched': 0,
+                                  'nModified': 0, 'nRemoved': 0, 'upserted': []})
+        return InsertManyResult(inserted, True)
+
+    def _update(self, filter: dict, update, upsert: bool, many: bool) -> dict:
+        matched = modified = 0
+        upserted_id = None
+        with self._lock:
+            for doc in list(self._scan(filter)):
+                new = _copy(doc)
+                changed = _apply_update(new, update)
+                matched += 1
+                if changed:
+                    self._replace_doc(doc['_id'], doc, new)
+                    modified += 1
+                if not many:
+                    break
+            if not matched and upsert:
+                seed = _upsert_seed(filter) if any(k.startswith('$') for k in update) else {}
+                _apply_update(seed, update, inserting=True)
+                upserted_id = self._insert(seed)
+        raw = {'n': matched or (1 if upserted_id is not None else 0), 'nModified': modified, 'ok': 1.0}
+        if upserted_id is not None:
+            raw['upserted'] = upserted_id
+        return raw
+
+    def _update_command(self, filter: dict, update, upsert: bool, many: bool) -> UpdateResult:
+        statement = {'q': filter, 'u': update, 'upsert': upsert, 'multi': many}
+        raw = self._command('update', {'updates': [statement]},
+                            lambda: self._update(filter, update, upsert, many))
+        return UpdateResult(raw, True)
+
+    def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update_command(filter, update, upsert, False)
+
+    def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update_command(filter, update, upsert, True)
+
+    def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update_command(filter, replacement, upsert, False)
+
+    def _delete(self, filter: dict, many: bool) -> int:
+        deleted = 0
+        with self._lock:
+            for doc in list(self._scan(filter)):
+                for index in self._indexes.values():
+                    self._index_remove(index, doc['_id'], doc)
+                del self._docs[doc['_id']]
+                self.database.client._changed(self, doc['_id'])
+                deleted += 1
+                if not many:
+                    break
+        return deleted
+
+    def _delete_command(self, filter: dict, many: bool) -> DeleteResult:
+        statement = {'q': filter, 'limit': 0 if many else 1}
+        deleted = self._command('delete', {'deletes': [statement]}, lambda: self._delete(filter, many))
+        return DeleteResult({'n': deleted, 'ok': 1.0}, True)
+
+    def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        return self._delete_command(filter, False)
+
+    def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        return self._delete_command(filter, True)
+
+    def bulk_write(self, requests: Iterable, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        """Apply pymongo write models (InsertOne, UpdateOne, ReplaceOne, ...)"""
+        requests = list(requests)
+        kinds = {type(r).__name__ for r in requests}
+        if kinds == {'InsertOne'}:
+            name, command = 'insert', {'documents': [r._doc for r in requests]}
+        elif kinds and kinds <= {'DeleteOne', 'DeleteMany'}:
+            name, command = 'delete', {'deletes': [{'q': r._filter} for r in requests]}
+        elif kinds and kinds <= {'UpdateOne', 'UpdateMany', 'ReplaceOne'}:
+            name, command = 'update', {'updates': [{'q': r._filter, 'u': r._doc} for r in requests]}
+        else:
+            name, command = 'bulkWrite', {'ops': len(requests)}
+        return self._command(name, command, lambda: self._bulk_write(requests, ordered))
+
+    def _bulk_write(self, requests: List, ordered: bool) -> BulkWriteResult:
+        result = {'writeErrors': [], 'writeConcernErrors': [], 'nInserted': 0, 'nUpserted': 0,
+                  'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []}
+        for i, request in enumerate(requests):
+            kind = type(request).__name__
+            try:
+                if kind == 'InsertOne':
+                    self._insert(request._doc)
+                    result['nInserted'] += 1
+                elif kind in ('UpdateOne', 'UpdateMany', 'ReplaceOne'):
+                    raw = self._update(request._filter, request._doc, bool(request._upsert),
+                                       kind == 'UpdateMany')
+                    if 'upserted' in raw:
+                        result['nUpserted'] += 1
+                        result['upserted'].append({'index': i, '_id': raw['upserted']})
+                    else:
+                        result['nMatched'] += raw['n']
+                        result['nModified'] += raw['nModified']
+                elif kind in ('DeleteOne', 'DeleteMany'):
+                    result['nRemoved'] += self._delete(request._filter, kind == 'DeleteMany')
+                else:
+                    raise OperationFailure(f"Unsupported bulk operation: {kind}")
+            except DuplicateKeyError as e:
+                result['writeErrors'].append({'index': i, 'code': 11000, 'errmsg': str(e),
+                                              'op': getattr(request, '_doc', None)})
+                if ordered:
+                    break
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def drop(self) -> None:
+        self.database.drop_collection(self.name)
+
+    # -- persistence ---------------------------------------------------------
+
+    def _dump(self) -> dict:
+        with self._lock:
+            return {
+                'docs': list(self._docs.values()),
+                'indexes': [(i.name, i.keys, i.unique, i.sparse) for i in self._indexes.values()],
+            }
+
+    def _load(self, state: dict) -> None:
+        for name, keys, unique, sparse in state.get('indexes', []):
+            self.create_index([tuple(key) for key in keys], unique=unique, name=name, sparse=sparse)
+        for doc in state.get('docs', []):
+            self._insert(doc)
+
+    def _replay(self, put: List[dict], deleted: list) -> None:
+        """Apply one logged write command: its documents' final state"""
+        with self._lock:
+            # Removed first, so values swapped between documents do not collide
+            for _id in itertools.chain((doc['_id'] for doc in put), deleted):
+                old = self._docs.pop(_id, None)
+                if old is not None:
+                    for index in self._indexes.values():
+                        self._index_remove(index, _id, old)
+            for doc in put:
+                self._insert(doc)
+
+
+class MemoryDatabase:
+    """In-memory database mirroring ``pymongo.database.Database``"""
+
+    def __init__(self, client: 'MemoryClient', name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections.setdefault(name, MemoryCollection(self, name))
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        return self[name]
+
+    def list_collection_names(self, **kwargs) -> List[str]:
+        return [name for name, c in self._collections.items() if c._docs or c._indexes]
+
+    def drop_collection(self, name: str) -> None:
+        self._collections.pop(name, None)
+        self.client._written()
+
+    def command(self, command, *args, **kwargs) -> dict:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == 'ping':
+            return {'ok': 1.0}
+        if name == 'collStats':
+            if isinstance(command, str):
+                command = {name: args[0]}
+            collection = self[command[name]]
+            count = len(collection._docs)
+            size = len(pickle.dumps(collection._dump()['docs']))
+            # Index sizes are estimated from their pickled keys
+            index_sizes = {'_id_': len(pickle.dumps(list(collection._docs)))}
+            for index_name, index in collection._indexes.items():
+                keys = list(index.unique_keys) if index.unique else [(k, list(ids)) for k, ids in index.postings.items()]
+                index_sizes[index_name] = len(pickle.dumps(keys))
+            return {'ok': 1.0, 'count': count, 'size': size,
+                    'avgObjSize': size / count if count else 0,
+                    'nindexes': len(index_sizes), 'indexSizes': index_sizes,
+                    'totalIndexSize': sum(index_sizes.values())}
+        raise OperationFailure(f"no such command: '{name}'", 59)
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", 40573)
+
+
+class MemoryClient:
+    """Drop-in replacement for ``pymongo.MongoClient`` backed by process memory.
+
+    With ``path`` set, data is loaded from that file and its log, and every
+    write command is logged before it returns, so the store survives restarts
+    and crashes. Inside ``batch()`` the log is skipped and the store is
+    compacted once at the end of the block.
+    """
+
+    def __init__(self, path: Optional[str] = None, event_listeners=None, **kwargs):
+        self._path = Path(path) if path else None
+        self._log_path = self._path.with_name(self._path.name + '.log') if self._path else None
+        self._databases: Dict[str, MemoryDatabase] = {}
+        # (database, collection) -> _ids written since the last save
+        self._changes: Dict[tuple, Dict[Any, None]] = {}
+        self._changes_lock = threading.Lock()
+        self._compact_pending = False
+        self._loading = False
+        self._batch_depth = 0
+        self._save_lock = threading.Lock()
+        # Snapshot generation the log continues; a log of another generation is obsolete
+        self._generation = 0
+        self._log_valid = False
+        self._log_bytes = 0
+        self._log_records = 0
+        self._snapshot_bytes = 0
+        self._listeners = list(event_listeners or [])
+        self._request_ids = itertools.count(1)
+        self._connection_id = ('memory', id(self))
+        self.admin = self['admin']
+        if self._path is not None:
+            self._load()
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases.setdefault(name, MemoryDatabase(self, name))
+        return database
+
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+
+    def _changed(self, collection: 'MemoryCollection', _id) -> None:
+        """Note a document written, for the next save"""
+        if self._path is None or self._loading:
+            return
+        with self._changes_lock:
+            self._changes.setdefault((collection.database.name, collection.name), {})[_id] = None
+
+    def _written(self) -> None:
+        """Save after an index or collection was created or dropped, unless inside ``batch()``"""
+        if self._path is None or self._loading:
+            return
+        self._compact_pending = True
+        if self._batch_depth == 0:
+            self.flush()
+
+    def _command_done(self, name: str) -> None:
+        """Save after a write command, including one that failed part way"""
+        if name in _WRITE_COMMANDS and self._changes and self._batch_depth == 0:
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        """Compact once when the block ends instead of logging every write (bulk loads)"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush(compact=True)
+
+    def _command(self, database_name: str, name: str, command: dict, run, reply_docs=None):
+        """Run ``run()`` as one monitored command, notifying the event listeners"""
+        request_id = next(self._request_ids)
+        ids = (database_name, request_id, self._connection_id)
+        for listener in self._listeners:
+            listener.started(_CommandEvent(name, *ids, command=command))
+        started = time.perf_counter()
+        try:
+            result = run()
+        except Exception as e:
+            duration = int((time.perf_counter() - started) * 1e6)
+            failure = {'ok': 0.0, 'errmsg': str(e), 'code': getattr(e, 'code', None)}
+            for listener in self._listeners:
+                listener.failed(_CommandEvent(name, *ids, duration_micros=duration, failure=failure))
+            raise
+        finally:
+            self._command_done(name)
+        duration = int((time.perf_counter() - started) * 1e6)
+        if reply_docs is not None:
+            reply = {'ok': 1.0, 'cursor': {'id': 0, 'ns': f"{database_name}.{command[name]}"}}
+            reply_bytes = _bson_size(reply_docs(result)) + 64
+        else:
+            reply = {'ok': 1.0}
+            reply_bytes = 32
+        for listener in self._listeners:
+            listener.succeeded(_CommandEvent(name, *ids, duration_micros=duration,
+                                             reply=reply, reply_bytes=reply_bytes))
+        return result
+
+    def _load(self) -> None:
+        self._loading = True
+        try:
+            if self._path.exists():
+                data = self._path.read_bytes()
+                state = json_util.loads(data, json_options=_JSON_OPTIONS)
+                self._generation = state['generation']
+                self._snapshot_bytes = len(data)
+                for db_name, collections in state['databases'].items():
+                    for coll_name, coll_state in collections.items():
+                        self[db_name][coll_name]._load(coll_state)
+            if self._log_path.exists():
+                self._replay_log()
+        finally:
+            self._loading = False
+
+    def _replay_log(self) -> None:
+        with open(self._log_path, 'rb') as fh:
+            lines = fh.read().split(b'\n')
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            header = {}
+        if header.get('generation') != self._generation:
+            # Left over from a compaction interrupted before the log was reset
+            return
+        self._log_valid = True
+        records = [line for line in lines[1:] if line]
+        for i, line in enumerate(records):
+            try:
+                record = json_util.loads(line, json_options=_JSON_OPTIONS)
+            except ValueError:
+                if i < len(records) - 1:
+                    raise
+                # A torn last record: its command never returned. Start a new
+                # snapshot before appending after it
+                self._compact_pending = True
+                break
+            self[record['db']][record['coll']]._replay(record['put'], record['del'])
+        self._log_bytes = sum(len(line) + 1 for line in lines)
+        self._log_records = len(records)
+
+    def flush(self, compact: bool = False) -> None:
+        """Save pending writes to the backing file (no-op for pure in-memory use).
+
+        Writes are appended to the log; with ``compact`` (or once the log has
+        outgrown the snapshot) the whole store is written as a new snapshot
+        instead, to a temporary file in the same directory that is synced and
+        renamed over the old one, so a crash leaves either snapshot intact.
+        """
+        if self._path is None:
+            return
+        with self._save_lock:
+            if compact or self._compact_pending or not self._log_valid:
+                if self._changes or self._compact_pending or self._log_records:
+                    self._compact()
+                return
+            self._append_log()
+            if self._log_bytes > max(COMPACT_MIN_LOG_BYTES, self._snapshot_bytes):
+                self._compact()
+
+    def _take_changes(self) -> Dict[tuple, Dict[Any, None]]:
+        with self._changes_lock:
+            changes, self._changes = self._changes, {}
+        return changes
+
+    def _restore_changes(self, changes: Dict[tuple, Dict[Any, None]]) -> None:
+        """Put back changes whose save failed, to be retried by the next one"""
+        with self._changes_lock:
+            for key, ids in changes.items():
+                self._changes.setdefault(key, {}).update(ids)
+
+    def _append_log(self) -> None:
+        changes = self._take_changes()
+        if not changes:
+            return
+        lines = []
+        try:
+            for (db_name, coll_name), ids in changes.items():
+                if db_name == 'admin':
+                    continue
+                docs = self[db_name][coll_name]._docs
+                put, deleted = [], []
+                for _id in ids:
+                    doc = docs.get(_id)
+                    if doc is None:
+                        deleted.append(_id)
+                    else:
+                        put.append(doc)
+                record = {'db': db_name, 'coll': coll_name, 'put': put, 'del': deleted}
+                lines.append(json_util.dumps(record, json_options=_JSON_OPTIONS))
+            data = ('\n'.join(lines) + '\n').encode('utf-8')
+            with open(self._log_path, 'ab') as fh:
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+        except BaseException:
+            self._restore_changes(changes)
+            raise
+        self._log_bytes += len(data)
+        self._log_records += len(lines)
+
+    def _compact(self) -> None:
+        # Taken before the dump: a write made meanwhile is saved again later
+        changes = self._take_changes()
+        state = {
+            'generation': self._generation + 1,
+            'databases': {
+                db_name: {name: coll._dump() for name, coll in database._collections.items()}
+                for db_name, database in self._databases.items() if db_name != 'admin'
+            },
+        }
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=self._path.name + '.', suffix='.tmp', dir=self._path.parent)
+        try:
+            data = json_util.dumps(state, json_options=_JSON_OPTIONS).encode('utf-8')
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self._path)
+        except BaseException:
+            self._restore_changes(changes)
+            self._compact_pending = True
+            with suppress(OSError):
+                os.unlink(tmp)
+            raise
+        self._generation += 1
+        self._snapshot_bytes = len(data)
+        self._compact_pending = False
+        # The old log is obsolete from here, even if resetting it fails
+        self._log_valid = False
+        header = (json.dumps({'generation': self._generation}) + '\n').encode('utf-8')
+        with open(self._log_path, 'wb') as fh:
+            fh.write(header)
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._log_valid = True
+        self._log_bytes = len(header)
+        self._log_records = 0
+
+    def close(self) -> None:
+        self.flush(compact=True)
@@ -0,0 +1,113 @@
+"""
+Query budgets and N+1 detection
+
+``QueryBudget`` counts the database round trips issued by the current thread
+inside a block (or a decorated function) using the command events recorded by
+``instrumentation``. Commands repeated with an identical shape from the same
+source are reported as likely N+1 patterns.
+
+    with QueryBudget("export payroll report", max_queries=3):
+        exporter.export_payroll_report(payrolls, month, year)
+
+Budgets only see commands while command metrics are on
+(``DB_METRICS_ENABLED=1`` or ``db.connect(metrics=True)``). In tests use
+``assert_query_budget``, which raises ``QueryBudgetExceeded`` instead of
+logging, and refuses to run at all when metrics are off:
+
+    with assert_query_budget(max_queries=2, max_repeats=1):
+        service.get_all_employees()
+"""
+from collections import Counter
+from contextlib import ContextDecorator
+from typing import List, Optional, Tuple
+import logging
+import threading
+
+from payroll_system.utils.database import db
+from payroll_system.utils.instrumentation import command_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by strict budgets when the query count or repeat limit is exceeded"""
+
+
+class QueryBudget(ContextDecorator):
+    """Count round trips made by the current thread within a block.
+
+    ``max_queries`` limits the total number of commands; ``max_repeats``
+    limits how often one (source, collection, command, shape) may recur
+    before it is reported as an N+1 pattern. With ``strict=True`` a violation
+    raises ``QueryBudgetExceeded``, otherwise it is logged as a warning.
+    """
+
+    def __init__(self, name: str = "operation", max_queries: Optional[int] = None,
+                 max_repeats: int = 5, strict: bool = False):
+        self.name = name
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.strict = strict
+        self.commands: List[Tuple[str, str, str, str]] = []
+        self._thread = None
+
+    def _observe(self, command_name: str, source: str, collection: str, shape) -> None:
+        if threading.get_ident() == self._thread:
+            self.commands.append((source, collection, command_name, repr(shape)))
+
+    def __enter__(self) -> 'QueryBudget':
+        if not db.metrics_enabled:
+            if self.strict:
+                # Counting nothing would let any block pass
+                raise QueryBudgetExceeded(f"Query budget '{self.name}' cannot count queries: "
+                                          f"command metrics are off (connect with metrics=True)")
+            logger.debug(f"Query budget '{self.name}' has no effect: DB_METRICS_ENABLED is off")
+        self.commands = []
+        self._thread = threading.get_ident()
+        command_metrics.add_observer(self._observe)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        command_metrics.remove_observer(self._observe)
+        if exc_type is None:
+            self.check()
+        return False
+
+    @property
+    def count(self) -> int:
+        return len(self.commands)
+
+    def repeated(self) -> List[Tuple[Tuple[str, str, str, str], int]]:
+        """Command shapes issued more than ``max_repeats`` times (likely N+1)"""
+        counts = Counter(self.commands)
+        return [(key, n) for key, n in counts.most_common() if n > self.max_repeats]
+
+    def violations(self) -> List[str]:
+        problems = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            problems.append(f"{self.count} queries (budget {self.max_queries})")
+        for (source, collection, command, shape), n in self.repeated():
+            problems.append(f"possible N+1: {source} ran {command} on {collection} "
+                            f"{n} times with shape {shape}")
+        return problems
+
+    def report(self) -> str:
+        lines = [f"Query budget '{self.name}': {self.count} queries"]
+        for (source, collection, command, shape), n in Counter(self.commands).most_common():
+            lines.append(f"  {n:>5} x {source} {command} {collection} {shape}")
+        return "\n".join(lines)
+
+    def check(self) -> None:
+        problems = self.violations()
+        if not problems:
+            return
+        message = f"Query budget '{self.name}' exceeded: " + "; ".join(problems)
+        if self.strict:
+            raise QueryBudgetExceeded(message + "\n" + self.report())
+        logger.warning(message)
+
+
+def assert_query_budget(max_queries: Optional[int] = None, max_repeats: int = 1,
+                        name: str = "test") -> QueryBudget:
+    """Strict budget for tests: fails on too many queries or repeated shapes"""
+    return QueryBudget(name, max_queries=max_queries, max_repeats=max_repeats, strict=True)
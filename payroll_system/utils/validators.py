@@ -1,23 +1,45 @@
 """
 Input validation utilities
+
+The single-value functions validate one form field. ``validate_columns``
+checks whole columns of imported data at once and returns structured
+errors, and ``calculate_pt_batch`` computes Professional Tax for a column
+of salaries.
 """
+import math
 import re
-from datetime import datetime
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from payroll_system.config import PT_SLABS
+
+# Compiled once; ``match`` with ``$`` keeps the original semantics
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+PHONE_PATTERN = re.compile(r'^\d{10,15}$')
+BANK_ACCOUNT_PATTERN = re.compile(r'^\d{10,18}$')
+
+# Default (config.py) PT slabs as parallel lists sorted by lower bound, for
+# bisect lookups. Salaries between two slabs (or outside all of them) pay no
+# PT. Payroll uses the per-state rule sets of services.statutory_rules.
+_PT_SLABS = sorted((low, high, amount) for (low, high), amount in PT_SLABS.items())
+_PT_LOWS = [low for low, _, _ in _PT_SLABS]
+_PT_HIGHS = [high for _, high, _ in _PT_SLABS]
+_PT_AMOUNTS = [amount for _, _, amount in _PT_SLABS]
+
 
 def validate_email(email):
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_PATTERN.match(email) is not None
 
 def validate_phone(phone):
     """Validate phone number (10-15 digits)"""
-    pattern = r'^\d{10,15}$'
-    return re.match(pattern, str(phone)) is not None
+    return PHONE_PATTERN.match(str(phone)) is not None
 
 def validate_bank_account(account):
     """Validate bank account number (10-18 digits)"""
-    pattern = r'^\d{10,18}$'
-    return re.match(pattern, str(account)) is not None
+    return BANK_ACCOUNT_PATTERN.match(str(account)) is not None
 
 def validate_date(date_string):
     """Validate date string format (YYYY-MM-DD)"""
@@ -31,7 +53,7 @@ def validate_salary(salary):
     """Validate salary is a positive number"""
     try:
         amount = float(salary)
-        return amount >= 0
+        return math.isfinite(amount) and amount >= 0
     except (ValueError, TypeError):
         return False
 
@@ -40,12 +62,116 @@ def validate_password(password):
     return len(password) >= 6
 
 def calculate_pt(basic_salary):
-    """Calculate Professional Tax based on salary slabs"""
-    from payroll_system.config import PT_SLABS
-    
+    """Calculate Professional Tax based on the default salary slabs"""
     basic = float(basic_salary)
-    for (min_sal, max_sal), pt_amount in PT_SLABS.items():
-        if min_sal <= basic <= max_sal:
-            return pt_amount
+    i = bisect_right(_PT_LOWS, basic) - 1
+    if i >= 0 and basic <= _PT_HIGHS[i]:
+        return _PT_AMOUNTS[i]
     return 0
 
+def calculate_pt_batch(salaries: Iterable) -> List[float]:
+    """Professional Tax for each salary in a column"""
+    lows, highs, amounts = _PT_LOWS, _PT_HIGHS, _PT_AMOUNTS
+    result = []
+    append = result.append
+    for salary in salaries:
+        basic = float(salary or 0)
+        i = bisect_right(lows, basic) - 1
+        append(amounts[i] if i >= 0 and basic <= highs[i] else 0)
+    return result
+
+
+# -- column validation ------------------------------------------------------
+
+@dataclass(frozen=True)
+class ValidationError:
+    """One invalid value: its row (position in the column), field and reason"""
+    row: int
+    field: str
+    value: object
+    message: str
+
+
+def _is_iso_date(value) -> bool:
+    if isinstance(value, (date, datetime)):
+        return True
+    value = str(value)
+    if len(value) != 10 or value[4] != '-' or value[7] != '-':
+        return False
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_salary(value) -> bool:
+    try:
+        amount = float(value)
+        # 'inf' and 'nan' parse as floats
+        return math.isfinite(amount) and amount >= 0
+    except (ValueError, TypeError):
+        return False
+
+
+def _pattern_check(pattern: re.Pattern) -> Callable[[object], bool]:
+    match = pattern.match
+    return lambda value: match(value if isinstance(value, str) else str(value)) is not None
+
+
+# field -> (check, message); blank values are not checked (see ``required``)
+COLUMN_RULES: Dict[str, Tuple[Callable[[object], bool], str]] = {
+    'email': (_pattern_check(EMAIL_PATTERN), "Invalid email format"),
+    'mobile_number': (_pattern_check(PHONE_PATTERN), "Invalid phone number"),
+    'bank_account_number': (_pattern_check(BANK_ACCOUNT_PATTERN), "Invalid bank account number"),
+    'basic_salary': (_is_salary, "Invalid basic salary"),
+    'dob': (_is_iso_date, "Invalid dob (expected YYYY-MM-DD)"),
+    'joining_date': (_is_iso_date, "Invalid joining date (expected YYYY-MM-DD)"),
+}
+
+
+def validate_column(field: str, values: Sequence, required: bool = False,
+                    rules: Mapping[str, Tuple[Callable, str]] = COLUMN_RULES) -> List[ValidationError]:
+    """Check every value of one column; returns the errors in row order"""
+    errors = []
+    rule = rules.get(field)
+    check, message = rule if rule else (None, '')
+    missing = f"Missing {field.replace('_', ' ')}"
+    for row, value in enumerate(values):
+        if value is None or value == '':
+            if required:
+                errors.append(ValidationError(row, field, value, missing))
+        elif check is not None and not check(value):
+            errors.append(ValidationError(row, field, value, message))
+    return errors
+
+
+def validate_columns(columns: Mapping[str, Sequence], required: Sequence[str] = (),
+                     rules: Mapping[str, Tuple[Callable, str]] = COLUMN_RULES) -> List[ValidationError]:
+    """Validate a table given as ``{field: column}`` (columns of equal length).
+
+    Only fields with a rule or listed in ``required`` are checked; a
+    required field absent from ``columns`` is reported for every row.
+    Errors are ordered by row, then by the order of ``required`` and
+    ``columns``.
+    """
+    rows = len(next(iter(columns.values()), ()))
+    errors = []
+    order = {}
+    for field in list(required) + [f for f in columns if f not in required]:
+        order.setdefault(field, len(order))
+        if field in columns:
+            if field in rules or field in required:
+                errors.extend(validate_column(field, columns[field], field in required, rules))
+        elif field in required:
+            errors.extend(validate_column(field, [None] * rows, True, rules))
+    errors.sort(key=lambda error: (error.row, order[error.field]))
+    return errors
+
+
+def first_errors(errors: Iterable[ValidationError]) -> Dict[int, ValidationError]:
+    """The first error of each invalid row"""
+    result: Dict[int, ValidationError] = {}
+    for error in errors:
+        result.setdefault(error.row, error)
+    return result
@@ -0,0 +1,47 @@
+"""
+Shared test fixtures: a fresh in-memory database per test
+"""
+from calendar import monthrange
+from datetime import date, time
+from typing import Iterable
+import unittest
+
+from payroll_system.models.attendance import Attendance
+from payroll_system.models.employee import Employee
+from payroll_system.services.statutory_rules import reload_rules
+from payroll_system.utils.database import db
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Connects the global ``db`` to an empty in-memory store for each test"""
+
+    # Command metrics (needed by query budgets)
+    metrics = False
+
+    def setUp(self):
+        db.disconnect()
+        self.database = db.connect(backend="memory", metrics=self.metrics)
+        # Rules loaded from an earlier test's store would otherwise be kept
+        reload_rules()
+
+    def tearDown(self):
+        db.disconnect()
+
+
+def make_employee(number: int, basic_salary: float = 30000.0, **fields) -> Employee:
+    """An active employee ``E<number>`` who joined on 1 January 2024"""
+    fields.setdefault('joining_date', date(2024, 1, 1))
+    fields.setdefault('department_id', 'DEPT001')
+    fields.setdefault('branch_id', 'BR001')
+    fields.setdefault('location', 'Pune')
+    return Employee(f"E{number:03d}", f"Employee {number}", f"e{number}@example.com", 'secret',
+                    basic_salary=basic_salary, **fields)
+
+
+def mark_present(database, employee_ids: Iterable[str], month: int, year: int) -> None:
+    """Attendance on every weekday of the month (no holidays are defined in
+    tests, so present days equal working days and the full salary is paid)"""
+    days = [date(year, month, day) for day in range(1, monthrange(year, month)[1] + 1)]
+    database.attendance.insert_many([
+        Attendance(employee_id, day, time(9, 0), time(18, 0)).to_dict()
+        for employee_id in employee_ids for day in days if day.weekday() < 5])
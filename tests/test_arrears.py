@@ -0,0 +1,101 @@
+"""
+Arrears for past payroll months after a backdated salary revision
+"""
+from datetime import date
+from unittest import mock
+import unittest
+
+from pymongo.errors import BulkWriteError
+
+from payroll_system.models.arrears import Arrear
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.arrears_service import ArrearsService
+from payroll_system.services.employee_service import EmployeeService
+from payroll_system.services.payroll_service import PayrollService
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+
+class ArrearsTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        employees = EmployeeRepository()
+        for number in (1, 2):
+            employees.create(make_employee(number, basic_salary=30000))
+        payrolls = PayrollService()
+        for month in (3, 4):
+            mark_present(self.database, ['E001', 'E002'], month, 2025)
+            for employee_id in ('E001', 'E002'):
+                ok, _, message = payrolls.generate_payroll(employee_id, month, 2025)
+                self.assertTrue(ok, message)
+        self.employees = EmployeeService()
+        self.service = ArrearsService()
+
+    def revise(self, employee_id, salary):
+        ok, message = self.employees.update_employee(employee_id, {'basic_salary': salary},
+                                                     salary_effective_from=date(2025, 3, 1))
+        self.assertTrue(ok, message)
+
+    def test_backdated_revision_owes_the_difference(self):
+        self.revise('E001', 36000)
+        counts = self.service.compute_arrears(date(2025, 3, 1), 'appraisal', through=(2025, 4))
+        self.assertEqual(counts, {'arrears': 2, 'unchanged': 2, 'skipped': 0, 'failed': 0})
+        arrears = self.service.get_arrears('appraisal')
+        self.assertEqual(sorted((a.employee_id, a.month) for a in arrears), [('E001', 3), ('E001', 4)])
+        for arrear in arrears:
+            self.assertAlmostEqual(arrear.basic_salary, 6000)
+
+    def test_running_again_replaces_unpaid_arrears(self):
+        self.revise('E001', 36000)
+        self.service.compute_arrears(date(2025, 3, 1), 'appraisal', through=(2025, 4))
+        counts = self.service.compute_arrears(date(2025, 3, 1), 'appraisal', through=(2025, 4))
+        self.assertEqual(counts['arrears'], 2)
+        self.assertEqual(self.database.arrears.count_documents({}), 2)
+
+    def test_arrears_of_other_revisions_count_as_paid(self):
+        self.revise('E001', 36000)
+        self.service.compute_arrears(date(2025, 3, 1), 'appraisal', through=(2025, 4))
+        self.revise('E001', 40000)
+        self.service.compute_arrears(date(2025, 3, 1), 'correction', through=(2025, 4))
+        for arrear in self.service.get_arrears('correction'):
+            self.assertAlmostEqual(arrear.basic_salary, 4000)
+        self.assertAlmostEqual(self.service.get_employee_totals('correction')['E001']['basic_salary'], 8000)
+
+    def test_paid_arrears_are_not_replaced(self):
+        self.revise('E001', 36000)
+        self.service.compute_arrears(date(2025, 3, 1), 'appraisal', through=(2025, 4))
+        self.database.arrears.update_many({'month': 3}, {'$set': {'status': 'paid'}})
+        self.revise('E001', 40000)
+        counts = self.service.compute_arrears(date(2025, 3, 1), 'appraisal', through=(2025, 4))
+        self.assertEqual(counts['skipped'], 1)
+        paid = self.database.arrears.find_one({'month': 3})
+        self.assertAlmostEqual(paid['basic_salary'], 6000)
+
+    def test_read_errors_abort_without_writing(self):
+        self.revise('E001', 36000)
+        failing = (
+            (self.service.repository.collection, 'find'),
+            (self.service.employee_repo.collection, 'find'),
+            (self.service.salary_history.repository.collection, 'aggregate'),
+        )
+        for collection, method in failing:
+            with self.subTest(collection=collection.name):
+                with mock.patch.object(collection, method, side_effect=RuntimeError("connection lost")):
+                    with self.assertRaises(RuntimeError):
+                        self.service.compute_arrears(date(2025, 3, 1), 'appraisal', through=(2025, 4))
+                self.assertEqual(self.database.arrears.count_documents({}), 0)
+
+    def test_partial_bulk_write_counts_what_was_written(self):
+        details = {'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'duplicate key'}],
+                   'writeConcernErrors': [], 'nInserted': 0, 'nUpserted': 1, 'nMatched': 0,
+                   'nModified': 0, 'nRemoved': 0, 'upserted': []}
+        arrears = [Arrear('E001', 3, 2025, 'appraisal', date(2025, 3, 1), basic_salary=6000),
+                   Arrear('E002', 3, 2025, 'appraisal', date(2025, 3, 1), basic_salary=6000)]
+        with mock.patch.object(self.service.repository.collection, 'bulk_write',
+                               side_effect=BulkWriteError(details)):
+            self.assertEqual(self.service.repository.save_many(arrears), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
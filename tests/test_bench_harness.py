@@ -0,0 +1,59 @@
+"""
+Benchmark harness: datasets clean up after themselves
+"""
+import unittest
+
+from payroll_system.reports import excel_export, payslip_generator
+from payroll_system.utils.database import db
+
+# Importing the modules registers their benchmarks
+from benchmarks import bench_reports, bench_services
+from benchmarks.harness import REGISTRY, Benchmark, Dataset, run_benchmark
+
+
+class HarnessTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dataset = Dataset.build(20)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dataset.close()
+        db.disconnect()
+
+    def setUp(self):
+        self.configured = excel_export.EXPORTS_DIR, payslip_generator.PAYSLIPS_DIR
+
+    def test_report_output_goes_to_the_workdir_and_is_restored(self):
+        result = run_benchmark(REGISTRY['reports.export_employee_list'], self.dataset)
+        self.assertEqual(result['size'], 20)
+        self.assertTrue(any(self.dataset.workdir.glob('*.xlsx')))
+        self.assertEqual((excel_export.EXPORTS_DIR, payslip_generator.PAYSLIPS_DIR), self.configured)
+
+    def test_output_folders_are_restored_when_a_benchmark_fails(self):
+        def setup(dataset):
+            self.assertEqual(excel_export.EXPORTS_DIR, dataset.workdir)
+            raise RuntimeError("setup failed")
+
+        failing = Benchmark("failing", setup, "test", context=bench_reports._redirect_output)
+        with self.assertRaises(RuntimeError):
+            run_benchmark(failing, self.dataset)
+        self.assertEqual((excel_export.EXPORTS_DIR, payslip_generator.PAYSLIPS_DIR), self.configured)
+
+    def test_written_collections_are_restored(self):
+        count = self.dataset.database.payrolls.count_documents({})
+        run_benchmark(REGISTRY['service.generate_payroll_run'], self.dataset)
+        self.assertEqual(self.dataset.database.payrolls.count_documents({}), count)
+
+
+class DatasetCloseTest(unittest.TestCase):
+
+    def test_workdir_is_deleted(self):
+        with Dataset(0) as dataset:
+            (dataset.workdir / 'export.xlsx').write_bytes(b'')
+        self.assertFalse(dataset.workdir.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Change tracking: updates write only the fields that changed
+"""
+from datetime import date, datetime
+from unittest import mock
+
+from payroll_system.models.employee import Employee
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.employee_service import EmployeeService
+
+from helpers import DatabaseTestCase, make_employee
+
+
+class ChangeTrackingTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.repository = EmployeeRepository()
+        for number in (1, 2):
+            self.repository.create(make_employee(number))
+
+    def test_new_employee_reports_every_field(self):
+        employee = make_employee(3)
+        self.assertEqual(employee.changes(), employee.to_dict())
+
+    def test_loaded_employee_has_no_changes(self):
+        self.assertEqual(self.repository.get_by_id('E001').changes(), {})
+
+    def test_stored_representation_is_not_a_change(self):
+        self.database.employees.update_one({'employee_id': 'E001'},
+                                           {'$set': {'joining_date': datetime(2024, 1, 1)}})
+        self.assertEqual(self.repository.get_by_id('E001').changes(), {})
+
+    def test_changed_fields(self):
+        employee = self.repository.get_by_id('E001')
+        employee.basic_salary = 36000
+        employee.city = 'Pune'
+        self.assertEqual(employee.changes(), {'basic_salary': 36000, 'city': 'Pune'})
+        employee.mark_clean()
+        self.assertEqual(employee.changes(), {})
+
+    def test_update_sets_only_the_changed_fields(self):
+        employee = self.repository.get_by_id('E001')
+        employee.basic_salary = 36000
+        with mock.patch.object(self.repository.collection, 'update_one',
+                               wraps=self.repository.collection.update_one) as update_one:
+            self.assertTrue(self.repository.update(employee))
+        self.assertEqual(update_one.call_args.args[1],
+                         {'$set': {'basic_salary': 36000, 'modified_date': date.today().isoformat()}})
+        self.assertEqual(self.repository.get_by_id('E001').basic_salary, 36000)
+        self.assertEqual(employee.changes(), {})
+
+    def test_unchanged_employee_is_not_written(self):
+        employee = self.repository.get_by_id('E001')
+        with mock.patch.object(self.repository.collection, 'update_one') as update_one:
+            self.assertTrue(self.repository.update(employee))
+        update_one.assert_not_called()
+
+    def test_update_many_writes_only_changed_employees(self):
+        first, second = self.repository.get_by_id('E001'), self.repository.get_by_id('E002')
+        first.basic_salary = 36000
+        self.assertEqual(self.repository.update_many([first, second]), 1)
+        self.assertEqual(self.repository.get_by_id('E001').basic_salary, 36000)
+
+    def test_service_compares_the_employee_once(self):
+        with mock.patch.object(Employee, 'changes', autospec=True, side_effect=Employee.changes) as changes:
+            ok, _ = EmployeeService().update_employee('E001', {'city': 'Mumbai'})
+        self.assertTrue(ok)
+        self.assertEqual(changes.call_count, 1)
+        self.assertEqual(self.repository.get_by_id('E001').city, 'Mumbai')
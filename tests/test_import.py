@@ -0,0 +1,87 @@
+"""
+Bulk employee import from CSV files
+"""
+from pathlib import Path
+import tempfile
+
+from payroll_system.config import ROLE_HR
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.employee_service import EmployeeService
+from payroll_system.services.import_service import EmployeeImportService
+
+from helpers import DatabaseTestCase, make_employee
+
+HEADER = 'Employee ID,Name,Email,Salary,Role,Status,Joining Date,Location'
+
+
+class ImportTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.workdir = tempfile.TemporaryDirectory()
+        self.repository = EmployeeRepository()
+
+    def tearDown(self):
+        self.workdir.cleanup()
+        super().tearDown()
+
+    def import_rows(self, *rows, header=HEADER, chunk_size=1000):
+        path = Path(self.workdir.name) / 'employees.csv'
+        path.write_text('\n'.join((header,) + rows) + '\n', encoding='utf-8')
+        return EmployeeImportService(chunk_size=chunk_size).import_file(path)
+
+    def test_valid_rows_are_imported(self):
+        report = self.import_rows('E001,Asha,asha@example.com,30000,HR,Active,2024-01-15,Pune',
+                                  'E002,Ravi,ravi@example.com,12000,,Inactive,,Chennai')
+        self.assertEqual((report.rows, report.imported, report.errors), (2, 2, []))
+        asha = self.repository.get_by_id('E001')
+        self.assertEqual((asha.role, asha.status, asha.basic_salary), (ROLE_HR, 1, 30000))
+        self.assertEqual(asha.joining_date.isoformat(), '2024-01-15')
+        self.assertEqual(asha.pt, 200)
+        self.assertEqual(self.repository.get_by_id('E002').status, 0)
+
+    def test_invalid_rows_are_rejected_with_their_row_number(self):
+        report = self.import_rows('E001,Asha,asha@example.com,30000,,,,Pune',
+                                  'E002,Ravi,not-an-email,30000,,,,Pune',
+                                  'E003,Meena,meena@example.com,30000,Admin,,,Pune',
+                                  'E004,Kiran,kiran@example.com,30000,,,2024-13-01,Pune')
+        self.assertEqual(report.imported, 1)
+        self.assertEqual([(row, employee_id) for row, employee_id, _ in report.errors],
+                         [(3, 'E002'), (4, 'E003'), (5, 'E004')])
+
+    def test_non_finite_salaries_are_rejected(self):
+        report = self.import_rows('E001,Asha,asha@example.com,inf,,,,Pune',
+                                  'E002,Ravi,ravi@example.com,nan,,,,Pune',
+                                  'E003,Meena,meena@example.com,-1,,,,Pune')
+        self.assertEqual(report.imported, 0)
+        self.assertEqual({message for _, _, message in report.errors}, {"Invalid basic salary"})
+
+    def test_duplicates_in_the_file_and_the_database_are_rejected(self):
+        self.repository.create(make_employee(1))
+        report = self.import_rows('E001,Asha,asha@example.com,30000,,,,Pune',
+                                  'E002,Ravi,e1@example.com,30000,,,,Pune',
+                                  'E003,Meena,meena@example.com,30000,,,,Pune',
+                                  'E003,Kiran,kiran@example.com,30000,,,,Pune',
+                                  'E004,Kiran,meena@example.com,30000,,,,Pune',
+                                  chunk_size=2)
+        self.assertEqual(report.imported, 1)
+        self.assertEqual([message for _, _, message in report.errors],
+                         ["Employee ID already exists", "Email already exists",
+                          "Employee ID repeated in file", "Email repeated in file"])
+
+    def test_imported_employees_cannot_log_in_without_a_password(self):
+        self.import_rows('E001,Asha,asha@example.com,30000,,,,Pune')
+        employee, message = EmployeeService().authenticate('asha@example.com', '')
+        self.assertIsNone(employee)
+        self.assertEqual(message, "No password has been set for this account")
+
+    def test_password_column_sets_the_password(self):
+        self.import_rows('E001,Asha,asha@example.com,30000,Pune,s3cret-pass',
+                         header='Employee ID,Name,Email,Salary,Location,Password')
+        employee, _ = EmployeeService().authenticate('asha@example.com', 's3cret-pass')
+        self.assertEqual(employee.employee_id, 'E001')
+
+    def test_unsupported_file_type_stops_the_import(self):
+        report = EmployeeImportService().import_file(Path(self.workdir.name) / 'employees.txt')
+        self.assertEqual(report.imported, 0)
+        self.assertIn("Unsupported file type", report.errors[0][2])
@@ -0,0 +1,53 @@
+"""
+Declared indexes: created at connect, changed ones only reported
+"""
+from payroll_system.utils.indexes import (INDEX_CREATED, INDEX_MISMATCH, INDEX_OK, INDEX_REBUILT, INDEX_UNKNOWN,
+                                          IndexSpec, QueryShape, explain_shape, explain_shapes,
+                                          reconcile_indexes, registered_indexes)
+
+from helpers import DatabaseTestCase
+
+SPEC = IndexSpec('widgets', (('code', 1),), unique=True)
+
+
+class ReconcileIndexesTest(DatabaseTestCase):
+
+    def outcomes(self, **kwargs):
+        return {name: outcome for _, name, outcome in reconcile_indexes(self.database, [SPEC], **kwargs)}
+
+    def test_declared_indexes_exist_after_connect(self):
+        report = reconcile_indexes(self.database)
+        self.assertEqual(len(report), len(registered_indexes()))
+        self.assertEqual({outcome for _, _, outcome in report}, {INDEX_OK})
+
+    def test_missing_index_is_created_once(self):
+        self.assertEqual(self.outcomes(), {'code_1': INDEX_CREATED})
+        self.assertTrue(self.database.widgets.index_information()['code_1'].get('unique'))
+        self.assertEqual(self.outcomes(), {'code_1': INDEX_OK})
+
+    def test_changed_index_is_only_rebuilt_on_request(self):
+        self.database.widgets.create_index([('code', 1)], name='code_1')
+        self.assertEqual(self.outcomes(), {'code_1': INDEX_MISMATCH})
+        self.assertFalse(self.database.widgets.index_information()['code_1'].get('unique'))
+        self.assertEqual(self.outcomes(rebuild=True), {'code_1': INDEX_REBUILT})
+        self.assertTrue(self.database.widgets.index_information()['code_1'].get('unique'))
+
+    def test_undeclared_indexes_are_kept_unless_dropped(self):
+        self.database.widgets.create_index([('name', 1)])
+        self.assertEqual(self.outcomes()['name_1'], INDEX_UNKNOWN)
+        self.assertIn('name_1', self.database.widgets.index_information())
+        self.assertEqual(self.outcomes(drop_unknown=True)['name_1'], 'dropped')
+        self.assertNotIn('name_1', self.database.widgets.index_information())
+
+
+class QueryPlanTest(DatabaseTestCase):
+
+    def test_declared_query_shapes_use_an_index(self):
+        failures = [(report.shape.name, report.problems, report.error)
+                    for report in explain_shapes(self.database) if not report.ok]
+        self.assertEqual(failures, [])
+
+    def test_unindexed_query_is_a_collection_scan(self):
+        report = explain_shape(self.database, QueryShape('scan', 'widgets', {'colour': 'red'}))
+        self.assertIn('COLLSCAN', report.problems)
+        self.assertFalse(report.ok)
@@ -0,0 +1,72 @@
+"""
+Command metrics per calling repository method
+"""
+from types import SimpleNamespace
+import unittest
+
+import bson
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.utils.instrumentation import CommandMetrics, command_metrics
+
+from helpers import DatabaseTestCase, make_employee
+
+
+def _event(command_name, request_id=1, **fields):
+    return SimpleNamespace(command_name=command_name, connection_id=('localhost', 27017),
+                           request_id=request_id, duration_micros=1500, **fields)
+
+
+class CommandMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = CommandMetrics(slow_query_ms=1000)
+
+    def test_get_more_is_recorded_against_its_collection(self):
+        self.metrics.started(_event('getMore', command={'getMore': 8812391, 'collection': 'payrolls'}))
+        self.metrics.succeeded(_event('getMore', reply={'ok': 1.0}))
+        [row] = self.metrics.snapshot()
+        self.assertEqual((row['collection'], row['command']), ('payrolls', 'getMore'))
+
+    def test_reply_size_is_measured_when_not_reported(self):
+        reply = {'ok': 1.0, 'cursor': {'id': 0, 'firstBatch': [{'employee_id': 'E001'}]}}
+        self.metrics.started(_event('find', command={'find': 'employees', 'filter': {}}))
+        self.metrics.succeeded(_event('find', reply=reply))
+        [row] = self.metrics.snapshot()
+        self.assertEqual(row['bytes'], len(bson.encode(reply)))
+
+    def test_reported_reply_size_is_used(self):
+        self.metrics.started(_event('find', command={'find': 'employees', 'filter': {}}))
+        self.metrics.succeeded(_event('find', reply={'ok': 1.0}, reply_bytes=4096))
+        self.assertEqual(self.metrics.snapshot()[0]['bytes'], 4096)
+
+
+class CallerMetricsTest(DatabaseTestCase):
+    metrics = True
+
+    def setUp(self):
+        super().setUp()
+        self.repository = EmployeeRepository()
+        self.repository.create(make_employee(1))
+        command_metrics.reset()
+
+    def tearDown(self):
+        command_metrics.reset()
+        super().tearDown()
+
+    def test_commands_are_attributed_to_the_repository_method(self):
+        self.repository.get_by_id('E001')
+        self.repository.get_by_id('E002')
+        rows = {(r['source'], r['collection'], r['command']): r for r in command_metrics.snapshot()}
+        row = rows[('EmployeeRepository.get_by_id', 'employees', 'find')]
+        self.assertEqual(row['count'], 2)
+        self.assertGreater(row['bytes'], 0)
+
+    def test_prometheus_labels_include_the_source(self):
+        self.repository.get_by_id('E001')
+        self.assertIn('payroll_db_commands_total{source="EmployeeRepository.get_by_id",'
+                      'collection="employees",command="find"} 1', command_metrics.render_prometheus())
+
+
+if __name__ == '__main__':
+    unittest.main()
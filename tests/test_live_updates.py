@@ -0,0 +1,57 @@
+"""
+Dashboard count deltas from change stream events
+"""
+import importlib.util
+import unittest
+
+if importlib.util.find_spec('PySide6'):
+    from payroll_system.gui.live_updates import _status_delta
+
+
+def _event(op, _id=1, **fields):
+    return dict(operationType=op, ns={'db': 'payroll', 'coll': 'employees'}, documentKey={'_id': _id}, **fields)
+
+
+def _update(status=None, _id=1, **updated):
+    if status is not None:
+        updated['status'] = status
+    return _event('update', _id, updateDescription={'updatedFields': updated, 'removedFields': []})
+
+
+@unittest.skipUnless(importlib.util.find_spec('PySide6'), "PySide6 is not installed")
+class StatusDeltaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.statuses = {}
+
+    def delta(self, event):
+        return _status_delta(event, self.statuses)
+
+    def test_insert(self):
+        self.assertEqual(self.delta(_event('insert', 1, fullDocument={'status': 1})), 1)
+        self.assertEqual(self.delta(_event('insert', 2, fullDocument={'status': 0})), 0)
+
+    def test_status_written_again_is_not_a_change(self):
+        self.delta(_event('insert', fullDocument={'status': 1}))
+        self.assertEqual(self.delta(_update(status=1)), 0)
+        self.assertEqual(self.delta(_update(status=0)), -1)
+        self.assertEqual(self.delta(_update(status=0, name='x')), 0)
+        self.assertEqual(self.delta(_update(status=1)), 1)
+
+    def test_other_fields_do_not_change_the_count(self):
+        self.assertEqual(self.delta(_update(name='x')), 0)
+
+    def test_unseen_documents_are_recounted_once(self):
+        self.assertIsNone(self.delta(_update(status=0)))
+        self.assertEqual(self.delta(_update(status=1)), 1)
+
+    def test_delete_uses_the_last_status(self):
+        self.delta(_event('insert', 1, fullDocument={'status': 1}))
+        self.delta(_event('insert', 2, fullDocument={'status': 0}))
+        self.assertEqual(self.delta(_event('delete', 1)), -1)
+        self.assertEqual(self.delta(_event('delete', 2)), 0)
+        self.assertIsNone(self.delta(_event('delete', 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
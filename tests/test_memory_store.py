@@ -0,0 +1,399 @@
+"""
+Behaviour of the in-process store against pymongo / MongoDB semantics
+
+Run with:
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+import tempfile
+import unittest
+
+from pymongo import DESCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from payroll_system.utils.memory_store import MemoryClient
+
+
+class MemoryStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = MemoryClient()
+        self.db = self.client['test']
+        self.coll = self.db['items']
+
+    def ids(self, filter, **kwargs):
+        return sorted(doc['_id'] for doc in self.coll.find(filter, **kwargs))
+
+
+class QueryTest(MemoryStoreTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.coll.insert_many([
+            {'_id': 1, 'n': 5, 'tags': ['a', 'b'], 'sub': {'x': 1}, 'name': 'Asha'},
+            {'_id': 2, 'n': 10, 'tags': ['b'], 'sub': {'x': 2}, 'name': 'ravi'},
+            {'_id': 3, 'n': None, 'tags': [], 'name': 'Meena'},
+            {'_id': 4, 'tags': 'a', 'items': [{'k': 1, 'v': 'p'}, {'k': 2, 'v': 'q'}]},
+        ])
+
+    def test_comparison_skips_missing_and_null(self):
+        self.assertEqual(self.ids({'n': {'$gt': 4}}), [1, 2])
+        self.assertEqual(self.ids({'n': {'$lte': 10}}), [1, 2])
+
+    def test_equality_with_null_matches_missing(self):
+        self.assertEqual(self.ids({'n': None}), [3, 4])
+        self.assertEqual(self.ids({'n': {'$ne': None}}), [1, 2])
+
+    def test_ne_and_nin_match_missing_fields(self):
+        self.assertEqual(self.ids({'n': {'$ne': 5}}), [2, 3, 4])
+        self.assertEqual(self.ids({'n': {'$nin': [5, 10]}}), [3, 4])
+
+    def test_exists(self):
+        self.assertEqual(self.ids({'n': {'$exists': True}}), [1, 2, 3])
+        self.assertEqual(self.ids({'sub': {'$exists': False}}), [3, 4])
+
+    def test_array_element_and_scalar_match(self):
+        self.assertEqual(self.ids({'tags': 'a'}), [1, 4])
+        self.assertEqual(self.ids({'tags': {'$in': ['b']}}), [1, 2])
+        self.assertEqual(self.ids({'tags': {'$size': 0}}), [3])
+
+    def test_whole_array_equality(self):
+        self.assertEqual(self.ids({'tags': ['a', 'b']}), [1])
+
+    def test_dotted_paths(self):
+        self.assertEqual(self.ids({'sub.x': 2}), [2])
+        self.assertEqual(self.ids({'items.k': 2}), [4])
+
+    def test_elem_match(self):
+        self.assertEqual(self.ids({'items': {'$elemMatch': {'k': 1, 'v': 'p'}}}), [4])
+        self.assertEqual(self.ids({'items': {'$elemMatch': {'k': 1, 'v': 'q'}}}), [])
+
+    def test_regex_and_type(self):
+        self.assertEqual(self.ids({'name': {'$regex': '^[a-m]', '$options': 'i'}}), [1, 3])
+        self.assertEqual(self.ids({'tags': {'$type': 'string'}}), [1, 2, 4])
+        self.assertEqual(self.ids({'n': {'$type': 'null'}}), [3])
+
+    def test_logical_operators(self):
+        self.assertEqual(self.ids({'$or': [{'n': 5}, {'tags': []}]}), [1, 3])
+        self.assertEqual(self.ids({'$nor': [{'n': 5}, {'n': 10}]}), [3, 4])
+        self.assertEqual(self.ids({'n': {'$not': {'$gt': 5}}}), [1, 3, 4])
+
+    def test_sort_puts_missing_and_null_first(self):
+        order = [doc['_id'] for doc in self.coll.find({}, sort=[('n', 1), ('_id', 1)])]
+        self.assertEqual(order, [3, 4, 1, 2])
+        order = [doc['_id'] for doc in self.coll.find().sort('n', DESCENDING).limit(2)]
+        self.assertEqual(order, [2, 1])
+
+    def test_projection(self):
+        doc = self.coll.find_one({'_id': 1}, {'n': 1})
+        self.assertEqual(doc, {'_id': 1, 'n': 5})
+        doc = self.coll.find_one({'_id': 1}, {'n': 1, '_id': 0})
+        self.assertEqual(doc, {'n': 5})
+        doc = self.coll.find_one({'_id': 1}, {'tags': 0, 'sub': 0, 'name': 0})
+        self.assertEqual(doc, {'_id': 1, 'n': 5})
+
+    def test_returned_documents_are_copies(self):
+        doc = self.coll.find_one({'_id': 1})
+        doc['sub']['x'] = 99
+        self.assertEqual(self.coll.find_one({'_id': 1})['sub'], {'x': 1})
+
+    def test_count_and_distinct(self):
+        self.assertEqual(self.coll.count_documents({'tags': 'b'}), 2)
+        self.assertEqual(sorted(self.coll.distinct('tags')), ['a', 'b'])
+
+
+class UpdateTest(MemoryStoreTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.coll.insert_many([{'_id': 1, 'n': 1, 'tags': ['a']}, {'_id': 2, 'n': 2}])
+
+    def test_update_one_and_many_counts(self):
+        result = self.coll.update_many({}, {'$set': {'n': 2}})
+        self.assertEqual((result.matched_count, result.modified_count), (2, 1))
+        result = self.coll.update_one({}, {'$inc': {'n': 1}})
+        self.assertEqual((result.matched_count, result.modified_count), (1, 1))
+
+    def test_no_op_update_is_matched_not_modified(self):
+        result = self.coll.update_one({'_id': 2}, {'$set': {'n': 2}})
+        self.assertEqual((result.matched_count, result.modified_count), (1, 0))
+
+    def test_set_unset_inc_on_nested_and_missing_fields(self):
+        self.coll.update_one({'_id': 1}, {'$set': {'sub.x': 1}, '$unset': {'tags': ''},
+                                          '$inc': {'count': 2}})
+        self.assertEqual(self.coll.find_one({'_id': 1}), {'_id': 1, 'n': 1, 'sub': {'x': 1}, 'count': 2})
+
+    def test_min_max(self):
+        self.coll.update_one({'_id': 1}, {'$min': {'n': 0}})
+        self.coll.update_one({'_id': 2}, {'$max': {'n': 1}})
+        self.assertEqual([d['n'] for d in self.coll.find(sort=[('_id', 1)])], [0, 2])
+
+    def test_array_operators(self):
+        self.coll.update_one({'_id': 1}, {'$push': {'tags': 'b'}})
+        self.coll.update_one({'_id': 1}, {'$addToSet': {'tags': 'a'}})
+        self.coll.update_one({'_id': 1}, {'$addToSet': {'tags': {'$each': ['c', 'b']}}})
+        self.assertEqual(self.coll.find_one({'_id': 1})['tags'], ['a', 'b', 'c'])
+        self.coll.update_one({'_id': 1}, {'$pull': {'tags': 'b'}})
+        self.assertEqual(self.coll.find_one({'_id': 1})['tags'], ['a', 'c'])
+
+    def test_upsert_seeds_equality_fields(self):
+        result = self.coll.update_one({'_id': 3, 'n': {'$gt': 5}, 'kind': 'x'},
+                                      {'$set': {'m': 1}, '$setOnInsert': {'created': True}},
+                                      upsert=True)
+        self.assertEqual(result.upserted_id, 3)
+        self.assertEqual(self.coll.find_one({'_id': 3}), {'_id': 3, 'kind': 'x', 'm': 1, 'created': True})
+
+    def test_set_on_insert_ignored_on_update(self):
+        self.coll.update_one({'_id': 1}, {'$set': {'m': 1}, '$setOnInsert': {'created': True}}, upsert=True)
+        self.assertNotIn('created', self.coll.find_one({'_id': 1}))
+
+    def test_replace_one_keeps_id(self):
+        self.coll.replace_one({'_id': 2}, {'n': 9})
+        self.assertEqual(self.coll.find_one({'_id': 2}), {'_id': 2, 'n': 9})
+
+    def test_bulk_write_counts(self):
+        result = self.coll.bulk_write([UpdateOne({'_id': 1}, {'$set': {'n': 5}}),
+                                       UpdateOne({'_id': 9}, {'$set': {'n': 9}}, upsert=True)])
+        self.assertEqual((result.matched_count, result.modified_count, result.upserted_count), (1, 1, 1))
+        self.assertEqual(result.upserted_ids, {1: 9})
+
+    def test_delete(self):
+        self.assertEqual(self.coll.delete_many({'n': {'$gte': 1}}).deleted_count, 2)
+        self.assertIsNone(self.coll.find_one({}))
+
+
+class IndexTest(MemoryStoreTestCase):
+
+    def test_duplicate_id(self):
+        self.coll.insert_one({'_id': 1})
+        with self.assertRaises(DuplicateKeyError):
+            self.coll.insert_one({'_id': 1})
+
+    def test_insert_one_assigns_id_to_the_document(self):
+        doc = {'n': 1}
+        result = self.coll.insert_one(doc)
+        self.assertEqual(doc['_id'], result.inserted_id)
+
+    def test_unique_index(self):
+        self.coll.create_index([('a', 1), ('b', 1)], unique=True)
+        self.coll.insert_one({'a': 1, 'b': 1})
+        self.coll.insert_one({'a': 1, 'b': 2})
+        with self.assertRaises(DuplicateKeyError):
+            self.coll.insert_one({'a': 1, 'b': 1})
+        with self.assertRaises(DuplicateKeyError):
+            self.coll.update_one({'b': 2}, {'$set': {'b': 1}})
+        self.assertEqual(self.coll.count_documents({}), 2)
+
+    def test_unique_index_on_existing_duplicates_fails(self):
+        self.coll.insert_many([{'a': 1}, {'a': 1}])
+        with self.assertRaises(DuplicateKeyError):
+            self.coll.create_index('a', unique=True)
+        self.assertNotIn('a_1', self.coll.index_information())
+
+    def test_unique_index_treats_missing_as_null(self):
+        self.coll.create_index('a', unique=True)
+        self.coll.insert_one({'n': 1})
+        with self.assertRaises(DuplicateKeyError):
+            self.coll.insert_one({'n': 2})
+
+    def test_sparse_unique_index_allows_missing(self):
+        self.coll.create_index('a', unique=True, sparse=True)
+        self.coll.insert_many([{'n': 1}, {'n': 2}])
+        self.assertEqual(self.coll.count_documents({}), 2)
+
+    def test_unordered_insert_many_continues_after_duplicate(self):
+        self.coll.create_index('a', unique=True)
+        with self.assertRaises(BulkWriteError) as raised:
+            self.coll.insert_many([{'a': 1}, {'a': 1}, {'a': 2}], ordered=False)
+        self.assertEqual(raised.exception.details['nInserted'], 2)
+        self.assertEqual(len(raised.exception.details['writeErrors']), 1)
+        self.assertEqual(self.coll.count_documents({}), 2)
+
+    def test_ordered_insert_many_stops_at_duplicate(self):
+        self.coll.create_index('a', unique=True)
+        with self.assertRaises(BulkWriteError):
+            self.coll.bulk_write([InsertOne({'a': 1}), InsertOne({'a': 1}), InsertOne({'a': 2})])
+        self.assertEqual(self.coll.count_documents({}), 1)
+
+    def test_index_information_and_drop(self):
+        name = self.coll.create_index([('a', 1), ('b', DESCENDING)])
+        self.assertEqual(name, 'a_1_b_-1')
+        self.assertEqual(self.coll.index_information()[name]['key'], [('a', 1), ('b', -1)])
+        self.coll.drop_index(name)
+        self.assertEqual(list(self.coll.index_information()), ['_id_'])
+        with self.assertRaises(OperationFailure):
+            self.coll.drop_index(name)
+
+    def test_index_results_match_a_scan(self):
+        self.coll.insert_many([{'a': i % 7, 'b': i, 'd': datetime(2025, 1, i % 28 + 1)} for i in range(100)])
+        queries = [{'a': 3}, {'a': {'$in': [1, 2]}, 'b': {'$gte': 50}},
+                   {'d': {'$gte': datetime(2025, 1, 10), '$lt': datetime(2025, 1, 12)}}]
+        expected = [self.ids(q) for q in queries]
+        self.coll.create_index([('a', 1), ('b', 1)])
+        self.coll.create_index('d')
+        self.assertEqual([self.ids(q) for q in queries], expected)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.coll.create_index('a')
+        self.coll.insert_many([{'_id': 1, 'a': 1}, {'_id': 2, 'a': 2}])
+        self.coll.update_one({'_id': 1}, {'$set': {'a': 2}})
+        self.coll.delete_one({'_id': 2})
+        self.assertEqual(self.ids({'a': 2}), [1])
+        self.assertEqual(self.ids({'a': 1}), [])
+
+    def test_explain_reports_index_use(self):
+        self.coll.create_index('a')
+        self.coll.insert_many([{'a': i} for i in range(10)])
+        plan = self.coll.find({'a': 3}).explain()['queryPlanner']['winningPlan']
+        self.assertEqual(plan['inputStage']['stage'], 'IXSCAN')
+        plan = self.coll.find({'b': 3}).explain()['queryPlanner']['winningPlan']
+        self.assertEqual(plan['stage'], 'COLLSCAN')
+
+
+class AggregateTest(MemoryStoreTestCase):
+
+    def test_group_sort_and_count(self):
+        self.coll.insert_many([{'d': 'x', 'v': 1}, {'d': 'x', 'v': 2}, {'d': 'y', 'v': 5}])
+        rows = list(self.coll.aggregate([
+            {'$group': {'_id': '$d', 'total': {'$sum': '$v'}, 'n': {'$sum': 1}, 'top': {'$max': '$v'}}},
+            {'$sort': {'_id': 1}},
+        ]))
+        self.assertEqual(rows, [{'_id': 'x', 'total': 3, 'n': 2, 'top': 2},
+                                {'_id': 'y', 'total': 5, 'n': 1, 'top': 5}])
+        self.assertEqual(list(self.coll.aggregate([{'$match': {'v': {'$gt': 1}}}, {'$count': 'n'}])),
+                         [{'n': 2}])
+
+
+class FileBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'store.db'
+        self.log = Path(self.tmp.name) / 'store.db.log'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def reopen(self) -> MemoryClient:
+        return MemoryClient(str(self.path))
+
+    def ids(self, client: MemoryClient) -> list:
+        return sorted(doc['_id'] for doc in client['test']['items'].find())
+
+    def test_every_write_is_saved(self):
+        client = self.reopen()
+        client['test']['items'].insert_one({'_id': 1, 'n': 1})
+        self.assertEqual(self.reopen()['test']['items'].find_one({'_id': 1}), {'_id': 1, 'n': 1})
+        client['test']['items'].update_one({'_id': 1}, {'$set': {'n': 2}})
+        self.assertEqual(self.reopen()['test']['items'].find_one({'_id': 1})['n'], 2)
+        client['test']['items'].delete_one({'_id': 1})
+        self.assertIsNone(self.reopen()['test']['items'].find_one({'_id': 1}))
+
+    def test_indexes_are_saved(self):
+        client = self.reopen()
+        client['test']['items'].create_index('a', unique=True)
+        reopened = self.reopen()['test']['items']
+        self.assertTrue(reopened.index_information()['a_1']['unique'])
+        client['test']['items'].drop_index('a_1')
+        self.assertNotIn('a_1', self.reopen()['test']['items'].index_information())
+
+    def test_partially_failed_bulk_write_is_saved(self):
+        client = self.reopen()
+        client['test']['items'].create_index('a', unique=True)
+        with self.assertRaises(BulkWriteError):
+            client['test']['items'].insert_many([{'a': 1}, {'a': 1}, {'a': 2}], ordered=False)
+        self.assertEqual(self.reopen()['test']['items'].count_documents({}), 2)
+
+    def test_batch_saves_once_at_the_end(self):
+        client = self.reopen()
+        with client.batch():
+            client['test']['items'].insert_one({'_id': 1})
+            self.assertFalse(self.path.exists())
+            client['test']['items'].insert_one({'_id': 2})
+        self.assertEqual(self.reopen()['test']['items'].count_documents({}), 2)
+
+    def test_writes_are_appended_to_the_log(self):
+        client = self.reopen()
+        client['test']['items'].insert_one({'_id': 1, 'n': 1})
+        snapshot, log_size = self.path.read_bytes(), self.log.stat().st_size
+        client['test']['items'].insert_many([{'_id': 2}, {'_id': 3}])
+        client['test']['items'].update_one({'_id': 1}, {'$inc': {'n': 1}})
+        self.assertEqual(self.path.read_bytes(), snapshot)
+        self.assertGreater(self.log.stat().st_size, log_size)
+        reopened = self.reopen()['test']['items']
+        self.assertEqual(reopened.count_documents({}), 3)
+        self.assertEqual(reopened.find_one({'_id': 1})['n'], 2)
+
+    def test_store_is_extended_json(self):
+        client = self.reopen()
+        client['test']['items'].insert_one({'_id': 1, 'at': datetime(2025, 4, 1, 9, 30), 'n': 2, 'x': 2.0})
+        client.close()
+        self.assertIn('$date', self.path.read_text(encoding='utf-8'))
+        doc = self.reopen()['test']['items'].find_one({'_id': 1})
+        self.assertEqual(doc['at'], datetime(2025, 4, 1, 9, 30))
+        self.assertIsInstance(doc['n'], int)
+        self.assertIsInstance(doc['x'], float)
+
+    def test_log_is_compacted_once_it_outgrows_the_snapshot(self):
+        client = self.reopen()
+        with mock.patch('payroll_system.utils.memory_store.COMPACT_MIN_LOG_BYTES', 0):
+            for i in range(20):
+                client['test']['items'].insert_one({'_id': i, 'payload': 'x' * 100})
+        self.assertLess(self.log.stat().st_size, 100)
+        self.assertEqual(self.reopen()['test']['items'].count_documents({}), 20)
+
+    def test_close_compacts_the_log(self):
+        client = self.reopen()
+        client['test']['items'].insert_many([{'_id': 1}, {'_id': 2}])
+        client['test']['items'].delete_one({'_id': 1})
+        client.close()
+        self.assertEqual(len(self.log.read_bytes().splitlines()), 1)
+        self.assertEqual(self.ids(self.reopen()), [2])
+
+    def test_torn_last_log_record_is_ignored(self):
+        client = self.reopen()
+        client['test']['items'].insert_one({'_id': 1})
+        client['test']['items'].insert_one({'_id': 2})
+        with open(self.log, 'ab') as fh:
+            fh.write(b'{"db": "test", "coll": "items", "put": [{"_id"')
+        reopened = self.reopen()
+        self.assertEqual(self.ids(reopened), [1, 2])
+        reopened['test']['items'].insert_one({'_id': 3})
+        self.assertEqual(self.ids(self.reopen()), [1, 2, 3])
+
+    def test_values_swapped_in_one_command_are_replayed(self):
+        client = self.reopen()
+        items = client['test']['items']
+        items.create_index('a', unique=True)
+        items.insert_many([{'_id': 1, 'a': 1}, {'_id': 2, 'a': 2}])
+        items.bulk_write([UpdateOne({'_id': 1}, {'$set': {'a': 3}}),
+                          UpdateOne({'_id': 2}, {'$set': {'a': 1}}),
+                          UpdateOne({'_id': 1}, {'$set': {'a': 2}})])
+        reopened = self.reopen()['test']['items']
+        self.assertEqual(reopened.find_one({'a': 1})['_id'], 2)
+        self.assertEqual(reopened.find_one({'a': 2})['_id'], 1)
+
+    def test_failed_save_keeps_the_previous_files(self):
+        client = self.reopen()
+        client['test']['items'].insert_one({'_id': 1})
+        before = self.path.read_bytes(), self.log.read_bytes()
+        with self.assertRaises(Exception):
+            # Not BSON: the save fails after the write was applied
+            client['test']['items'].insert_one({'_id': 2, 'f': object()})
+        self.assertEqual((self.path.read_bytes(), self.log.read_bytes()), before)
+        self.assertEqual(sorted(p.name for p in self.path.parent.iterdir()), ['store.db', 'store.db.log'])
+
+    def test_load_does_not_rewrite_the_files(self):
+        client = self.reopen()
+        client['test']['items'].create_index('a')
+        client['test']['items'].insert_one({'a': 1})
+        mtimes = self.path.stat().st_mtime_ns, self.log.stat().st_mtime_ns
+        self.reopen()
+        self.assertEqual((self.path.stat().st_mtime_ns, self.log.stat().st_mtime_ns), mtimes)
+
+
+if __name__ == '__main__':
+    unittest.main()
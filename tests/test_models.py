@@ -0,0 +1,63 @@
+"""
+Model field conversion and dictionary round trips
+"""
+from datetime import date, datetime, time
+import unittest
+
+from payroll_system.models.employee import Employee
+from payroll_system.models.fields import iso, parse_date, parse_timestamp, to_datetime
+from payroll_system.models.master_data import Department
+from payroll_system.models.payroll import Payroll
+
+from helpers import make_employee
+
+STAMP = datetime(2025, 3, 14, 9, 26, 53, 589000)
+
+
+class FieldsTest(unittest.TestCase):
+
+    def test_iso_keeps_the_time_of_datetimes(self):
+        self.assertEqual(iso(STAMP), '2025-03-14T09:26:53.589000')
+        self.assertEqual(iso(date(2025, 3, 14)), '2025-03-14')
+        self.assertEqual(iso(time(9, 30)), '09:30:00')
+        self.assertIsNone(iso(None))
+
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp('2025-03-14T09:26:53.589000'), STAMP)
+        self.assertEqual(parse_timestamp(STAMP), STAMP)
+        parsed = parse_timestamp('2025-03-14')
+        self.assertEqual((type(parsed), parsed), (date, date(2025, 3, 14)))
+        self.assertIsNone(parse_timestamp(''))
+
+    def test_parse_date_drops_the_time(self):
+        self.assertEqual(parse_date('2025-03-14T09:26:53'), date(2025, 3, 14))
+        self.assertEqual(parse_date(STAMP), date(2025, 3, 14))
+
+    def test_to_datetime(self):
+        self.assertEqual(to_datetime(date(2025, 3, 14)), datetime(2025, 3, 14))
+        self.assertEqual(to_datetime('2025-03-14'), datetime(2025, 3, 14))
+        self.assertEqual(to_datetime(iso(STAMP)), STAMP)
+
+
+class RoundTripTest(unittest.TestCase):
+
+    def test_employee_keeps_its_timestamps(self):
+        employee = make_employee(1, created_date=STAMP, modified_date=date(2025, 3, 15))
+        data = employee.to_dict()
+        self.assertEqual(data['created_date'], '2025-03-14T09:26:53.589000')
+        loaded = Employee.from_dict(data)
+        self.assertEqual((loaded.created_date, loaded.modified_date), (STAMP, date(2025, 3, 15)))
+        self.assertEqual(loaded.joining_date, date(2024, 1, 1))
+        self.assertEqual(loaded.to_dict(), data)
+
+    def test_master_data_keeps_its_timestamps(self):
+        data = Department('D01', 'Finance', created_date=STAMP, modified_date=STAMP).to_dict()
+        self.assertEqual(Department.from_dict(data).created_date, STAMP)
+
+    def test_payroll_keeps_its_creation_time(self):
+        payroll = Payroll('E001', 3, 2025, created_date=STAMP)
+        self.assertEqual(Payroll.from_dict(payroll.to_dict()).created_date, STAMP)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Columnar payroll batches
+"""
+from datetime import datetime
+import unittest
+
+from payroll_system.models.payroll import Payroll
+from payroll_system.models.payroll_batch import PayrollBatch
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.payroll_service import PayrollService
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+
+def payroll(employee_id, month, net_salary, status='draft'):
+    return Payroll(employee_id, month, 2025, net_salary=net_salary, present_days=20, status=status,
+                   created_date=datetime(2025, month, 28))
+
+
+class PayrollBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.batch = PayrollBatch.from_payrolls([
+            payroll('E001', 1, 1000.0), payroll('E002', 1, 2000.0, 'paid'),
+            payroll('E001', 2, 1500.0, 'paid'), payroll('E003', 2, 500.0)])
+
+    def test_rows_round_trip(self):
+        [first] = PayrollBatch.from_payrolls([payroll('E001', 1, 1000.5)]).to_payrolls()
+        self.assertEqual((first.employee_id, first.month, first.net_salary), ('E001', 1, 1000.5))
+        self.assertEqual((first.present_days, type(first.present_days)), (20, int))
+        self.assertEqual(first.created_date, datetime(2025, 1, 28))
+
+    def test_filter(self):
+        paid = self.batch.filter(status='paid')
+        self.assertEqual(list(paid.column('employee_id')), ['E002', 'E001'])
+        self.assertEqual(len(self.batch.filter(month=(1, 2), employee_id={'E001'})), 2)
+        mask = [value > 900 for value in self.batch.column('net_salary')]
+        self.assertEqual(len(self.batch.filter(mask, month=1)), 2)
+
+    def test_totals_and_groups(self):
+        self.assertEqual(self.batch.totals(['net_salary']), {'net_salary': 5000.0})
+        self.assertEqual(self.batch.group_totals('employee_id', ['net_salary']),
+                         {'E001': {'count': 2, 'net_salary': 2500.0},
+                          'E002': {'count': 1, 'net_salary': 2000.0},
+                          'E003': {'count': 1, 'net_salary': 500.0}})
+        departments = {'E001': 'D1', 'E002': 'D2', 'E003': 'D1'}
+        self.assertEqual({k: v['net_salary'] for k, v in self.batch.group_totals(departments).items()},
+                         {'D1': 3000.0, 'D2': 2000.0})
+        by_month = self.batch.group_by('month')
+        self.assertEqual({month: len(batch) for month, batch in by_month.items()}, {1: 2, 2: 2})
+
+
+class PayrollBatchQueryTest(DatabaseTestCase):
+
+    def test_batch_of_a_month_matches_the_payrolls(self):
+        employees = EmployeeRepository()
+        for number in (1, 2, 3):
+            employees.create(make_employee(number, basic_salary=20000 + number * 1000))
+        mark_present(self.database, ['E001', 'E002', 'E003'], 3, 2025)
+        service = PayrollService()
+        service.generate_payroll_run(3, 2025)
+        batch = service.repository.get_batch_by_month(3, 2025)
+        payrolls = {p.employee_id: p for p in service.get_all_payrolls(3, 2025)}
+        self.assertEqual(sorted(batch.column('employee_id')), sorted(payrolls))
+        for row in batch.to_payrolls():
+            self.assertEqual(row.to_dict(), payrolls[row.employee_id].to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
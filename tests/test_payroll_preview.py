@@ -0,0 +1,87 @@
+"""
+Dry-run payroll previews and their single bulk commit
+"""
+from unittest import mock
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.payroll_service import PayrollService
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+IDS = ['E001', 'E002', 'E003', 'E004', 'E005']
+
+
+class PayrollPreviewTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        employees = EmployeeRepository()
+        for number in range(1, len(IDS) + 1):
+            employees.create(make_employee(number, basic_salary=20000 + number * 1000))
+        mark_present(self.database, IDS, 2, 2025)
+        mark_present(self.database, IDS, 3, 2025)
+        self.service = PayrollService()
+
+    def payroll_count(self, month=3):
+        return self.database.payrolls.count_documents({'month': month, 'year': 2025})
+
+    def test_preview_saves_nothing(self):
+        preview = self.service.preview_payroll_run(3, 2025, batch_size=2)
+        self.assertEqual(sorted(preview.batch.column('employee_id')), IDS)
+        self.assertIsNone(preview.error)
+        self.assertEqual(self.payroll_count(), 0)
+
+    def test_commit_saves_the_previewed_payrolls(self):
+        self.service.generate_payroll('E002', 3, 2025)
+        preview = self.service.preview_payroll_run(3, 2025, bonus=500, batch_size=2)
+        self.assertEqual((len(preview.batch), preview.skipped), (4, 1))
+        with mock.patch.object(self.service.calculator, 'calculate_batch') as calculate:
+            counts = self.service.commit_preview(preview)
+        calculate.assert_not_called()
+        self.assertEqual(counts, {'generated': 4, 'skipped': 0, 'failed': 0})
+        self.assertEqual(self.payroll_count(), 5)
+        saved = self.service.get_payroll('E004', 3, 2025)
+        self.assertEqual(saved.net_salary, preview.batch.filter(employee_id='E004').column('net_salary')[0])
+        self.assertEqual(saved.bonus, 500)
+
+    def test_preview_is_committed_once(self):
+        preview = self.service.preview_payroll_run(3, 2025)
+        self.service.commit_preview(preview)
+        with self.assertRaises(ValueError):
+            self.service.commit_preview(preview)
+
+    def test_payrolls_created_after_the_preview_are_skipped(self):
+        preview = self.service.preview_payroll_run(3, 2025)
+        self.service.generate_payroll('E001', 3, 2025)
+        self.assertEqual(self.service.commit_preview(preview), {'generated': 4, 'skipped': 1, 'failed': 0})
+
+    def test_variances_against_last_month(self):
+        self.service.generate_payroll_run(2, 2025)
+        self.service.generate_payroll('E001', 3, 2025)
+        self.service.delete_payroll('E005', 2, 2025)
+        preview = self.service.preview_payroll_run(3, 2025, bonus=1000)
+        variances = preview.employee_variances('bonus')
+        self.assertEqual(variances, {'E002': 1000, 'E003': 1000, 'E004': 1000, 'E005': None})
+        self.assertEqual(preview.variances()['bonus'], 4000)
+        self.assertEqual(sorted(preview.previous.column('employee_id')), ['E002', 'E003', 'E004'])
+
+    def test_preview_of_listed_employees(self):
+        preview = self.service.preview_payroll_run(3, 2025, employee_ids=['E003', 'E999'])
+        self.assertEqual(list(preview.batch.column('employee_id')), ['E003'])
+        self.assertEqual(preview.failed, 1)
+
+    def test_partial_preview_cannot_be_committed(self):
+        get_page = self.service.employee_repo.get_page
+        pages = []
+
+        def fail_second_page(*args, **kwargs):
+            pages.append(args)
+            return None if len(pages) == 2 else get_page(*args, **kwargs)
+
+        with mock.patch.object(self.service.employee_repo, 'get_page', side_effect=fail_second_page):
+            preview = self.service.preview_payroll_run(3, 2025, batch_size=2)
+        self.assertEqual(len(preview.batch), 2)
+        self.assertIn("could not read employees after E002", preview.error)
+        with self.assertRaises(ValueError):
+            self.service.commit_preview(preview)
+        self.assertEqual(self.payroll_count(), 0)
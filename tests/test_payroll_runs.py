@@ -0,0 +1,103 @@
+"""
+Checkpointed all-employee payroll runs
+"""
+from unittest import mock
+import unittest
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.payroll_run_repository import RUN_COMPLETE, RUN_FAILED
+from payroll_system.services.payroll_service import PayrollService
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+IDS = ['E001', 'E002', 'E003', 'E004', 'E005']
+
+
+class PayrollRunTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        employees = EmployeeRepository()
+        for number in range(1, len(IDS) + 1):
+            employees.create(make_employee(number))
+        mark_present(self.database, IDS, 3, 2025)
+        self.service = PayrollService()
+
+    def payroll_ids(self):
+        return sorted(d['employee_id'] for d in self.database.payrolls.find({'month': 3, 'year': 2025}))
+
+    def test_run_generates_missing_payrolls(self):
+        self.service.generate_payroll('E002', 3, 2025)
+        counts = self.service.generate_payroll_run(3, 2025, batch_size=2)
+        self.assertEqual(counts, {'generated': 4, 'skipped': 1, 'failed': 0})
+        self.assertEqual(self.payroll_ids(), IDS)
+        [run] = self.service.get_payroll_runs(3, 2025)
+        self.assertEqual((run['status'], run['checkpoint'], run['shards_done']), (RUN_COMPLETE, 'E005', 3))
+        self.assertIsNone(self.service.get_unfinished_run(3, 2025))
+
+    def test_failed_run_resumes_after_its_checkpoint(self):
+        generate_batch = self.service._generate_batch
+        shards = []
+
+        def fail_second_shard(employees, *args, **kwargs):
+            shards.append([employee.employee_id for employee in employees])
+            if len(shards) == 2:
+                raise RuntimeError("connection lost")
+            return generate_batch(employees, *args, **kwargs)
+
+        with mock.patch.object(self.service, '_generate_batch', side_effect=fail_second_shard):
+            counts = self.service.generate_payroll_run(3, 2025, bonus=500, batch_size=2)
+        self.assertEqual(counts['generated'], 2)
+        run = self.service.get_unfinished_run(3, 2025)
+        self.assertEqual((run['status'], run['checkpoint']), (RUN_FAILED, 'E002'))
+        self.assertIn("connection lost", run['error'])
+        run_id = run['_id']
+
+        # The bonus and batch size of the stopped run apply
+        counts = self.service.generate_payroll_run(3, 2025)
+        self.assertEqual(counts, {'generated': 5, 'skipped': 0, 'failed': 0})
+        self.assertEqual(self.payroll_ids(), IDS)
+        self.assertEqual({d['bonus'] for d in self.database.payrolls.find()}, {500})
+        [run] = self.service.get_payroll_runs(3, 2025)
+        self.assertEqual((run['_id'], run['status'], run['shards_done']), (run_id, RUN_COMPLETE, 3))
+
+    def test_salaries_are_read_per_shard(self):
+        with mock.patch.object(self.service.salary_history, 'month_salaries',
+                               wraps=self.service.salary_history.month_salaries) as month_salaries:
+            self.service.generate_payroll_run(3, 2025, batch_size=2)
+        self.assertEqual([call.args[2] for call in month_salaries.call_args_list],
+                         [['E001', 'E002'], ['E003', 'E004'], ['E005']])
+
+    def test_salary_history_error_fails_the_run(self):
+        with mock.patch.object(self.service.salary_history.repository.collection, 'aggregate',
+                               side_effect=RuntimeError("connection lost")):
+            counts = self.service.generate_payroll_run(3, 2025, batch_size=2)
+        self.assertEqual(counts['generated'], 0)
+        self.assertEqual(self.service.get_unfinished_run(3, 2025)['status'], RUN_FAILED)
+        self.assertEqual(self.payroll_ids(), [])
+
+    def test_run_stops_when_its_checkpoint_cannot_be_saved(self):
+        save_state = self.service.run_repo.save_state
+
+        def fail_checkpoints(run_id, **fields):
+            return False if 'checkpoint' in fields and fields['checkpoint'] else save_state(run_id, **fields)
+
+        with mock.patch.object(self.service.run_repo, 'save_state', side_effect=fail_checkpoints):
+            self.service.generate_payroll_run(3, 2025, batch_size=2)
+        self.assertEqual(self.payroll_ids(), ['E001', 'E002'])
+        run = self.service.get_unfinished_run(3, 2025)
+        self.assertEqual((run['status'], run['checkpoint']), (RUN_FAILED, None))
+
+        # Resuming repeats the first shard
+        counts = self.service.generate_payroll_run(3, 2025)
+        self.assertEqual(counts, {'generated': 3, 'skipped': 2, 'failed': 0})
+        self.assertEqual(self.payroll_ids(), IDS)
+
+    def test_run_does_not_start_without_its_state(self):
+        with mock.patch.object(self.service.run_repo, 'save_state', return_value=False):
+            self.service.generate_payroll_run(3, 2025)
+        self.assertEqual(self.payroll_ids(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
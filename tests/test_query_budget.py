@@ -0,0 +1,64 @@
+"""
+Query budgets and N+1 detection
+"""
+import unittest
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.utils.database import db
+from payroll_system.utils.query_budget import QueryBudget, QueryBudgetExceeded, assert_query_budget
+
+from helpers import DatabaseTestCase, make_employee
+
+
+class QueryBudgetTest(DatabaseTestCase):
+    metrics = True
+
+    def setUp(self):
+        super().setUp()
+        self.repository = EmployeeRepository()
+        for number in range(1, 11):
+            self.repository.create(make_employee(number))
+
+    def test_counts_round_trips(self):
+        with QueryBudget("lookups") as budget:
+            for number in range(1, 11):
+                self.repository.get_by_id(f"E{number:03d}")
+        self.assertEqual(budget.count, 10)
+
+    def test_over_budget_block_fails(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(max_queries=0, max_repeats=100):
+                for number in range(1, 11):
+                    self.repository.get_by_id(f"E{number:03d}")
+
+    def test_repeated_shape_is_reported_as_n_plus_one(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with assert_query_budget(max_queries=100, max_repeats=1):
+                for number in range(1, 4):
+                    self.repository.get_by_id(f"E{number:03d}")
+        self.assertIn("possible N+1", str(raised.exception))
+        self.assertIn("EmployeeRepository.get_by_id", str(raised.exception))
+
+    def test_batched_lookup_fits_the_budget(self):
+        with assert_query_budget(max_queries=1) as budget:
+            found = self.repository.get_by_ids([f"E{number:03d}" for number in range(1, 11)])
+        self.assertEqual(len(found), 10)
+        self.assertEqual(budget.count, 1)
+
+
+class WithoutMetricsTest(DatabaseTestCase):
+
+    def test_strict_budget_refuses_to_run(self):
+        self.assertFalse(db.metrics_enabled)
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(max_queries=0):
+                EmployeeRepository().get_by_id("E001")
+
+    def test_lenient_budget_counts_nothing(self):
+        with QueryBudget("lenient", max_queries=0) as budget:
+            EmployeeRepository().get_by_id("E001")
+        self.assertEqual(budget.count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
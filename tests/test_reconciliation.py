@@ -0,0 +1,85 @@
+"""
+Month-over-month payroll reconciliation
+"""
+from datetime import date
+import unittest
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.employee_service import EmployeeService
+from payroll_system.services.payroll_service import PayrollService
+from payroll_system.services.reconciliation import (STATUS_CHANGED, STATUS_LEFT, STATUS_MISSING, STATUS_NEW,
+                                                    STATUS_OK, ReconciliationService, previous_month, reconcile)
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+
+class ReconcileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = {'employee_id': ['E001', 'E002', 'E003', 'E004'],
+                         'net_salary': [10000.0, 10000.0, 1000.0, 8000.0]}
+        self.current = {'employee_id': ['E001', 'E002', 'E003', 'E005'],
+                        'net_salary': [10400.0, 12000.0, 1600.0, 9000.0]}
+
+    def statuses(self, result):
+        return dict(zip(result.column('employee_id'), result.column('status')))
+
+    def test_statuses(self):
+        result = reconcile(self.current, self.previous, ['E001', 'E002', 'E003', 'E005', 'E006'], 3, 2025,
+                           fields=('net_salary',), percent=10, amount=500)
+        # E001 changed by 4%, E003 by 60% but only 600 (not below the amount)
+        self.assertEqual(self.statuses(result),
+                         {'E001': STATUS_OK, 'E002': STATUS_CHANGED, 'E003': STATUS_CHANGED,
+                          'E005': STATUS_NEW, 'E006': STATUS_MISSING, 'E004': STATUS_LEFT})
+        self.assertEqual(result.counts(), {STATUS_CHANGED: 2, STATUS_NEW: 1, STATUS_MISSING: 1,
+                                           STATUS_LEFT: 1, STATUS_OK: 1})
+
+    def test_both_thresholds_must_be_reached(self):
+        result = reconcile(self.current, self.previous, self.current['employee_id'], 3, 2025,
+                           fields=('net_salary',), percent=10, amount=1000)
+        self.assertEqual(self.statuses(result)['E003'], STATUS_OK)
+
+    def test_rows_and_totals(self):
+        result = reconcile(self.current, self.previous, ['E001', 'E002', 'E003', 'E005'], 3, 2025,
+                           fields=('net_salary',))
+        rows = list(result.rows(only_exceptions=True))
+        self.assertEqual([(row.employee_id, row.flagged) for row in rows],
+                         [('E002', ('net_salary',)), ('E003', ('net_salary',)), ('E005', ()), ('E004', ())])
+        self.assertEqual((rows[-1].previous, rows[-1].current), ((8000.0,), (0.0,)))
+        self.assertEqual(result.totals()['net_salary'],
+                         {'previous': 29000.0, 'current': 33000.0, 'change': 4000.0})
+
+    def test_previous_month(self):
+        self.assertEqual((previous_month(3, 2025), previous_month(1, 2025)), ((2, 2025), (12, 2024)))
+
+
+class ReconciliationServiceTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        employees = EmployeeRepository()
+        for number in (1, 2, 3):
+            employees.create(make_employee(number))
+        employees.create(make_employee(4, joining_date=date(2025, 4, 1)))
+        mark_present(self.database, ['E001', 'E002', 'E003'], 2, 2025)
+        mark_present(self.database, ['E001', 'E002'], 3, 2025)
+        self.payroll = PayrollService()
+
+    def test_reconcile_month(self):
+        for employee_id in ('E001', 'E002', 'E003'):
+            self.payroll.generate_payroll(employee_id, 2, 2025)
+        self.payroll.generate_payroll('E001', 3, 2025)
+        self.payroll.generate_payroll('E002', 3, 2025, bonus=5000)
+        EmployeeService().delete_employee('E003')
+        result = ReconciliationService().reconcile_month(3, 2025)
+        statuses = dict(zip(result.column('employee_id'), result.column('status')))
+        # E004 joins after March and is not expected in it
+        self.assertEqual(statuses, {'E001': STATUS_OK, 'E002': STATUS_CHANGED, 'E003': STATUS_LEFT})
+        [changed] = [row for row in result.rows() if row.status == STATUS_CHANGED]
+        self.assertEqual(changed.flagged, ('net_salary',))
+
+    def test_active_employee_without_a_payroll_is_missing(self):
+        self.payroll.generate_payroll('E001', 3, 2025)
+        result = ReconciliationService().reconcile_month(3, 2025)
+        statuses = dict(zip(result.column('employee_id'), result.column('status')))
+        self.assertEqual(statuses, {'E001': STATUS_NEW, 'E002': STATUS_MISSING, 'E003': STATUS_MISSING})
@@ -0,0 +1,81 @@
+"""
+Effective-dated salary history and its use by payroll generation
+"""
+from datetime import date, datetime
+from unittest import mock
+import unittest
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.employee_service import EmployeeService
+from payroll_system.services.payroll_service import PayrollService
+from payroll_system.services.salary_history import SalaryHistoryService
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+
+class SalaryHistoryTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.employees = EmployeeRepository()
+        for number in (1, 2, 3):
+            self.employees.create(make_employee(number, basic_salary=30000))
+        self.history = SalaryHistoryService()
+        self.service = EmployeeService()
+
+    def test_salary_change_records_previous_and_new_salary(self):
+        ok, _ = self.service.update_employee('E001', {'basic_salary': 36000},
+                                             salary_effective_from=date(2025, 4, 1))
+        self.assertTrue(ok)
+        records = self.history.get_history('E001')
+        self.assertEqual([(r.effective_from, r.basic_salary) for r in records],
+                         [(date(2024, 1, 1), 30000), (date(2025, 4, 1), 36000)])
+
+    def test_effective_dates_are_stored_as_dates(self):
+        self.service.update_employee('E001', {'basic_salary': 36000}, salary_effective_from=date(2025, 4, 1))
+        stored = self.database.salary_history.find_one({'basic_salary': 36000})
+        self.assertIsInstance(stored['effective_from'], datetime)
+
+    def test_salary_in_force_on_a_date(self):
+        self.service.update_employee('E001', {'basic_salary': 36000}, salary_effective_from=date(2025, 4, 1))
+        self.service.update_employee('E001', {'basic_salary': 40000}, salary_effective_from=date(2025, 9, 1))
+        self.service.update_employee('E002', {'basic_salary': 50000}, salary_effective_from=date(2025, 6, 1))
+        self.assertEqual(self.history.salaries_as_of(date(2025, 3, 31)), {'E001': 30000, 'E002': 30000})
+        self.assertEqual(self.history.salaries_as_of(date(2025, 6, 30)), {'E001': 36000, 'E002': 50000})
+        self.assertEqual(self.history.salaries_as_of(date(2025, 12, 31), ['E001']), {'E001': 40000})
+        # Employees without history are left out (their basic_salary applies)
+        self.assertNotIn('E003', self.history.salaries_as_of(date(2025, 12, 31)))
+
+    def test_revision_during_a_month_applies_to_the_whole_month(self):
+        self.service.update_employee('E001', {'basic_salary': 36000}, salary_effective_from=date(2025, 4, 15))
+        self.assertEqual(self.history.month_salaries(4, 2025, ['E001']), {'E001': 36000})
+        self.assertEqual(self.history.month_salaries(3, 2025, ['E001']), {'E001': 30000})
+
+    def test_read_error_propagates(self):
+        with mock.patch.object(self.history.repository.collection, 'aggregate',
+                               side_effect=RuntimeError("connection lost")):
+            with self.assertRaises(RuntimeError):
+                self.history.month_salaries(4, 2025)
+
+    def test_past_payroll_uses_the_salary_in_force_then(self):
+        self.service.update_employee('E001', {'basic_salary': 36000}, salary_effective_from=date(2025, 4, 1))
+        mark_present(self.database, ['E001'], 3, 2025)
+        mark_present(self.database, ['E001'], 4, 2025)
+        payrolls = PayrollService()
+        _, march, _ = payrolls.generate_payroll('E001', 3, 2025)
+        _, april, _ = payrolls.generate_payroll('E001', 4, 2025)
+        self.assertAlmostEqual(march.basic_salary, 30000)
+        self.assertAlmostEqual(april.basic_salary, 36000)
+
+    def test_payroll_is_not_generated_when_history_cannot_be_read(self):
+        mark_present(self.database, ['E001'], 3, 2025)
+        payrolls = PayrollService()
+        with mock.patch.object(payrolls.salary_history.repository.collection, 'aggregate',
+                               side_effect=RuntimeError("connection lost")):
+            ok, payroll, _ = payrolls.generate_payroll('E001', 3, 2025)
+        self.assertFalse(ok)
+        self.assertIsNone(self.database.payrolls.find_one({'employee_id': 'E001'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Salary revision what-if simulation and applying a revision
+"""
+from datetime import date
+from unittest import mock
+import unittest
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.services.employee_service import EmployeeService
+from payroll_system.services.payroll_service import PayrollService
+from payroll_system.services.salary_history import SalaryHistoryService
+from payroll_system.services.salary_revision import SalaryRevision, SalaryRevisionService, simulate
+from payroll_system.services.statutory_rules import StatutoryRulesEngine
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+
+class RevisionTest(unittest.TestCase):
+
+    def assertSalaries(self, revised, expected):
+        self.assertEqual(len(revised), len(expected))
+        for salary, salary_expected in zip(revised, expected):
+            self.assertAlmostEqual(salary, salary_expected)
+
+    def test_percent(self):
+        self.assertSalaries(SalaryRevision(percent=10).revise([10000, 25000]), [11000, 27500])
+
+    def test_slabs_and_the_default_percent(self):
+        revision = SalaryRevision(percent=5, slabs=((0, 19999, 10), (20000, 39999, 8)))
+        self.assertSalaries(revision.revise([15000, 20000, 50000]), [16500, 21600, 52500])
+
+    def test_rounding(self):
+        self.assertEqual(list(SalaryRevision(percent=7, round_to=100).revise([12345])), [13200])
+
+
+class SimulateTest(unittest.TestCase):
+
+    def setUp(self):
+        # No stored rule sets: the config defaults apply everywhere
+        self.rules = StatutoryRulesEngine([])
+
+    def test_monthly_figures_before_and_after(self):
+        impact = simulate({'employee_id': ['E001'], 'basic_salary': [11000], 'location': ['Pune']},
+                          SalaryRevision(percent=10), self.rules, date(2025, 4, 1))
+        self.assertAlmostEqual(impact.column('current_gross_salary')[0], 18700)
+        self.assertAlmostEqual(impact.column('revised_gross_salary')[0], 20570)
+        # PT moves to the next slab; ESI stops at the threshold
+        self.assertEqual((impact.column('current_pt')[0], impact.column('revised_pt')[0]), (150, 200))
+        self.assertAlmostEqual(impact.column('current_esi')[0], 18700 * 0.0075)
+        self.assertAlmostEqual(impact.column('revised_pf')[0], 1452)
+        net = impact.totals()['net_salary']
+        self.assertAlmostEqual(net['change'], net['revised'] - net['current'])
+        self.assertAlmostEqual(impact.changes('basic_salary')[0], 1100)
+
+    def test_rollup(self):
+        impact = simulate({'employee_id': ['E001', 'E002', 'E003'], 'basic_salary': [10000, 20000, 30000],
+                           'department_id': ['D1', 'D2', 'D1']},
+                          SalaryRevision(percent=10), self.rules, date(2025, 4, 1))
+        rollup = impact.rollup('department')
+        self.assertEqual(list(rollup), ['D1', 'D2'])
+        self.assertEqual(rollup['D1']['count'], 2)
+        self.assertAlmostEqual(rollup['D1']['change_basic_salary'], 4000)
+
+
+class RevisionServiceTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.employees = EmployeeRepository()
+        for number, department in ((1, 'D1'), (2, 'D1'), (3, 'D2')):
+            self.employees.create(make_employee(number, basic_salary=20000, department_id=department))
+        self.service = SalaryRevisionService()
+
+    def test_filters_select_the_employees(self):
+        impact = self.service.simulate_revision(SalaryRevision(percent=10), department_ids=['D1'])
+        self.assertEqual(sorted(impact.column('employee_id')), ['E001', 'E002'])
+
+    def test_salary_in_force_on_the_date_is_used(self):
+        EmployeeService().update_employee('E001', {'basic_salary': 25000}, salary_effective_from=date(2025, 4, 1))
+        impact = self.service.simulate_revision(SalaryRevision(percent=10), employee_ids=['E001'],
+                                                on=date(2025, 3, 31))
+        self.assertEqual(list(impact.column('current_basic_salary')), [20000])
+
+    def test_simulation_writes_nothing(self):
+        self.service.simulate_revision(SalaryRevision(percent=10))
+        self.assertEqual({e.basic_salary for e in self.employees.get_all()}, {20000})
+
+    def test_apply_updates_salaries_history_and_stale_flags(self):
+        today = date.today()
+        mark_present(self.database, ['E001'], today.month, today.year)
+        PayrollService().generate_payroll('E001', today.month, today.year)
+        impact = self.service.simulate_revision(SalaryRevision(percent=10), department_ids=['D1'])
+        self.assertEqual(self.service.apply_revision(impact, reason="Annual revision"), 2)
+        employee = self.employees.get_by_id('E001')
+        self.assertEqual((employee.basic_salary, employee.pt), (22000, 200))
+        self.assertEqual(self.employees.get_by_id('E003').basic_salary, 20000)
+        history = SalaryHistoryService().get_history('E002')
+        self.assertEqual([(r.basic_salary, r.reason) for r in history][-1], (22000, "Annual revision"))
+        self.assertEqual(PayrollService().get_stale_payrolls(), [('E001', today.month, today.year)])
+
+    def test_unchanged_salaries_are_not_written(self):
+        impact = self.service.simulate_revision(SalaryRevision(percent=0))
+        self.assertEqual(self.service.apply_revision(impact), 0)
+
+    def test_only_written_employees_are_recorded(self):
+        impact = self.service.simulate_revision(SalaryRevision(percent=10), department_ids=['D1'])
+        update_many = self.service.employee_repo.update_many
+
+        def write_first_only(employees):
+            return update_many([employee for employee in employees if employee.employee_id == 'E001'])
+
+        with mock.patch.object(self.service.employee_repo, 'update_many', side_effect=write_first_only):
+            self.assertEqual(self.service.apply_revision(impact), 1)
+        self.assertEqual(self.employees.get_by_id('E002').basic_salary, 20000)
+        self.assertEqual([r.basic_salary for r in SalaryHistoryService().get_history('E002')], [])
@@ -0,0 +1,84 @@
+"""
+Stale payroll flags and recomputation of the flagged payrolls only
+"""
+from datetime import date
+from unittest import mock
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.payroll_repository import STALE_ATTENDANCE, STALE_HOLIDAYS, STALE_SALARY
+from payroll_system.services.attendance_service import AttendanceService
+from payroll_system.services.employee_service import EmployeeService
+from payroll_system.services.payroll_service import PayrollService
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+IDS = ['E001', 'E002', 'E003']
+
+
+class StalePayrollTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        employees = EmployeeRepository()
+        for number in range(1, len(IDS) + 1):
+            employees.create(make_employee(number))
+        mark_present(self.database, IDS, 3, 2025)
+        self.service = PayrollService()
+        self.service.generate_payroll('E001', 3, 2025, bonus=1000)
+        self.service.generate_payroll_run(3, 2025)
+        self.attendance = AttendanceService()
+
+    def reasons(self, employee_id, month=3, year=2025):
+        payroll = self.database.payrolls.find_one({'employee_id': employee_id, 'month': month, 'year': year})
+        return payroll.get('stale_reasons')
+
+    def test_new_payrolls_are_not_stale(self):
+        self.assertEqual(self.service.get_stale_payrolls(), [])
+
+    def test_attendance_changes_flag_the_month(self):
+        self.attendance.mark_lop('E002', date(2025, 3, 3))
+        self.attendance.delete_attendance('E003', date(2025, 3, 4))
+        self.assertEqual(self.service.get_stale_payrolls(3, 2025), [('E002', 3, 2025), ('E003', 3, 2025)])
+        self.assertEqual(self.reasons('E002'), [STALE_ATTENDANCE])
+        self.assertIsNone(self.reasons('E001'))
+
+    def test_unsaved_attendance_change_does_not_flag(self):
+        with mock.patch.object(self.attendance.repository, 'delete', return_value=False):
+            self.attendance.delete_attendance('E002', date(2025, 3, 4))
+        self.assertEqual(self.service.get_stale_payrolls(), [])
+
+    def test_holiday_change_flags_every_unpaid_payroll_of_the_month(self):
+        payroll = self.service.get_payroll('E003', 3, 2025)
+        payroll.status = 'paid'
+        self.service.update_payroll(payroll)
+        self.assertEqual(self.service.mark_holiday_changed(date(2025, 3, 14)), 2)
+        self.assertEqual([key[0] for key in self.service.get_stale_payrolls()], ['E001', 'E002'])
+        self.assertEqual(self.reasons('E001'), [STALE_HOLIDAYS])
+
+    def test_salary_change_flags_payrolls_from_this_month(self):
+        today = date.today()
+        mark_present(self.database, ['E001'], today.month, today.year)
+        self.service.generate_payroll('E001', today.month, today.year)
+        EmployeeService().update_employee('E001', {'basic_salary': 40000}, salary_effective_from=date(2025, 3, 1))
+        self.assertEqual(self.service.get_stale_payrolls(), [('E001', today.month, today.year)])
+        self.assertEqual(self.reasons('E001', today.month, today.year), [STALE_SALARY])
+
+    def test_paying_a_payroll_clears_its_flag(self):
+        self.attendance.mark_lop('E002', date(2025, 3, 3))
+        payroll = self.service.get_payroll('E002', 3, 2025)
+        payroll.status = 'paid'
+        self.service.update_payroll(payroll)
+        self.assertEqual(self.service.get_stale_payrolls(), [])
+        self.assertIsNone(self.reasons('E002'))
+
+    def test_recompute_updates_only_stale_payrolls(self):
+        before = {d['employee_id']: d['net_salary'] for d in self.database.payrolls.find()}
+        self.attendance.mark_lop('E001', date(2025, 3, 3))
+        counts = self.service.recompute_stale()
+        self.assertEqual(counts, {'recomputed': 1, 'skipped': 0, 'failed': 0})
+        recomputed = self.service.get_payroll('E001', 3, 2025)
+        self.assertEqual((recomputed.lop_days, recomputed.bonus), (1, 1000))
+        self.assertLess(recomputed.net_salary, before['E001'])
+        self.assertEqual(self.service.get_payroll('E002', 3, 2025).net_salary, before['E002'])
+        self.assertEqual(self.service.get_stale_payrolls(), [])
+        self.assertIsNone(self.reasons('E001'))
@@ -0,0 +1,102 @@
+"""
+Versioned statutory rule sets by state and effective date
+"""
+from datetime import date
+from unittest import mock
+import unittest
+
+from payroll_system.config import PF_RATE
+from payroll_system.models.statutory import StatutoryRuleSet
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.statutory_repository import StatutoryRuleRepository
+from payroll_system.services import statutory_rules
+from payroll_system.services.payroll_service import PayrollService
+from payroll_system.services.statutory_rules import (StatutoryRulesEngine, compile_pt, get_rules_engine,
+                                                     refresh_rules)
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+
+def rule_set(state, effective_from, pf_rate=0.10, pt_slabs=((0, 9999, 0), (10000, None, 300))):
+    return StatutoryRuleSet(state, effective_from, pf_rate, 1800, 0.0075, 21000, 0.40, 0.20, 0.10, 1.5,
+                            list(pt_slabs))
+
+
+class CompilePtTest(unittest.TestCase):
+
+    def test_slabs(self):
+        pt = compile_pt([(0, 5999, 0), (6000, 8999, 80), (9000, None, 200)])
+        self.assertEqual([pt(0), pt(6000), pt(8999), pt(9000), pt(10 ** 7)], [0, 80, 80, 200, 200])
+
+    def test_gaps_and_salaries_below_the_slabs_pay_nothing(self):
+        pt = compile_pt([(1000, 1999, 50), (3000, 3999, 100)])
+        self.assertEqual([pt(500), pt(2500), pt(4000)], [0, 0, 0])
+
+
+class RulesEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = StatutoryRulesEngine([
+            rule_set('Maharashtra', date(2024, 4, 1), pf_rate=0.10),
+            rule_set('Maharashtra', date(2025, 4, 1), pf_rate=0.11),
+            rule_set('Karnataka', date(2024, 4, 1), pf_rate=0.09),
+        ])
+
+    def test_cities_resolve_to_their_state(self):
+        self.assertEqual(self.engine.rules_for('Pune', date(2024, 6, 1)).pf_rate, 0.10)
+        self.assertEqual(self.engine.rules_for('Mumbai', date(2024, 6, 1)).pf_rate, 0.10)
+        self.assertEqual(self.engine.rules_for(' bangalore ', date(2024, 6, 1)).pf_rate, 0.09)
+        self.assertEqual(self.engine.rules_for('Maharashtra', date(2024, 6, 1)).pf_rate, 0.10)
+
+    def test_version_in_force_on_the_date(self):
+        self.assertEqual(self.engine.rules_for('Pune', date(2025, 3, 31)).pf_rate, 0.10)
+        self.assertEqual(self.engine.rules_for('Pune', date(2025, 4, 1)).pf_rate, 0.11)
+
+    def test_default_rules_where_none_apply(self):
+        # No rule set for Tamil Nadu, or for Maharashtra before its first version
+        self.assertEqual(self.engine.rules_for('Chennai', date(2025, 1, 1)).pf_rate, PF_RATE)
+        self.assertEqual(self.engine.rules_for('Pune', date(2023, 1, 1)).pf_rate, PF_RATE)
+        self.assertEqual(self.engine.rules_for(None, date(2025, 1, 1)).pf_rate, PF_RATE)
+
+
+class StoredRulesTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.repository = StatutoryRuleRepository()
+
+    def test_payroll_uses_the_rules_of_the_employee_state(self):
+        self.repository.save(rule_set('Maharashtra', date(2024, 4, 1), pf_rate=0.05))
+        EmployeeRepository().create(make_employee(1, basic_salary=30000, location='Pune'))
+        EmployeeRepository().create(make_employee(2, basic_salary=30000, location='Chennai'))
+        mark_present(self.database, ['E001', 'E002'], 3, 2025)
+        counts = PayrollService().generate_payroll_run(3, 2025)
+        self.assertEqual(counts['generated'], 2)
+        pune, chennai = (self.database.payrolls.find_one({'employee_id': e}) for e in ('E001', 'E002'))
+        self.assertAlmostEqual(pune['pf'], 1500)
+        self.assertAlmostEqual(pune['pt'], 300)
+        self.assertAlmostEqual(chennai['pf'], 1800)
+
+    def test_refresh_checks_the_stored_rules_at_most_every_interval(self):
+        engine = get_rules_engine()
+        self.repository.save(rule_set('Maharashtra', date(2024, 4, 1)))
+        with mock.patch.object(StatutoryRuleRepository, 'get_version',
+                               wraps=self.repository.get_version) as get_version:
+            self.assertIs(refresh_rules(), engine)
+            self.assertIs(refresh_rules(), engine)
+            self.assertEqual(get_version.call_count, 0)
+            with mock.patch.object(statutory_rules, 'RULES_REFRESH_S', 0):
+                refreshed = refresh_rules()
+        # The check, then the reload stamping what it loaded
+        self.assertEqual(get_version.call_count, 2)
+        self.assertIsNot(refreshed, engine)
+        self.assertEqual(refreshed.rules_for('Pune', date(2025, 1, 1)).pf_rate, 0.10)
+
+    def test_unchanged_rules_are_kept(self):
+        engine = get_rules_engine()
+        with mock.patch.object(statutory_rules, 'RULES_REFRESH_S', 0):
+            self.assertIs(refresh_rules(), engine)
+
+
+if __name__ == '__main__':
+    unittest.main()
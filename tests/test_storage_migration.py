@@ -0,0 +1,57 @@
+"""
+Online migration of attendance dates from ISO strings to BSON dates
+"""
+from datetime import date, datetime
+
+from payroll_system.repository.attendance_repository import AttendanceRepository
+from payroll_system.repository.migration_repository import ATTENDANCE_DATES, MigrationRepository
+from payroll_system.tools.migrate_storage import MIGRATIONS, MigrationRunner
+
+from helpers import DatabaseTestCase
+
+
+class AttendanceDatesMigrationTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Records written by a client from before the migration
+        self.database.attendance.insert_many([
+            {'employee_id': 'E001', 'date': f'2025-03-{day:02d}', 'status': 'present'} for day in (3, 4, 5)])
+        self.states = MigrationRepository()
+        self.states.reset(ATTENDANCE_DATES)
+
+    def run_migration(self, batch_size=2):
+        return MigrationRunner(self.database, batch_size=batch_size, progress=lambda message: None).run(
+            MIGRATIONS[ATTENDANCE_DATES])
+
+    def test_new_database_is_marked_complete_at_connect(self):
+        self.database.attendance.delete_many({})
+        self.assertEqual(self.states.mark_finished(), [ATTENDANCE_DATES])
+        self.assertTrue(self.states.is_complete(ATTENDANCE_DATES))
+
+    def test_legacy_dates_are_read_until_migrated(self):
+        self.assertEqual(self.states.mark_finished(), [])
+        repository = AttendanceRepository('daily')
+        self.assertEqual(len(repository.get_by_employee_month('E001', 3, 2025)), 3)
+        self.assertIsNotNone(repository.get_by_employee_and_date('E001', date(2025, 3, 4)))
+
+    def test_migration_converts_every_record(self):
+        state = self.run_migration()
+        self.assertEqual((state['status'], state['converted']), ('complete', 3))
+        self.assertTrue(all(isinstance(d['date'], datetime) for d in self.database.attendance.find()))
+        self.assertTrue(self.states.is_complete(ATTENDANCE_DATES))
+        repository = AttendanceRepository('daily')
+        self.assertFalse(repository.layout.dual_read)
+        self.assertEqual(len(repository.get_by_employee_month('E001', 3, 2025)), 3)
+
+    def test_interrupted_migration_resumes_after_its_last_batch(self):
+        first = self.database.attendance.find_one({'date': '2025-03-03'})
+        self.states.save_state(ATTENDANCE_DATES, status='running', last_id=first['_id'], converted=1)
+        self.database.attendance.update_one({'_id': first['_id']}, {'$set': {'date': datetime(2025, 3, 3)}})
+        state = self.run_migration(batch_size=1)
+        self.assertEqual((state['status'], state['converted']), ('complete', 3))
+
+    def test_completed_migration_is_not_run_again(self):
+        self.run_migration()
+        self.database.attendance.insert_one({'employee_id': 'E002', 'date': '2025-03-06'})
+        self.assertEqual(self.run_migration()['converted'], 3)
@@ -0,0 +1,67 @@
+"""
+Generator-based streaming reads: a failed read is raised, never cut short
+"""
+from unittest import mock
+
+from pymongo.errors import AutoReconnect
+
+from payroll_system.repository.employee_repository import EmployeeRepository
+from payroll_system.repository.payroll_repository import PayrollRepository
+from payroll_system.services.payroll_service import PayrollService
+
+from helpers import DatabaseTestCase, make_employee, mark_present
+
+
+class _FailingCursor:
+    """A cursor that returns ``documents`` and then loses the connection"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __iter__(self):
+        yield from self.documents
+        raise AutoReconnect("connection lost")
+
+
+class StreamingTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.employees = EmployeeRepository()
+        for number in (3, 1, 2):
+            self.employees.create(make_employee(number))
+
+    def failing_find(self, repository):
+        documents = list(repository.collection.find({}))[:1]
+        return mock.patch.object(repository.collection, 'find', return_value=_FailingCursor(documents))
+
+    def test_employees_stream_in_id_order(self):
+        self.assertEqual([e.employee_id for e in self.employees.iter_all(batch_size=1)], ['E001', 'E002', 'E003'])
+
+    def test_stream_raises_after_a_partial_read(self):
+        read = []
+        with self.failing_find(self.employees), self.assertRaises(AutoReconnect):
+            for employee in self.employees.iter_all():
+                read.append(employee.employee_id)
+        self.assertEqual(len(read), 1)
+
+    def test_lists_are_empty_rather_than_partial(self):
+        with self.failing_find(self.employees):
+            self.assertEqual(self.employees.get_all(), [])
+
+    def test_payroll_streams(self):
+        mark_present(self.database, ['E001', 'E002', 'E003'], 3, 2025)
+        service = PayrollService()
+        service.generate_payroll_run(3, 2025)
+        self.assertEqual(sorted(p.employee_id for p in service.iter_payrolls(3, 2025)), ['E001', 'E002', 'E003'])
+        repository = PayrollRepository()
+        with self.failing_find(repository):
+            with self.assertRaises(AutoReconnect):
+                list(repository.iter_by_period_range((2025, 1), (2025, 12)))
+            self.assertEqual(repository.get_all_by_month(3, 2025), [])
@@ -0,0 +1,72 @@
+"""
+Form field and column validation
+"""
+from datetime import date
+import unittest
+
+from payroll_system.utils.validators import (ValidationError, calculate_pt, calculate_pt_batch, first_errors,
+                                             validate_bank_account, validate_column, validate_columns,
+                                             validate_date, validate_email, validate_phone, validate_salary)
+
+
+class FieldValidatorsTest(unittest.TestCase):
+
+    def test_email(self):
+        self.assertTrue(validate_email('asha.k+hr@example.co.in'))
+        self.assertFalse(validate_email('asha@example'))
+        self.assertFalse(validate_email('asha@example.com '))
+
+    def test_phone_and_bank_account(self):
+        self.assertTrue(validate_phone(9876543210))
+        self.assertFalse(validate_phone('98765-43210'))
+        self.assertTrue(validate_bank_account('123456789012'))
+        self.assertFalse(validate_bank_account('123456789'))
+
+    def test_date(self):
+        self.assertTrue(validate_date('2024-02-29'))
+        self.assertFalse(validate_date('2023-02-29'))
+
+    def test_salary(self):
+        self.assertTrue(validate_salary('30000.50'))
+        self.assertTrue(validate_salary(0))
+        for value in ('-1', 'inf', 'nan', 'abc', None):
+            self.assertFalse(validate_salary(value), value)
+
+    def test_pt_slabs(self):
+        salaries = [0, 5999, 6000, 8999.5, 9000, 12000, 10 ** 7]
+        expected = [0, 0, 80, 0, 150, 200, 200]
+        self.assertEqual([calculate_pt(s) for s in salaries], expected)
+        self.assertEqual(calculate_pt_batch(salaries), expected)
+        self.assertEqual(calculate_pt_batch([None, '']), [0, 0])
+
+
+class ColumnValidationTest(unittest.TestCase):
+
+    def test_column_errors_in_row_order(self):
+        errors = validate_column('email', ['a@example.com', 'bad', '', 'also bad'])
+        self.assertEqual([(e.row, e.value) for e in errors], [(1, 'bad'), (3, 'also bad')])
+
+    def test_blank_values_are_only_checked_when_required(self):
+        self.assertEqual(validate_column('basic_salary', ['', None]), [])
+        errors = validate_column('basic_salary', ['', None], required=True)
+        self.assertEqual([e.message for e in errors], ["Missing basic salary"] * 2)
+
+    def test_dates_must_be_iso(self):
+        errors = validate_column('joining_date', ['2024-01-15', '15/01/2024', '2024-1-5', date(2024, 1, 5)])
+        self.assertEqual([e.row for e in errors], [1, 2])
+
+    def test_columns_are_ordered_by_row_then_field(self):
+        errors = validate_columns({'email': ['bad', 'a@example.com'], 'basic_salary': ['-5', '1'],
+                                   'city': ['', '']},
+                                  required=('employee_id', 'email'))
+        self.assertEqual([(e.row, e.field) for e in errors],
+                         [(0, 'employee_id'), (0, 'email'), (0, 'basic_salary'), (1, 'employee_id')])
+
+    def test_first_error_of_each_row(self):
+        errors = [ValidationError(0, 'email', 'x', "first"), ValidationError(0, 'basic_salary', 'y', "second"),
+                  ValidationError(2, 'email', 'z', "third")]
+        self.assertEqual({row: e.message for row, e in first_errors(errors).items()}, {0: "first", 2: "third"})
+
+
+if __name__ == '__main__':
+    unittest.main()